@@ -1,7 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from . import pricing
 from .models import (
     Category, SubCategory, Shop, Product,
-    Advertisement, ProductReview, ProductLike
+    Advertisement, ProductReview, ProductLike, DiscountCampaign
 )
 
 
@@ -26,12 +27,40 @@ class ShopAdmin(admin.ModelAdmin):
     date_hierarchy = 'yaratilgan_vaqt'
 
 
+def discount_action(percent):
+    """Tanlangan mahsulotlarga bitta UPDATE bilan chegirma beruvchi admin action"""
+    def apply(modeladmin, request, queryset):
+        updated = pricing.apply_discount(queryset, percent, discount_campaign=None)
+        modeladmin.message_user(request, f"{updated} ta mahsulot narxi o'zgardi", messages.SUCCESS)
+
+    if percent is None:
+        apply.__name__ = 'remove_discount'
+        apply.short_description = "Chegirmani olib tashlash"
+    else:
+        apply.__name__ = f'discount_{percent}'
+        apply.short_description = f"{percent}% chegirma berish"
+    return apply
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['nomi', 'shop', 'category', 'narx', 'chegirma_bormi', 'yaratilgan_vaqt']
+    list_display = [
+        'nomi', 'shop', 'category', 'narx', 'chegirma_bormi',
+        'reviews_count', 'likes_count', 'yaratilgan_vaqt'
+    ]
     list_filter = ['chegirma_bormi', 'category', 'yaratilgan_vaqt']
-    search_fields = ['nomi', 'tavsif']
+    search_fields = ['nomi', 'sku', 'tavsif']
     date_hierarchy = 'yaratilgan_vaqt'
+    actions = [discount_action(percent) for percent in (10, 20, 30, 50)] + [discount_action(None)]
+
+
+@admin.register(DiscountCampaign)
+class DiscountCampaignAdmin(admin.ModelAdmin):
+    list_display = ['nomi', 'chegirma_foizi', 'product', 'shop', 'category', 'boshlanish_vaqti', 'tugash_vaqti', 'faol']
+    list_filter = ['faol', 'boshlanish_vaqti']
+    search_fields = ['nomi']
+    raw_id_fields = ['product']
+    date_hierarchy = 'boshlanish_vaqti'
 
 
 @admin.register(Advertisement)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CategoriyaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'categoriya'
+
+    def ready(self):
+        from core import db_routing, metrics  # noqa: F401 (SQL wrapper'lari)
+        from . import signals  # noqa: F401
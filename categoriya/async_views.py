@@ -0,0 +1,103 @@
+"""
+Katalogning async (ASGI) o'qish endpointlari: ``/api/v1/async/...``.
+
+Sinxron DRF viewset'lari ASGI ostida har bir so'rov uchun oqim egallaydi.
+Bu yerdagi view'lar Django async ORM (``aget``, ``aiterator``, ``acount``)
+bilan ishlaydi, mustaqil so'rovlar (masalan mahsulot, uning sharhlari,
+likelari va reklamalari) ``gather_lists`` orqali bir vaqtda bajariladi,
+serializatsiya esa event loop'dan tashqarida (``core.async_db.render``).
+
+Javoblar sinxron API bilan bir xil serializerlardan tuziladi. Ro'yxatlar
+``?cursor=`` kursorli (keyset) pagination bilan; ``?count=true`` bo'lsa jami
+soni ham qaytadi. Javob keshi va ETag bu yo'lda ishlatilmaydi (kategoriyalar
+daraxtidan tashqari: u ``tree`` snapshot'idan beriladi).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import ValidationError
+
+from core.async_db import async_api_view, attach_prefetched, gather_lists, render
+from core.eager_loading import plan_queryset
+from core.pagination import KeysetPagination
+from . import tree
+from .models import Advertisement, Product, ProductLike, ProductReview, Shop
+from .serializers import (
+    ProductAdSerializer, ProductFullSerializer,
+    ProductLikeSerializer, ProductReviewSerializer, ProductSerializer,
+)
+
+
+PRODUCT_FILTERS = ('shop', 'category', 'subcategory')
+
+
+def _bool_param(value):
+    return value.lower() in ('1', 'true')
+
+
+async def keyset_response(request, queryset, serializer_class):
+    """Kursorli sahifa; ``?count=true`` bo'lsa COUNT bir vaqtda hisoblanadi"""
+    paginator = KeysetPagination()
+    page = paginator.apaginate_queryset(plan_queryset(queryset, serializer_class), request)
+    if _bool_param(request.query_params.get('count', '')):
+        rows, count = await asyncio.gather(page, queryset.acount())
+    else:
+        rows, count = await page, None
+    wrap = paginator.get_paginated_data(None)
+    if count is not None:
+        wrap = {'count': count, **wrap}
+    return await render(serializer_class, rows, many=True, context={'request': request}, wrap=wrap)
+
+
+@async_api_view
+async def product_list(request):
+    params = request.query_params
+    products = Product.objects.all()
+    for name in PRODUCT_FILTERS:
+        if params.get(name):
+            try:
+                products = products.filter(**{f'{name}_id': int(params[name])})
+            except ValueError:
+                raise ValidationError({name: "Son bo'lishi kerak"})
+    if params.get('chegirma_bormi'):
+        products = products.filter(chegirma_bormi=_bool_param(params['chegirma_bormi']))
+    return await keyset_response(request, products, ProductSerializer)
+
+
+@async_api_view
+async def product_detail(request, pk):
+    product, reviews, likes, ads = await gather_lists(
+        plan_queryset(Product.objects.filter(pk=pk), ProductSerializer),
+        plan_queryset(ProductReview.objects.filter(product_id=pk), ProductReviewSerializer),
+        plan_queryset(ProductLike.objects.filter(product_id=pk), ProductLikeSerializer),
+        plan_queryset(Advertisement.objects.filter(product_id=pk), ProductAdSerializer),
+    )
+    if not product:
+        raise Product.DoesNotExist
+    product = product[0]
+    attach_prefetched(product, 'reviews', reviews)
+    attach_prefetched(product, 'likes', likes)
+    attach_prefetched(product, 'ads', ads)
+    return await render(ProductFullSerializer, product, context={'request': request})
+
+
+@async_api_view
+async def product_reviews(request, pk):
+    await Product.objects.only('pk').aget(pk=pk)
+    return await keyset_response(request, ProductReview.objects.filter(product_id=pk), ProductReviewSerializer)
+
+
+@async_api_view
+async def shop_products(request, pk):
+    await Shop.objects.only('pk').aget(pk=pk)
+    products = Product.objects.filter(shop_id=pk)
+    has_discount = request.query_params.get('has_discount')
+    if has_discount is not None:
+        products = products.filter(chegirma_bormi=has_discount.lower() == 'true')
+    return await keyset_response(request, products, ProductSerializer)
+
+
+@async_api_view
+async def category_tree(request):
+    # Worker xotirasidagi snapshot: versiya o'zgarmagan bo'lsa DB so'rovi yo'q
+    return tree.tree_response(request, await sync_to_async(tree.TREE.get)())
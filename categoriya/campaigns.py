@@ -0,0 +1,93 @@
+"""
+Chegirma kampaniyalarini mahsulotlarga qo'llash va muddati o'tganda olib tashlash.
+
+``run_campaigns`` har ishga tushganda ikki bosqichni bajaradi:
+
+1. Faol kampaniyalar (``faol`` va ``boshlanish_vaqti <= now < tugash_vaqti``)
+   foiz bo'yicha kamayish tartibida qo'llanadi. Kampaniya o'z doirasidagi
+   mahsulotlardan faqat chegirmasizlarini, o'zinikini, kichikroq foizli yoki
+   nofaol kampaniyaniki bo'lganlarini oladi -- qo'lda qo'yilgan chegirmaga
+   (``discount_campaign`` bo'sh, ``chegirma_bormi`` True) tegilmaydi. Bir
+   mahsulotga bir nechta kampaniya tushsa eng kattasi qoladi.
+2. Hali ham nofaol kampaniyaga bog'langan mahsulotlarning chegirmasi olib
+   tashlanadi.
+
+Har bir yozuv -- ``pricing.apply_discount`` (``UPDATE ... WHERE``, mahsulotlar
+Python'ga o'qilmaydi) id oraliqlari bo'yicha ``batch_size`` lik bo'laklarda:
+tranzaksiya va qulf qisqa, xotira mahsulotlar soniga bog'liq emas. Qiymati
+allaqachon to'g'ri qatorlar yangilanmaydi, shuning uchun qayta ishga tushirish
+xavfsiz va hech narsa o'zgarmasa ``0`` qaytaradi.
+"""
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from . import pricing
+from .models import DiscountCampaign, Product
+
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def active_campaigns(now):
+    return DiscountCampaign.objects.filter(faol=True, boshlanish_vaqti__lte=now, tugash_vaqti__gt=now)
+
+
+def campaign_products(campaign):
+    """Kampaniya doirasidagi mahsulotlar (ko'rsatilgan maydonlar AND bilan)"""
+    scope = {
+        lookup: getattr(campaign, f'{field}_id')
+        for field, lookup in (('product', 'pk'), ('shop', 'shop'), ('category', 'category'))
+        if getattr(campaign, f'{field}_id') is not None
+    }
+    return Product.objects.filter(**scope)
+
+
+def _apply_in_batches(queryset, percent, batch_size, **extra):
+    """
+    ``apply_discount`` ni id oraliqlari bo'yicha bo'laklab chaqiradi (qatorlar
+    o'qilmaydi). Qidiruv hujjatlari butun oraliq uchun sinxronlanadi: filtr
+    ``discount_campaign`` ga bog'liq, yozuvdan keyin qatorlar undan chiqib ketadi.
+    """
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+    updated = 0
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        batch = Product.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+        updated += pricing.apply_discount(
+            queryset.filter(pk__gte=start, pk__lt=start + batch_size), percent, scope=batch, **extra,
+        )
+    return updated
+
+
+def run_campaigns(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    """``{'campaigns', 'applied', 'expired'}``: faol kampaniyalar va o'zgargan qatorlar soni"""
+    now = now or timezone.now()
+    active = active_campaigns(now)
+    # Qolgan kampaniyalar -- nofaol, ularning mahsulotlarini boshqasi olishi mumkin
+    inactive = DiscountCampaign.objects.exclude(pk__in=active.values('pk')).values('pk')
+
+    campaigns = 0
+    applied = 0
+    for campaign in active.order_by('-chegirma_foizi', 'pk').iterator():
+        campaigns += 1
+        eligible = campaign_products(campaign).filter(
+            Q(discount_campaign=campaign)
+            | Q(discount_campaign__isnull=True, chegirma_bormi=False)
+            | Q(discount_campaign__chegirma_foizi__lt=campaign.chegirma_foizi)
+            | Q(discount_campaign__in=inactive)
+        )
+        applied += _apply_in_batches(eligible, campaign.chegirma_foizi, batch_size, discount_campaign=campaign)
+
+    expired = _apply_in_batches(
+        Product.objects.filter(discount_campaign__in=inactive), None, batch_size, discount_campaign=None,
+    )
+    return {'campaigns': campaigns, 'applied': applied, 'expired': expired}
+
+
+def clear_campaign(campaign):
+    """O'chirilayotgan kampaniya qo'ygan chegirmalarni olib tashlaydi"""
+    products = Product.objects.filter(discount_campaign=campaign)
+    # Yozuvdan keyin filtr bo'shaydi: sinxronlash uchun id'lar oldindan olinadi
+    ids = list(products.values_list('pk', flat=True))
+    return pricing.apply_discount(products, None, scope=Product.objects.filter(pk__in=ids), discount_campaign=None)
@@ -0,0 +1,193 @@
+"""
+Katalogni NDJSON yoki CSV oqim (stream) sifatida eksport qilish.
+
+Hamkorlar (narx agregatorlari) butun katalogni sahifama-sahifa o'qimasdan bitta
+so'rovda oladi: ``GET /api/v1/products/export/?format=ndjson|csv``.
+
+* Qatorlar ``values_list`` + ``iterator(chunk_size=...)`` bilan o'qiladi --
+  model obyektlari yaratilmaydi va xotira katalog hajmiga bog'liq emas.
+  Do'kon, kategoriya va subkategoriya nomlari shu so'rovning o'zida JOIN qilinadi.
+* Matn ``BUFFER_SIZE`` baytlik bo'laklarga yig'ilib yuboriladi; mijoz
+  ``Accept-Encoding: gzip`` yuborsa bo'laklar oqim davomida siqiladi.
+* Filtrlar ``ProductViewSet.filterset_fields`` bilan bir xil, qo'shimcha
+  ``updated_since`` -- faqat shu vaqtdan keyin o'zgargan mahsulotlar
+  (inkremental eksport). Keyingi eksport uchun ``updated_since`` qiymati
+  sifatida ``X-Export-Watermark`` sarlavhasini ishlatish kerak: u so'rov
+  boshlanishidan oldin olinadi, shuning uchun hech bir o'zgarish tushib qolmaydi.
+"""
+import csv
+import io
+import json
+import re
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django_filters import rest_framework as filters
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .models import Product
+
+
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+DEFAULT_CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+# (chiqish ustuni, ``values_list`` maydoni); ``average_rating`` hisoblanadi
+COLUMNS = (
+    ('id', 'id'),
+    ('sku', 'sku'),
+    ('nomi', 'nomi'),
+    ('tavsif', 'tavsif'),
+    ('narx', 'narx'),
+    ('chegirma_narx', 'chegirma_narx'),
+    ('chegirma_bormi', 'chegirma_bormi'),
+    ('shop', 'shop_id'),
+    ('shop_nomi', 'shop__kompaniya_nomi'),
+    ('category', 'category_id'),
+    ('category_nomi', 'category__nomi'),
+    ('subcategory', 'subcategory_id'),
+    ('subcategory_nomi', 'subcategory__nomi'),
+    ('rasm', 'rasm'),
+    ('reviews_count', 'reviews_count'),
+    ('likes_count', 'likes_count'),
+    ('average_rating', 'rating_sum'),
+    ('yaratilgan_vaqt', 'yaratilgan_vaqt'),
+    ('yangilangan_vaqt', 'yangilangan_vaqt'),
+)
+HEADER = [name for name, _ in COLUMNS]
+
+_GZIP_RE = re.compile(r'\bgzip\b')
+
+
+class ProductExportFilter(filters.FilterSet):
+    updated_since = filters.IsoDateTimeFilter(field_name='yangilangan_vaqt', lookup_expr='gte')
+
+    class Meta:
+        model = Product
+        fields = ['shop', 'category', 'subcategory', 'chegirma_bormi', 'updated_since']
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Eksport action'ida ``?format=ndjson`` / ``Accept`` kelishuvi uchun. Ma'lumot
+    ``StreamingHttpResponse`` orqali ketadi, renderer faqat xato javobini
+    (bitta JSON qator) yozadi.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class CSVRenderer(NDJSONRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+def export_queryset(queryset):
+    """Eksport qatorlari: ``COLUMNS`` tartibidagi tuple'lar, id bo'yicha"""
+    return queryset.order_by('pk').values_list(*(field for _, field in COLUMNS))
+
+
+def iter_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE, media_url=''):
+    """``COLUMNS`` tartibidagi ro'yxatlar; ``rasm`` to'liq URL, reyting hisoblangan"""
+    rasm = HEADER.index('rasm')
+    rating = HEADER.index('average_rating')
+    reviews = HEADER.index('reviews_count')
+    for values in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        row = list(values)
+        row[rasm] = f'{media_url}{row[rasm]}' if row[rasm] else None
+        row[rating] = round(row[rating] / row[reviews], 2) if row[reviews] else None
+        yield row
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(HEADER, row))) + '\n'
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        # import_products qayta o'qiy oladigan ko'rinishda
+        return 'true' if value else 'false'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+ENCODERS = {'ndjson': ndjson_lines, 'csv': csv_lines}
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Satrlarni ``size`` baytdan katta bo'laklarga yig'ib, UTF-8 bayt qaytaradi"""
+    parts, length = [], 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts).encode()
+            parts, length = [], 0
+    if parts:
+        yield ''.join(parts).encode()
+
+
+def gzipped(chunks, level=6):
+    """Bo'laklarni oqim davomida gzip formatida siqadi"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(queryset, format, compress=False, chunk_size=DEFAULT_CHUNK_SIZE, media_url=''):
+    """Eksportning bayt bo'laklari (fayl yoki HTTP javob uchun)"""
+    chunks = buffered(ENCODERS[format](iter_rows(queryset, chunk_size, media_url)))
+    return gzipped(chunks) if compress else chunks
+
+
+async def aiterate(iterator):
+    """
+    Sinxron generatorni ASGI uchun async generatorga o'raydi. Aks holda Django
+    sinxron oqimni ASGI ostida avval to'liq xotiraga o'qib oladi. Bo'laklar
+    bitta oqimda olinadi: ochiq kursor shu oqimning DB ulanishiga tegishli.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await step(iterator, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def accepts_gzip(request):
+    return bool(_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+
+def watermark():
+    return timezone.now().isoformat()
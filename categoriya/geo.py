@@ -0,0 +1,140 @@
+"""
+Joylashuv bo'yicha qidiruv (PostGIS'siz, oddiy SQLite/PostgreSQL'da).
+
+Yer yuzi ``CELL_SIZE`` gradusli to'rga bo'linadi va har bir do'konning katak
+raqami ``Shop.geo_cell`` ustunida (indeks bilan) saqlanadi. Katak raqami
+qatorlar bo'yicha tartiblangan (``lat_index * LNG_CELLS + lng_index``), shuning
+uchun bounding-box ning har bir kenglik qatori indeksdagi bitta uzluksiz
+``BETWEEN`` oraliqqa to'g'ri keladi.
+
+Qidiruv uch bosqichda:
+
+1. bounding-box kataklari -- ``geo_cell`` indeksi bo'yicha;
+2. aniq bounding-box -- ``latitude``/``longitude`` oralig'i;
+3. haversine masofa -- SQL ifodasi bilan, ``radius`` dan uzoqlari tashlanadi
+   va natija masofa bo'yicha saralanadi.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+CELL_SIZE = 0.05  # ~5.5 km
+LAT_CELLS = math.ceil(180 / CELL_SIZE)
+LNG_CELLS = math.ceil(360 / CELL_SIZE)
+
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 100
+
+
+def _lat_index(lat):
+    return min(LAT_CELLS - 1, max(0, int(math.floor((lat + 90) / CELL_SIZE))))
+
+
+def _lng_index(lng):
+    return min(LNG_CELLS - 1, max(0, int(math.floor((lng + 180) / CELL_SIZE))))
+
+
+def cell_for(lat, lng):
+    """Nuqta joylashgan katak raqami; koordinata bo'lmasa ``None``"""
+    if lat is None or lng is None:
+        return None
+    return _lat_index(float(lat)) * LNG_CELLS + _lng_index(float(lng))
+
+
+def bounding_box(lat, lng, radius_km):
+    """``(min_lat, max_lat, min_lng, max_lng)``; uzunlik oralig'i 180 dan o'tishi mumkin"""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 89.9:
+        # Qutb yaqinida butun uzunlik oralig'i
+        return min_lat, max_lat, -180.0, 180.0
+    dlng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+    if dlng >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def _lng_ranges(min_lng, max_lng):
+    """180-meridiandan o'tgan oraliqni ikkiga bo'ladi"""
+    if min_lng < -180:
+        return [(min_lng + 360, 180.0), (-180.0, max_lng)]
+    if max_lng > 180:
+        return [(min_lng, 180.0), (-180.0, max_lng - 360)]
+    return [(min_lng, max_lng)]
+
+
+def cell_ranges(lat, lng, radius_km):
+    """Bounding-box ni qoplovchi ``[(birinchi_katak, oxirgi_katak), ...]``"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    ranges = []
+    for row in range(_lat_index(min_lat), _lat_index(max_lat) + 1):
+        base = row * LNG_CELLS
+        for low, high in _lng_ranges(min_lng, max_lng):
+            ranges.append((base + _lng_index(low), base + _lng_index(high)))
+    return ranges
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Ikki nuqta orasidagi masofa (km), Python'da"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(lat, lng, prefix=''):
+    """``(lat, lng)`` dan ``{prefix}latitude/longitude`` gacha haversine masofa (km)"""
+    row_lat = Radians(Cast(F(f'{prefix}latitude'), FloatField()))
+    row_lng = Radians(Cast(F(f'{prefix}longitude'), FloatField()))
+    lat_rad = Value(math.radians(lat))
+    a = (
+        Power(Sin((row_lat - lat_rad) / 2), 2)
+        + Value(math.cos(math.radians(lat))) * Cos(row_lat)
+        * Power(Sin((row_lng - Value(math.radians(lng))) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a))
+
+
+def area_filter(lat, lng, radius_km, prefix=''):
+    """Katak indeksi + aniq bounding-box sharti"""
+    cells = Q()
+    for low, high in cell_ranges(lat, lng, radius_km):
+        cells |= Q(**{f'{prefix}geo_cell__range': (low, high)})
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    box = Q(**{f'{prefix}latitude__range': (min_lat, max_lat)})
+    lng_box = Q()
+    for low, high in _lng_ranges(min_lng, max_lng):
+        lng_box |= Q(**{f'{prefix}longitude__range': (low, high)})
+    return cells & box & lng_box
+
+
+def within(queryset, lat, lng, radius_km, prefix=''):
+    """
+    ``radius_km`` ichidagi obyektlar, ``distance_km`` annotatsiyasi bilan,
+    masofa bo'yicha saralangan. ``prefix`` -- do'konga yo'l (masalan ``'shop__'``).
+    """
+    return (
+        queryset.filter(area_filter(lat, lng, radius_km, prefix))
+        .annotate(distance_km=distance_expression(lat, lng, prefix))
+        .filter(distance_km__lte=radius_km)
+        .order_by('distance_km', 'pk')
+    )
+
+
+def nearest(queryset, lat, lng, k, max_radius_km=MAX_RADIUS_KM, prefix=''):
+    """
+    Eng yaqin ``k`` ta obyekt (k-nearest). Radius ``k`` ta nomzod topilguncha
+    ikki barobardan oshiriladi, lekin ``max_radius_km`` dan oshmaydi.
+    """
+    radius = min(DEFAULT_RADIUS_KM, max_radius_km)
+    while True:
+        candidates = within(queryset, lat, lng, radius, prefix)
+        if radius >= max_radius_km or candidates.order_by()[:k].count() >= k:
+            return candidates[:k]
+        radius = min(radius * 2, max_radius_km)
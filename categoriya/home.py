@@ -0,0 +1,217 @@
+"""
+Bosh sahifa (``/api/v1/home/``): reklamalar, chegirmalar, kategoriyalar, yangi
+va eng yuqori baholangan mahsulotlar bitta javobda.
+
+Har bir bo'lim mustaqil: ``?<bo'lim>=n`` bilan soni beriladi (``0`` -- bo'lim
+javobga kirmaydi), o'z kesh muddati (``HOME_SECTION_TTL``) bor va keshda
+bo'lmagan bo'limlar alohida oqimlarda (har biri o'z DB ulanishi bilan) bir
+vaqtda quriladi. Ulanish tranzaksiya ichida bo'lsa (testlar) boshqa ulanish
+commit qilinmagan ma'lumotni ko'rmaydi -- bo'limlar navbat bilan quriladi.
+
+Keshdagi bo'limlar avlodlarga bog'lanmagan: ma'lumot ko'pi bilan TTL soniya
+eskiradi (reytinglar har sharhda o'zgaradi, lekin bosh sahifa uchun bir necha
+daqiqalik kechikish yetarli). Mahsulotlar ``shared`` kontekstda
+serializatsiya qilinadi; ``is_liked``/``my_rating`` har so'rovda
+``viewer.overlay`` bilan qo'yiladi.
+"""
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+
+from core import db_routing, profiling, response_cache
+from core.eager_loading import plan_queryset
+from . import viewer
+from .models import Advertisement, Category, Product
+from .serializers import AdvertisementSerializer, CategorySerializer, ProductSerializer
+
+
+KEY_PREFIX = 'home'
+MAX_LIMIT = 50
+# Shundan kam sharhli mahsulot "top" ga kirmaydi (bitta 5 yulduz yetarli emas)
+TOP_RATED_MIN_REVIEWS = 3
+DEFAULT_TTL = {
+    'ads': 60,
+    'discounted': 60,
+    'categories': 600,
+    'newest': 30,
+    'top_rated': 600,
+}
+
+
+def _ads():
+    return Advertisement.objects.order_by('-id')
+
+
+def _discounted():
+    return Product.objects.filter(chegirma_bormi=True).order_by('-yaratilgan_vaqt', '-id')
+
+
+def _categories():
+    return Category.objects.order_by('nomi', 'pk')
+
+
+def _newest():
+    return Product.objects.order_by('-yaratilgan_vaqt', '-id')
+
+
+def _top_rated():
+    return (
+        Product.objects.filter(reviews_count__gte=TOP_RATED_MIN_REVIEWS)
+        .annotate(home_rating=Cast(F('rating_sum'), FloatField()) / F('reviews_count'))
+        .order_by('-home_rating', '-reviews_count', '-id')
+    )
+
+
+@dataclass(frozen=True)
+class Section:
+    name: str
+    get_queryset: object
+    serializer: type
+    default_limit: int
+
+    @property
+    def products(self):
+        return issubclass(self.serializer, ProductSerializer)
+
+
+SECTIONS = (
+    Section('ads', _ads, AdvertisementSerializer, 5),
+    Section('discounted', _discounted, ProductSerializer, 10),
+    Section('categories', _categories, CategorySerializer, 20),
+    Section('newest', _newest, ProductSerializer, 10),
+    Section('top_rated', _top_rated, ProductSerializer, 10),
+)
+
+
+def section_limits(params):
+    """``{bo'lim: n}`` (``0`` lilar tashlab yuboriladi)"""
+    limits = {}
+    for section in SECTIONS:
+        value = params.get(section.name)
+        if value in (None, ''):
+            limits[section.name] = section.default_limit
+            continue
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({section.name: "Son bo'lishi kerak"})
+        if not 0 <= value <= MAX_LIMIT:
+            raise ValidationError({section.name: f"0 va {MAX_LIMIT} oralig'ida bo'lishi kerak"})
+        if value:
+            limits[section.name] = value
+    return limits
+
+
+def section_ttl(name):
+    return {**DEFAULT_TTL, **getattr(settings, 'HOME_SECTION_TTL', {})}[name]
+
+
+def _cache_key(request, name, limit):
+    # Rasm URL'lari host va sxemaga bog'liq
+    return f'{KEY_PREFIX}:{name}:{limit}:{request.scheme}://{request.get_host()}'
+
+
+def build_section(section, limit, request):
+    queryset = plan_queryset(section.get_queryset()[:limit], section.serializer)
+    context = {'request': request, 'shared': True}
+    return section.serializer(queryset, many=True, context=context).data
+
+
+def _build_in_worker(section, limit, request):
+    try:
+        with profiling.capture_queries():
+            return build_section(section, limit, request)
+    finally:
+        # Oqim ulanishi so'rov oxiridagi kabi CONN_MAX_AGE bo'yicha yopiladi
+        close_old_connections()
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'HOME_WORKERS', len(SECTIONS)), thread_name_prefix='home',
+        )
+    return _executor
+
+
+def _timed(build, *args):
+    started = time.perf_counter()
+    data = build(*args)
+    return data, (time.perf_counter() - started) * 1000
+
+
+def home(request, limits):
+    """
+    ``(data, timings)``: ``data`` -- ``{bo'lim: [...]}`` (``SECTIONS`` tartibida),
+    ``timings`` -- ``{bo'lim: (ms, 'hit' | 'miss')}``.
+    """
+    cache = response_cache.get_cache()
+    sections = [section for section in SECTIONS if section.name in limits]
+    keys = {section.name: _cache_key(request, section.name, limits[section.name]) for section in sections}
+    started = time.perf_counter()
+    cached = cache.get_many(list(keys.values())) if cache is not None else {}
+    lookup_ms = (time.perf_counter() - started) * 1000
+
+    results = {}
+    timings = {}
+    missing = []
+    for section in sections:
+        key = keys[section.name]
+        if key in cached:
+            results[section.name] = cached[key]
+            timings[section.name] = (lookup_ms, 'hit')
+        else:
+            missing.append(section)
+
+    if missing and cache is not None:
+        # Bo'limlar umumiy keshga yoziladi: kechikkan replikadan emas
+        db_routing.use_primary()
+    parallel = len(missing) > 1 and not connection.in_atomic_block
+    if parallel:
+        executor = _get_executor()
+        # Kontekst (masalan core.db_routing holati) oqimlarga ham o'tadi
+        futures = {
+            section.name: executor.submit(
+                contextvars.copy_context().run, _timed, _build_in_worker, section, limits[section.name], request,
+            )
+            for section in missing
+        }
+        built = {name: future.result() for name, future in futures.items()}
+    else:
+        built = {
+            section.name: _timed(build_section, section, limits[section.name], request) for section in missing
+        }
+    for section in missing:
+        data, elapsed = built[section.name]
+        # ReturnList serializer'ga havola saqlaydi: keshga oddiy ro'yxat
+        results[section.name] = list(data)
+        timings[section.name] = (elapsed, 'miss')
+        if cache is not None:
+            cache.set(keys[section.name], results[section.name], section_ttl(section.name))
+
+    products = [section for section in sections if section.products]
+    # Barcha mahsulot bo'limlari uchun foydalanuvchi holati bitta juft so'rov bilan
+    viewer.viewer_state(request, {item['id'] for section in products for item in results[section.name]})
+    data = {}
+    for section in sections:
+        items = results[section.name]
+        data[section.name] = viewer.overlay(request, items) if section.products else items
+    return data, timings
+
+
+def server_timing(timings):
+    """``Server-Timing`` sarlavhasi qiymati"""
+    return ', '.join(
+        f'{name};dur={elapsed:.1f};desc="{status}"' for name, (elapsed, status) in timings.items()
+    )
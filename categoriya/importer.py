@@ -0,0 +1,366 @@
+"""
+Do'kon mahsulotlarini CSV/JSONL fayldan ommaviy import qilish.
+
+* Fayl qatorma-qator o'qiladi (butunlay xotiraga yuklanmaydi).
+* Kategoriya va subkategoriya ID yoki nomi bo'yicha oldindan yuklangan
+  lug'atdan topiladi -- har bir qator uchun so'rov yo'q.
+* Qatorlar ``chunk_size`` tadan tekshiriladi va yoziladi: har bir bo'lakda
+  ``bulk_create(update_conflicts=True)`` bilan yoziladi -- do'kon ichidagi SKU
+  bo'yicha upsert (``INSERT ... ON CONFLICT DO UPDATE``).
+* Xato qatorlar o'tkazib yuboriladi va hisobotga ``{'row', 'sku', 'errors'}``
+  ko'rinishida yoziladi; to'g'ri qatorlar baribir saqlanadi.
+* Butun import bitta tranzaksiyada: fayl o'rtasida o'qib bo'lmaydigan joy
+  chiqsa (``ImportFileError``, masalan UTF-8 bo'lmagan bayt) oldingi bo'laklar
+  ham bekor qilinadi -- 400 javobi hech narsa yozilmaganini bildiradi.
+
+Bulk yozuvlar signal chaqirmaydi, shuning uchun qidiruv indeksi, narx tarixi,
+javob keshi va do'konning ``yangilangan_vaqt`` i shu yerda yangilanadi.
+"""
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from core import response_cache
+from . import price_history, search, tree
+from .models import Category, Product, Shop, SubCategory
+from .signals import touch
+
+
+FORMATS = ('csv', 'jsonl')
+COLUMNS = ('sku', 'nomi', 'tavsif', 'narx', 'chegirma_narx', 'chegirma_bormi', 'category', 'subcategory')
+REQUIRED = ('nomi', 'narx')
+# Fayl ustuni -> mavjud mahsulotda yangilanadigan model maydonlari.
+# Qo'lda berilgan chegirma kampaniyadan chiqaradi (serializer va bulk-update kabi):
+# aks holda run_campaigns uni kampaniyaniki deb qayta yozadi yoki tugaganda o'chiradi
+MODEL_FIELDS = {
+    'nomi': ['nomi'], 'tavsif': ['tavsif'], 'narx': ['narx'],
+    'chegirma_narx': ['chegirma_narx', 'discount_campaign'],
+    'chegirma_bormi': ['chegirma_bormi', 'discount_campaign'],
+    'category': ['category'], 'subcategory': ['category', 'subcategory'],
+}
+TRUE_VALUES = {'1', 'true', 'ha', 'yes'}
+FALSE_VALUES = {'0', 'false', "yo'q", 'yoq', 'no'}
+PRICE_LIMIT = Decimal(10) ** 13  # max_digits=15, decimal_places=2
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportFileError(ValueError):
+    """Fayl umuman o'qib bo'lmaydigan holatda (format, sarlavha)"""
+
+
+def detect_format(filename, format=None):
+    if format:
+        if format not in FORMATS:
+            raise ImportFileError(f"Format {', '.join(FORMATS)} dan biri bo'lishi kerak")
+        return format
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    raise ImportFileError("Formatni aniqlab bo'lmadi: fayl .csv yoki .jsonl bo'lishi yoki format berilishi kerak")
+
+
+def read_rows(binary_file, format):
+    """``(qator_raqami, dict yoki xato matni)`` juftliklarini oqim bilan qaytaradi"""
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    try:
+        if format == 'csv':
+            reader = csv.DictReader(text)
+            if not reader.fieldnames or not set(REQUIRED) <= {name.strip() for name in reader.fieldnames}:
+                raise ImportFileError(f"CSV sarlavhasida {', '.join(REQUIRED)} ustunlari bo'lishi kerak")
+            for number, row in enumerate(reader, start=1):
+                yield number, {key.strip(): value for key, value in row.items() if key is not None}
+        else:
+            for number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield number, "JSON noto'g'ri"
+                    continue
+                yield number, row if isinstance(row, dict) else "Qator JSON obyekt bo'lishi kerak"
+    except UnicodeDecodeError:
+        raise ImportFileError("Fayl UTF-8 kodirovkasida bo'lishi kerak")
+    finally:
+        # Asl faylni yopmaslik uchun
+        text.detach()
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _name_key(value):
+    return ' '.join(_text(value).casefold().split())
+
+
+def _decimal(value):
+    text = _text(value).replace(' ', '').replace(',', '.')
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        raise ValueError("Son bo'lishi kerak")
+    if not number.is_finite() or number < 0:
+        raise ValueError("Manfiy bo'lmagan son bo'lishi kerak")
+    if number >= PRICE_LIMIT or number != number.quantize(Decimal('0.01')):
+        raise ValueError("Ko'pi bilan 13 xonali, 2 kasr xonali son bo'lishi kerak")
+    return number
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = _text(value).casefold()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError("true/false bo'lishi kerak")
+
+
+class ImportResult:
+    def __init__(self, dry_run, max_errors):
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.rows = self.created = self.updated = self.error_count = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    def add_error(self, row, sku, errors):
+        self.error_count += 1
+        entry = {'row': row, 'sku': sku, 'errors': errors}
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append(entry)
+        return entry
+
+    def as_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows / self.seconds) if self.seconds else None,
+        }
+
+
+class ProductImporter:
+    """
+    ``ProductImporter(shop).run(read_rows(fh, 'csv'))`` -> ``ImportResult``.
+    ``on_error`` -- har bir xato qator uchun chaqiriladi (hisobot ``max_errors``
+    bilan cheklangan bo'lsa ham hammasini olish uchun).
+    """
+
+    def __init__(self, shop, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False,
+                 max_errors=MAX_REPORTED_ERRORS, on_error=None):
+        self.shop = shop
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.on_error = on_error
+        self.result = ImportResult(dry_run, max_errors)
+        self.seen_skus = set()
+        self.load_lookups()
+
+    def load_lookups(self):
+        self.categories = {}
+        for pk, nomi in Category.objects.values_list('pk', 'nomi'):
+            self.categories[str(pk)] = pk
+            self.categories.setdefault(_name_key(nomi), pk)
+        # subkategoriya nomi turli kategoriyalarda takrorlanishi mumkin
+        self.subcategories = {}
+        self.subcategory_names = {}
+        for pk, category_id, nomi in SubCategory.objects.values_list('pk', 'category_id', 'nomi'):
+            self.subcategories[str(pk)] = (pk, category_id)
+            self.subcategory_names.setdefault(_name_key(nomi), []).append((pk, category_id))
+
+    def run(self, rows):
+        started = time.perf_counter()
+        with transaction.atomic():
+            chunk = []
+            for number, row in rows:
+                self.result.rows += 1
+                chunk.append((number, row))
+                if len(chunk) >= self.chunk_size:
+                    self.process_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self.process_chunk(chunk)
+        if not self.dry_run and (self.result.created or self.result.updated):
+            response_cache.bump(Product)
+            touch(Shop, self.shop.pk)
+            # Yangi mahsulotlar yoki kategoriya o'zgarishi daraxtdagi sonlarga ta'sir qiladi
+            tree.TREE.bump()
+        self.result.seconds = time.perf_counter() - started
+        return self.result
+
+    # --- tekshirish ---
+
+    def error(self, number, sku, errors):
+        entry = self.result.add_error(number, sku, errors)
+        if self.on_error is not None:
+            self.on_error(entry)
+
+    def resolve_category(self, value, errors):
+        if _text(value) == '':
+            return None
+        pk = self.categories.get(_text(value)) or self.categories.get(_name_key(value))
+        if pk is None:
+            errors['category'] = "Kategoriya topilmadi"
+        return pk
+
+    def resolve_subcategory(self, value, category_id, errors):
+        if _text(value) == '':
+            return None, category_id
+        found = self.subcategories.get(_text(value))
+        if found is None:
+            candidates = self.subcategory_names.get(_name_key(value), [])
+            if category_id is not None:
+                candidates = [item for item in candidates if item[1] == category_id]
+            if len(candidates) > 1:
+                errors['subcategory'] = "Bu nomli subkategoriya bir nechta: kategoriyani ham ko'rsating"
+                return None, category_id
+            found = candidates[0] if candidates else None
+        if found is None:
+            errors['subcategory'] = "Subkategoriya topilmadi"
+            return None, category_id
+        pk, parent_id = found
+        if category_id is not None and parent_id != category_id:
+            errors['subcategory'] = "Subkategoriya boshqa kategoriyaga tegishli"
+        return pk, parent_id
+
+    def validate(self, row):
+        """``(maydonlar, yangilanadigan ustunlar, xatolar)``"""
+        errors = {}
+        present = {column for column in COLUMNS if column in row}
+        values = {}
+        for column in REQUIRED:
+            if _text(row.get(column)) == '':
+                errors[column] = "Majburiy maydon"
+
+        nomi = _text(row.get('nomi'))
+        if len(nomi) > 255:
+            errors['nomi'] = "Ko'pi bilan 255 belgi"
+        values['nomi'] = nomi
+        values['tavsif'] = _text(row.get('tavsif'))
+
+        for column in ('narx', 'chegirma_narx'):
+            if _text(row.get(column)) == '':
+                # narx yo'qligi yuqorida "Majburiy maydon" sifatida qayd etilgan
+                values[column] = None
+                continue
+            try:
+                values[column] = _decimal(row[column])
+            except ValueError as exc:
+                errors[column] = str(exc)
+
+        if _text(row.get('chegirma_bormi')) == '':
+            values['chegirma_bormi'] = values.get('chegirma_narx') is not None
+            if 'chegirma_narx' in present:
+                present.add('chegirma_bormi')
+        else:
+            try:
+                values['chegirma_bormi'] = _boolean(row['chegirma_bormi'])
+            except ValueError as exc:
+                errors['chegirma_bormi'] = str(exc)
+
+        category_id = self.resolve_category(row.get('category'), errors)
+        subcategory_id, category_id = self.resolve_subcategory(row.get('subcategory'), category_id, errors)
+        values['category_id'] = category_id
+        values['subcategory_id'] = subcategory_id
+
+        sku = _text(row.get('sku'))
+        if len(sku) > 64:
+            errors['sku'] = "Ko'pi bilan 64 belgi"
+        elif sku and sku in self.seen_skus:
+            errors['sku'] = "SKU faylda takrorlangan"
+        values['sku'] = sku or None
+        return values, present, errors
+
+    # --- yozish ---
+
+    def process_chunk(self, chunk):
+        valid = []
+        for number, row in chunk:
+            if not isinstance(row, dict):
+                self.error(number, None, {'non_field_errors': row})
+                continue
+            values, present, errors = self.validate(row)
+            if errors:
+                self.error(number, values['sku'], errors)
+                continue
+            if values['sku']:
+                self.seen_skus.add(values['sku'])
+            valid.append((values, present))
+        if not valid:
+            return
+
+        skus = [values['sku'] for values, _ in valid if values['sku']]
+        # SKU -> yozuvdan oldingi narxlar (tarix faqat o'zgarganlar uchun)
+        existing = {
+            sku: price_history.snapshot(narx, chegirma_narx, chegirma_bormi)
+            for sku, narx, chegirma_narx, chegirma_bormi in Product.objects.filter(shop=self.shop, sku__in=skus)
+            .values_list('sku', 'narx', 'chegirma_narx', 'chegirma_bormi')
+        } if skus else {}
+
+        plain, upserts = [], {}
+        for values, present in valid:
+            product = Product(shop=self.shop, discount_campaign=None, **values)
+            if values['sku'] is None:
+                plain.append(product)
+                self.result.created += 1
+                continue
+            if values['sku'] in existing:
+                self.result.updated += 1
+            else:
+                self.result.created += 1
+            # Mavjud mahsulotda faqat faylda bor ustunlar yangilanadi
+            fields = {'yangilangan_vaqt'}
+            for column in present:
+                fields.update(MODEL_FIELDS.get(column, ()))
+            upserts.setdefault(tuple(sorted(fields)), []).append(product)
+        if self.dry_run:
+            return
+
+        # Tranzaksiya run() da: bo'lak alohida commit qilinmaydi
+        prices = {
+            product.pk: price_history.snapshot(product.narx, product.chegirma_narx, product.chegirma_bormi)
+            for product in Product.objects.bulk_create(plain, batch_size=self.chunk_size)
+        }
+        ids = list(prices)
+        for fields, products in upserts.items():
+            # INSERT ... ON CONFLICT (shop_id, sku) DO UPDATE -- bitta so'rov
+            Product.objects.bulk_create(
+                products, batch_size=self.chunk_size, update_conflicts=True,
+                unique_fields=['shop', 'sku'], update_fields=fields,
+            )
+        if skus:
+            written = Product.objects.filter(shop=self.shop, sku__in=skus).values_list(
+                'pk', 'sku', 'narx', 'chegirma_narx', 'chegirma_bormi',
+            )
+            for pk, sku, narx, chegirma_narx, chegirma_bormi in written:
+                ids.append(pk)
+                snapshot = price_history.snapshot(narx, chegirma_narx, chegirma_bormi)
+                if existing.get(sku) != snapshot:
+                    prices[pk] = snapshot
+        price_history.record(prices)
+        # Qisman yangilangan qatorlar uchun indeks to'liq qiymatlardan tuziladi
+        search.index_instances(
+            Product.objects.filter(pk__in=ids)
+            .only('pk', 'nomi', 'tavsif', 'shop_id', 'category_id', 'chegirma_bormi')
+        )
+
+
+def import_products(shop, binary_file, format, **options):
+    """Fayl obyektidan import; ``ImportFileError`` -- fayl o'qib bo'lmasa"""
+    return ProductImporter(shop, **options).run(read_rows(binary_file, format))
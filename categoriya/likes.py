@@ -0,0 +1,199 @@
+"""
+Like / unlike yo'li.
+
+* ``like`` -- bitta ``INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING``:
+  mahsulot oldindan o'qilmaydi, takroriy like unikallik cheklovida xato
+  emas, shunchaki hech narsa qo'shmaydi.
+* ``unlike`` -- bitta ``DELETE ... WHERE product_id AND user_id RETURNING``.
+
+Ikkalasi ham signal chaqirmaydi: mahsulotning ``likes_count`` i har bir bosishda
+``UPDATE`` qilinmaydi (ommabop mahsulot qatori qulf uchun navbatga aylanardi),
+o'zgarish ``LikeCounterBuffer`` ga (write-behind) yoziladi va
+``LIKE_BUFFER_MAX_DELAY`` soniyadan yoki ``LIKE_BUFFER_MAX_PENDING`` ta
+o'zgarishdan keyin bir nechta set-based ``UPDATE`` bilan yoziladi. Bufer
+jarayon ichida: hisoblagich ko'pi bilan shuncha kechikadi, jarayon to'satdan
+o'lsa qolgan deltalar ``rebuild_product_stats`` bilan tiklanadi.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+from django.utils import timezone
+
+from core import response_cache
+from .models import Product, ProductLike
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def apply_like_deltas(deltas):
+    """
+    ``{product_id: delta}`` ni yozadi: bir xil deltali mahsulotlar bitta
+    ``UPDATE ... WHERE id IN (...)`` bilan (odatda faqat +1 / -1 guruhlari).
+    Deltasi 0 ga teng mahsulotlar ham (like qo'shilib, o'chirilgan) touch
+    qilinadi: hisoblagich o'sha, lekin detaldagi ``likes`` ro'yxati o'zgargan.
+    """
+    groups = {}
+    for product_id, delta in deltas.items():
+        groups.setdefault(delta, []).append(product_id)
+    with transaction.atomic():
+        for delta, ids in groups.items():
+            values = {'yangilangan_vaqt': Now()}
+            if delta:
+                values['likes_count'] = Greatest(F('likes_count') + delta, 0)
+            for start in range(0, len(ids), BATCH_SIZE):
+                Product.objects.filter(pk__in=ids[start:start + BATCH_SIZE]).update(**values)
+    if groups:
+        response_cache.bump(Product)
+
+
+class LikeCounterBuffer:
+    """Jarayon ichidagi ``{product_id: delta}`` to'plovchisi"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deltas = {}
+        self.pending = 0
+        self.first_at = None
+        self.timer = None
+
+    def add(self, product_id, delta):
+        max_delay = getattr(settings, 'LIKE_BUFFER_MAX_DELAY', 1.0)
+        max_pending = getattr(settings, 'LIKE_BUFFER_MAX_PENDING', 500)
+        with self.lock:
+            self.deltas[product_id] = self.deltas.get(product_id, 0) + delta
+            self.pending += 1
+            if self.first_at is None:
+                self.first_at = time.monotonic()
+            due = max_delay <= 0 or self.pending >= max_pending or time.monotonic() - self.first_at >= max_delay
+            if not due and self.timer is None:
+                # Yangi bosishlar bo'lmasa ham deltalar ko'pi bilan max_delay kutadi
+                self.timer = threading.Timer(max_delay, self.flush_in_thread)
+                self.timer.daemon = True
+                self.timer.start()
+        if due:
+            self.flush()
+
+    def pending_delta(self, product_id):
+        with self.lock:
+            return self.deltas.get(product_id, 0)
+
+    def take(self):
+        with self.lock:
+            deltas, self.deltas = self.deltas, {}
+            self.pending = 0
+            self.first_at = None
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        return deltas
+
+    def flush(self):
+        """Yig'ilgan deltalarni yozadi; yozilgan mahsulotlar sonini qaytaradi"""
+        deltas = self.take()
+        if not deltas:
+            return 0
+        try:
+            apply_like_deltas(deltas)
+        except Exception:
+            # Deltalar yo'qolmasin: keyingi flush yana urinadi
+            with self.lock:
+                for product_id, delta in deltas.items():
+                    self.deltas[product_id] = self.deltas.get(product_id, 0) + delta
+                self.pending += len(deltas)
+                if self.first_at is None:
+                    self.first_at = time.monotonic()
+            raise
+        return len(deltas)
+
+    def flush_in_thread(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Like hisoblagichlarini yozib bo'lmadi")
+        finally:
+            # Timer oqimining o'z ulanishi
+            connection.close()
+
+
+BUFFER = LikeCounterBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        BUFFER.flush()
+    except Exception:
+        logger.exception("Jarayon tugashida like hisoblagichlari yozilmadi")
+
+
+def _buffer_after_commit(product_id, delta):
+    # Rollback bo'lgan like hisoblagichga tushmasligi kerak
+    transaction.on_commit(lambda: BUFFER.add(product_id, delta))
+
+
+def like(product_id, user_id):
+    """
+    True -- like qo'shildi, False -- allaqachon bor edi. Mahsulot bo'lmasa
+    ``Product.DoesNotExist`` (faqat shu kam uchraydigan holatda qo'shimcha so'rov).
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(ProductLike._meta.db_table)} (product_id, user_id, yaratilgan_vaqt) '
+            f'SELECT id, %s, %s FROM {quote(Product._meta.db_table)} WHERE id = %s '
+            'ON CONFLICT (product_id, user_id) DO NOTHING RETURNING id',
+            [user_id, connection.ops.adapt_datetimefield_value(timezone.now()), product_id],
+        )
+        created = cursor.fetchone() is not None
+    if not created:
+        if not Product.objects.filter(pk=product_id).exists():
+            raise Product.DoesNotExist
+        return False
+    response_cache.bump(ProductLike)
+    _buffer_after_commit(product_id, 1)
+    return True
+
+
+def unlike(product_id, user_id):
+    """True -- like o'chirildi, False -- like yo'q edi"""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(ProductLike._meta.db_table)} WHERE product_id = %s AND user_id = %s RETURNING id',
+            [product_id, user_id],
+        )
+        deleted = cursor.fetchone() is not None
+    if not deleted:
+        return False
+    response_cache.bump(ProductLike)
+    _buffer_after_commit(product_id, -1)
+    return True
+
+
+def toggle(product_id, user_id):
+    """``(liked, likes_count)``: like bo'lsa o'chiradi, bo'lmasa qo'shadi"""
+    # unlike + like va hisoblagich o'qilishi bitta tranzaksiyada: qaytgan holat
+    # va son bir-biriga mos
+    with transaction.atomic():
+        if unlike(product_id, user_id):
+            liked, delta = False, -1
+        else:
+            # Parallel so'rov allaqachon qo'shgan bo'lsa ham natija -- "liked"
+            liked, delta = True, int(like(product_id, user_id))
+        # Delta buferga commit'dan keyin tushadi
+        return liked, likes_count(product_id) + delta
+
+
+def likes_count(product_id):
+    """Bazadagi qiymat + shu jarayonda hali yozilmagan delta"""
+    count = Product.objects.filter(pk=product_id).values_list('likes_count', flat=True).first() or 0
+    return max(count + BUFFER.pending_delta(product_id), 0)
@@ -0,0 +1,192 @@
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from core.api_catalog import _busiest
+from core.benchmark import environment, summarize, write_report
+from categoriya.models import Product, Shop
+
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+class Command(BaseCommand):
+    help = (
+        "Sinxron (DRF) va async o'qish endpointlarini yuqori parallellikda "
+        "solishtiradi: WSGI (oqimlar puli), ASGI ostidagi sinxron view'lar va "
+        "ASGI ostidagi async view'lar. Har bir rejim uchun requests/sec va "
+        "p50/p95/p99 kechikish. So'rovlar ilovaga jarayon ichida (server va "
+        "tarmoqsiz) yuboriladi, javob keshi o'chiriladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64, help="Bir vaqtdagi so'rovlar soni")
+        parser.add_argument('--requests', type=int, default=1000, help="Har bir endpoint va rejim uchun so'rovlar")
+        parser.add_argument('--only', action='append', help="Faqat shu nomdagi endpoint(lar)")
+        parser.add_argument('--mode', action='append', choices=MODES, dest='modes')
+        parser.add_argument('--output', help="Natijani JSON faylga yozish")
+
+    def endpoints(self):
+        """``(nom, sinxron URL, async URL)``; sinxron muqobili yo'q bo'lsa None"""
+        shop = _busiest(Shop, 'products')
+        product = _busiest(Product, 'reviews')
+        if shop is None or product is None:
+            raise CommandError("Ma'lumot yo'q: avval generate_catalog ni ishga tushiring")
+        return [
+            ('product-list', '/api/v1/products/?cursor=', '/api/v1/async/products/'),
+            ('product-detail', f'/api/v1/products/{product}/', f'/api/v1/async/products/{product}/'),
+            ('product-reviews', f'/api/v1/products/{product}/reviews/', f'/api/v1/async/products/{product}/reviews/'),
+            ('shop-products', f'/api/v1/shops/{shop}/products/', f'/api/v1/async/shops/{shop}/products/'),
+            ('category-tree', None, '/api/v1/async/categories/tree/'),
+        ]
+
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--concurrency va --requests musbat bo'lishi kerak")
+        self.options = options
+        modes = options['modes'] or MODES
+        self.wsgi = get_wsgi_application()
+        self.asgi = get_asgi_application()
+
+        results = {}
+        for name, sync_url, async_url in self.endpoints():
+            if options['only'] and name not in options['only']:
+                continue
+            results[name] = {}
+            for mode in modes:
+                url = async_url if mode == 'asgi-async' else sync_url
+                if url is None:
+                    continue
+                result = self.measure(mode, url)
+                results[name][mode] = result
+                self.print_row(name, mode, result)
+            self.print_speedup(results[name])
+
+        if options['output']:
+            write_report(options['output'], {
+                'environment': environment(),
+                'options': {key: options[key] for key in ('concurrency', 'requests')},
+                'results': results,
+            })
+            self.stdout.write(self.style.SUCCESS(f"Natija yozildi: {options['output']}"))
+
+    def measure(self, mode, url):
+        # Ulanish, URL resolver va import xarajatlari hisobga olinmasin
+        warmup = min(self.options['requests'], self.options['concurrency'])
+        if mode == 'wsgi':
+            self.run_wsgi(url, warmup)
+            started = time.perf_counter()
+            latencies, statuses = self.run_wsgi(url, self.options['requests'])
+        else:
+            asyncio.run(self.run_asgi(url, warmup))
+            started = time.perf_counter()
+            latencies, statuses = asyncio.run(self.run_asgi(url, self.options['requests']))
+        elapsed = time.perf_counter() - started
+        return {
+            'url': url,
+            'rps': round(len(latencies) / elapsed, 1),
+            'errors': sum(1 for status in statuses if status >= 400),
+            'status': sorted(set(statuses)),
+            **summarize(latencies),
+        }
+
+    # --- WSGI: har bir so'rov oqimlar pulidagi alohida oqimda ---
+
+    def wsgi_call(self, url):
+        parts = urlsplit(url)
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': parts.path, 'QUERY_STRING': parts.query,
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+            'HTTP_ACCEPT': 'application/json', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        status = []
+        started = time.perf_counter()
+        response = self.wsgi(environ, lambda line, headers, exc_info=None: status.append(int(line[:3])))
+        try:
+            b''.join(response)
+        finally:
+            # request_finished -> DB ulanishi yopiladi
+            response.close()
+        return (time.perf_counter() - started) * 1000, status[0]
+
+    def run_wsgi(self, url, count):
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as pool:
+            results = list(pool.map(self.wsgi_call, [url] * count))
+        return [latency for latency, _ in results], [status for _, status in results]
+
+    # --- ASGI: bitta event loop, ``concurrency`` ta parallel klient ---
+
+    async def asgi_call(self, url):
+        parts = urlsplit(url)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': parts.path, 'raw_path': parts.path.encode(),
+            'query_string': parts.query.encode(), 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'accept', b'application/json')],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+        }
+        sent_body = False
+        disconnect = asyncio.Event()
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # Django javob tugaguncha uzilishni kutadi
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        status = None
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        started = time.perf_counter()
+        try:
+            await self.asgi(scope, receive, send)
+        finally:
+            disconnect.set()
+        return (time.perf_counter() - started) * 1000, status
+
+    async def run_asgi(self, url, count):
+        queue = iter(range(count))
+        results = []
+
+        async def client():
+            for _ in queue:
+                results.append(await self.asgi_call(url))
+
+        await asyncio.gather(*(client() for _ in range(self.options['concurrency'])))
+        return [latency for latency, _ in results], [status for _, status in results]
+
+    # --- chiqarish ---
+
+    def print_row(self, name, mode, result):
+        style = self.style.WARNING if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{name:16} {mode:11} rps={result['rps']:>8} p50={result['p50_ms']:8.2f}ms "
+            f"p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms "
+            f"status={','.join(map(str, result['status']))}"
+        ))
+
+    def print_speedup(self, results):
+        if 'asgi-async' not in results:
+            return
+        for mode in ('wsgi', 'asgi-sync'):
+            if mode in results:
+                ratio = results['asgi-async']['rps'] / results[mode]['rps']
+                self.stdout.write(f"{'':16} asgi-async / {mode}: {ratio:.2f}x rps")
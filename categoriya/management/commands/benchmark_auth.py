@@ -0,0 +1,95 @@
+import base64
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from core.benchmark import environment, summarize, write_report
+from user import tokens
+from user.models import User
+
+
+MODES = ('basic', 'bearer')
+TELEFON = 'benchmark-auth'
+PASSWORD = 'benchmark-parol-123'
+URL = '/api/v1/auth/users/me/'
+
+
+class Command(BaseCommand):
+    help = (
+        "Autentifikatsiyali so'rovlar/sekund: Basic auth (har so'rovda PBKDF2 parol xeshi) "
+        "va imzolangan Bearer token (HMAC + jarayon ichidagi foydalanuvchi keshi). "
+        "Har bir rejimda GET /api/v1/auth/users/me/ ko'p oqimda chaqiriladi; "
+        "vaqtinchalik foydalanuvchi oxirida o'chiriladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--mode', action='append', choices=MODES, dest='modes')
+        parser.add_argument('--output', help="Natijani JSON faylga yozish")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['threads'] < 1:
+            raise CommandError("--requests va --threads musbat bo'lishi kerak")
+        self.cleanup()
+        user = User.objects.create_user(
+            username=TELEFON, telefon=TELEFON, email='benchmark-auth@example.uz',
+            ism='Benchmark', familiya='Auth', password=PASSWORD,
+        )
+        headers = {
+            'basic': 'Basic ' + base64.b64encode(f'{TELEFON}:{PASSWORD}'.encode()).decode(),
+            'bearer': f"Bearer {tokens.issue_pair(user.pk)['access']}",
+        }
+        results = {}
+        try:
+            # Javob keshi faqat anonim so'rovlarga tegishli, lekin aniqlik uchun o'chiriladi
+            with override_settings(RESPONSE_CACHE_ALIAS=None, ALLOWED_HOSTS=['*']):
+                for mode in options['modes'] or MODES:
+                    results[mode] = self.run_mode(headers[mode], options)
+                    self.print_row(mode, results[mode])
+        finally:
+            self.cleanup()
+        if 'basic' in results and 'bearer' in results:
+            speedup = results['bearer']['requests_per_sec'] / results['basic']['requests_per_sec']
+            self.stdout.write(self.style.SUCCESS(f"bearer / basic = {speedup:.1f}x"))
+
+        if options['output']:
+            write_report(options['output'], {
+                'environment': environment(),
+                'options': {'requests': options['requests'], 'threads': options['threads']},
+                'results': results,
+            })
+            self.stdout.write(self.style.SUCCESS(f"Natija yozildi: {options['output']}"))
+
+    def run_mode(self, authorization, options):
+        # Isitish: foydalanuvchi keshi va bekor qilinganlar snapshot'i
+        self.call(authorization)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            outcomes = list(pool.map(lambda _: self.call(authorization), range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency, status in outcomes if status == 200]
+        return {
+            'requests_per_sec': round(len(outcomes) / elapsed, 1),
+            'errors': sum(1 for _, status in outcomes if status != 200),
+            **summarize(latencies),
+        }
+
+    def call(self, authorization):
+        started = time.perf_counter()
+        response = APIClient().get(URL, HTTP_AUTHORIZATION=authorization, SERVER_NAME='localhost')
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    def cleanup(self):
+        tokens.USERS.clear()
+        User.objects.filter(telefon=TELEFON).delete()
+
+    def print_row(self, mode, result):
+        style = self.style.WARNING if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{mode:7} req/s={result['requests_per_sec']:>8} p50={result['p50_ms'] or 0:8.2f}ms "
+            f"p95={result['p95_ms'] or 0:8.2f}ms p99={result['p99_ms'] or 0:8.2f}ms errors={result['errors']}"
+        ))
@@ -0,0 +1,205 @@
+import base64
+import time
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from core.api_catalog import canonical_requests, write_requests
+from core.benchmark import compare_results, environment, load_report, summarize, write_report
+from categoriya.models import Category, Product, ProductLike, ProductReview, Shop
+from user.models import User
+
+
+COMPARE_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'bytes')
+
+
+class Rollback(Exception):
+    """Yozuvchi so'rovlar tranzaksiyasini bekor qilish uchun"""
+
+
+class Command(BaseCommand):
+    help = (
+        "API endpointlarini (core.api_catalog) ketma-ket chaqirib, har biri uchun "
+        "p50/p95/p99 kechikish, so'rovdagi SQL soni va javob hajmini o'lchaydi. "
+        "Natijani JSON ga yozib, oldingi natija bilan solishtirish mumkin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2, help="Hisobga olinmaydigan dastlabki chaqiruvlar")
+        parser.add_argument('--only', action='append', help="Faqat shu nomdagi so'rov(lar)")
+        parser.add_argument(
+            '--no-response-cache', action='store_true',
+            help="Javob keshini o'chirib, har bir so'rovni bazadan o'lchash",
+        )
+        parser.add_argument('--no-writes', action='store_true', help="Yozuvchi endpointlarni o'tkazib yuborish")
+        parser.add_argument(
+            '--base-url',
+            help="Ishlab turgan serverga HTTP orqali so'rov yuborish (masalan http://127.0.0.1:8000). "
+                 "Bu holatda SQL soni o'lchanmaydi va yozuvchi endpointlar o'tkaziladi",
+        )
+        parser.add_argument('--username', help="--base-url uchun Basic auth foydalanuvchisi")
+        parser.add_argument('--password', help="--base-url uchun Basic auth paroli")
+        parser.add_argument('--output', help="Natijani JSON faylga yozish")
+        parser.add_argument('--compare', help="Oldingi JSON natija bilan solishtirish")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations kamida 1 bo'lishi kerak")
+        self.options = options
+        self.user = User.objects.order_by('pk').first()
+        if options['no_response_cache']:
+            with override_settings(RESPONSE_CACHE_ALIAS=None):
+                return self.run(options)
+        return self.run(options)
+
+    def run(self, options):
+        results = {}
+        for item in canonical_requests():
+            if self.selected(item):
+                results[item.name] = self.measure_read(item)
+                self.print_row(item.name, results[item.name])
+
+        if not options['no_writes'] and not options['base_url'] and self.user is not None:
+            for name, result in self.measure_writes().items():
+                results[name] = result
+                self.print_row(name, result)
+
+        report = {
+            'environment': environment(),
+            'dataset': {
+                model.__name__: model.objects.count()
+                for model in (User, Shop, Category, Product, ProductReview, ProductLike)
+            },
+            'options': {
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'base_url': options['base_url'],
+                'response_cache': not options['no_response_cache'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            write_report(options['output'], report)
+            self.stdout.write(self.style.SUCCESS(f"Natija yozildi: {options['output']}"))
+        if options['compare']:
+            self.print_comparison(load_report(options['compare'])['results'], results)
+
+    def selected(self, item):
+        return not self.options['only'] or item.name in self.options['only']
+
+    # --- o'lchash ---
+
+    def measure_read(self, item):
+        latencies, statuses = [], set()
+        queries = size = None
+        for n in range(self.options['warmup'] + self.options['iterations']):
+            status, elapsed, size, queries = self.call(item)
+            statuses.add(status)
+            if n >= self.options['warmup']:
+                latencies.append(elapsed)
+        return self.result(item, latencies, statuses, queries, size)
+
+    def measure_writes(self):
+        """
+        Har bir iteratsiyada yangi foydalanuvchi yaratiladi va barcha yozuvchi
+        so'rovlar bitta tranzaksiyada bajarilib, so'ng rollback qilinadi.
+        """
+        items = [item for item in write_requests() if self.selected(item)]
+        samples = {item.name: {'latencies': [], 'statuses': set()} for item in items}
+        last = {}
+        for n in range(self.options['warmup'] + self.options['iterations']):
+            try:
+                with transaction.atomic():
+                    user = User.objects.create(
+                        username=f'benchmark-{n}', telefon=f'benchmark-{n}', email=f'benchmark{n}@example.uz',
+                    )
+                    for item in items:
+                        status, elapsed, size, queries = self.call(item, user)
+                        last[item.name] = (queries, size)
+                        samples[item.name]['statuses'].add(status)
+                        if n >= self.options['warmup']:
+                            samples[item.name]['latencies'].append(elapsed)
+                    raise Rollback
+            except Rollback:
+                pass
+        return {
+            item.name: self.result(
+                item, samples[item.name]['latencies'], samples[item.name]['statuses'], *last[item.name],
+            )
+            for item in items
+        }
+
+    def call(self, item, user=None):
+        if self.options['base_url']:
+            return self.call_http(item)
+        client = APIClient()
+        if item.auth:
+            client.force_authenticate(user or self.user)
+        data = dict(item.data, user=(user or self.user).pk) if item.data else None
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            if item.method == 'get':
+                response = client.get(item.url)
+            else:
+                response = getattr(client, item.method)(item.url, data, format='json')
+            content = response.content
+            elapsed = (time.perf_counter() - started) * 1000
+        return response.status_code, elapsed, len(content), len(ctx.captured_queries)
+
+    def call_http(self, item):
+        request = urllib.request.Request(self.options['base_url'].rstrip('/') + item.url)
+        if item.auth and self.options['username']:
+            token = base64.b64encode(f"{self.options['username']}:{self.options['password'] or ''}".encode())
+            request.add_header('Authorization', f'Basic {token.decode()}')
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            status, content = exc.code, exc.read()
+        elapsed = (time.perf_counter() - started) * 1000
+        return status, elapsed, len(content), None
+
+    def result(self, item, latencies, statuses, queries, size):
+        return {
+            'url': item.url,
+            'method': item.method.upper(),
+            'status': sorted(statuses),
+            'queries': queries,
+            'bytes': size,
+            **summarize(latencies),
+        }
+
+    # --- chiqarish ---
+
+    def print_row(self, name, result):
+        style = self.style.SUCCESS if all(code < 400 for code in result['status']) else self.style.WARNING
+        queries = '-' if result['queries'] is None else result['queries']
+        self.stdout.write(style(
+            f"{name:32} p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms "
+            f"p99={result['p99_ms']:8.2f}ms sql={queries:>3} bytes={result['bytes']:>8} "
+            f"status={','.join(map(str, result['status']))}"
+        ))
+
+    def print_comparison(self, old, new):
+        self.stdout.write('')
+        self.stdout.write("Solishtirish (eski -> yangi):")
+        old = {name: values for name, values in old.items() if name in new}
+        for name, metric, before, after, change in compare_results(old, new, COMPARE_METRICS):
+            if before == after:
+                continue
+            text = f"  {name:32} {metric:8} {before} -> {after}"
+            if change is None:
+                self.stdout.write(text)
+                continue
+            text += f" ({change:+.1f}%)"
+            worse = change > 10
+            better = change < -10
+            self.stdout.write(
+                self.style.ERROR(text) if worse else self.style.SUCCESS(text) if better else text
+            )
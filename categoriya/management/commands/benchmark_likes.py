@@ -0,0 +1,139 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.test.utils import override_settings
+
+from core.api_catalog import _busiest
+from core.benchmark import environment, summarize, write_report
+from categoriya import likes
+from categoriya.models import Product, ProductLike
+from categoriya.stats import rebuild_product_stats
+from user.models import User
+
+
+MODES = ('legacy', 'buffered')
+USER_PREFIX = 'benchmark-like-'
+
+
+def legacy_like(product_id, user_id):
+    """Oldingi yo'l: get_object + get_or_create (+ signal orqali UPDATE)"""
+    product = Product.objects.get(pk=product_id)
+    ProductLike.objects.get_or_create(product=product, user_id=user_id)
+
+
+def legacy_unlike(product_id, user_id):
+    product = Product.objects.get(pk=product_id)
+    ProductLike.objects.get(product=product, user_id=user_id).delete()
+
+
+OPERATIONS = {
+    'legacy': (legacy_like, legacy_unlike),
+    'buffered': (likes.like, likes.unlike),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Ko'p oqim bitta (eng ommabop) mahsulotni bir vaqtda like/unlike qiladi: "
+        "oldingi yo'l (get + get_or_create + har bir like uchun hisoblagich UPDATE) va "
+        "bitta SQL + write-behind bufer solishtiriladi. Har bir rejim uchun ops/sec, "
+        "p50/p95/p99, xatolar (masalan 'database is locked') va yakuniy likes_count "
+        "to'g'riligi. Vaqtinchalik foydalanuvchilar oxirida o'chiriladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--users', type=int, default=2000, help="Har biri bir marta like va unlike qiladi")
+        parser.add_argument('--product', type=int, help="Standart: eng ko'p like olgan mahsulot")
+        parser.add_argument('--mode', action='append', choices=MODES, dest='modes')
+        parser.add_argument('--output', help="Natijani JSON faylga yozish")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['users'] < 1:
+            raise CommandError("--threads va --users musbat bo'lishi kerak")
+        product_id = options['product'] or _busiest(Product, 'likes')
+        if product_id is None or not Product.objects.filter(pk=product_id).exists():
+            raise CommandError("Mahsulot topilmadi: avval generate_catalog ni ishga tushiring")
+        self.options = options
+        self.product_id = product_id
+
+        user_ids = self.create_users(options['users'])
+        results = {}
+        try:
+            for mode in options['modes'] or MODES:
+                results[mode] = self.run_mode(mode, user_ids)
+        finally:
+            self.cleanup()
+
+        if options['output']:
+            write_report(options['output'], {
+                'environment': environment(),
+                'options': {'threads': options['threads'], 'users': options['users'], 'product': product_id},
+                'results': results,
+            })
+            self.stdout.write(self.style.SUCCESS(f"Natija yozildi: {options['output']}"))
+
+    def create_users(self, count):
+        self.cleanup()
+        User.objects.bulk_create([
+            User(
+                username=f'{USER_PREFIX}{n}', telefon=f'{USER_PREFIX}{n}', email=f'benchmark-like{n}@example.uz',
+                ism='Benchmark', familiya='Like',
+            )
+            for n in range(count)
+        ], batch_size=500)
+        return list(User.objects.filter(username__startswith=USER_PREFIX).values_list('pk', flat=True))
+
+    def cleanup(self):
+        users = User.objects.filter(username__startswith=USER_PREFIX)
+        # Signalsiz: hisoblagich oxirida manbadan qayta hisoblanadi
+        ProductLike.objects.filter(user__in=users)._raw_delete(ProductLike.objects.db)
+        users.delete()
+        rebuild_product_stats(Product.objects.filter(pk=self.product_id))
+
+    def run_mode(self, mode, user_ids):
+        like, unlike = OPERATIONS[mode]
+        result = {}
+        # Bufer oqim soniga bog'liq bo'lmagan odatiy sozlamalar bilan
+        with override_settings(LIKE_BUFFER_MAX_DELAY=1.0, LIKE_BUFFER_MAX_PENDING=500):
+            for phase, operation in (('like', like), ('unlike', unlike)):
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=self.options['threads']) as pool:
+                    outcomes = list(pool.map(lambda user_id: self.call(operation, user_id), user_ids))
+                elapsed = time.perf_counter() - started
+                likes.BUFFER.flush()
+                latencies = [latency for latency, error in outcomes if error is None]
+                result[phase] = {
+                    'ops_per_sec': round(len(user_ids) / elapsed, 1),
+                    'errors': sum(1 for _, error in outcomes if error is not None),
+                    **summarize(latencies),
+                }
+                self.print_row(mode, phase, result[phase])
+        result['likes_count_ok'] = self.likes_count() == self.actual_likes()
+        style = self.style.SUCCESS if result['likes_count_ok'] else self.style.ERROR
+        self.stdout.write(style(f"{mode:9} likes_count {'mos' if result['likes_count_ok'] else 'MOS EMAS'}"))
+        return result
+
+    def call(self, operation, user_id):
+        started = time.perf_counter()
+        try:
+            operation(self.product_id, user_id)
+            error = None
+        except (DatabaseError, ProductLike.DoesNotExist) as exc:
+            error = exc
+        return (time.perf_counter() - started) * 1000, error
+
+    def likes_count(self):
+        return Product.objects.filter(pk=self.product_id).values_list('likes_count', flat=True).get()
+
+    def actual_likes(self):
+        return ProductLike.objects.filter(product_id=self.product_id).count()
+
+    def print_row(self, mode, phase, result):
+        style = self.style.WARNING if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{mode:9} {phase:7} ops/s={result['ops_per_sec']:>8} p50={result['p50_ms'] or 0:8.2f}ms "
+            f"p95={result['p95_ms'] or 0:8.2f}ms p99={result['p99_ms'] or 0:8.2f}ms errors={result['errors']}"
+        ))
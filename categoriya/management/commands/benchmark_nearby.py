@@ -0,0 +1,77 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from categoriya import geo
+from categoriya.models import Shop
+from core.benchmark import environment, summarize, write_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Yaqin do'konlar qidiruvini (geo_cell indeksi + bounding-box + haversine) "
+        "barcha do'konlarni masofa bo'yicha saralovchi oddiy to'liq skan bilan "
+        "solishtiradi. Natijalar bir xilligi ham tekshiriladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--radius', type=float, default=10.0, help="km")
+        parser.add_argument('--k', type=int, default=20, help="Har bir so'rovda olinadigan natijalar soni")
+        parser.add_argument('--min-shops', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Natijani JSON faylga yozish")
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.exclude(geo_cell=None)
+        total = shops.count()
+        if total < options['min_shops']:
+            raise CommandError(
+                f"Koordinatali do'konlar {total} ta, kamida {options['min_shops']} kerak: "
+                f"generate_catalog --shops {options['min_shops']} bilan yarating yoki --min-shops ni kamaytiring"
+            )
+        bounds = shops.order_by('latitude').values_list('latitude', flat=True)
+        min_lat, max_lat = float(bounds.first()), float(bounds.last())
+        bounds = shops.order_by('longitude').values_list('longitude', flat=True)
+        min_lng, max_lng = float(bounds.first()), float(bounds.last())
+
+        rng = random.Random(options['seed'])
+        radius, k = options['radius'], options['k']
+        timings = {'indexed': [], 'naive': []}
+        mismatches = 0
+        for _ in range(options['queries']):
+            lat, lng = rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)
+
+            started = time.perf_counter()
+            indexed = list(geo.within(shops, lat, lng, radius).values_list('pk', flat=True)[:k])
+            timings['indexed'].append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            naive = list(
+                shops.annotate(distance_km=geo.distance_expression(lat, lng))
+                .filter(distance_km__lte=radius)
+                .order_by('distance_km', 'pk')
+                .values_list('pk', flat=True)[:k]
+            )
+            timings['naive'].append((time.perf_counter() - started) * 1000)
+            mismatches += indexed != naive
+
+        results = {name: summarize(values) for name, values in timings.items()}
+        for name, summary in results.items():
+            self.stdout.write(
+                f"{name:8} p50={summary['p50_ms']:8.2f}ms p95={summary['p95_ms']:8.2f}ms p99={summary['p99_ms']:8.2f}ms"
+            )
+        speedup = results['naive']['p50_ms'] / results['indexed']['p50_ms']
+        self.stdout.write(f"{total} ta do'kon, radius={radius} km, k={k}: p50 bo'yicha {speedup:.1f}x tezroq")
+        if mismatches:
+            raise CommandError(f"{mismatches} ta so'rovda natijalar farq qildi")
+        self.stdout.write(self.style.SUCCESS("Natijalar to'liq skan bilan bir xil"))
+
+        if options['output']:
+            write_report(options['output'], {
+                'environment': environment(),
+                'options': {key: options[key] for key in ('queries', 'radius', 'k', 'seed')},
+                'shops': total,
+                'results': results,
+            })
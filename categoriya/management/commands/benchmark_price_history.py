@@ -0,0 +1,132 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from categoriya import price_history
+from categoriya.models import PriceHistory, Product
+from core.benchmark import environment, summarize, write_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Narx tarixiga sintetik o'zgarishlar (standart 2M) qo'shib, jadval + indeks "
+        "hajmining o'sishini (bayt/qator) va so'rov kechikishlarini o'lchaydi: raw "
+        "va kunlik siqilgan diapazon, \"30 kun oldingi narx\", min_price_90d ni qayta "
+        "hisoblash. Qo'shilgan qatorlar oxirida o'chiriladi (--keep bo'lmasa)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--changes', type=int, default=2_000_000)
+        parser.add_argument('--products', type=int, default=10_000, help="O'zgarishlar taqsimlanadigan mahsulotlar soni")
+        parser.add_argument('--days', type=int, default=365, help="O'zgarishlar shu kunlar ichida tarqatiladi")
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--keep', action='store_true', help="Sintetik qatorlarni o'chirmaslik")
+        parser.add_argument('--output', help="Natijani JSON faylga yozish")
+
+    def handle(self, *args, **options):
+        if min(options['changes'], options['products'], options['days'], options['queries']) < 1:
+            raise CommandError("Barcha sonlar musbat bo'lishi kerak")
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True)[:options['products']])
+        if not product_ids:
+            raise CommandError("Mahsulot yo'q: avval generate_catalog ni ishga tushiring")
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+
+        last_pk = PriceHistory.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        size_before = self.storage()
+        started = time.perf_counter()
+        self.generate(rng, product_ids, options['changes'], options['days'], now)
+        insert_seconds = time.perf_counter() - started
+        size_after = self.storage()
+        try:
+            results = self.measure(rng, product_ids, options['queries'], now)
+        finally:
+            if not options['keep']:
+                PriceHistory.objects.filter(pk__gt=last_pk)._raw_delete(PriceHistory.objects.db)
+
+        growth = {
+            name: round((size_after[name] - size_before[name]) / options['changes'], 1)
+            for name in size_after if size_after[name] is not None and size_before[name] is not None
+        }
+        self.stdout.write(
+            f"{options['changes']} o'zgarish {insert_seconds:.1f}s da yozildi; bayt/qator: "
+            + ', '.join(f'{name}={value}' for name, value in growth.items())
+        )
+        for name, result in results.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{name:22} p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms"
+            ))
+        if options['output']:
+            write_report(options['output'], {
+                'environment': environment(),
+                'options': {key: options[key] for key in ('changes', 'products', 'days', 'queries', 'seed')},
+                'insert_seconds': round(insert_seconds, 2),
+                'bytes_per_change': growth,
+                'results': results,
+            })
+            self.stdout.write(self.style.SUCCESS(f"Natija yozildi: {options['output']}"))
+
+    def generate(self, rng, product_ids, changes, days, now):
+        span = days * 86400
+        batch = []
+        with transaction.atomic():
+            for _ in range(changes):
+                narx = Decimal(rng.randrange(1000, 10_000_000)) / 100
+                discount = (narx * Decimal('0.8')).quantize(Decimal('0.01')) if rng.random() < 0.3 else None
+                batch.append(PriceHistory(
+                    product_id=rng.choice(product_ids), narx=narx, chegirma_narx=discount,
+                    vaqt=now - timedelta(seconds=rng.randrange(span)),
+                ))
+                if len(batch) >= 5000:
+                    PriceHistory.objects.bulk_create(batch)
+                    batch = []
+            PriceHistory.objects.bulk_create(batch)
+
+    def storage(self):
+        """Jadval va indeks hajmi (bayt); SQLite dbstat bo'lmasa butun baza"""
+        names = {'table': PriceHistory._meta.db_table, 'index': 'price_history_idx'}
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                try:
+                    return {
+                        kind: cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', [name]).fetchone()[0]
+                        for kind, name in names.items()
+                    }
+                except Exception:
+                    page_size = cursor.execute('PRAGMA page_size').fetchone()[0]
+                    pages = cursor.execute('PRAGMA page_count').fetchone()[0]
+                    free = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+                    return {'database': (pages - free) * page_size}
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_relation_size(%s), pg_relation_size(%s)', list(names.values()))
+                return dict(zip(names, cursor.fetchone()))
+        return {'database': None}
+
+    def measure(self, rng, product_ids, queries, now):
+        timings = {name: [] for name in ('raw_90d', 'day_365d', 'price_30d_ago', 'refresh_min_1000')}
+        for _ in range(queries):
+            product_id = rng.choice(product_ids)
+            for name, call in (
+                ('raw_90d', lambda: price_history.points(product_id, now - price_history.WINDOW, now)),
+                ('day_365d', lambda: price_history.points(product_id, now - timedelta(days=365), now, 'day')),
+                ('price_30d_ago', lambda: price_history.price_at(product_id, now - timedelta(days=30))),
+            ):
+                started = time.perf_counter()
+                call()
+                timings[name].append((time.perf_counter() - started) * 1000)
+        for _ in range(max(queries // 20, 1)):
+            start = rng.choice(product_ids)
+            products = Product.objects.filter(pk__gte=start, pk__lt=start + 1000)
+            started = time.perf_counter()
+            with transaction.atomic():
+                price_history.refresh_min_prices(products, now=now)
+                # Benchmark ma'lumotlarni o'zgartirmasin
+                transaction.set_rollback(True)
+            timings['refresh_min_1000'].append((time.perf_counter() - started) * 1000)
+        return {name: summarize(values) for name, values in timings.items()}
@@ -0,0 +1,132 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from core import throttling
+from core.benchmark import environment, summarize, write_report
+
+
+MODES = ('off', 'on')
+URL = '/api/v1/products/?page_size=20'
+ABUSER_IP = '203.0.113.66'
+
+
+class Command(BaseCommand):
+    help = (
+        "Cheklov yuk testi: me'yoridagi klientlar (har biri o'z IP'si, so'rovlar "
+        "orasida --interval) va to'xtamay so'rov yuborayotgan --abusers oqimlari "
+        "bir vaqtda GET /api/v1/products/ ni chaqiradi. Cheklov o'chiq va yoqiq "
+        "holatda me'yoriy klientlar kechikishi (p50/p95/p99) va hujumchilarning "
+        "429 javoblari solishtiriladi; oxirida bitta tekshiruv narxi (µs) o'lchanadi. "
+        "Hisoblagichlar vaqtinchalik faylda, javob keshi o'chiq."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=10.0, help="Har rejim davomiyligi (soniya)")
+        parser.add_argument('--clients', type=int, default=4)
+        parser.add_argument('--interval', type=float, default=1.0, help="Me'yoriy klient so'rovlari orasi")
+        parser.add_argument('--abusers', type=int, default=4)
+        parser.add_argument('--rate', default='120/min', help="Benchmark uchun anon doirasi")
+        parser.add_argument('--checks', type=int, default=5000)
+        parser.add_argument('--mode', action='append', choices=MODES, dest='modes')
+        parser.add_argument('--output', help="Natijani JSON faylga yozish")
+
+    def handle(self, *args, **options):
+        if options['duration'] <= 0 or options['clients'] < 1 or options['abusers'] < 0:
+            raise CommandError("--duration va --clients musbat, --abusers manfiy bo'lmasligi kerak")
+        try:
+            throttling.parse_rate(options['rate'])
+        except (ValueError, KeyError, IndexError):
+            raise CommandError("--rate '<son>/<sec|min|hour|day>' ko'rinishida bo'lishi kerak")
+
+        results = {}
+        # Har bir 429 uchun "Too Many Requests" ogohlantirishi chiqmasin
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        with tempfile.TemporaryDirectory() as directory:
+            rates = {**settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}), 'anon': options['rate']}
+            with override_settings(
+                RESPONSE_CACHE_ALIAS=None,
+                ALLOWED_HOSTS=['*'],
+                THROTTLE_STORE_PATH=os.path.join(directory, 'throttle.sqlite3'),
+                REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates},
+            ):
+                for mode in options['modes'] or MODES:
+                    with override_settings(THROTTLE_ENABLED=mode == 'on'):
+                        throttling.STORE.clear()
+                        results[mode] = self.run_mode(options)
+                    self.print_row(mode, results[mode])
+                results['check_us'] = self.measure_check(options['checks'])
+                self.stdout.write(f"bitta tekshiruv: {results['check_us']:.1f} µs")
+
+        if options['output']:
+            write_report(options['output'], {
+                'environment': environment(),
+                'options': {
+                    key: options[key] for key in ('duration', 'clients', 'interval', 'abusers', 'rate')
+                },
+                'results': results,
+            })
+            self.stdout.write(self.style.SUCCESS(f"Natija yozildi: {options['output']}"))
+
+    def run_mode(self, options):
+        deadline = time.perf_counter() + options['duration']
+        good, bad = [], []
+        lock = threading.Lock()
+
+        def client(ip, pause, outcomes):
+            api = APIClient()
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = api.get(URL, REMOTE_ADDR=ip, SERVER_NAME='localhost').status_code
+                with lock:
+                    outcomes.append(((time.perf_counter() - started) * 1000, status))
+                if pause:
+                    time.sleep(pause)
+
+        threads = [
+            threading.Thread(target=client, args=(f'198.51.100.{n + 1}', options['interval'], good))
+            for n in range(options['clients'])
+        ] + [
+            threading.Thread(target=client, args=(ABUSER_IP, 0, bad)) for _ in range(options['abusers'])
+        ]
+        # Isitish: URL marshruti, serializer va DB ulanishi
+        APIClient().get(URL, REMOTE_ADDR='192.0.2.1', SERVER_NAME='localhost')
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            'good': {
+                'requests': len(good),
+                'throttled': sum(1 for _, status in good if status == 429),
+                **summarize([latency for latency, status in good if status == 200]),
+            },
+            'abusers': {
+                'requests': len(bad),
+                'throttled': sum(1 for _, status in bad if status == 429),
+            },
+        }
+
+    def measure_check(self, checks):
+        store = throttling.STORE
+        store.hit('benchmark', 60)
+        started = time.perf_counter()
+        for n in range(checks):
+            store.hit(f'benchmark:{n % 100}', 60)
+        return (time.perf_counter() - started) / checks * 1_000_000
+
+    def print_row(self, mode, result):
+        good, bad = result['good'], result['abusers']
+        style = self.style.WARNING if good['throttled'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{mode:4} good: n={good['requests']:>5} p50={good['p50_ms'] or 0:8.2f}ms "
+            f"p95={good['p95_ms'] or 0:8.2f}ms p99={good['p99_ms'] or 0:8.2f}ms 429={good['throttled']} | "
+            f"abusers: n={bad['requests']:>6} 429={bad['throttled']}"
+        ))
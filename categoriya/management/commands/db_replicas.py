@@ -0,0 +1,55 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import db_routing
+
+
+class Command(BaseCommand):
+    help = (
+        "O'qish replikalari holati: kechikish, sog'lomligi va alias bo'yicha SQL soni. "
+        "--sync SQLite primary'ni replika fayllariga nusxalaydi (lokal sinov uchun)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true', help="SQLite replika fayllarini primary'dan yangilash")
+        parser.add_argument('--reset-stats', action='store_true', help="SQL hisoblagichlarini nolga tushirish")
+
+    def handle(self, *args, **options):
+        replicas = db_routing.replica_aliases()
+        if options['sync']:
+            self.sync(replicas)
+        if options['reset_stats']:
+            db_routing.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Statistika tozalandi"))
+            return
+        if not replicas:
+            self.stdout.write(self.style.WARNING("Replikalar sozlanmagan (DB_REPLICAS)"))
+        healthy = set(db_routing.healthy_replicas())
+        for alias in replicas:
+            lag = db_routing.replica_lag(alias)
+            status = 'ok' if alias in healthy else ('ishlamayapti' if lag is None else 'orqada')
+            lag_text = '-' if lag is None else f'{lag:.1f}s'
+            self.stdout.write(f"{alias:12} lag={lag_text:>8} {status}")
+        for alias, count in db_routing.stats().items():
+            self.stdout.write(f"{alias:12} queries={count:>10}")
+
+    def sync(self, replicas):
+        primary = connections[db_routing.PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError("--sync faqat SQLite uchun: PostgreSQL replikalari streaming replication bilan yangilanadi")
+        for alias in replicas:
+            started = time.perf_counter()
+            source = sqlite3.connect(primary.settings_dict['NAME'])
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                # Online backup: primary yozuvlar davomida ham izchil nusxa
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            connections[alias].close()
+            db_routing.record_lag(alias, 0.0)
+            self.stdout.write(self.style.SUCCESS(f"{alias}: {time.perf_counter() - started:.1f}s"))
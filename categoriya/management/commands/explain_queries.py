@@ -0,0 +1,89 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from core.api_catalog import canonical_requests
+from core.query_plans import EXPLAINERS
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "API'ning kanonik so'rovlarini bajarib, har bir SQL uchun EXPLAIN oladi va "
+        "to'liq skan (full scan) yoki vaqtinchalik saralash (temp sort) qilayotganlarini ko'rsatadi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', help="Faqat shu nomdagi so'rov(lar)")
+        parser.add_argument('--verbose-plans', action='store_true', help="Barcha rejalarni chiqarish")
+        parser.add_argument('--json', dest='json_path', help="Natijani JSON faylga yozish")
+        parser.add_argument(
+            '--fail-on-issues', action='store_true',
+            help="Muammo topilsa xato kodi bilan chiqish (CI uchun)",
+        )
+
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def handle(self, *args, **options):
+        # Javob keshi o'chiriladi: aks holda keshdagi so'rovlar SQL bajarmaydi
+        explain = EXPLAINERS.get(connection.vendor)
+        if explain is None:
+            raise CommandError(f"{connection.vendor} uchun EXPLAIN tahlili yo'q")
+        if connection.vendor == 'postgresql':
+            # Kichik lokal bazada ham rejalashtiruvchi indeksni tanlashi uchun
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+        client = APIClient()
+        user = User.objects.order_by('pk').first()
+        report = []
+        seen = set()
+
+        for item in canonical_requests():
+            if options['only'] and item.name not in options['only']:
+                continue
+            if item.auth:
+                if user is None:
+                    continue
+                client.force_authenticate(user)
+            else:
+                client.force_authenticate(None)
+
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(item.url)
+            if response.status_code != 200:
+                self.stderr.write(f"{item.name}: HTTP {response.status_code}, o'tkazib yuborildi")
+                continue
+
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+                    continue
+                seen.add(sql)
+                with connection.cursor() as cursor:
+                    plan, issues = explain(cursor, sql)
+                issues = [issue for issue in issues if not issue.startswith(item.allow)]
+                report.append({'request': item.name, 'url': item.url, 'sql': sql, 'plan': plan, 'issues': issues})
+
+        problems = [entry for entry in report if entry['issues']]
+        for entry in report:
+            if not entry['issues'] and not options['verbose_plans']:
+                continue
+            style = self.style.WARNING if entry['issues'] else self.style.SUCCESS
+            self.stdout.write(style(f"[{entry['request']}] {entry['url']}"))
+            self.stdout.write(f"  SQL: {entry['sql'][:500]}")
+            for line in entry['plan']:
+                self.stdout.write(f"    {line}")
+            for issue in entry['issues']:
+                self.stdout.write(self.style.ERROR(f"  ! {issue}"))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2)
+
+        summary = f"{len(report)} ta so'rov tekshirildi, {len(problems)} tasida muammo bor"
+        if problems and options['fail_on_issues']:
+            raise CommandError(summary)
+        self.stdout.write((self.style.WARNING if problems else self.style.SUCCESS)(summary))
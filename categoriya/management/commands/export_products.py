@@ -0,0 +1,59 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from categoriya import export
+from categoriya.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Katalogni NDJSON yoki CSV faylga oqim bilan eksport qiladi (xotira katalog "
+        "hajmiga bog'liq emas). Fayl nomi .gz bilan tugasa gzip bilan siqiladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="Fayl yo'li; '-' bo'lsa stdout")
+        parser.add_argument('--format', choices=export.FORMATS, help="Standart: fayl kengaytmasidan, aks holda ndjson")
+        parser.add_argument('--shop', type=int)
+        parser.add_argument('--category', type=int)
+        parser.add_argument('--subcategory', type=int)
+        parser.add_argument('--chegirma-bormi', choices=('true', 'false'))
+        parser.add_argument('--updated-since', help="ISO 8601: shu vaqtdan keyin o'zgargan mahsulotlar")
+        parser.add_argument('--chunk-size', type=int, default=export.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--media-url', default=settings.MEDIA_URL, help="Rasm URL'lari prefiksi")
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name] for name in ('shop', 'category', 'subcategory', 'chegirma_bormi', 'updated_since')
+            if options[name] is not None
+        }
+        filterset = export.ProductExportFilter(params, queryset=Product.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(f"Noto'g'ri filtr: {dict(filterset.errors)}")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size musbat bo'lishi kerak")
+
+        path = options['output']
+        compress = path.endswith('.gz')
+        format = options['format'] or ('csv' if path.removesuffix('.gz').endswith('.csv') else 'ndjson')
+        watermark = export.watermark()
+        chunks = export.stream(
+            filterset.qs, format, compress=compress,
+            chunk_size=options['chunk_size'], media_url=options['media_url'],
+        )
+
+        written = 0
+        target = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        try:
+            for chunk in chunks:
+                target.write(chunk)
+                written += len(chunk)
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: {written} bayt yozildi. Keyingi eksport uchun --updated-since {watermark}"
+            ))
@@ -0,0 +1,248 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core import response_cache
+from categoriya import tree
+from categoriya.models import (
+    Advertisement, Category, Product, ProductLike, ProductReview, Shop, SubCategory,
+)
+from categoriya.geo import cell_for
+from categoriya.search import clear_index, rebuild_index
+from categoriya.stats import rebuild_product_stats
+from user.models import User
+
+
+CATEGORY_NAMES = [
+    'Elektronika', 'Maishiy texnika', 'Kiyim-kechak', 'Poyabzal', 'Oziq-ovqat',
+    'Go\'zallik', 'Salomatlik', 'Uy-ro\'zg\'or', 'Bolalar uchun', 'Sport',
+    'Avto tovarlar', 'Kitoblar', 'Mebel', 'Qurilish', 'Bog\'dorchilik',
+    'Sovg\'alar', 'Zargarlik', 'Hayvonlar uchun', 'Kanselyariya', 'Sayohat',
+]
+PRODUCT_WORDS = [
+    'telefon', 'smartfon', 'televizor', 'noutbuk', 'muzlatgich', 'konditsioner',
+    'ko\'ylak', 'shim', 'krossovka', 'choy', 'qahva', 'guruch', 'yog\'', 'shampun',
+    'atir', 'vitamin', 'gilam', 'idish', 'o\'yinchoq', 'velosiped', 'shina',
+    'kitob', 'divan', 'stol', 'bo\'yoq', 'urug\'', 'soat', 'uzuk', 'daftar', 'chamadon',
+    'телефон', 'чой', 'кўйлак', 'китоб',
+]
+ADJECTIVES = ['yangi', 'arzon', 'sifatli', 'original', 'premium', 'katta', 'kichik', 'milliy', 'import']
+BRANDS = ['Artel', 'Samsung', 'Akfa', 'Uzum', 'Korzinka', 'Texnomart', 'Mediapark', 'Makro', 'Havas', 'Baraka']
+
+
+@contextmanager
+def manual_timestamps(*fields):
+    """bulk_create da auto_now/auto_now_add ni vaqtincha o'chiradi"""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def timestamp_field(model, name='yaratilgan_vaqt'):
+    return model._meta.get_field(name)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark uchun realistik sintetik katalog yaratadi (bulk_create bilan). "
+        "Mahsulotlar do'konlar orasida, sharh/likelar esa mahsulotlar orasida notekis "
+        "(power-law) taqsimlanadi. Bir xil --seed bir xil ma'lumot beradi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--shops', type=int, default=20_000)
+        parser.add_argument('--products', type=int, default=2_000_000)
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument('--subcategories', type=int, default=8, help="Har bir kategoriyada")
+        parser.add_argument('--reviews-per-product', type=float, default=2.0, help="O'rtacha")
+        parser.add_argument('--likes-per-product', type=float, default=5.0, help="O'rtacha")
+        parser.add_argument('--ads', type=int, default=1_000)
+        parser.add_argument('--discount-ratio', type=float, default=0.2)
+        parser.add_argument('--days', type=int, default=365, help="Yaratilgan vaqtlar oralig'i")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--search-index', action='store_true', help="Qidiruv indeksini ham qurish")
+        parser.add_argument('--flush', action='store_true', help="Avval mavjud katalogni o'chirish")
+
+    def log(self, message):
+        self.stdout.write(f"[{time.perf_counter() - self.started:7.1f}s] {message}")
+
+    def handle(self, *args, **options):
+        self.started = time.perf_counter()
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+
+        if options['flush']:
+            for model in (Advertisement, ProductLike, ProductReview, Product, Shop, SubCategory, Category):
+                model.objects.all()._raw_delete(model.objects.db)
+            User.objects.filter(is_superuser=False, is_staff=False)._raw_delete(User.objects.db)
+            clear_index()
+            self.log("Eski ma'lumotlar o'chirildi")
+        elif Product.objects.exists():
+            raise CommandError("Katalog bo'sh emas: --flush bilan ishga tushiring")
+
+        with manual_timestamps(
+            timestamp_field(User), timestamp_field(Shop), timestamp_field(Product),
+            timestamp_field(Product, 'yangilangan_vaqt'), timestamp_field(ProductReview),
+            timestamp_field(ProductLike),
+        ):
+            users = self.create_users(options['users'])
+            shops = self.create_shops(options['shops'], users)
+            categories = self.create_categories(options['categories'], options['subcategories'])
+            self.create_products(options, shops, categories, users)
+
+        rebuild_product_stats()
+        # bulk_create signal chaqirmaydi
+        response_cache.bump_all()
+        tree.TREE.bump()
+        self.log("Hisoblagichlar qayta hisoblandi")
+        if options['search_index']:
+            total = rebuild_index(batch_size=self.batch_size)
+            self.log(f"Qidiruv indeksi: {total} hujjat")
+        self.log(self.style.SUCCESS("Tayyor"))
+
+    # --- yordamchilar ---
+
+    def random_time(self):
+        # Yangi yozuvlar ko'proq: vaqt oralig'i bo'yicha kvadratik taqsimot
+        age = (1 - self.rng.random() ** 0.5) * self.days
+        return self.now - timedelta(days=age)
+
+    def skewed_count(self, mean, alpha=1.5, limit=10_000):
+        """O'rtachasi ~``mean`` bo'lgan power-law (Pareto) son"""
+        if mean <= 0:
+            return 0
+        scale = mean * (alpha - 1) / alpha
+        return min(limit, int(self.rng.paretovariate(alpha) * scale))
+
+    def bulk(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return [obj.pk for obj in created]
+
+    # --- bosqichlar ---
+
+    def create_users(self, count):
+        password = make_password('parol12345')
+        ids = []
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for n in range(start, min(count, start + self.batch_size)):
+                telefon = f'99890{n:07d}'
+                batch.append(User(
+                    username=telefon, telefon=telefon, email=f'user{n}@example.uz',
+                    ism=f'Ism{n}', familiya=f'Familiya{n}', password=password,
+                    yaratilgan_vaqt=self.random_time(),
+                ))
+            with transaction.atomic():
+                ids.extend(self.bulk(User, batch))
+        self.log(f"Foydalanuvchilar: {len(ids)}")
+        return ids
+
+    def create_shops(self, count, users):
+        ids = []
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for n in range(start, min(count, start + self.batch_size)):
+                brand = self.rng.choice(BRANDS)
+                latitude = Decimal(f'{self.rng.uniform(37.2, 45.6):.6f}')
+                longitude = Decimal(f'{self.rng.uniform(56.0, 73.1):.6f}')
+                batch.append(Shop(
+                    foydalanuvchi_id=self.rng.choice(users),
+                    kompaniya_nomi=f'{brand} {n}', brend_nomi=brand,
+                    direktor_ismi=f'Direktor {n}', telefon_raqam_email=f'+99871{n:07d}',
+                    bizness_manzili='Toshkent', yaratilgan_vaqt=self.random_time(),
+                    latitude=latitude, longitude=longitude,
+                    # bulk_create save() ni chaqirmaydi
+                    geo_cell=cell_for(latitude, longitude),
+                ))
+            with transaction.atomic():
+                ids.extend(self.bulk(Shop, batch))
+        self.log(f"Do'konlar: {len(ids)}")
+        return ids
+
+    def create_categories(self, count, per_category):
+        categories = []
+        for n in range(count):
+            name = CATEGORY_NAMES[n % len(CATEGORY_NAMES)]
+            if n >= len(CATEGORY_NAMES):
+                name = f'{name} {n // len(CATEGORY_NAMES) + 1}'
+            category = Category.objects.create(nomi=name, tavsif=f'{name} bo\'limi')
+            subcategories = SubCategory.objects.bulk_create([
+                SubCategory(category=category, nomi=f'{name} / {i + 1}') for i in range(per_category)
+            ])
+            categories.append((category.pk, [sub.pk for sub in subcategories]))
+        self.log(f"Kategoriyalar: {len(categories)}")
+        return categories
+
+    def create_products(self, options, shops, categories, users):
+        total = options['products']
+        # Do'kon og'irliklari: bir nechta yirik do'kon katalogning katta qismini egallaydi
+        shop_weights = [self.rng.paretovariate(1.2) for _ in shops]
+        category_weights = [self.rng.paretovariate(1.5) for _ in categories]
+        created = reviews = likes = ads = 0
+        ad_every = max(1, total // options['ads']) if options['ads'] else 0
+
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            shop_ids = self.rng.choices(shops, weights=shop_weights, k=size)
+            picked = self.rng.choices(categories, weights=category_weights, k=size)
+            batch = []
+            for shop_id, (category_id, subcategory_ids) in zip(shop_ids, picked):
+                narx = Decimal(self.rng.randint(5, 5_000) * 1000)
+                discounted = self.rng.random() < options['discount_ratio']
+                created_at = self.random_time()
+                words = self.rng.sample(PRODUCT_WORDS, 2)
+                batch.append(Product(
+                    shop_id=shop_id, category_id=category_id,
+                    subcategory_id=self.rng.choice(subcategory_ids) if subcategory_ids else None,
+                    nomi=f'{self.rng.choice(ADJECTIVES).capitalize()} {words[0]} {self.rng.choice(BRANDS)}',
+                    tavsif=f'{words[1]} {self.rng.choice(ADJECTIVES)} {words[0]}',
+                    narx=narx,
+                    chegirma_narx=(narx * Decimal(self.rng.choice(['0.7', '0.8', '0.9']))) if discounted else None,
+                    chegirma_bormi=discounted,
+                    yaratilgan_vaqt=created_at,
+                    yangilangan_vaqt=created_at,
+                ))
+
+            with transaction.atomic():
+                product_ids = self.bulk(Product, batch)
+                review_batch, like_batch, ad_batch = [], [], []
+                for index, product_id in enumerate(product_ids):
+                    for _ in range(self.skewed_count(options['reviews_per_product'])):
+                        review_batch.append(ProductReview(
+                            product_id=product_id, user_id=self.rng.choice(users),
+                            tavsif='Sharh', yulduz=self.rng.choices([1, 2, 3, 4, 5], [1, 1, 2, 4, 6])[0],
+                            yaratilgan_vaqt=self.random_time(),
+                        ))
+                    like_count = min(len(users), self.skewed_count(options['likes_per_product']))
+                    for user_id in self.rng.sample(users, like_count):
+                        like_batch.append(ProductLike(
+                            product_id=product_id, user_id=user_id, yaratilgan_vaqt=self.random_time(),
+                        ))
+                    if ad_every and (start + index) % ad_every == 0 and ads < options['ads']:
+                        ad_batch.append(Advertisement(product_id=product_id, tavsif='Reklama'))
+                        ads += 1
+                ProductReview.objects.bulk_create(review_batch, batch_size=self.batch_size)
+                ProductLike.objects.bulk_create(like_batch, batch_size=self.batch_size)
+                Advertisement.objects.bulk_create(ad_batch)
+
+            created += len(product_ids)
+            reviews += len(review_batch)
+            likes += len(like_batch)
+            if (start // self.batch_size) % 20 == 0 or created == total:
+                self.log(f"Mahsulotlar: {created}/{total}, sharhlar: {reviews}, likelar: {likes}, reklamalar: {ads}")
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Mavjud rasmlar uchun thumbnail/medium (WebP + JPEG) variantlarini yaratadi. "
+        "Standart bo'yicha faqat variantlari yo'q yoki eskirgan rasmlar qayta ishlanadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            help="Faqat shu model(lar) uchun, masalan categoriya.product yoki user.user",
+        )
+        parser.add_argument('--force', action='store_true', help="Barcha variantlarni qaytadan kodlash")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        registry = {model._meta.label_lower: (model, fields) for model, fields in images.REGISTRY.items()}
+        labels = options['models'] or sorted(registry)
+        unknown = set(labels) - registry.keys()
+        if unknown:
+            raise CommandError(f"Noma'lum model(lar): {', '.join(sorted(unknown))}. Mavjud: {', '.join(sorted(registry))}")
+
+        total_done = total_failed = 0
+        for label in labels:
+            model, fields = registry[label]
+            for field_name in fields:
+                done = failed = 0
+                rows = (
+                    model._default_manager.exclude(**{field_name: ''}).exclude(**{field_name: None})
+                    .order_by('pk')
+                    .values_list('pk', field_name, images.variants_field(field_name))
+                    .iterator(chunk_size=options['batch_size'])
+                )
+                for pk, name, data in rows:
+                    if not options['force'] and data and data.get('source') == name:
+                        continue
+                    if images.generate_for(model, pk, field_name, force=options['force']):
+                        done += 1
+                    else:
+                        failed += 1
+                self.stdout.write(f"{label}.{field_name}: {done} ta yaratildi, {failed} ta xato")
+                total_done += done
+                total_failed += failed
+
+        style = self.style.WARNING if total_failed else self.style.SUCCESS
+        self.stdout.write(style(f"Jami: {total_done} ta rasm, {total_failed} ta xato"))
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from categoriya.importer import DEFAULT_CHUNK_SIZE, FORMATS, ImportFileError, detect_format, import_products
+from categoriya.models import Shop
+
+
+class Command(BaseCommand):
+    help = (
+        "Do'kon mahsulotlarini CSV/JSONL fayldan import qiladi (SKU bo'yicha upsert). "
+        "Oxirida qatorlar soni va rows/sec chiqariladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV yoki JSONL fayl")
+        parser.add_argument('--shop', type=int, required=True, help="Do'kon ID")
+        parser.add_argument('--format', choices=FORMATS, help="Standart: fayl kengaytmasidan")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Faqat tekshirish, hech narsa yozilmaydi")
+        parser.add_argument('--report', help="Barcha xato qatorlarni JSONL faylga yozish")
+
+    def handle(self, *args, **options):
+        try:
+            shop = Shop.objects.get(pk=options['shop'])
+        except Shop.DoesNotExist:
+            raise CommandError(f"Do'kon topilmadi: {options['shop']}")
+
+        report = open(options['report'], 'w') if options['report'] else None
+        on_error = None
+        if report is not None:
+            def on_error(entry):
+                report.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        try:
+            format = detect_format(options['path'], options['format'])
+            with open(options['path'], 'rb') as fh:
+                result = import_products(
+                    shop, fh, format, chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'], max_errors=10, on_error=on_error,
+                )
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if report is not None:
+                report.close()
+
+        summary = result.as_dict()
+        for entry in summary['errors']:
+            self.stdout.write(self.style.WARNING(f"#{entry['row']} {entry['sku'] or ''}: {entry['errors']}"))
+        if summary['errors_truncated']:
+            self.stdout.write(f"... va yana {summary['error_count'] - len(summary['errors'])} ta xato")
+        prefix = "Tekshirildi (dry-run)" if options['dry_run'] else "Import qilindi"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}: {summary['rows']} qator, {summary['created']} yangi, {summary['updated']} yangilandi, "
+            f"{summary['error_count']} xato; {summary['seconds']} s, {summary['rows_per_second']} qator/s"
+        ))
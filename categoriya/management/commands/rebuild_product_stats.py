@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from categoriya.models import Product
+from categoriya.stats import find_stale_product_stats, rebuild_product_stats
+
+
+class Command(BaseCommand):
+    help = "Mahsulot sharh/like/reyting hisoblagichlarini manba jadvallardan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Faqat farqlarni ko'rsatish, hech narsani yozmaslik",
+        )
+        parser.add_argument(
+            '--product', type=int, action='append', dest='products',
+            help="Faqat shu mahsulot(lar) uchun (bir necha marta berish mumkin)",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options['products']:
+            queryset = queryset.filter(pk__in=options['products'])
+
+        stale = find_stale_product_stats(queryset)
+
+        if options['check']:
+            for product in stale.only('pk', *Product.STATS_FIELDS)[:50]:
+                self.stdout.write(
+                    f"#{product.pk}: reviews {product.reviews_count} != {product.actual_reviews_count}, "
+                    f"likes {product.likes_count} != {product.actual_likes_count}, "
+                    f"rating_sum {product.rating_sum} != {product.actual_rating_sum}"
+                )
+            self.stdout.write(f"Mos kelmagan mahsulotlar: {stale.count()}")
+            return
+
+        updated = rebuild_product_stats(stale)
+        if not updated:
+            self.stdout.write(self.style.SUCCESS("Barcha hisoblagichlar to'g'ri"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"{updated} ta mahsulot hisoblagichi tuzatildi"))
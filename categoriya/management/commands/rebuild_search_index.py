@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from categoriya.models import SearchDocument
+from categoriya.search import INDEXED_MODELS, get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Qidiruv indeksini mahsulot, do'kon va kategoriyalardan qayta quradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', action='append', dest='kinds', choices=list(INDEXED_MODELS),
+            help="Faqat shu turdagi hujjatlar (bir necha marta berish mumkin)",
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_index(kinds=options['kinds'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} ta hujjat indekslandi ({type(get_backend()).__name__}, {elapsed:.1f} s)"
+        ))
+        for kind, _ in SearchDocument.KIND_CHOICES:
+            count = SearchDocument.objects.filter(kind=kind).count()
+            self.stdout.write(f"  {kind}: {count}")
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core import response_cache
+from categoriya import price_history
+from categoriya.models import PriceHistory, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Mahsulotlarning min_price_90d keshini narx tarixidan qayta hisoblaydi. Standart: "
+        "faqat so'nggi --lookback-hours ichida 90 kunlik oynadan chiqqan tarix qatorlari "
+        "bo'lgan mahsulotlar (kunlik cron uchun); --all -- barcha mahsulotlar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true')
+        parser.add_argument('--lookback-hours', type=int, default=25)
+        parser.add_argument('--batch-size', type=int, default=5000, help="Bitta UPDATE qamrab oladigan id oralig'i")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['lookback_hours'] < 1:
+            raise CommandError("--batch-size va --lookback-hours musbat bo'lishi kerak")
+        now = timezone.now()
+        products = Product.objects.all()
+        if not options['all']:
+            cutoff = now - price_history.WINDOW
+            aged = PriceHistory.objects.filter(
+                vaqt__gte=cutoff - timedelta(hours=options['lookback_hours']), vaqt__lt=cutoff,
+            ).values('product_id')
+            products = products.filter(pk__in=aged)
+
+        bounds = products.aggregate(low=Min('pk'), high=Max('pk'))
+        updated = 0
+        if bounds['low'] is not None:
+            for start in range(bounds['low'], bounds['high'] + 1, options['batch_size']):
+                updated += price_history.refresh_min_prices(
+                    products.filter(pk__gte=start, pk__lt=start + options['batch_size']), now=now,
+                )
+            response_cache.bump(Product)
+        self.stdout.write(self.style.SUCCESS(f"{updated} ta mahsulotning min_price_90d qiymati qayta hisoblandi"))
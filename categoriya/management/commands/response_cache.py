@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core import response_cache
+
+
+class Command(BaseCommand):
+    help = "Javob keshi statistikasi (hit/miss) va keshni bekor qilish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help="Barcha keshlangan javoblarni eskirtirish")
+        parser.add_argument('--reset-stats', action='store_true', help="Hit/miss hisoblagichlarini nolga tushirish")
+
+    def handle(self, *args, **options):
+        if response_cache.get_cache() is None:
+            self.stdout.write(self.style.WARNING("Javob keshi o'chirilgan (RESPONSE_CACHE_ALIAS = None)"))
+            return
+        if options['clear']:
+            response_cache.bump_all()
+            self.stdout.write(self.style.SUCCESS("Kesh eskirtirildi"))
+        if options['reset_stats']:
+            response_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Statistika tozalandi"))
+        if options['clear'] or options['reset_stats']:
+            return
+
+        stats = response_cache.stats()
+        if not stats:
+            self.stdout.write("Hali statistika yo'q")
+            return
+        total_hit = total_miss = 0
+        for name, values in sorted(stats.items()):
+            total_hit += values['hit']
+            total_miss += values['miss']
+            self.stdout.write(f"{name:40} hit={values['hit']:>8} miss={values['miss']:>8} ratio={values['ratio']:.3f}")
+        self.stdout.write(f"{'Jami':40} hit={total_hit:>8} miss={total_miss:>8} "
+                          f"ratio={total_hit / (total_hit + total_miss):.3f}")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from categoriya import campaigns
+
+
+class Command(BaseCommand):
+    help = (
+        "Chegirma kampaniyalarini qo'llaydi va muddati o'tganlarini olib tashlaydi "
+        "(chegirma_bormi / chegirma_narx). Set-based UPDATE'lar id oraliqlari bo'yicha "
+        "bo'laklarda; qayta ishga tushirish xavfsiz. Cron'dan har daqiqada chaqirish uchun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', help="ISO 8601: shu vaqt holatini qo'llash (standart: hozir)")
+        parser.add_argument('--batch-size', type=int, default=campaigns.DEFAULT_BATCH_SIZE,
+                            help="Bitta UPDATE qamrab oladigan id oralig'i")
+
+    def handle(self, *args, **options):
+        now = None
+        if options['now']:
+            now = parse_datetime(options['now'])
+            if now is None or now.tzinfo is None:
+                raise CommandError("--now vaqt mintaqasi bilan ISO 8601 bo'lishi kerak")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size musbat bo'lishi kerak")
+
+        result = campaigns.run_campaigns(now=now, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Faol kampaniyalar: {result['campaigns']}, chegirma qo'yildi: {result['applied']}, "
+            f"olib tashlandi: {result['expired']}"
+        ))
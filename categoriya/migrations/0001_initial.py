@@ -0,0 +1,123 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:54
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nomi', models.CharField(max_length=255, verbose_name='Nomi')),
+                ('tavsif', models.TextField(blank=True, verbose_name='Tavsif')),
+            ],
+            options={
+                'verbose_name': 'Kategoriya',
+                'verbose_name_plural': 'Kategoriyalar',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tavsif', models.TextField(verbose_name='Sharh matni')),
+                ('yulduz', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Bahosi')),
+                ('yaratilgan_vaqt', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+            ],
+            options={
+                'verbose_name': 'Mahsulot sharhi',
+                'verbose_name_plural': 'Mahsulot sharhlari',
+            },
+        ),
+        migrations.CreateModel(
+            name='Shop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kompaniya_nomi', models.CharField(max_length=255, verbose_name='Kompaniya nomi')),
+                ('brend_nomi', models.CharField(max_length=255, verbose_name='Brend nomi')),
+                ('inn_stir', models.CharField(blank=True, max_length=50, verbose_name='INN/STIR')),
+                ('yuridik_sertifikat', models.CharField(blank=True, max_length=255, verbose_name='Yuridik sertifikat')),
+                ('direktor_ismi', models.CharField(max_length=255, verbose_name='Direktor ismi')),
+                ('telefon_raqam_email', models.CharField(max_length=255, verbose_name='Telefon yoki email')),
+                ('bizness_manzili', models.CharField(max_length=255, verbose_name='Biznes manzili')),
+                ('brend_logotipi', models.ImageField(blank=True, null=True, upload_to='shops/', verbose_name='Brend logotipi')),
+                ('jismoniy_tarmoqlar', models.TextField(blank=True, verbose_name='Jismoniy tarmoqlar')),
+                ('pasport_seriyasi', models.CharField(blank=True, max_length=20, verbose_name='Pasport seriyasi')),
+                ('tugilgan_kun', models.DateField(blank=True, null=True, verbose_name="Tug'ilgan kun")),
+                ('yaratilgan_vaqt', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='Kenglik')),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='Uzunlik')),
+                ('location', models.CharField(blank=True, max_length=255, verbose_name='Manzil matni')),
+                ('muddati', models.DateField(blank=True, null=True, verbose_name="Ro'yxatdan o'tish muddati")),
+            ],
+            options={
+                'verbose_name': "Do'kon",
+                'verbose_name_plural': "Do'konlar",
+            },
+        ),
+        migrations.CreateModel(
+            name='SubCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nomi', models.CharField(max_length=255, verbose_name='Nomi')),
+                ('tavsif', models.TextField(blank=True, verbose_name='Tavsif')),
+            ],
+            options={
+                'verbose_name': 'Qism kategoriya',
+                'verbose_name_plural': 'Qism kategoriyalar',
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nomi', models.CharField(max_length=255, verbose_name='Nomi')),
+                ('tavsif', models.TextField(verbose_name='Tavsif')),
+                ('rasm', models.ImageField(blank=True, null=True, upload_to='products/', verbose_name='Rasm')),
+                ('narx', models.DecimalField(decimal_places=2, max_digits=15, validators=[django.core.validators.MinValueValidator(0)], verbose_name="Narx (so'm)")),
+                ('chegirma_narx', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Chegirma narxi')),
+                ('chegirma_bormi', models.BooleanField(default=False, verbose_name='Chegirma mavjud')),
+                ('yaratilgan_vaqt', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+                ('yangilangan_vaqt', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='categoriya.category')),
+            ],
+            options={
+                'verbose_name': 'Mahsulot',
+                'verbose_name_plural': 'Mahsulotlar',
+            },
+        ),
+        migrations.CreateModel(
+            name='Advertisement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tavsif', models.TextField(verbose_name='Tavsif')),
+                ('rasm', models.ImageField(blank=True, null=True, upload_to='ads/', verbose_name='Rasm')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ads', to='categoriya.product')),
+            ],
+            options={
+                'verbose_name': 'Reklama',
+                'verbose_name_plural': 'Reklamalar',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductLike',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('yaratilgan_vaqt', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='categoriya.product')),
+            ],
+            options={
+                'verbose_name': 'Mahsulot like',
+                'verbose_name_plural': 'Mahsulot likelari',
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:55
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_product_stats(apps, schema_editor):
+    Product = apps.get_model('categoriya', 'Product')
+    ProductReview = apps.get_model('categoriya', 'ProductReview')
+    ProductLike = apps.get_model('categoriya', 'ProductLike')
+
+    def aggregate(queryset, expression):
+        return Coalesce(
+            Subquery(
+                queryset.filter(product=OuterRef('pk')).order_by()
+                .values('product').annotate(v=expression).values('v'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    changes = {
+        'reviews_count': aggregate(ProductReview.objects.all(), Count('pk')),
+        'likes_count': aggregate(ProductLike.objects.all(), Count('pk')),
+        'rating_sum': aggregate(ProductReview.objects.all(), Sum('yulduz')),
+    }
+    for star in range(1, 6):
+        changes[f'rating_{star}'] = aggregate(ProductReview.objects.filter(yulduz=star), Count('pk'))
+    Product.objects.update(**changes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Likelar soni'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Baholar yig'indisi"),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Sharhlar soni'),
+        ),
+        migrations.RunPython(backfill_product_stats, migrations.RunPython.noop),
+    ]
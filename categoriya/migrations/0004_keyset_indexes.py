@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0003_product_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-yaratilgan_vaqt', '-id'], name='product_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['shop', '-yaratilgan_vaqt', '-id'], name='product_shop_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', '-yaratilgan_vaqt', '-id'], name='product_cat_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subcategory', '-yaratilgan_vaqt', '-id'], name='product_subcat_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['chegirma_bormi', '-yaratilgan_vaqt', '-id'], name='product_disc_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['product', '-yaratilgan_vaqt', '-id'], name='review_product_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['-yaratilgan_vaqt', '-id'], name='shop_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['foydalanuvchi', '-yaratilgan_vaqt', '-id'], name='shop_owner_recent_idx'),
+        ),
+    ]
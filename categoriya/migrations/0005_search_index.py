@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS categoriya_search_fts "
+        "USING fts5(title, body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS categoriya_search_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Mahsulot'), ('shop', "Do'kon"), ('category', 'Kategoriya')], max_length=16, verbose_name='Turi')),
+                ('object_id', models.BigIntegerField(verbose_name='Obyekt ID')),
+                ('title', models.TextField(verbose_name='Sarlavha')),
+                ('body', models.TextField(blank=True, verbose_name='Matn')),
+                ('shop_id', models.BigIntegerField(blank=True, null=True)),
+                ('category_id', models.BigIntegerField(blank=True, null=True)),
+                ('chegirma_bormi', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Qidiruv hujjati',
+                'verbose_name_plural': 'Qidiruv hujjatlari',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='yangilangan_vaqt',
+            field=models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt'),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='yangilangan_vaqt',
+            field=models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt'),
+        ),
+        migrations.AddField(
+            model_name='subcategory',
+            name='yangilangan_vaqt',
+            field=models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+from categoriya.geo import cell_for
+
+
+def backfill_geo_cell(apps, schema_editor):
+    Shop = apps.get_model('categoriya', 'Shop')
+    batch = []
+    queryset = Shop.objects.exclude(latitude=None).exclude(longitude=None).only('latitude', 'longitude')
+    for shop in queryset.iterator(chunk_size=2000):
+        shop.geo_cell = cell_for(shop.latitude, shop.longitude)
+        batch.append(shop)
+        if len(batch) >= 2000:
+            Shop.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    if batch:
+        Shop.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0007_updated_timestamps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['geo_cell'], name='shop_geo_cell_idx'),
+        ),
+        migrations.RunPython(backfill_geo_cell, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0008_shop_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='rasm_variants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rasm_variants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='brend_logotipi_variants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0010_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['yangilangan_vaqt'], name='product_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:58
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0011_product_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscountCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nomi', models.CharField(max_length=255, verbose_name='Nomi')),
+                ('chegirma_foizi', models.DecimalField(decimal_places=2, max_digits=4, validators=[django.core.validators.MinValueValidator(Decimal('0.01')), django.core.validators.MaxValueValidator(Decimal('99.99'))], verbose_name='Chegirma foizi')),
+                ('boshlanish_vaqti', models.DateTimeField(verbose_name='Boshlanish vaqti')),
+                ('tugash_vaqti', models.DateTimeField(verbose_name='Tugash vaqti')),
+                ('faol', models.BooleanField(default=True, verbose_name='Faol')),
+                ('yaratilgan_vaqt', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+                ('yangilangan_vaqt', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='campaigns', to='categoriya.category')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='campaigns', to='categoriya.product')),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='campaigns', to='categoriya.shop')),
+            ],
+            options={
+                'verbose_name': 'Chegirma kampaniyasi',
+                'verbose_name_plural': 'Chegirma kampaniyalari',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='discount_campaign',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='categoriya.discountcampaign', verbose_name='Chegirma kampaniyasi'),
+        ),
+        migrations.AddIndex(
+            model_name='discountcampaign',
+            index=models.Index(fields=['tugash_vaqti', 'boshlanish_vaqti'], name='campaign_window_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='discountcampaign',
+            constraint=models.CheckConstraint(condition=models.Q(('product__isnull', False), ('shop__isnull', False), ('category__isnull', False), _connector='OR'), name='campaign_has_scope'),
+        ),
+        migrations.AddConstraint(
+            model_name='discountcampaign',
+            constraint=models.CheckConstraint(condition=models.Q(('tugash_vaqti__gt', models.F('boshlanish_vaqti'))), name='campaign_window_valid'),
+        ),
+    ]
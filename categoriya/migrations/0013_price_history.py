@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_price_history(apps, schema_editor):
+    """Har bir mahsulot uchun joriy narx -- tarixning boshlang'ich qatori"""
+    Product = apps.get_model('categoriya', 'Product')
+    PriceHistory = apps.get_model('categoriya', 'PriceHistory')
+    quote = schema_editor.connection.ops.quote_name
+    product, history = quote(Product._meta.db_table), quote(PriceHistory._meta.db_table)
+    discount = 'CASE WHEN chegirma_bormi AND chegirma_narx IS NOT NULL THEN chegirma_narx END'
+    schema_editor.execute(
+        f'INSERT INTO {history} (product_id, narx, chegirma_narx, vaqt) '
+        f'SELECT id, narx, {discount}, yangilangan_vaqt FROM {product}'
+    )
+    schema_editor.execute(f'UPDATE {product} SET min_price_90d = COALESCE({discount}, narx)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoriya', '0012_discount_campaigns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='min_price_90d',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=15, null=True, verbose_name='90 kunlik eng past narx'),
+        ),
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('narx', models.DecimalField(decimal_places=2, max_digits=15, verbose_name="Narx (so'm)")),
+                ('chegirma_narx', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True, verbose_name='Chegirma narxi')),
+                ('vaqt', models.DateTimeField(verbose_name='Vaqt')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='categoriya.product')),
+            ],
+            options={
+                'verbose_name': 'Narx tarixi',
+                'verbose_name_plural': 'Narx tarixi',
+                'indexes': [models.Index(fields=['product', 'vaqt'], name='price_history_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_price_history, migrations.RunPython.noop),
+    ]
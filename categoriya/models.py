@@ -1,13 +1,18 @@
 # models.py
+from decimal import Decimal
+
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
 from user.models import User
 
+from .geo import cell_for
+
 
 class Category(models.Model):
     nomi = models.CharField(_("Nomi"), max_length=255)
     tavsif = models.TextField(_("Tavsif"), blank=True)
+    yangilangan_vaqt = models.DateTimeField(_("Yangilangan vaqt"), auto_now=True)
 
     def __str__(self):
         return self.nomi
@@ -15,6 +20,9 @@ class Category(models.Model):
     class Meta:
         verbose_name = _("Kategoriya")
         verbose_name_plural = _("Kategoriyalar")
+        indexes = [
+            models.Index(fields=['nomi'], name='category_name_idx'),
+        ]
 
 
 class SubCategory(models.Model):
@@ -22,6 +30,7 @@ class SubCategory(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="subcategories")
     nomi = models.CharField(_("Nomi"), max_length=255)
     tavsif = models.TextField(_("Tavsif"), blank=True)
+    yangilangan_vaqt = models.DateTimeField(_("Yangilangan vaqt"), auto_now=True)
 
     def __str__(self):
         return self.nomi
@@ -41,23 +50,40 @@ class Shop(models.Model):
     telefon_raqam_email = models.CharField(_("Telefon yoki email"), max_length=255)
     bizness_manzili = models.CharField(_("Biznes manzili"), max_length=255)
     brend_logotipi = models.ImageField(_("Brend logotipi"), upload_to="shops/", null=True, blank=True)
+    # Rasm variantlari (core.images), fonda to'ldiriladi
+    brend_logotipi_variants = models.JSONField(null=True, blank=True, editable=False)
     jismoniy_tarmoqlar = models.TextField(_("Jismoniy tarmoqlar"), blank=True)
     pasport_seriyasi = models.CharField(_("Pasport seriyasi"), max_length=20, blank=True)
     tugilgan_kun = models.DateField(_("Tug'ilgan kun"), null=True, blank=True)
     yaratilgan_vaqt = models.DateTimeField(_("Yaratilgan vaqt"), auto_now_add=True)
+    yangilangan_vaqt = models.DateTimeField(_("Yangilangan vaqt"), auto_now=True)
 
     # Joylashuv uchun
     latitude = models.DecimalField(_("Kenglik"), max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(_("Uzunlik"), max_digits=9, decimal_places=6, null=True, blank=True)
     location = models.CharField(_("Manzil matni"), max_length=255, blank=True)
     muddati = models.DateField(_("Ro'yxatdan o'tish muddati"), null=True, blank=True)
+    # Joylashuv to'ri katagi (categoriya.geo), koordinatalardan hisoblanadi
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.kompaniya_nomi
 
+    def save(self, *args, **kwargs):
+        self.geo_cell = cell_for(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geo_cell'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = _("Do'kon")
         verbose_name_plural = _("Do'konlar")
+        indexes = [
+            models.Index(fields=['-yaratilgan_vaqt', '-id'], name='shop_recent_idx'),
+            models.Index(fields=['foydalanuvchi', '-yaratilgan_vaqt', '-id'], name='shop_owner_recent_idx'),
+            models.Index(fields=['geo_cell'], name='shop_geo_cell_idx'),
+        ]
 
 
 class Product(models.Model):
@@ -66,8 +92,12 @@ class Product(models.Model):
     subcategory = models.ForeignKey(SubCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name="products")
     
     nomi = models.CharField(_("Nomi"), max_length=255)
+    # Do'kon ichidagi artikul: bulk import shu bo'yicha mavjud mahsulotni yangilaydi.
+    # Bo'sh qiymat NULL saqlanadi -- unikallik faqat to'ldirilgan SKU'larga tegishli
+    sku = models.CharField(_("SKU (artikul)"), max_length=64, null=True, blank=True, default=None)
     tavsif = models.TextField(_("Tavsif"))
     rasm = models.ImageField(_("Rasm"), upload_to="products/", null=True, blank=True)
+    rasm_variants = models.JSONField(null=True, blank=True, editable=False)
     
     narx = models.DecimalField(
         _("Narx (so'm)"),
@@ -84,158 +114,167 @@ class Product(models.Model):
         validators=[MinValueValidator(0)],
     )
     chegirma_bormi = models.BooleanField(_("Chegirma mavjud"), default=False)
+    # Chegirmani qo'ygan kampaniya; None va chegirma_bormi=True -- qo'lda qo'yilgan
+    discount_campaign = models.ForeignKey(
+        'DiscountCampaign', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name="products", verbose_name=_("Chegirma kampaniyasi"),
+    )
+    # Oxirgi 90 kundagi eng past amaldagi narx (PriceHistory dan, refresh_min_prices kunlik yangilaydi)
+    min_price_90d = models.DecimalField(
+        _("90 kunlik eng past narx"), max_digits=15, decimal_places=2, null=True, blank=True, editable=False,
+    )
     
     yaratilgan_vaqt = models.DateTimeField(_("Yaratilgan vaqt"), auto_now_add=True)
     yangilangan_vaqt = models.DateTimeField(_("Yangilangan vaqt"), auto_now=True)
 
-    def __str__(self):
-        return self.nomi
-
-    class Meta:
-        verbose_name = _("Mahsulot")
-        verbose_name_plural = _("Mahsulotlar")
-
-
-class Advertisement(models.Model):
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="ads")
-    tavsif = models.TextField(_("Tavsif"))
-    rasm = models.ImageField(_("Rasm"), upload_to="ads/", null=True, blank=True)
-
-    def __str__(self):
-        return f"Reklama: {self.product.nomi}"
-
-    class Meta:
-        verbose_name = _("Reklama")
-        verbose_name_plural = _("Reklamalar")
-
-
-class ProductReview(models.Model):
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reviews")
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reviews")
-    tavsif = models.TextField(_("Sharh matni"))
-    yulduz = models.IntegerField(
-        _("Bahosi"),
-        validators=[MinValueValidator(1), MaxValueValidator(5)]
+    # Sharh va like hisoblagichlari (signallar orqali F() bilan yangilanadi)
+    reviews_count = models.PositiveIntegerField(_("Sharhlar soni"), default=0, editable=False)
+    likes_count = models.PositiveIntegerField(_("Likelar soni"), default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(_("Baholar yig'indisi"), default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    STATS_FIELDS = (
+        'reviews_count', 'likes_count', 'rating_sum',
+        'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
     )
-    yaratilgan_vaqt = models.DateTimeField(_("Yaratilgan vaqt"), auto_now_add=True)
+    # Faqat set-based UPDATE bilan yuritiladigan maydonlar
+    DERIVED_FIELDS = STATS_FIELDS + ('min_price_90d',)
 
     def __str__(self):
-        return f"{self.user} — {self.product} ({self.yulduz} yulduz)"
-
-    class Meta:
-        verbose_name = _("Mahsulot sharhi")
-        verbose_name_plural = _("Mahsulot sharhlari")
+        return self.nomi
 
-
-class ProductLike(models.Model):
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="likes")
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="likes")
-    yaratilgan_vaqt = models.DateTimeField(auto_now_add=True)
+    def save(self, *args, **kwargs):
+        if self.sku == '':
+            self.sku = None
+        # Oddiy saqlash hisoblagichlarni eski qiymat bilan ustidan yozmasligi kerak
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def average_rating(self):
+        if not self.reviews_count:
+            return None
+        return self.rating_sum / self.reviews_count
+
+    @property
+    def rating_histogram(self):
+        return {str(star): getattr(self, f'rating_{star}') for star in range(1, 6)}
 
     class Meta:
+        verbose_name = _("Mahsulot")
+        verbose_name_plural = _("Mahsulotlar")
+        # Keyset pagination (yaratilgan_vaqt, id) uchun kompozit indekslar
+        indexes = [
+            models.Index(fields=['-yaratilgan_vaqt', '-id'], name='product_recent_idx'),
+            models.Index(fields=['shop', '-yaratilgan_vaqt', '-id'], name='product_shop_recent_idx'),
+            models.Index(fields=['category', '-yaratilgan_vaqt', '-id'], name='product_cat_recent_idx'),
+            models.Index(fields=['subcategory', '-yaratilgan_vaqt', '-id'], name='product_subcat_recent_idx'),
+            # Faqat chegirmadagi mahsulotlar uchun qisman (partial) indekslar
+            models.Index(
+                fields=['-yaratilgan_vaqt', '-id'], name='product_disc_recent_idx',
+                condition=models.Q(chegirma_bormi=True),
+            ),
+            models.Index(
+                fields=['shop', '-yaratilgan_vaqt', '-id'], name='product_shop_disc_recent_idx',
+                condition=models.Q(chegirma_bormi=True),
+            ),
+            # ?ordering=narx / ?ordering=nomi
+            models.Index(fields=['narx', 'id'], name='product_price_idx'),
+            models.Index(fields=['category', 'narx'], name='product_cat_price_idx'),
+            models.Index(fields=['shop', 'narx'], name='product_shop_price_idx'),
+            models.Index(fields=['nomi'], name='product_name_idx'),
+            # Inkremental eksport: ?updated_since=
+            models.Index(fields=['yangilangan_vaqt'], name='product_updated_idx'),
+            # Bosh sahifa "top_rated": reviews_count >= N -- kichik diapazon
+            models.Index(fields=['reviews_count'], name='product_reviews_idx'),
+        ]
         constraints = [
-            models.UniqueConstraint(fields=["product", "user"], name="unique_product_like")
+            models.UniqueConstraint(fields=['shop', 'sku'], name='unique_product_shop_sku'),
         ]
-        verbose_name = _("Mahsulot like")
-        verbose_name_plural = _("Mahsulot likelari")
-
-    def __str__(self):
-        return f"{self.user} yoqtirdi: {self.product}"
-
-    nomi = models.CharField(_("Nomi"), max_length=255)
-    tavsif = models.TextField(_("Tavsif"), blank=True)
 
-    def __str__(self):
-        return self.nomi
 
-    class Meta:
-        verbose_name = _("Kategoriya")
-        verbose_name_plural = _("Kategoriyalar")
-
-
-class SubCategory(models.Model):
-    """Qism kategoriyalar (subkategoriyalar)"""
-    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="subcategories")
+class DiscountCampaign(models.Model):
+    """
+    Vaqt oralig'idagi foizli chegirma: bitta mahsulot, do'kon, kategoriya yoki
+    do'konning bitta kategoriyasi uchun. Mahsulotlarga ``run_discount_campaigns``
+    buyrug'i qo'llaydi va muddati tugaganda olib tashlaydi.
+    """
     nomi = models.CharField(_("Nomi"), max_length=255)
-    tavsif = models.TextField(_("Tavsif"), blank=True)
-
-    def __str__(self):
-        return self.nomi
-
-    class Meta:
-        verbose_name = _("Qism kategoriya")
-        verbose_name_plural = _("Qism kategoriyalar")
-
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, null=True, blank=True, related_name="campaigns",
+    )
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, null=True, blank=True, related_name="campaigns")
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name="campaigns",
+    )
+    chegirma_foizi = models.DecimalField(
+        _("Chegirma foizi"), max_digits=4, decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01')), MaxValueValidator(Decimal('99.99'))],
+    )
+    boshlanish_vaqti = models.DateTimeField(_("Boshlanish vaqti"))
+    tugash_vaqti = models.DateTimeField(_("Tugash vaqti"))
+    faol = models.BooleanField(_("Faol"), default=True)
 
-class Shop(models.Model):
-    foydalanuvchi = models.ForeignKey(User, on_delete=models.CASCADE, related_name="shops")
-    kompaniya_nomi = models.CharField(_("Kompaniya nomi"), max_length=255)
-    brend_nomi = models.CharField(_("Brend nomi"), max_length=255)
-    inn_stir = models.CharField(_("INN/STIR"), max_length=50, blank=True)
-    yuridik_sertifikat = models.CharField(_("Yuridik sertifikat"), max_length=255, blank=True)
-    direktor_ismi = models.CharField(_("Direktor ismi"), max_length=255)
-    telefon_raqam_email = models.CharField(_("Telefon yoki email"), max_length=255)
-    bizness_manzili = models.CharField(_("Biznes manzili"), max_length=255)
-    brend_logotipi = models.ImageField(_("Brend logotipi"), upload_to="shops/", null=True, blank=True)
-    jismoniy_tarmoqlar = models.TextField(_("Jismoniy tarmoqlar"), blank=True)
-    pasport_seriyasi = models.CharField(_("Pasport seriyasi"), max_length=20, blank=True)
-    tugilgan_kun = models.DateField(_("Tug'ilgan kun"), null=True, blank=True)
     yaratilgan_vaqt = models.DateTimeField(_("Yaratilgan vaqt"), auto_now_add=True)
-
-    # Joylashuv uchun
-    latitude = models.DecimalField(_("Kenglik"), max_digits=9, decimal_places=6, null=True, blank=True)
-    longitude = models.DecimalField(_("Uzunlik"), max_digits=9, decimal_places=6, null=True, blank=True)
-    location = models.CharField(_("Manzil matni"), max_length=255, blank=True)
-    muddati = models.DateField(_("Ro'yxatdan o'tish muddati"), null=True, blank=True)
+    yangilangan_vaqt = models.DateTimeField(_("Yangilangan vaqt"), auto_now=True)
 
     def __str__(self):
-        return self.kompaniya_nomi
+        return f"{self.nomi} (-{self.chegirma_foizi}%)"
 
     class Meta:
-        verbose_name = _("Do'kon")
-        verbose_name_plural = _("Do'konlar")
+        verbose_name = _("Chegirma kampaniyasi")
+        verbose_name_plural = _("Chegirma kampaniyalari")
+        indexes = [
+            models.Index(fields=['tugash_vaqti', 'boshlanish_vaqti'], name='campaign_window_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(product__isnull=False) | models.Q(shop__isnull=False) | models.Q(category__isnull=False),
+                name='campaign_has_scope',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(tugash_vaqti__gt=models.F('boshlanish_vaqti')),
+                name='campaign_window_valid',
+            ),
+        ]
 
 
-class Product(models.Model):
-    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="products")
-    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name="products")
-    subcategory = models.ForeignKey(SubCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name="products")
-    
-    nomi = models.CharField(_("Nomi"), max_length=255)
-    tavsif = models.TextField(_("Tavsif"))
-    rasm = models.ImageField(_("Rasm"), upload_to="products/", null=True, blank=True)
-    
-    narx = models.DecimalField(
-        _("Narx (so'm)"),
-        max_digits=15,
-        decimal_places=2,
-        validators=[MinValueValidator(0)],
-    )
-    chegirma_narx = models.DecimalField(
-        _("Chegirma narxi"),
-        max_digits=15,
-        decimal_places=2,
-        null=True,
-        blank=True,
-        validators=[MinValueValidator(0)],
-    )
-    chegirma_bormi = models.BooleanField(_("Chegirma mavjud"), default=False)
-    
-    yaratilgan_vaqt = models.DateTimeField(_("Yaratilgan vaqt"), auto_now_add=True)
-    yangilangan_vaqt = models.DateTimeField(_("Yangilangan vaqt"), auto_now=True)
+class PriceHistory(models.Model):
+    """
+    Narx o'zgarishlari jurnali (faqat qo'shiladi): ``narx`` yoki amaldagi
+    chegirma narxi o'zgargandagina bitta qator. ``chegirma_narx`` -- chegirma
+    bo'lmasa NULL.
+    """
+    # Alohida product_id indeksi kerak emas: (product, vaqt) indeksi qoplaydi
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="price_history", db_index=False)
+    narx = models.DecimalField(_("Narx (so'm)"), max_digits=15, decimal_places=2)
+    chegirma_narx = models.DecimalField(_("Chegirma narxi"), max_digits=15, decimal_places=2, null=True, blank=True)
+    vaqt = models.DateTimeField(_("Vaqt"))
 
     def __str__(self):
-        return self.nomi
+        return f"{self.product_id}: {self.narx} / {self.chegirma_narx} ({self.vaqt})"
 
     class Meta:
-        verbose_name = _("Mahsulot")
-        verbose_name_plural = _("Mahsulotlar")
+        verbose_name = _("Narx tarixi")
+        verbose_name_plural = _("Narx tarixi")
+        indexes = [
+            models.Index(fields=['product', 'vaqt'], name='price_history_idx'),
+        ]
 
 
 class Advertisement(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="ads")
     tavsif = models.TextField(_("Tavsif"))
     rasm = models.ImageField(_("Rasm"), upload_to="ads/", null=True, blank=True)
+    rasm_variants = models.JSONField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"Reklama: {self.product.nomi}"
@@ -261,6 +300,11 @@ class ProductReview(models.Model):
     class Meta:
         verbose_name = _("Mahsulot sharhi")
         verbose_name_plural = _("Mahsulot sharhlari")
+        indexes = [
+            models.Index(fields=['product', '-yaratilgan_vaqt', '-id'], name='review_product_recent_idx'),
+            models.Index(fields=['user', '-yaratilgan_vaqt'], name='review_user_recent_idx'),
+            models.Index(fields=['-yaratilgan_vaqt', '-id'], name='review_recent_idx'),
+        ]
 
 
 class ProductLike(models.Model):
@@ -276,4 +320,39 @@ class ProductLike(models.Model):
         verbose_name_plural = _("Mahsulot likelari")
 
     def __str__(self):
-        return f"{self.user} yoqtirdi: {self.product}"
\ No newline at end of file
+        return f"{self.user} yoqtirdi: {self.product}"
+
+
+class SearchDocument(models.Model):
+    """
+    Qidiruv indeksi uchun normallashtirilgan hujjat (mahsulot, do'kon yoki
+    kategoriya). Matn lotin yozuviga o'tkazilgan va tutuq belgilarsiz saqlanadi.
+    """
+    KIND_PRODUCT = 'product'
+    KIND_SHOP = 'shop'
+    KIND_CATEGORY = 'category'
+    KIND_CHOICES = [
+        (KIND_PRODUCT, _("Mahsulot")),
+        (KIND_SHOP, _("Do'kon")),
+        (KIND_CATEGORY, _("Kategoriya")),
+    ]
+
+    kind = models.CharField(_("Turi"), max_length=16, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField(_("Obyekt ID"))
+    title = models.TextField(_("Sarlavha"))
+    body = models.TextField(_("Matn"), blank=True)
+
+    # Filtrlar uchun (faqat mahsulotlarda to'ldiriladi)
+    shop_id = models.BigIntegerField(null=True, blank=True)
+    category_id = models.BigIntegerField(null=True, blank=True)
+    chegirma_bormi = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.kind}#{self.object_id}"
+
+    class Meta:
+        verbose_name = _("Qidiruv hujjati")
+        verbose_name_plural = _("Qidiruv hujjatlari")
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_document")
+        ]
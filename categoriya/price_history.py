@@ -0,0 +1,157 @@
+"""
+Narx tarixi: ``PriceHistory`` ga yozish, ``min_price_90d`` keshi va diapazon so'rovlari.
+
+Qator faqat ``narx`` yoki amaldagi chegirma narxi (``chegirma_bormi`` bo'lsa
+``chegirma_narx``, aks holda NULL) o'zgarganda qo'shiladi:
+
+* model saqlanishi -- ``signals`` (pre_save eski narxni eslaydi);
+* ``pricing.apply_item_changes`` va importer -- ``record`` (bitta ``bulk_create``);
+* ``pricing.apply_discount`` -- ``record_discount``: o'zgaradigan qatorlar
+  ``UPDATE`` dan oldin bitta ``INSERT ... SELECT`` bilan.
+
+``min_price_90d`` yozuv paytida ``LEAST`` bilan kamayadi; 90 kunlik oynadan
+chiqib ketgan narxlar uchun ``refresh_min_prices`` buyrug'i (kunlik) uni
+manbadan qayta hisoblaydi.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Case, Count, DecimalField, F, Max, Min, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Least, TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import PriceHistory, Product
+
+
+WINDOW = timedelta(days=90)
+BATCH_SIZE = 1000
+MAX_RAW_POINTS = 1000
+RESOLUTIONS = {
+    'raw': None,
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+PRICE_FIELD = DecimalField(max_digits=15, decimal_places=2)
+# Mahsulotning amaldagi narxi (SQL ifoda)
+EFFECTIVE_PRICE = Case(
+    When(chegirma_bormi=True, chegirma_narx__isnull=False, then=F('chegirma_narx')),
+    default=F('narx'), output_field=PRICE_FIELD,
+)
+# Tarix qatoridagi amaldagi narx
+HISTORY_PRICE = Coalesce(F('chegirma_narx'), F('narx'), output_field=PRICE_FIELD)
+
+
+def _decimal(value):
+    # Saqlanmagan instansiyada narx satr yoki int bo'lishi mumkin
+    return None if value is None else Decimal(str(value))
+
+
+def snapshot(narx, chegirma_narx, chegirma_bormi):
+    """Tarixda saqlanadigan ``(narx, chegirma_narx)`` juftligi"""
+    return _decimal(narx), (_decimal(chegirma_narx) if chegirma_bormi else None)
+
+
+def lower_min_price(price):
+    """``min_price_90d`` ni yangi narx bilan kamaytiruvchi UPDATE ifodasi"""
+    return Least(Coalesce(F('min_price_90d'), price), price)
+
+
+def effective_price(narx, chegirma_narx):
+    return narx if chegirma_narx is None else chegirma_narx
+
+
+def record(changes, at=None, update_min=True):
+    """
+    ``changes`` -- ``{product_id: (narx, chegirma_narx)}`` (yangi qiymatlar,
+    o'zgargani tekshirilgan). Tarix qatorlari va ``min_price_90d`` yoziladi;
+    ``update_min=False`` -- chaqiruvchi ``min_price_90d`` ni o'zi yozadi.
+    """
+    if not changes:
+        return
+    at = at or timezone.now()
+    PriceHistory.objects.bulk_create(
+        [PriceHistory(product_id=pk, narx=narx, chegirma_narx=chegirma_narx, vaqt=at)
+         for pk, (narx, chegirma_narx) in changes.items()],
+        batch_size=BATCH_SIZE,
+    )
+    if not update_min:
+        return
+    ids = list(changes)
+    for start in range(0, len(ids), BATCH_SIZE):
+        Product.objects.filter(pk__in=ids[start:start + BATCH_SIZE]).update(
+            min_price_90d=lower_min_price(EFFECTIVE_PRICE),
+        )
+
+
+def record_discount(queryset, new_discount, at=None):
+    """
+    ``apply_discount`` uchun: chegirma narxi ``new_discount`` (SQL ifoda yoki
+    None) ga o'zgaradigan qatorlar tarixini ``UPDATE`` dan oldin bitta
+    ``INSERT ... SELECT`` bilan yozadi. Qo'shilgan qatorlar soni qaytadi.
+    """
+    if new_discount is None:
+        changing = queryset.filter(chegirma_bormi=True, chegirma_narx__isnull=False)
+        new_discount = Value(None, output_field=PRICE_FIELD)
+    else:
+        changing = queryset.filter(
+            Q(chegirma_bormi=False) | Q(chegirma_narx__isnull=True) | ~Q(chegirma_narx=new_discount)
+        )
+    rows = changing.order_by().annotate(
+        history_discount=new_discount, history_at=Value(at or timezone.now()),
+    ).values_list('pk', 'narx', 'history_discount', 'history_at')
+    sql, params = rows.query.sql_with_params()
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(PriceHistory._meta.db_table)} (product_id, narx, chegirma_narx, vaqt) {sql}',
+            params,
+        )
+        return cursor.rowcount
+
+
+def refresh_min_prices(queryset, now=None):
+    """
+    ``min_price_90d`` ni manbadan qayta hisoblaydi: oyna ichidagi tarix
+    qatorlari, oyna boshida amalda bo'lgan narx va joriy narx ichidan eng pasti.
+    """
+    start = (now or timezone.now()) - WINDOW
+    history = PriceHistory.objects.filter(product=OuterRef('pk')).order_by()
+    in_window = (
+        history.filter(vaqt__gte=start).values('product')
+        .annotate(price=Min(HISTORY_PRICE)).values('price')
+    )
+    at_start = history.filter(vaqt__lt=start).order_by('-vaqt').values(price=HISTORY_PRICE)[:1]
+    return queryset.update(min_price_90d=Least(
+        EFFECTIVE_PRICE,
+        Coalesce(Subquery(in_window, output_field=PRICE_FIELD), EFFECTIVE_PRICE),
+        Coalesce(Subquery(at_start, output_field=PRICE_FIELD), EFFECTIVE_PRICE),
+    ))
+
+
+def price_at(product_id, moment):
+    """``moment`` da amalda bo'lgan ``{'narx', 'chegirma_narx', 'vaqt'}`` (yo'q bo'lsa None)"""
+    return (
+        PriceHistory.objects.filter(product_id=product_id, vaqt__lte=moment)
+        .order_by('-vaqt').values('narx', 'chegirma_narx', 'vaqt').first()
+    )
+
+
+def points(product_id, start, end, resolution='raw'):
+    """
+    ``[start, end]`` oralig'idagi o'zgarishlar. ``raw`` -- qatorlarning o'zi
+    (ko'pi bilan ``MAX_RAW_POINTS + 1``, chaqiruvchi tekshiradi), qolganlari --
+    har bir davr uchun bitta nuqta: amaldagi narxning min/max'i va o'zgarishlar soni.
+    """
+    rows = PriceHistory.objects.filter(product_id=product_id, vaqt__gte=start, vaqt__lte=end)
+    trunc = RESOLUTIONS[resolution]
+    if trunc is None:
+        return list(rows.order_by('vaqt').values('vaqt', 'narx', 'chegirma_narx')[:MAX_RAW_POINTS + 1])
+    return list(
+        rows.annotate(period=trunc('vaqt')).values('period')
+        .annotate(min_price=Min(HISTORY_PRICE), max_price=Max(HISTORY_PRICE), changes=Count('pk'))
+        .order_by('period')
+    )
@@ -0,0 +1,168 @@
+"""
+Narx va chegirmalarni ommaviy (set-based) o'zgartirish.
+
+* ``apply_item_changes`` -- ``[{id, narx, chegirma_narx, chegirma_bormi}, ...]``
+  ro'yxati: barcha mahsulotlar bitta SELECT bilan o'qiladi, egalik va narxlar
+  bir o'tishda tekshiriladi, o'zgargan qatorlar bitta tranzaksiyada
+  ``bulk_update`` (``UPDATE ... SET narx = CASE id WHEN ...``) bilan yoziladi.
+  Bitta xato bo'lsa ham hech narsa yozilmaydi.
+* ``apply_discount`` -- qoida bo'yicha (masalan do'konning X kategoriyasidagi
+  barcha mahsulotlarga 20% chegirma) bitta ``UPDATE ... WHERE`` bilan,
+  mahsulotlar Python'ga o'qilmaydi.
+
+Ikkala yo'l ham signal chaqirmaydi: javob keshi, qidiruv hujjatlaridagi
+``chegirma_bormi``, narx tarixi va ``yangilangan_vaqt`` shu yerda yangilanadi.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Now, Round
+from django.utils import timezone
+
+from core import response_cache
+from . import price_history, search
+from .models import Product
+
+
+PRICE_FIELDS = ('narx', 'chegirma_narx', 'chegirma_bormi')
+MAX_ITEMS = 1000
+BATCH_SIZE = 500
+
+
+class PriceChangeError(ValueError):
+    """``errors`` -- ``{mahsulot_id: {maydon: xabar}}``"""
+
+    def __init__(self, errors):
+        super().__init__("Narxlarni o'zgartirib bo'lmadi")
+        self.errors = errors
+
+
+def price_errors(narx, chegirma_narx, chegirma_bormi):
+    """Yakuniy narx qiymatlari uchun xatolar lug'ati (bo'sh bo'lsa to'g'ri)"""
+    errors = {}
+    if chegirma_bormi:
+        if chegirma_narx is None:
+            errors['chegirma_narx'] = "Chegirma mavjud bo'lsa chegirma narxi majburiy"
+        elif chegirma_narx >= narx:
+            errors['chegirma_narx'] = "Chegirma narxi asosiy narxdan kichik bo'lishi kerak"
+    return errors
+
+
+def can_manage(user, shop_owner_id):
+    return user.is_staff or shop_owner_id == user.pk
+
+
+def after_price_change(products):
+    """
+    Signalsiz narx yozuvlaridan keyingi umumiy ishlar. ``products`` -- id'lar
+    ro'yxati yoki ``values('pk')`` subquery'si.
+    """
+    search.sync_product_flags(products)
+    response_cache.bump(Product)
+
+
+def apply_item_changes(user, items):
+    """
+    ``items`` -- tekshirilgan lug'atlar (``id`` va ``PRICE_FIELDS`` dan
+    ixtiyoriy to'plami). ``{'matched', 'updated', 'unchanged'}`` qaytaradi.
+    """
+    changes = {item['id']: item for item in items}
+    products = {
+        product.pk: product for product in
+        Product.objects.filter(pk__in=changes)
+        .only('pk', 'discount_campaign_id', 'min_price_90d', *PRICE_FIELDS)
+        .annotate(owner_id=F('shop__foydalanuvchi_id'))
+    }
+    errors = {}
+    changed = []
+    fields = set()
+    history = {}
+    for pk, item in changes.items():
+        product = products.get(pk)
+        if product is None:
+            errors[pk] = {'id': "Mahsulot topilmadi"}
+            continue
+        if not can_manage(user, product.owner_id):
+            errors[pk] = {'id': "Faqat do'kon egasi narxni o'zgartira oladi"}
+            continue
+        new = {field: item.get(field, getattr(product, field)) for field in PRICE_FIELDS}
+        if 'chegirma_narx' in item and 'chegirma_bormi' not in item:
+            new['chegirma_bormi'] = new['chegirma_narx'] is not None
+        if not new['chegirma_bormi'] and 'chegirma_narx' not in item:
+            new['chegirma_narx'] = None
+        item_errors = price_errors(**new)
+        if item_errors:
+            errors[pk] = item_errors
+            continue
+        diff = {field: value for field, value in new.items() if getattr(product, field) != value}
+        if diff.keys() - {'narx'} and product.discount_campaign_id is not None:
+            # Qo'lda qo'yilgan chegirma kampaniyadan ajraladi
+            diff['discount_campaign'] = None
+        if diff:
+            old_prices = price_history.snapshot(product.narx, product.chegirma_narx, product.chegirma_bormi)
+            new_prices = price_history.snapshot(new['narx'], new['chegirma_narx'], new['chegirma_bormi'])
+            if new_prices != old_prices:
+                history[pk] = new_prices
+                price = price_history.effective_price(*new_prices)
+                if product.min_price_90d is None or price < product.min_price_90d:
+                    diff['min_price_90d'] = price
+            for field, value in diff.items():
+                setattr(product, field, value)
+            fields.update(diff)
+            changed.append(product)
+    if errors:
+        raise PriceChangeError(errors)
+
+    if changed:
+        now = timezone.now()
+        for product in changed:
+            product.yangilangan_vaqt = now
+        with transaction.atomic():
+            # Faqat haqiqatan o'zgargan ustunlar: har bir ustun -- alohida CASE ifodasi
+            update_fields = [field for field in (*PRICE_FIELDS, 'discount_campaign', 'min_price_90d') if field in fields]
+            update_fields.append('yangilangan_vaqt')
+            Product.objects.bulk_update(changed, update_fields, batch_size=BATCH_SIZE)
+            price_history.record(history, at=now, update_min=False)
+            after_price_change([product.pk for product in changed])
+    return {'matched': len(products), 'updated': len(changed), 'unchanged': len(products) - len(changed)}
+
+
+def discounted_price(percent):
+    """``narx`` dan ``percent`` foiz chegirma qilingan narx (SQL ifoda)"""
+    factor = (Decimal(100) - Decimal(percent)) / Decimal(100)
+    return Round(
+        ExpressionWrapper(F('narx') * Value(factor), output_field=DecimalField(max_digits=15, decimal_places=2)),
+        2,
+    )
+
+
+def apply_discount(queryset, percent, scope=None, **extra):
+    """
+    ``queryset`` dagi barcha mahsulotlarga ``percent`` foiz chegirma beradi;
+    ``percent`` None bo'lsa chegirma olib tashlanadi. ``extra`` -- birga
+    yoziladigan maydonlar (masalan ``discount_campaign``). Qiymati allaqachon
+    shunday bo'lgan qatorlarga tegilmaydi. O'zgargan qatorlar soni qaytadi.
+
+    ``scope`` -- qidiruv hujjatlari sinxronlanadigan mahsulotlar; ``queryset``
+    filtri yozilayotgan maydonlarga bog'liq bo'lsa (yozuvdan keyin qatorlar
+    unga tushmay qoladi) kerak. Standart: ``queryset``.
+    """
+    if percent is None:
+        price = None
+        # Chegirma olib tashlanganda amaldagi narx oshadi: min_price_90d o'zgarmaydi
+        values = {'chegirma_narx': None, 'chegirma_bormi': False}
+        stale = Q(chegirma_bormi=True) | Q(chegirma_narx__isnull=False)
+    else:
+        price = discounted_price(percent)
+        values = {'chegirma_narx': price, 'chegirma_bormi': True, 'min_price_90d': price_history.lower_min_price(price)}
+        stale = Q(chegirma_bormi=False) | Q(chegirma_narx__isnull=True) | ~Q(chegirma_narx=price)
+    for field, value in extra.items():
+        stale |= ~Q(**{field: value})
+    with transaction.atomic():
+        # Tarix eski qiymatlardan o'qiladi: UPDATE dan oldin
+        price_history.record_discount(queryset, price)
+        updated = queryset.filter(stale).update(**values, **extra, yangilangan_vaqt=Now())
+        if updated:
+            after_price_change((queryset if scope is None else scope).values('pk'))
+    return updated
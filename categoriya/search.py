@@ -0,0 +1,323 @@
+"""
+Mahsulot, do'kon va kategoriyalar bo'yicha to'liq matnli qidiruv.
+
+Matn indeksga yozilishidan oldin ``normalize()`` dan o'tadi: kirill yozuvi
+o'zbek lotin yozuviga o'giriladi, o'/oʻ/o‘ kabi tutuq belgilarining barcha
+variantlari olib tashlanadi. Shu sababli "телефон", "telefon", "o'zbek" va
+"ўзбек" bir xil tokenlarga aylanadi.
+
+Hujjatlar ``SearchDocument`` jadvalida saqlanadi va signallar orqali yozish
+paytida yangilanadi. Qidiruvning o'zi ``SEARCH_BACKEND`` sozlamasidagi backend
+orqali bajariladi:
+
+* ``SQLiteFTSBackend`` -- SQLite FTS5 inverted indeksi, bm25 bo'yicha reyting;
+* ``DatabaseSearchBackend`` -- istalgan DB uchun zaxira (LIKE + oddiy reyting).
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.utils.module_loading import import_string
+
+from .models import Category, Product, SearchDocument, Shop
+
+
+APOSTROPHES = "'`´ʻʼ‘’ʹ′"
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': "g'", 'д': 'd', 'ж': 'j',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'қ': 'q', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ў': "o'", 'ф': 'f', 'х': 'x', 'ҳ': 'h', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh',
+    'ъ': "'", 'ь': '', 'ы': 'i', 'э': 'e', 'ё': 'yo', 'ю': 'yu', 'я': 'ya',
+}
+VOWELS = set('aeiouаеёиоуўэюя')
+TOKEN_RE = re.compile(r'\w+')
+
+
+def transliterate(text):
+    """Kirill yozuvini o'zbek lotin yozuviga o'giradi"""
+    result = []
+    previous = ''
+    for char in text:
+        if char == 'е':
+            # So'z boshida va unlidan keyin "ye": ер -> yer, поезд -> poyezd
+            result.append('ye' if not previous.isalpha() or previous in VOWELS else 'e')
+        elif char == 'ц':
+            result.append('ts' if previous in VOWELS else 's')
+        else:
+            result.append(CYRILLIC_TO_LATIN.get(char, char))
+        previous = char
+    return ''.join(result)
+
+
+def normalize(text):
+    """Indeks va so'rov uchun yagona ko'rinishga keltiradi"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    text = transliterate(text)
+    for char in APOSTROPHES:
+        text = text.replace(char, '')
+    return ' '.join(TOKEN_RE.findall(text))
+
+
+def tokenize(text):
+    return normalize(text).split()
+
+
+# --- Hujjatlar ---------------------------------------------------------------
+
+def document_fields(instance):
+    """Model obyektidan ``SearchDocument`` maydonlarini tayyorlaydi"""
+    if isinstance(instance, Product):
+        return {
+            'kind': SearchDocument.KIND_PRODUCT,
+            'title': normalize(instance.nomi),
+            'body': normalize(instance.tavsif),
+            'shop_id': instance.shop_id,
+            'category_id': instance.category_id,
+            'chegirma_bormi': instance.chegirma_bormi,
+        }
+    if isinstance(instance, Shop):
+        return {
+            'kind': SearchDocument.KIND_SHOP,
+            'title': normalize(f'{instance.kompaniya_nomi} {instance.brend_nomi}'),
+            'body': normalize(instance.bizness_manzili),
+        }
+    if isinstance(instance, Category):
+        return {
+            'kind': SearchDocument.KIND_CATEGORY,
+            'title': normalize(instance.nomi),
+            'body': normalize(instance.tavsif),
+        }
+    raise TypeError(f"{type(instance).__name__} qidiruvda indekslanmaydi")
+
+
+def index_instance(instance):
+    fields = document_fields(instance)
+    document, created = SearchDocument.objects.update_or_create(
+        kind=fields.pop('kind'), object_id=instance.pk, defaults=fields,
+    )
+    get_backend().index([document], new=created)
+
+
+def index_instances(instances):
+    """
+    ``index_instance`` ning ko'p obyekt uchun varianti: ``bulk_create`` /
+    ``bulk_update`` signal chaqirmaydi, shuning uchun bulk yozuvlardan keyin.
+    Eski hujjatlar o'chirilib, yangilari bitta ``bulk_create`` bilan yoziladi
+    (``bulk_update`` ning CASE WHEN so'rovi katta to'plamlarda sekin).
+    """
+    documents = []
+    for instance in instances:
+        fields = document_fields(instance)
+        documents.append(SearchDocument(object_id=instance.pk, **fields))
+    if not documents:
+        return
+    backend = get_backend()
+    with transaction.atomic():
+        old = SearchDocument.objects.none()
+        for kind in {document.kind for document in documents}:
+            ids = [document.object_id for document in documents if document.kind == kind]
+            old |= SearchDocument.objects.filter(kind=kind, object_id__in=ids)
+        old_ids = list(old.values_list('pk', flat=True))
+        if old_ids:
+            backend.remove(old_ids)
+            SearchDocument.objects.filter(pk__in=old_ids)._raw_delete(SearchDocument.objects.db)
+        backend.index(SearchDocument.objects.bulk_create(documents), new=True)
+
+
+def sync_product_flags(products):
+    """
+    Mahsulot hujjatlaridagi ``chegirma_bormi`` filtr ustunini bitta
+    ``UPDATE ... SET = (SELECT ...)`` bilan manba jadvaldan yangilaydi (matn
+    o'zgarmagan bulk narx yozuvlaridan keyin). ``products`` -- id'lar yoki
+    ``values('pk')`` subquery'si.
+    """
+    SearchDocument.objects.filter(kind=SearchDocument.KIND_PRODUCT, object_id__in=products).update(
+        chegirma_bormi=Subquery(Product.objects.filter(pk=OuterRef('object_id')).values('chegirma_bormi')[:1]),
+    )
+
+
+def remove_instance(instance):
+    kind = document_fields(instance)['kind']
+    ids = list(SearchDocument.objects.filter(kind=kind, object_id=instance.pk).values_list('pk', flat=True))
+    if ids:
+        get_backend().remove(ids)
+        SearchDocument.objects.filter(pk__in=ids).delete()
+
+
+INDEXED_MODELS = {
+    SearchDocument.KIND_PRODUCT: Product,
+    SearchDocument.KIND_SHOP: Shop,
+    SearchDocument.KIND_CATEGORY: Category,
+}
+
+
+def clear_index():
+    get_backend().clear()
+    SearchDocument.objects.all()._raw_delete(SearchDocument.objects.db)
+
+
+def rebuild_index(kinds=None, batch_size=2000):
+    """Indeksni manba jadvallardan to'liq qayta quradi; yozilgan hujjatlar sonini qaytaradi"""
+    kinds = kinds or list(INDEXED_MODELS)
+    backend = get_backend()
+    total = 0
+    if set(kinds) == set(INDEXED_MODELS):
+        # To'liq qayta qurishda indeksni bir yo'la tozalash ancha tez
+        clear_index()
+    for kind in kinds:
+        model = INDEXED_MODELS[kind]
+        old_ids = list(SearchDocument.objects.filter(kind=kind).values_list('pk', flat=True))
+        with transaction.atomic():
+            for start in range(0, len(old_ids), batch_size):
+                backend.remove(old_ids[start:start + batch_size])
+            SearchDocument.objects.filter(kind=kind)._raw_delete(SearchDocument.objects.db)
+
+        batch = []
+        for instance in model._default_manager.order_by('pk').iterator(chunk_size=batch_size):
+            fields = document_fields(instance)
+            batch.append(SearchDocument(object_id=instance.pk, **fields))
+            if len(batch) >= batch_size:
+                total += _index_batch(backend, batch)
+                batch = []
+        if batch:
+            total += _index_batch(backend, batch)
+    return total
+
+
+def _index_batch(backend, documents):
+    # Bitta tranzaksiya: aks holda har bir INSERT alohida commit (fsync) bo'ladi
+    with transaction.atomic():
+        backend.index(SearchDocument.objects.bulk_create(documents), new=True)
+    return len(documents)
+
+
+# --- Backendlar --------------------------------------------------------------
+
+FILTER_COLUMNS = ('shop_id', 'category_id', 'chegirma_bormi')
+
+
+class BaseSearchBackend:
+    def index(self, documents, new=False):
+        """
+        Hujjatlarni indeksga yozadi. ``new=False`` bo'lsa eski yozuvlar
+        almashtiriladi, ``new=True`` -- hujjatlar indeksda hali yo'q.
+        """
+
+    def remove(self, document_ids):
+        """Hujjatlarni indeksdan o'chiradi"""
+
+    def clear(self):
+        """Indeksni butunlay tozalaydi"""
+
+    def search(self, query, kinds=None, filters=None, limit=20, offset=0):
+        """``[(document_id, score), ...]`` ni reyting bo'yicha qaytaradi"""
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Alohida indekssiz zaxira backend: normallashtirilgan matn ustida LIKE"""
+
+    def search(self, query, kinds=None, filters=None, limit=20, offset=0):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        queryset = SearchDocument.objects.all()
+        if kinds:
+            queryset = queryset.filter(kind__in=kinds)
+        for column, value in (filters or {}).items():
+            queryset = queryset.filter(**{column: value})
+        score = Value(0)
+        for token in tokens:
+            queryset = queryset.filter(Q(title__contains=token) | Q(body__contains=token))
+            score = score + Case(
+                When(title__startswith=token, then=Value(4)),
+                When(title__contains=token, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        queryset = queryset.annotate(score=score).order_by('-score', 'pk')
+        return list(queryset.values_list('pk', 'score')[offset:offset + limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """SQLite FTS5 inverted indeksi (jadval 0005 migratsiyasida yaratiladi)"""
+    table = 'categoriya_search_fts'
+    title_weight = 10.0
+    body_weight = 1.0
+
+    def index(self, documents, new=False):
+        rows = [(doc.pk, doc.title, doc.body) for doc in documents]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            if not new:
+                cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(f'INSERT INTO {self.table}(rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+    def remove(self, document_ids):
+        if not document_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in document_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def match_expression(self, tokens):
+        # Har bir token prefiks bo'yicha, hammasi AND bilan
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search(self, query, kinds=None, filters=None, limit=20, offset=0):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        document_table = SearchDocument._meta.db_table
+        where = [f'{self.table} MATCH %s']
+        params = [self.match_expression(tokens)]
+        if kinds:
+            where.append(f"d.kind IN ({', '.join(['%s'] * len(kinds))})")
+            params.extend(kinds)
+        for column, value in (filters or {}).items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(column)
+            where.append(f'd.{column} = %s')
+            params.append(value)
+        sql = (
+            f'SELECT d.id, -bm25({self.table}, %s, %s) AS score '
+            f'FROM {self.table} JOIN {document_table} d ON d.id = {self.table}.rowid '
+            f"WHERE {' AND '.join(where)} "
+            f'ORDER BY score DESC, d.id LIMIT %s OFFSET %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.title_weight, self.body_weight, *params, limit, offset])
+            return cursor.fetchall()
+
+
+def get_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path is None:
+        path = (
+            'categoriya.search.SQLiteFTSBackend' if connection.vendor == 'sqlite'
+            else 'categoriya.search.DatabaseSearchBackend'
+        )
+    return import_string(path)()
+
+
+def search(query, kinds=None, filters=None, limit=20, offset=0):
+    """
+    Qidiradi va ``[(kind, object_id, score), ...]`` qaytaradi.
+    """
+    hits = get_backend().search(query, kinds=kinds, filters=filters, limit=limit, offset=offset)
+    scores = dict(hits)
+    documents = SearchDocument.objects.in_bulk([pk for pk, _ in hits])
+    return [
+        (documents[pk].kind, documents[pk].object_id, scores[pk])
+        for pk, _ in hits if pk in documents
+    ]
@@ -1,17 +1,23 @@
+from decimal import Decimal
+
+from django.db.models import Count
+from django.utils import timezone
 from rest_framework import serializers
+
+from core.eager_loading import AggregateField, PageBatchField
+from core.images import ImageVariantsField
+from user.serializers import UserInfoSerializer, ShopOwnerSerializer, ReviewAuthorSerializer
+from . import price_history, pricing, viewer
 from .models import Category, SubCategory, Shop, Product, Advertisement, ProductReview, ProductLike
 
 
 class CategorySerializer(serializers.ModelSerializer):
     """Kategoriya serializer"""
-    subcategories_count = serializers.SerializerMethodField()
+    subcategories_count = AggregateField(Count('subcategories'))
     
     class Meta:
         model = Category
         fields = ['id', 'nomi', 'tavsif', 'subcategories_count']
-        
-    def get_subcategories_count(self, obj):
-        return obj.subcategories.count()
 
 
 class SubCategorySerializer(serializers.ModelSerializer):
@@ -25,66 +31,49 @@ class SubCategorySerializer(serializers.ModelSerializer):
 
 class ShopSerializer(serializers.ModelSerializer):
     """Do'kon serializer"""
-    foydalanuvchi_info = serializers.SerializerMethodField()
-    products_count = serializers.SerializerMethodField()
+    foydalanuvchi_info = ShopOwnerSerializer(source='foydalanuvchi', read_only=True)
+    products_count = AggregateField(Count('products'))
+    images = ImageVariantsField('brend_logotipi')
     
     class Meta:
         model = Shop
         fields = [
             'id', 'foydalanuvchi', 'foydalanuvchi_info', 'kompaniya_nomi', 
             'brend_nomi', 'inn_stir', 'yuridik_sertifikat', 'direktor_ismi',
-            'telefon_raqam_email', 'bizness_manzili', 'brend_logotipi',
+            'telefon_raqam_email', 'bizness_manzili', 'brend_logotipi', 'images',
             'jismoniy_tarmoqlar', 'pasport_seriyasi', 'tugilgan_kun',
             'latitude', 'longitude', 'location', 'muddati',
-            'yaratilgan_vaqt', 'products_count'
+            'yaratilgan_vaqt', 'yangilangan_vaqt', 'products_count'
         ]
-        read_only_fields = ['yaratilgan_vaqt']
-        
-    def get_foydalanuvchi_info(self, obj):
-        return {
-            'id': obj.foydalanuvchi.id,
-            'ism': obj.foydalanuvchi.ism,
-            'familiya': obj.foydalanuvchi.familiya,
-            'telefon': obj.foydalanuvchi.telefon
-        }
-        
-    def get_products_count(self, obj):
-        return obj.products.count()
+        read_only_fields = ['yaratilgan_vaqt', 'yangilangan_vaqt']
+
+
+class NearbyShopSerializer(ShopSerializer):
+    """Yaqin do'kon: so'ralgan nuqtagacha masofa bilan"""
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta(ShopSerializer.Meta):
+        fields = ShopSerializer.Meta.fields + ['distance_km']
 
 
 class ProductLikeSerializer(serializers.ModelSerializer):
     """Mahsulot like serializer"""
-    user_info = serializers.SerializerMethodField()
+    user_info = UserInfoSerializer(source='user', read_only=True)
     
     class Meta:
         model = ProductLike
         fields = ['id', 'product', 'user', 'user_info', 'yaratilgan_vaqt']
         read_only_fields = ['yaratilgan_vaqt']
-        
-    def get_user_info(self, obj):
-        return {
-            'id': obj.user.id,
-            'ism': obj.user.ism,
-            'familiya': obj.user.familiya
-        }
 
 
 class ProductReviewSerializer(serializers.ModelSerializer):
     """Mahsulot sharh serializer"""
-    user_info = serializers.SerializerMethodField()
+    user_info = ReviewAuthorSerializer(source='user', read_only=True)
     
     class Meta:
         model = ProductReview
         fields = ['id', 'product', 'user', 'user_info', 'tavsif', 'yulduz', 'yaratilgan_vaqt']
         read_only_fields = ['yaratilgan_vaqt']
-        
-    def get_user_info(self, obj):
-        return {
-            'id': obj.user.id,
-            'ism': obj.user.ism,
-            'familiya': obj.user.familiya,
-            'rasm': obj.user.rasm.url if obj.user.rasm else None
-        }
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -92,48 +81,183 @@ class ProductSerializer(serializers.ModelSerializer):
     shop_name = serializers.CharField(source='shop.kompaniya_nomi', read_only=True)
     category_name = serializers.CharField(source='category.nomi', read_only=True)
     subcategory_name = serializers.CharField(source='subcategory.nomi', read_only=True)
-    reviews_count = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    average_rating = serializers.SerializerMethodField()
+    reviews_count = serializers.IntegerField(read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
+    images = ImageVariantsField('rasm')
+    # Joriy foydalanuvchi uchun (anonim bo'lsa null); sahifaga ikkita so'rov
+    is_liked = PageBatchField(viewer.is_liked_map)
+    my_rating = PageBatchField(viewer.my_rating_map)
     
     class Meta:
         model = Product
         fields = [
             'id', 'shop', 'shop_name', 'category', 'category_name',
-            'subcategory', 'subcategory_name', 'nomi', 'tavsif', 'rasm',
-            'narx', 'chegirma_narx', 'chegirma_bormi',
+            'subcategory', 'subcategory_name', 'nomi', 'sku', 'tavsif', 'rasm', 'images',
+            'narx', 'chegirma_narx', 'chegirma_bormi', 'discount_campaign', 'min_price_90d',
             'yaratilgan_vaqt', 'yangilangan_vaqt',
-            'reviews_count', 'likes_count', 'average_rating'
+            'reviews_count', 'likes_count', 'average_rating',
+            'is_liked', 'my_rating',
         ]
-        read_only_fields = ['yaratilgan_vaqt', 'yangilangan_vaqt']
-        
-    def get_reviews_count(self, obj):
-        return obj.reviews.count()
-        
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-        
-    def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews.exists():
-            from django.db.models import Avg
-            return reviews.aggregate(Avg('yulduz'))['yulduz__avg']
-        return None
+        read_only_fields = ['discount_campaign', 'min_price_90d', 'yaratilgan_vaqt', 'yangilangan_vaqt']
+
+    @classmethod
+    def viewer_etag(cls, request, pks):
+        return viewer.etag_part(request, pks)
+
+    def validate_sku(self, value):
+        # Bo'sh SKU NULL saqlanadi: unikallik faqat to'ldirilganlariga tegishli
+        return value or None
+
+    def update(self, instance, validated_data):
+        if validated_data.keys() & {'chegirma_narx', 'chegirma_bormi'}:
+            # Qo'lda qo'yilgan chegirma kampaniyadan ajraladi
+            validated_data['discount_campaign'] = None
+        return super().update(instance, validated_data)
+
+
+class NearbyProductSerializer(ProductSerializer):
+    """Yaqin chegirma: mahsulot do'konigacha masofa bilan"""
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['distance_km']
 
 
 class ProductDetailSerializer(ProductSerializer):
     """Mahsulot detali serializer"""
     reviews = ProductReviewSerializer(many=True, read_only=True)
     likes = ProductLikeSerializer(many=True, read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     
     class Meta(ProductSerializer.Meta):
-        fields = ProductSerializer.Meta.fields + ['reviews', 'likes']
+        fields = ProductSerializer.Meta.fields + ['rating_histogram', 'reviews', 'likes']
+
+
+class ProductAdSerializer(serializers.ModelSerializer):
+    """Mahsulot ichidagi reklama (mahsulot ma'lumotisiz)"""
+    images = ImageVariantsField('rasm')
+
+    class Meta:
+        model = Advertisement
+        fields = ['id', 'tavsif', 'rasm', 'images']
+
+
+class ProductFullSerializer(ProductDetailSerializer):
+    """Async mahsulot detali: sharhlar, likelar va reklamalar bilan"""
+    ads = ProductAdSerializer(many=True, read_only=True)
+
+    class Meta(ProductDetailSerializer.Meta):
+        fields = ProductDetailSerializer.Meta.fields + ['ads']
+
+
+class SubCategoryBriefSerializer(serializers.ModelSerializer):
+    """Kategoriya ichidagi subkategoriya"""
+    products_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = SubCategory
+        fields = ['id', 'nomi', 'tavsif', 'products_count']
+
+
+class CategoryTreeSerializer(serializers.ModelSerializer):
+    """
+    Kategoriya va uning subkategoriyalari. Sonlar va subkategoriyalar
+    ``tree.build_tree`` da oldindan biriktiriladi.
+    """
+    subcategories_count = serializers.IntegerField(read_only=True)
+    products_count = serializers.IntegerField(read_only=True)
+    subcategories = SubCategoryBriefSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Category
+        fields = ['id', 'nomi', 'tavsif', 'subcategories_count', 'products_count', 'subcategories']
 
 
 class AdvertisementSerializer(serializers.ModelSerializer):
     """Reklama serializer"""
     product_name = serializers.CharField(source='product.nomi', read_only=True)
+    images = ImageVariantsField('rasm')
     
     class Meta:
         model = Advertisement
-        fields = ['id', 'product', 'product_name', 'tavsif', 'rasm']
+        fields = ['id', 'product', 'product_name', 'tavsif', 'rasm', 'images']
+
+
+class PriceChangeSerializer(serializers.Serializer):
+    """Bitta mahsulot narxining o'zgarishi (berilmagan maydonlar o'zgarmaydi)"""
+    id = serializers.IntegerField()
+    narx = serializers.DecimalField(max_digits=15, decimal_places=2, min_value=0, required=False)
+    chegirma_narx = serializers.DecimalField(max_digits=15, decimal_places=2, min_value=0, required=False, allow_null=True)
+    chegirma_bormi = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        if len(attrs) == 1:
+            raise serializers.ValidationError("Kamida bitta narx maydoni berilishi kerak")
+        return attrs
+
+
+class DiscountRuleSerializer(serializers.Serializer):
+    """Do'kon (ixtiyoriy kategoriya/subkategoriya) mahsulotlariga foizli chegirma"""
+    shop = serializers.PrimaryKeyRelatedField(queryset=Shop.objects.all())
+    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=False)
+    subcategory = serializers.PrimaryKeyRelatedField(queryset=SubCategory.objects.all(), required=False)
+    discount_percent = serializers.DecimalField(
+        max_digits=4, decimal_places=2, min_value=Decimal('0.01'), max_value=Decimal('99.99'), allow_null=True,
+        help_text="null bo'lsa chegirma olib tashlanadi",
+    )
+
+    def validate(self, attrs):
+        category, subcategory = attrs.get('category'), attrs.get('subcategory')
+        if category and subcategory and subcategory.category_id != category.pk:
+            raise serializers.ValidationError({'subcategory': "Subkategoriya boshqa kategoriyaga tegishli"})
+        return attrs
+
+
+class BulkPriceUpdateSerializer(serializers.Serializer):
+    items = PriceChangeSerializer(many=True, required=False, max_length=pricing.MAX_ITEMS)
+    rule = DiscountRuleSerializer(required=False)
+
+    def validate_items(self, items):
+        ids = [item['id'] for item in items]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Mahsulot id'lari takrorlanmasligi kerak")
+        return items
+
+    def validate(self, attrs):
+        if ('items' in attrs) == ('rule' in attrs):
+            raise serializers.ValidationError("items yoki rule dan faqat bittasi berilishi kerak")
+        return attrs
+
+
+class PriceHistoryQuerySerializer(serializers.Serializer):
+    """``?from=&to=&resolution=``; standart -- oxirgi 90 kun, har bir o'zgarish alohida"""
+    to = serializers.DateTimeField(required=False)
+    resolution = serializers.ChoiceField(choices=list(price_history.RESOLUTIONS), default='raw')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # "from" Python kalit so'zi: klass atributi sifatida e'lon qilib bo'lmaydi
+        fields['from'] = serializers.DateTimeField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        end = attrs.get('to') or timezone.now()
+        start = attrs.get('from') or end - price_history.WINDOW
+        if start > end:
+            raise serializers.ValidationError({'from': "from to dan katta bo'lmasligi kerak"})
+        return {'start': start, 'end': end, 'resolution': attrs['resolution']}
+
+
+class PricePointSerializer(serializers.Serializer):
+    vaqt = serializers.DateTimeField()
+    narx = serializers.DecimalField(max_digits=15, decimal_places=2)
+    chegirma_narx = serializers.DecimalField(max_digits=15, decimal_places=2, allow_null=True)
+
+
+class PricePeriodSerializer(serializers.Serializer):
+    """Davr (soat/kun/hafta/oy) bo'yicha amaldagi narxning min/max'i"""
+    period = serializers.DateTimeField()
+    min_price = serializers.DecimalField(max_digits=15, decimal_places=2)
+    max_price = serializers.DecimalField(max_digits=15, decimal_places=2)
+    changes = serializers.IntegerField()
@@ -0,0 +1,243 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import images, response_cache
+from . import campaigns, price_history, search, tree
+from .models import Advertisement, Category, DiscountCampaign, Product, ProductLike, ProductReview, Shop, SubCategory
+from .stats import adjust_product_stats
+
+
+@receiver(pre_save, sender=ProductReview)
+def remember_review_state(sender, instance, raw=False, **kwargs):
+    """Tahrirlashdan oldingi mahsulot va bahoni eslab qoladi"""
+    instance._stats_old = None
+    if raw or instance.pk is None:
+        return
+    instance._stats_old = (
+        ProductReview.objects.filter(pk=instance.pk)
+        .values_list('product_id', 'yulduz')
+        .first()
+    )
+
+
+@receiver(post_save, sender=ProductReview)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_stats_old', None)
+    new = (instance.product_id, instance.yulduz)
+    if created or old is None:
+        adjust_product_stats(instance.product_id, reviews=1, stars={instance.yulduz: 1})
+    elif old == new:
+        # Faqat matn o'zgardi: mahsulot detalidagi sharhlar ham o'zgaradi
+        adjust_product_stats(instance.product_id)
+    else:
+        old_product_id, old_yulduz = old
+        if old_product_id == instance.product_id:
+            adjust_product_stats(instance.product_id, stars={old_yulduz: -1, instance.yulduz: 1})
+        else:
+            adjust_product_stats(old_product_id, reviews=-1, stars={old_yulduz: -1})
+            adjust_product_stats(instance.product_id, reviews=1, stars={instance.yulduz: 1})
+    instance._stats_old = new
+
+
+@receiver(post_delete, sender=ProductReview)
+def review_deleted(sender, instance, **kwargs):
+    adjust_product_stats(instance.product_id, reviews=-1, stars={instance.yulduz: -1})
+
+
+@receiver(pre_save, sender=ProductLike)
+def remember_like_state(sender, instance, raw=False, **kwargs):
+    instance._stats_old = None
+    if raw or instance.pk is None:
+        return
+    instance._stats_old = (
+        ProductLike.objects.filter(pk=instance.pk)
+        .values_list('product_id', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=ProductLike)
+def like_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_product_id = getattr(instance, '_stats_old', None)
+    if created or old_product_id is None:
+        adjust_product_stats(instance.product_id, likes=1)
+    elif old_product_id != instance.product_id:
+        adjust_product_stats(old_product_id, likes=-1)
+        adjust_product_stats(instance.product_id, likes=1)
+    instance._stats_old = instance.product_id
+
+
+@receiver(post_delete, sender=ProductLike)
+def like_deleted(sender, instance, **kwargs):
+    adjust_product_stats(instance.product_id, likes=-1)
+
+
+PRICE_FIELDS = {'narx', 'chegirma_narx', 'chegirma_bormi'}
+
+
+def _price_snapshot(product):
+    return price_history.snapshot(product.narx, product.chegirma_narx, product.chegirma_bormi)
+
+
+@receiver(pre_save, sender=Product)
+def remember_price(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._price_old = None
+    if raw or instance.pk is None or (update_fields is not None and not PRICE_FIELDS & set(update_fields)):
+        return
+    old = Product.objects.filter(pk=instance.pk).values_list('narx', 'chegirma_narx', 'chegirma_bormi').first()
+    instance._price_old = old and price_history.snapshot(*old)
+
+
+@receiver(post_save, sender=Product)
+def record_price_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if not created and (update_fields is not None and not PRICE_FIELDS & set(update_fields)):
+        return
+    new = _price_snapshot(instance)
+    if created or getattr(instance, '_price_old', None) != new:
+        price_history.record({instance.pk: new})
+    instance._price_old = new
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Shop)
+@receiver(post_save, sender=Category)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_instance(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Shop)
+@receiver(post_delete, sender=Category)
+def delete_search_document(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+def invalidate_response_cache(sender, **kwargs):
+    """Model o'zgarganda faqat shu modelga bog'liq javob keshlarini eskirtiradi"""
+    response_cache.bump(sender)
+
+
+for model in (Category, SubCategory, Shop, Product, Advertisement, ProductReview, ProductLike):
+    post_save.connect(invalidate_response_cache, sender=model, dispatch_uid=f'response_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_response_cache, sender=model, dispatch_uid=f'response_cache_delete_{model.__name__}')
+
+
+def bump_category_tree(sender, **kwargs):
+    """Daraxtdagi kategoriyalar yoki mahsulotlar soni o'zgarishi mumkin"""
+    if not kwargs.get('raw'):
+        tree.TREE.bump()
+
+
+for model in (Category, SubCategory, Product):
+    post_save.connect(bump_category_tree, sender=model, dispatch_uid=f'category_tree_save_{model.__name__}')
+    post_delete.connect(bump_category_tree, sender=model, dispatch_uid=f'category_tree_delete_{model.__name__}')
+
+
+images.register(Shop, 'brend_logotipi')
+images.register(Product, 'rasm')
+images.register(Advertisement, 'rasm')
+
+
+def touch(model, *pks):
+    """
+    Ota obyektning ``yangilangan_vaqt`` ini yangilaydi: uning javobida bola
+    obyektlardan hisoblangan qiymatlar (masalan ``products_count``) bor.
+    """
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        model.objects.filter(pk__in=pks).update(yangilangan_vaqt=Now())
+        response_cache.bump(model)
+
+
+# Bola model -> ota (ota serializerida bolalar soni ko'rsatiladi)
+PARENT_FIELDS = {Product: 'shop_id', SubCategory: 'category_id'}
+PARENT_MODELS = {Product: Shop, SubCategory: Category}
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=SubCategory)
+def remember_parent(sender, instance, raw=False, **kwargs):
+    instance._parent_old = None
+    if raw or instance.pk is None:
+        return
+    field = PARENT_FIELDS[sender]
+    instance._parent_old = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=SubCategory)
+def touch_parent_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    field = PARENT_FIELDS[sender]
+    parent_id = getattr(instance, field)
+    old = getattr(instance, '_parent_old', None)
+    if created:
+        touch(PARENT_MODELS[sender], parent_id)
+    elif old != parent_id:
+        touch(PARENT_MODELS[sender], old, parent_id)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=SubCategory)
+def touch_parent_on_delete(sender, instance, **kwargs):
+    touch(PARENT_MODELS[sender], getattr(instance, PARENT_FIELDS[sender]))
+
+
+User = get_user_model()
+
+# Do'kon egasi va sharh/like muallifi sifatida ko'rsatiladigan maydonlar.
+# User'da yangilangan_vaqt yo'q -- ularni ko'rsatuvchi qatorlar touch qilinadi
+USER_DISPLAY_FIELDS = ('ism', 'familiya', 'telefon', 'rasm')
+
+
+def touch_user_rows(user_id):
+    """Foydalanuvchi ma'lumotini ko'rsatadigan do'kon va mahsulotlar ETag'ini yangilaydi"""
+    touch(Shop, *Shop.objects.filter(foydalanuvchi_id=user_id).values_list('pk', flat=True))
+    updated = Product.objects.filter(
+        Q(pk__in=ProductReview.objects.filter(user_id=user_id).values('product_id'))
+        | Q(pk__in=ProductLike.objects.filter(user_id=user_id).values('product_id'))
+    ).update(yangilangan_vaqt=Now())
+    if updated:
+        response_cache.bump(Product)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_display(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._display_old = None
+    if raw or instance.pk is None or (update_fields is not None and not set(USER_DISPLAY_FIELDS) & set(update_fields)):
+        return
+    instance._display_old = sender.objects.filter(pk=instance.pk).values_list(*USER_DISPLAY_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def touch_user_rows_on_save(sender, instance, created, raw=False, **kwargs):
+    old = getattr(instance, '_display_old', None)
+    if raw or created or old is None:
+        return
+    new = tuple(getattr(instance, name) for name in USER_DISPLAY_FIELDS)
+    if old != new:
+        touch_user_rows(instance.pk)
+    instance._display_old = new
+
+
+@receiver(images.variants_updated, sender=User)
+def touch_user_rows_on_variants(sender, pk, **kwargs):
+    touch_user_rows(pk)
+
+
+@receiver(pre_delete, sender=DiscountCampaign)
+def clear_campaign_discounts(sender, instance, **kwargs):
+    """Kampaniya o'chsa uning chegirmalari qo'lda qo'yilgandek qolib ketmasin"""
+    campaigns.clear_campaign(instance)
@@ -0,0 +1,97 @@
+"""
+Mahsulot hisoblagichlari (sharhlar, likelar, reyting) bilan ishlash.
+
+Hisoblagichlar Product jadvalida saqlanadi va har bir o'zgarishda bitta
+atomik ``UPDATE ... SET x = x + n`` bilan yangilanadi, shuning uchun ro'yxat
+endpointlari reytingni qo'shimcha so'rovsiz o'qiydi.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
+
+from core import response_cache
+from .models import Product, ProductLike, ProductReview
+
+
+def adjust_product_stats(product_id, reviews=0, likes=0, stars=None):
+    """
+    Mahsulot hisoblagichlarini ``delta`` qiymatlariga o'zgartiradi.
+
+    ``stars`` -- ``{yulduz: delta}`` ko'rinishidagi lug'at (masalan ``{5: 1}``).
+    ``yangilangan_vaqt`` doim yangilanadi (mahsulot ETag'i hisoblagichlar va
+    sharhlar bilan birga o'zgaradi), shuning uchun deltasiz chaqiruv mahsulotni
+    faqat "tegib" o'tadi.
+    """
+    changes = {'yangilangan_vaqt': Now()}
+    if reviews:
+        changes['reviews_count'] = F('reviews_count') + reviews
+    if likes:
+        changes['likes_count'] = F('likes_count') + likes
+    for star, delta in (stars or {}).items():
+        if not delta:
+            continue
+        field = f'rating_{star}'
+        changes[field] = F(field) + delta
+        changes['rating_sum'] = changes.get('rating_sum', F('rating_sum')) + star * delta
+    Product.objects.filter(pk=product_id).update(**changes)
+    response_cache.bump(Product)
+
+
+def _count_subquery(queryset):
+    return Coalesce(
+        Subquery(
+            queryset.filter(product=OuterRef('pk'))
+            .order_by()
+            .values('product')
+            .annotate(n=Count('pk'))
+            .values('n'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def stats_expressions():
+    """Hisoblagichlarni manba jadvallardan hisoblovchi ifodalar."""
+    expressions = {
+        'reviews_count': _count_subquery(ProductReview.objects.all()),
+        'likes_count': _count_subquery(ProductLike.objects.all()),
+        'rating_sum': Coalesce(
+            Subquery(
+                ProductReview.objects.filter(product=OuterRef('pk'))
+                .order_by()
+                .values('product')
+                .annotate(s=Sum('yulduz'))
+                .values('s'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        ),
+    }
+    for star in range(1, 6):
+        expressions[f'rating_{star}'] = _count_subquery(ProductReview.objects.filter(yulduz=star))
+    return expressions
+
+
+def rebuild_product_stats(queryset=None):
+    """
+    Hisoblagichlarni bitta set-based UPDATE bilan qayta hisoblaydi.
+    ``yangilangan_vaqt`` ham yangilanadi: tuzatilgan hisoblagichlar ETag'ni
+    o'zgartiradi (eski validator bilan 304 qaytmasin).
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    updated = queryset.update(yangilangan_vaqt=Now(), **stats_expressions())
+    response_cache.bump(Product)
+    return updated
+
+
+def find_stale_product_stats(queryset=None):
+    """Saqlangan hisoblagichi manbadan farq qiladigan mahsulotlarni qaytaradi."""
+    if queryset is None:
+        queryset = Product.objects.all()
+    expressions = stats_expressions()
+    annotations = {f'actual_{name}': expr for name, expr in expressions.items()}
+    mismatch = Q()
+    for name in expressions:
+        mismatch |= ~Q(**{name: F(f'actual_{name}')})
+    return queryset.annotate(**annotations).filter(mismatch)
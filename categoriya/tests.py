@@ -1,3 +1,1624 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.contrib.sessions.models import Session
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.views.static import serve
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core import db_routing, images, metrics, profiling, response_cache, throttling
+from core.snapshot import Snapshot
+from user.models import User
+from . import campaigns, geo, home, likes, tree, views
+from .export import ProductExportFilter
+from .importer import ProductImporter, read_rows
+from .models import (
+    Advertisement, Category, DiscountCampaign, PriceHistory, SubCategory, Shop, Product, ProductReview,
+    ProductLike,
+)
+
+
+def make_user(n=1):
+    return User.objects.create_user(
+        username=f'99890000000{n}', telefon=f'99890000000{n}', email=f'user{n}@test.uz',
+        ism=f'Ism{n}', familiya=f'Familiya{n}', password=None,
+    )
+
+
+class CatalogTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(1)
+        cls.other = make_user(2)
+        cls.category = Category.objects.create(nomi='Elektronika')
+        cls.shop = Shop.objects.create(
+            foydalanuvchi=cls.user, kompaniya_nomi='Texno', brend_nomi='Texno',
+            direktor_ismi='Ali', telefon_raqam_email='998900000000', bizness_manzili='Toshkent',
+        )
+        cls.product = Product.objects.create(
+            shop=cls.shop, category=cls.category, nomi='Telefon', tavsif='Yangi telefon', narx=1000,
+        )
+
+
+class ProductStatsTests(CatalogTestMixin, TestCase):
+    def refresh(self):
+        self.product.refresh_from_db()
+        return self.product
+
+    def test_review_create_edit_delete(self):
+        review = ProductReview.objects.create(product=self.product, user=self.user, tavsif='Zo\'r', yulduz=5)
+        ProductReview.objects.create(product=self.product, user=self.other, tavsif='Yomon', yulduz=1)
+        product = self.refresh()
+        self.assertEqual(product.reviews_count, 2)
+        self.assertEqual(product.average_rating, 3)
+        self.assertEqual(product.rating_histogram, {'1': 1, '2': 0, '3': 0, '4': 0, '5': 1})
+
+        review.yulduz = 3
+        review.save()
+        product = self.refresh()
+        self.assertEqual((product.rating_sum, product.rating_5, product.rating_3), (4, 0, 1))
+
+        review.delete()
+        product = self.refresh()
+        self.assertEqual((product.reviews_count, product.rating_sum, product.rating_3), (1, 1, 0))
+
+    def test_bulk_delete_updates_counters(self):
+        ProductLike.objects.create(product=self.product, user=self.user)
+        ProductLike.objects.create(product=self.product, user=self.other)
+        self.assertEqual(self.refresh().likes_count, 2)
+        ProductLike.objects.all().delete()
+        self.assertEqual(self.refresh().likes_count, 0)
+
+    def test_product_save_keeps_counters(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        ProductLike.objects.create(product=self.product, user=self.user)
+        stale.nomi = 'Smartfon'
+        stale.save()
+        self.assertEqual(self.refresh().likes_count, 1)
+
+    def test_rebuild_command_fixes_drift(self):
+        ProductReview.objects.create(product=self.product, user=self.user, tavsif='Yaxshi', yulduz=4)
+        Product.objects.filter(pk=self.product.pk).update(reviews_count=7, rating_sum=0, rating_4=0)
+        etag = self.client.get(f'/api/v1/products/{self.product.pk}/')['ETag']
+        call_command('rebuild_product_stats', stdout=StringIO())
+        product = self.refresh()
+        self.assertEqual((product.reviews_count, product.rating_sum, product.rating_4), (1, 4, 1))
+        # Tuzatilgan hisoblagichlar ETag'ni o'zgartiradi
+        response = self.client.get(f'/api/v1/products/{self.product.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_has_no_per_row_rating_queries(self):
+        for i in range(5):
+            Product.objects.create(shop=self.shop, category=self.category, nomi=f'P{i}', tavsif='-', narx=10)
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/v1/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+
+class EagerLoadingTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(3):
+            owner = make_user(10 + i)
+            shop = Shop.objects.create(
+                foydalanuvchi=owner, kompaniya_nomi=f'Do\'kon {i}', brend_nomi='B',
+                direktor_ismi='D', telefon_raqam_email='-', bizness_manzili='-',
+            )
+            product = Product.objects.create(shop=shop, category=self.category, nomi=f'P{i}', tavsif='-', narx=5)
+            ProductReview.objects.create(product=self.product, user=owner, tavsif='-', yulduz=4)
+            ProductLike.objects.create(product=product, user=owner)
+
+    def assertQueriesPerPage(self, url, expected):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), expected, [q['sql'] for q in ctx.captured_queries])
+        return response
+
+    # Shartli GET (ETag) bo'lgan ro'yxatlar: COUNT + validator sahifasi + PK bo'yicha to'liq qatorlar
+    def test_shop_list(self):
+        response = self.assertQueriesPerPage('/api/v1/shops/', 3)
+        shop = next(s for s in response.data['results'] if s['id'] == self.shop.id)
+        self.assertEqual(shop['products_count'], 1)
+        self.assertEqual(shop['foydalanuvchi_info']['telefon'], self.user.telefon)
+
+    def test_category_list(self):
+        self.assertQueriesPerPage('/api/v1/categories/', 3)
+
+    def test_review_and_like_lists(self):
+        self.assertQueriesPerPage('/api/v1/reviews/', 2)
+        self.assertQueriesPerPage('/api/v1/likes/', 2)
+
+    def test_product_detail(self):
+        response = self.assertQueriesPerPage(f'/api/v1/products/{self.product.id}/', 4)
+        self.assertEqual(len(response.data['reviews']), 3)
+
+    def test_nested_actions(self):
+        self.assertQueriesPerPage(f'/api/v1/categories/{self.category.id}/products/', 3)
+        self.assertQueriesPerPage(f'/api/v1/products/{self.product.id}/reviews/', 2)
+
+
+class PaginationTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Product.objects.bulk_create([
+            Product(shop=self.shop, category=self.category, nomi=f'P{i}', tavsif='-', narx=i, chegirma_bormi=True)
+            for i in range(25)
+        ])
+        # Bir xil vaqt -- tartib id bo'yicha aniqlanishi kerak
+        Product.objects.update(yaratilgan_vaqt=self.product.yaratilgan_vaqt)
+
+    def test_keyset_walks_all_rows_once(self):
+        url = f'/api/v1/shops/{self.shop.id}/products/?page_size=7'
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(ctx.captured_queries), 3)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, sorted(Product.objects.values_list('id', flat=True), reverse=True))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/products/discounted/?cursor=buzuq')
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_without_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/v1/products/?count=false&page=2')
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_list_cursor_mode(self):
+        response = self.client.get('/api/v1/products/?cursor=')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(self.client.get('/api/v1/products/?cursor=&ordering=-yaratilgan_vaqt').status_code, 200)
+
+    def test_cursor_rejected_where_unsupported(self):
+        # yaratilgan_vaqt yo'q modellar va keyset tartibiga zid ?ordering=
+        for url in ('/api/v1/categories/?cursor=x', '/api/v1/advertisements/?cursor=x',
+                    '/api/v1/products/?cursor=&ordering=narx'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
+class SearchTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Product.objects.create(shop=self.shop, category=self.category, nomi='Телефон Samsung', tavsif='-', narx=5)
+        Product.objects.create(
+            shop=self.shop, category=self.category, nomi='Oʻzbek choyi', tavsif='telefon emas', narx=5,
+            chegirma_bormi=True,
+        )
+
+    def test_normalize(self):
+        from .search import normalize
+        self.assertEqual(normalize('ТЕЛЕФОН'), 'telefon')
+        self.assertEqual(normalize('Ўзбек'), normalize("o‘zbek"))
+        self.assertEqual(normalize('ер ва поезд'), 'yer va poyezd')
+
+    def test_cyrillic_and_latin_match_with_ranking(self):
+        response = self.client.get('/api/v1/search/?q=telefon&type=product')
+        names = [hit['object']['nomi'] for hit in response.data['results']]
+        # Sarlavhadagi moslik matndagidan yuqori turadi
+        self.assertEqual(set(names[:2]), {'Telefon', 'Телефон Samsung'})
+        self.assertEqual(names[2:], ['Oʻzbek choyi'])
+
+    def test_apostrophe_variants_and_filters(self):
+        response = self.client.get("/api/v1/search/?q=o'zbek&chegirma_bormi=true")
+        self.assertEqual([hit['object']['nomi'] for hit in response.data['results']], ['Oʻzbek choyi'])
+        response = self.client.get('/api/v1/search/?q=texno')
+        self.assertEqual(response.data['results'][0]['type'], 'shop')
+
+    def test_index_follows_writes_and_rebuild(self):
+        product = Product.objects.get(nomi='Телефон Samsung')
+        product.nomi = 'Muzlatgich'
+        product.save()
+        self.assertEqual(len(self.client.get('/api/v1/search/?q=samsung').data['results']), 0)
+        product.delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.client.get('/api/v1/search/?q=muzlatgich').data['results']), 0)
+        self.assertEqual(len(self.client.get('/api/v1/search/?q=elektronika').data['results']), 1)
+
+
+class QueryPlanTests(CatalogTestMixin, TestCase):
+    def test_canonical_queries_use_indexes(self):
+        ProductReview.objects.create(product=self.product, user=self.user, tavsif='-', yulduz=5)
+        ProductLike.objects.create(product=self.product, user=self.user)
+        out = StringIO()
+        call_command('explain_queries', '--fail-on-issues', stdout=out, stderr=StringIO())
+        self.assertIn("0 tasida muammo bor", out.getvalue())
+
+
+class ResponseCacheTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_hit_after_miss(self):
+        first, _ = self.get('/api/v1/categories/?page_size=5&page=1')
+        # Parametrlar tartibi kalitga ta'sir qilmaydi
+        second, queries = self.get('/api/v1/categories/?page=1&page_size=5')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(queries, 0)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(response_cache.stats()['CategoryViewSet.list'], {'hit': 1, 'miss': 1, 'ratio': 0.5})
+
+    def test_only_affected_generations_bumped(self):
+        self.get('/api/v1/categories/')
+        self.get(f'/api/v1/shops/{self.shop.pk}/products/')
+        ProductLike.objects.create(product=self.product, user=self.other)
+        self.assertEqual(self.get('/api/v1/categories/')[0]['X-Cache'], 'HIT')
+        response, _ = self.get(f'/api/v1/shops/{self.shop.pk}/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+
+        self.category.nomi = 'Maishiy texnika'
+        self.category.save()
+        response, _ = self.get('/api/v1/categories/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['nomi'], 'Maishiy texnika')
+
+    def test_authenticated_requests_not_cached(self):
+        self.client.force_login(self.user)
+        response, _ = self.get('/api/v1/categories/')
+        self.assertNotIn('X-Cache', response)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class ConditionalGetTests(CatalogTestMixin, TestCase):
+    def conditional_get(self, url, etag, expected_status):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, expected_status)
+        return response, len(ctx.captured_queries)
+
+    def test_product_detail(self):
+        url = f'/api/v1/products/{self.product.pk}/'
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+        response, queries = self.conditional_get(url, first['ETag'], 304)
+        self.assertEqual(queries, 1)
+        self.assertEqual(response['ETag'], first['ETag'])
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # Like va sharh matni mahsulot detalini o'zgartiradi
+        ProductLike.objects.create(product=self.product, user=self.other)
+        second, _ = self.conditional_get(url, first['ETag'], 200)
+        review = ProductReview.objects.create(product=self.product, user=self.other, tavsif='-', yulduz=3)
+        third, _ = self.conditional_get(url, second['ETag'], 200)
+        review.tavsif = 'Yangi matn'
+        review.save()
+        self.conditional_get(url, third['ETag'], 200)
+
+    def test_invalid_pk_is_404(self):
+        for url in ('/api/v1/products/abc/', '/api/v1/shops/abc/', '/api/v1/categories/abc/'):
+            self.assertEqual(self.client.get(url).status_code, 404, url)
+
+    def test_list_skips_serialization(self):
+        url = '/api/v1/products/?category=%d' % self.category.pk
+        first = self.client.get(url)
+        self.assertNotIn('Last-Modified', first)
+        _, queries = self.conditional_get(url, first['ETag'], 304)
+        # Filtr qiymatini tekshirish (category) + COUNT + validator sahifasi
+        self.assertEqual(queries, 3)
+        self.product.narx = 2000
+        self.product.save()
+        self.conditional_get(url, first['ETag'], 200)
+
+    def test_parent_touched_by_children(self):
+        shop_url = f'/api/v1/shops/{self.shop.pk}/'
+        category_url = f'/api/v1/categories/{self.category.pk}/'
+        shop_etag = self.client.get(shop_url)['ETag']
+        category_etag = self.client.get(category_url)['ETag']
+        Product.objects.create(shop=self.shop, category=self.category, nomi='Yangi', tavsif='-', narx=1)
+        SubCategory.objects.create(category=self.category, nomi='Smartfonlar')
+        response, _ = self.conditional_get(shop_url, shop_etag, 200)
+        self.assertEqual(response.data['products_count'], 2)
+        response, _ = self.conditional_get(category_url, category_etag, 200)
+        self.assertEqual(response.data['subcategories_count'], 1)
+
+    def test_nested_list(self):
+        url = f'/api/v1/shops/{self.shop.pk}/products/'
+        first = self.client.get(url)
+        self.conditional_get(url, first['ETag'], 304)
+
+    def test_related_rename_changes_etag(self):
+        list_url = '/api/v1/products/'
+        detail_url = f'/api/v1/products/{self.product.pk}/'
+        list_etag = self.client.get(list_url)['ETag']
+        detail_etag = self.client.get(detail_url)['ETag']
+        self.category.nomi = 'Texnika'
+        self.category.save()
+        response, _ = self.conditional_get(list_url, list_etag, 200)
+        self.assertEqual(response.data['results'][0]['category_name'], 'Texnika')
+        response, _ = self.conditional_get(detail_url, detail_etag, 200)
+        detail_etag = response['ETag']
+        self.shop.kompaniya_nomi = 'Texno Plus'
+        self.shop.save()
+        response, _ = self.conditional_get(detail_url, detail_etag, 200)
+        self.assertEqual(response.data['shop_name'], 'Texno Plus')
+
+    def test_user_rename_touches_shops_and_products(self):
+        ProductReview.objects.create(product=self.product, user=self.other, tavsif='-', yulduz=4)
+        shop_url = f'/api/v1/shops/{self.shop.pk}/'
+        detail_url = f'/api/v1/products/{self.product.pk}/'
+        shop_etag = self.client.get(shop_url)['ETag']
+        detail_etag = self.client.get(detail_url)['ETag']
+        self.user.ism = 'Vali'
+        self.user.save()
+        response, _ = self.conditional_get(shop_url, shop_etag, 200)
+        self.assertEqual(response.data['foydalanuvchi_info']['ism'], 'Vali')
+        self.other.familiya = 'Karimov'
+        self.other.save()
+        response, _ = self.conditional_get(detail_url, detail_etag, 200)
+        self.assertEqual(response.data['reviews'][0]['user_info']['familiya'], 'Karimov')
+        # Faqat last_login yozilishi hech narsani touch qilmaydi
+        detail_etag = response['ETag']
+        self.other.save(update_fields=['last_login'])
+        self.conditional_get(detail_url, detail_etag, 304)
+
+    @override_settings(RESPONSE_CACHE_ALIAS='default')
+    def test_cached_response_revalidated(self):
+        cache.clear()
+        url = '/api/v1/categories/'
+        first = self.client.get(url)
+        response, queries = self.conditional_get(url, first['ETag'], 304)
+        self.assertEqual(queries, 0)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class NearbyTests(CatalogTestMixin, TestCase):
+    # Toshkent markazi va undan turli masofadagi nuqtalar
+    CENTER = (41.311081, 69.240562)
+    POINTS = {
+        'yaqin': (41.32, 69.25),      # ~1.3 km
+        "o'rta": (41.35, 69.30),      # ~6.6 km
+        'uzoq': (41.55, 69.60),       # ~41 km
+        'samarqand': (39.65, 66.96),  # ~270 km
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.shops = {}
+        for name, (lat, lng) in cls.POINTS.items():
+            cls.shops[name] = Shop.objects.create(
+                foydalanuvchi=cls.user, kompaniya_nomi=name, brend_nomi='B', direktor_ismi='D',
+                telefon_raqam_email='-', bizness_manzili='-', latitude=lat, longitude=lng,
+            )
+            Product.objects.create(
+                shop=cls.shops[name], category=cls.category, nomi=f'{name} chegirma', tavsif='-',
+                narx=100, chegirma_narx=80, chegirma_bormi=True,
+            )
+            Product.objects.create(shop=cls.shops[name], category=cls.category, nomi=name, tavsif='-', narx=100)
+
+    def nearby(self, url, **params):
+        lat, lng = self.CENTER
+        response = self.client.get(url, {'lat': lat, 'lng': lng, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_cells(self):
+        lat, lng = self.CENTER
+        cell = geo.cell_for(lat, lng)
+        self.assertTrue(any(low <= cell <= high for low, high in geo.cell_ranges(lat, lng, 1)))
+        # 180-meridian yaqinida oraliq ikkiga bo'linadi
+        self.assertEqual(len(geo.cell_ranges(0, 179.99, 5)), 2 * len(geo.cell_ranges(0, 0, 5)))
+        self.assertIsNone(geo.cell_for(None, 69))
+
+    def test_geo_cell_follows_coordinates(self):
+        shop = self.shops['samarqand']
+        shop.latitude, shop.longitude = self.POINTS['yaqin']
+        shop.save(update_fields=['latitude', 'longitude'])
+        shop.refresh_from_db()
+        self.assertEqual(shop.geo_cell, geo.cell_for(*self.POINTS['yaqin']))
+
+    def test_shops_within_radius_sorted(self):
+        data = self.nearby('/api/v1/shops/nearby/', radius=50)
+        names = [item['kompaniya_nomi'] for item in data['results']]
+        self.assertEqual(names, ['yaqin', "o'rta", 'uzoq'])
+        self.assertEqual(data['count'], 3)
+        for item in data['results']:
+            expected = geo.haversine_km(*self.CENTER, *self.POINTS[item['kompaniya_nomi']])
+            self.assertAlmostEqual(item['distance_km'], expected, places=3)
+        # Standart radius (5 km)
+        self.assertEqual([item['kompaniya_nomi'] for item in self.nearby('/api/v1/shops/nearby/')['results']], ['yaqin'])
+
+    def test_k_nearest_expands_radius(self):
+        data = self.nearby('/api/v1/shops/nearby/', k=4)
+        self.assertEqual([item['kompaniya_nomi'] for item in data['results']], ['yaqin', "o'rta", 'uzoq'])
+        data = self.nearby('/api/v1/shops/nearby/', k=2, page_size=1)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['results'][0]['kompaniya_nomi'], 'yaqin')
+
+    def test_nearby_discounted(self):
+        data = self.nearby('/api/v1/products/nearby-discounted/', radius=10)
+        self.assertEqual([item['nomi'] for item in data['results']], ['yaqin chegirma', "o'rta chegirma"])
+        self.assertLess(data['results'][0]['distance_km'], data['results'][1]['distance_km'])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get('/api/v1/shops/nearby/?lat=41').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/shops/nearby/?lat=91&lng=69').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/shops/nearby/?lat=41&lng=69&radius=500').status_code, 400)
+        for query in ('lat=nan&lng=69', 'lat=41&lng=inf', 'lat=41&lng=69&radius=NaN'):
+            self.assertEqual(self.client.get(f'/api/v1/shops/nearby/?{query}').status_code, 400, query)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class ProductImportTests(CatalogTestMixin, TestCase):
+    CSV = (
+        "sku,nomi,tavsif,narx,chegirma_narx,category,subcategory\n"
+        "A-1,Televizor,Katta ekran,5000,4500,Elektronika,Televizorlar\n"
+        "A-2,Muzlatkich,,7000,,{category_id},\n"
+        "A-3,,Nomsiz,abc,,Mebel,\n"
+        "A-1,Takror,,1,,,\n"
+    )
+
+    def setUp(self):
+        SubCategory.objects.create(category=self.category, nomi='Televizorlar')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/shops/{self.shop.pk}/import-products/'
+
+    def upload(self, content, name='mahsulotlar.csv', **data):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post(self.url, {'file': upload, **data}, format='multipart')
+
+    def test_csv_import_and_report(self):
+        stamp = Shop.objects.get(pk=self.shop.pk).yangilangan_vaqt
+        response = self.upload(self.CSV.format(category_id=self.category.pk))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['updated']), (2, 0))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4])
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'nomi', 'narx', 'category'})
+        self.assertEqual(response.data['errors'][1]['errors']['sku'], "SKU faylda takrorlangan")
+
+        tv = Product.objects.get(shop=self.shop, sku='A-1')
+        self.assertEqual((tv.category, tv.subcategory.nomi, tv.chegirma_bormi), (self.category, 'Televizorlar', True))
+        self.assertEqual(Product.objects.get(sku='A-2').category, self.category)
+        self.assertGreater(Shop.objects.get(pk=self.shop.pk).yangilangan_vaqt, stamp)
+        hits = self.client.get('/api/v1/search/?q=muzlatkich').data['results']
+        self.assertEqual([hit['object']['nomi'] for hit in hits], ['Muzlatkich'])
+
+    def test_upsert_by_sku_updates_only_given_columns(self):
+        self.upload(self.CSV.format(category_id=self.category.pk))
+        tv = Product.objects.get(sku='A-1')
+        ProductLike.objects.create(product=tv, user=self.other)
+        response = self.upload('{"sku": "A-1", "nomi": "Televizor 4K", "narx": 5500}\n', name='yangi.jsonl')
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+        tv.refresh_from_db()
+        self.assertEqual((tv.nomi, tv.narx, tv.tavsif, tv.likes_count), ('Televizor 4K', 5500, 'Katta ekran', 1))
+        self.assertEqual(tv.subcategory.nomi, 'Televizorlar')
+
+    def test_dry_run_and_permissions(self):
+        response = self.upload(self.CSV.format(category_id=self.category.pk), dry_run='true')
+        self.assertEqual(response.data['created'], 2)
+        self.assertFalse(Product.objects.filter(sku__isnull=False).exists())
+        self.assertEqual(self.upload('nomi\nX\n').status_code, 400)
+        self.assertEqual(self.upload('x', name='fayl.txt').status_code, 400)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.upload(self.CSV).status_code, 403)
+
+    def test_command(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'mahsulotlar.csv')
+        report = os.path.join(directory.name, 'xatolar.jsonl')
+        with open(path, 'w') as fh:
+            fh.write(self.CSV.format(category_id=self.category.pk))
+        out = StringIO()
+        call_command('import_products', path, f'--shop={self.shop.pk}', f'--report={report}', '--chunk-size=2', stdout=out)
+        self.assertIn("2 yangi", out.getvalue())
+        with open(report) as fh:
+            self.assertEqual([json.loads(line)['row'] for line in fh], [3, 4])
+
+    def test_unreadable_tail_rolls_back_whole_import(self):
+        # Yaroqsiz bayt birinchi bo'lak (1000 qator) yozilgandan keyin chiqadi
+        rows = ''.join(f'B-{n},Mahsulot {n},,{n + 1}\n' for n in range(1200))
+        content = ('sku,nomi,tavsif,narx\n' + rows).encode() + b'B-x,\xff\xfe,,1\n'
+        upload = SimpleUploadedFile('mahsulotlar.csv', content)
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Product.objects.filter(sku__startswith='B-').exists())
+
+
+class ProductExportTests(CatalogTestMixin, TestCase):
+    url = '/api/v1/products/export/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_shop = Shop.objects.create(
+            foydalanuvchi=cls.other, kompaniya_nomi='Mebel uyi', brend_nomi='Mebel',
+            direktor_ismi='Vali', telefon_raqam_email='998900000001', bizness_manzili='Samarqand',
+        )
+        cls.sofa = Product.objects.create(
+            shop=cls.other_shop, nomi='Divan', sku='D-1', tavsif='Yumshoq, "katta"', narx=3000,
+            chegirma_narx=2500, chegirma_bormi=True,
+        )
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_rows_with_joined_names(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.product.pk, self.sofa.pk])
+        self.assertEqual((rows[0]['shop_nomi'], rows[0]['category_nomi'], rows[0]['narx']), ('Texno', 'Elektronika', '1000.00'))
+        self.assertEqual((rows[1]['category'], rows[1]['sku'], rows[1]['chegirma_bormi']), (None, 'D-1', True))
+
+    def test_filters_and_updated_since(self):
+        rows = self.read(self.client.get(self.url, {'shop': self.other_shop.pk, 'chegirma_bormi': 'true'})).splitlines()
+        self.assertEqual([json.loads(line)['nomi'] for line in rows], ['Divan'])
+        watermark = self.client.get(self.url)['X-Export-Watermark']
+        self.assertEqual(self.read(self.client.get(self.url, {'updated_since': watermark})), '')
+        Product.objects.filter(pk=self.product.pk).update(narx=900, yangilangan_vaqt=timezone.now())
+        rows = self.read(self.client.get(self.url, {'updated_since': watermark})).splitlines()
+        self.assertEqual([json.loads(line)['narx'] for line in rows], ['900.00'])
+        self.assertEqual(self.client.get(self.url, {'updated_since': 'kecha'}).status_code, 400)
+
+    def test_csv_gzip_streams_and_round_trips(self):
+        response = self.client.get(self.url, {'format': 'csv'}, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['nomi'] for row in rows], ['Telefon', 'Divan'])
+        self.assertEqual((rows[1]['tavsif'], rows[1]['chegirma_bormi'], rows[0]['sku']), ('Yumshoq, "katta"', 'true', ''))
+        self.assertEqual(self.client.get('/api/v1/products/export.csv').status_code, 200)
+
+    def test_filters_match_viewset(self):
+        from .views import ProductViewSet
+        self.assertEqual(
+            set(ProductExportFilter.Meta.fields) - {'updated_since'}, set(ProductViewSet.filterset_fields),
+        )
+
+    def test_command(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'katalog.csv.gz')
+        out = StringIO()
+        call_command('export_products', f'--output={path}', f'--shop={self.shop.pk}', '--chunk-size=1', stdout=out)
+        self.assertIn('--updated-since', out.getvalue())
+        with gzip.open(path, 'rt') as fh:
+            self.assertEqual([row['nomi'] for row in csv.DictReader(fh)], ['Telefon'])
+
+
+@override_settings(LIKE_BUFFER_MAX_DELAY=0)
+class LikeTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.other)
+        self.url = f'/api/v1/products/{self.product.pk}/'
+
+    def likes_count(self):
+        return Product.objects.get(pk=self.product.pk).likes_count
+
+    def test_like_and_unlike_are_single_statements(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.post(self.url + 'like/').status_code, 201)
+        self.assertEqual(self.likes_count(), 1)
+        self.assertEqual(self.client.post(self.url + 'like/').status_code, 400)
+        self.assertEqual(ProductLike.objects.filter(product=self.product).count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.delete(self.url + 'unlike/').status_code, 204)
+        self.assertEqual(self.likes_count(), 0)
+        self.assertEqual(self.client.delete(self.url + 'unlike/').status_code, 404)
+        self.assertEqual(self.client.post('/api/v1/products/999999/like/').status_code, 404)
+
+    def test_toggle_returns_state_and_count(self):
+        ProductLike.objects.create(product=self.product, user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url + 'toggle-like/')
+        self.assertEqual(response.data, {'liked': True, 'likes_count': 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url + 'toggle-like/')
+        self.assertEqual(response.data, {'liked': False, 'likes_count': 1})
+        self.assertEqual(self.client.post('/api/v1/products/999999/toggle-like/').status_code, 404)
+
+    @override_settings(LIKE_BUFFER_MAX_DELAY=60, LIKE_BUFFER_MAX_PENDING=3)
+    def test_buffer_flushes_in_batches(self):
+        other = Product.objects.create(shop=self.shop, nomi='Planshet', tavsif='', narx=10)
+        buffer = likes.LikeCounterBuffer()
+        self.addCleanup(buffer.take)
+        buffer.add(self.product.pk, 1)
+        buffer.add(other.pk, 1)
+        self.assertEqual((self.likes_count(), buffer.pending_delta(self.product.pk)), (0, 1))
+        # +2 va +1 -- ikki guruh, ikkita UPDATE
+        with self.assertNumQueries(4):
+            buffer.add(self.product.pk, 1)
+        self.assertEqual((self.likes_count(), Product.objects.get(pk=other.pk).likes_count), (2, 1))
+        self.assertEqual(buffer.pending_delta(self.product.pk), 0)
+
+    def test_zero_net_delta_touches_product(self):
+        stamp = Product.objects.get(pk=self.product.pk).yangilangan_vaqt
+        # Bir foydalanuvchi like qo'ydi, boshqasi olib tashladi: soni o'zgarmadi
+        likes.apply_like_deltas({self.product.pk: 0})
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.likes_count, 0)
+        self.assertGreater(product.yangilangan_vaqt, stamp)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class ViewerFlagsTests(CatalogTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = [cls.product] + [
+            Product.objects.create(shop=cls.shop, category=cls.category, nomi=f'P{i}', tavsif='-', narx=10)
+            for i in range(7)
+        ]
+        ProductLike.objects.create(product=cls.products[1], user=cls.other)
+        ProductLike.objects.create(product=cls.products[2], user=cls.user)
+        ProductReview.objects.create(product=cls.products[1], user=cls.other, tavsif='-', yulduz=2)
+        ProductReview.objects.create(product=cls.products[1], user=cls.other, tavsif='-', yulduz=4)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.other)
+
+    def flag_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        tables = ('"categoriya_productlike"', '"categoriya_productreview"')
+        return response, [query['sql'] for query in ctx if any(f'FROM {table}' in query['sql'] for table in tables)]
+
+    def test_flags_resolved_once_per_page(self):
+        response, queries = self.flag_queries('/api/v1/products/?page_size=8')
+        self.assertEqual(len(queries), 2)
+        flags = {item['id']: (item['is_liked'], item['my_rating']) for item in response.data['results']}
+        self.assertEqual(flags[self.products[1].pk], (True, 4))
+        self.assertEqual(flags[self.products[2].pk], (False, None))
+        self.assertEqual(len(self.flag_queries('/api/v1/products/?page_size=3')[1]), 2)
+        self.assertEqual(len(self.flag_queries(f'/api/v1/shops/{self.shop.pk}/products/')[1]), 2)
+
+        response, queries = self.flag_queries(f'/api/v1/products/{self.products[1].pk}/')
+        # ETag va serializer bitta holatni ishlatadi; qolgan ikkitasi -- sharh/like prefetch
+        self.assertEqual((response.data['is_liked'], response.data['my_rating'], len(queries)), (True, 4, 4))
+
+    def test_anonymous_gets_nulls(self):
+        self.client.force_authenticate(None)
+        response, queries = self.flag_queries('/api/v1/products/')
+        self.assertEqual(queries, [])
+        self.assertEqual({(item['is_liked'], item['my_rating']) for item in response.data['results']}, {(None, None)})
+
+    def test_etag_depends_on_viewer_state(self):
+        url = '/api/v1/products/?page_size=8'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ProductLike.objects.create(product=self.products[3], user=self.other)
+        Product.objects.filter(pk=self.products[3].pk).update(yangilangan_vaqt=self.products[3].yangilangan_vaqt)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.client.force_authenticate(self.user)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+
+class BulkPriceUpdateTests(CatalogTestMixin, TestCase):
+    url = '/api/v1/products/bulk-update/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tv = Product.objects.create(shop=cls.shop, category=cls.category, nomi='Televizor', tavsif='', narx=5000)
+        cls.chair = Product.objects.create(shop=cls.shop, nomi='Stul', tavsif='', narx='199.99')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def prices(self):
+        return {
+            pk: (narx, chegirma_narx, chegirma_bormi) for pk, narx, chegirma_narx, chegirma_bormi
+            in Product.objects.values_list('pk', 'narx', 'chegirma_narx', 'chegirma_bormi')
+        }
+
+    def test_items_updated_in_one_statement(self):
+        items = [
+            {'id': self.product.pk, 'chegirma_narx': '900'},
+            {'id': self.tv.pk, 'narx': '5500'},
+            {'id': self.chair.pk, 'narx': '199.99'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'items': items}, format='json')
+        self.assertEqual(response.data, {'matched': 3, 'updated': 2, 'unchanged': 1})
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "categoriya_product"')]
+        self.assertEqual(len(updates), 1)
+        prices = self.prices()
+        self.assertEqual(prices[self.product.pk], (1000, 900, True))
+        self.assertEqual(prices[self.tv.pk], (5500, None, False))
+        hits = self.client.get('/api/v1/search/?q=telefon&chegirma_bormi=true').data['results']
+        self.assertEqual([hit['object']['id'] for hit in hits], [self.product.pk])
+
+    def test_invalid_item_rejects_whole_batch(self):
+        other_product = Product.objects.create(shop=Shop.objects.create(
+            foydalanuvchi=self.other, kompaniya_nomi='B', brend_nomi='B', direktor_ismi='B',
+            telefon_raqam_email='1', bizness_manzili='B',
+        ), nomi='Begona', tavsif='', narx=10)
+        before = self.prices()
+        response = self.client.post(self.url, {'items': [
+            {'id': self.product.pk, 'narx': '800'},
+            {'id': self.tv.pk, 'chegirma_narx': '6000'},
+            {'id': other_product.pk, 'narx': '1'},
+            {'id': 999999, 'narx': '1'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['items']), {str(self.tv.pk), str(other_product.pk), '999999'})
+        self.assertEqual(self.prices(), before)
+        self.assertEqual(self.client.post(self.url, {'items': [{'id': 1}]}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, 400)
+
+    def test_discount_rule(self):
+        rule = {'shop': self.shop.pk, 'category': self.category.pk, 'discount_percent': '20'}
+        response = self.client.post(self.url, {'rule': rule}, format='json')
+        self.assertEqual(response.data, {'matched': 2, 'updated': 2, 'unchanged': 0})
+        prices = self.prices()
+        self.assertEqual(prices[self.tv.pk], (5000, 4000, True))
+        self.assertEqual(prices[self.chair.pk], (Decimal('199.99'), None, False))
+        # Takroriy qoida hech narsani o'zgartirmaydi
+        self.assertEqual(self.client.post(self.url, {'rule': rule}, format='json').data['updated'], 0)
+        self.assertEqual(self.client.get('/api/v1/products/', {'chegirma_bormi': 'true'}).data['count'], 2)
+
+        response = self.client.post(self.url, {'rule': {'shop': self.shop.pk, 'discount_percent': None}}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertFalse(Product.objects.filter(chegirma_bormi=True).exists())
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.post(self.url, {'rule': rule}, format='json').status_code, 403)
+
+    def test_admin_actions(self):
+        from .admin import ProductAdmin
+        admin_actions = {func.__name__: func for func in ProductAdmin.actions}
+        request = type('Request', (), {})()
+        messages_sent = []
+        modeladmin = type('Admin', (), {'message_user': lambda self, request, message, level: messages_sent.append(message)})()
+        admin_actions['discount_50'](modeladmin, request, Product.objects.filter(pk__in=[self.tv.pk, self.chair.pk]))
+        self.assertEqual(self.prices()[self.chair.pk], (Decimal('199.99'), Decimal('100.00'), True))
+        admin_actions['remove_discount'](modeladmin, request, Product.objects.all())
+        self.assertEqual(messages_sent, ["2 ta mahsulot narxi o'zgardi", "2 ta mahsulot narxi o'zgardi"])
+
+
+
+class DiscountCampaignTests(CatalogTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tv = Product.objects.create(shop=cls.shop, category=cls.category, nomi='Televizor', tavsif='', narx=5000)
+        cls.chair = Product.objects.create(shop=cls.shop, nomi='Stul', tavsif='', narx=200)
+        cls.now = timezone.now()
+
+    def campaign(self, percent, days=(-1, 1), **scope):
+        return DiscountCampaign.objects.create(
+            nomi=f'{percent}%', chegirma_foizi=percent, **scope,
+            boshlanish_vaqti=self.now + timezone.timedelta(days=days[0]),
+            tugash_vaqti=self.now + timezone.timedelta(days=days[1]),
+        )
+
+    def run_at(self, days=0, batch_size=2):
+        # Kichik bo'lak: id oraliqlari bo'yicha bo'laklash ham tekshiriladi
+        return campaigns.run_campaigns(now=self.now + timezone.timedelta(days=days), batch_size=batch_size)
+
+    def prices(self):
+        return {
+            pk: (chegirma_narx, chegirma_bormi, campaign_id) for pk, chegirma_narx, chegirma_bormi, campaign_id
+            in Product.objects.values_list('pk', 'chegirma_narx', 'chegirma_bormi', 'discount_campaign')
+        }
+
+    def test_import_discount_leaves_campaign(self):
+        self.chair.sku = 'S-1'
+        self.chair.save()
+        shop_wide = self.campaign(10, shop=self.shop)
+        self.run_at()
+        self.assertEqual(self.prices()[self.chair.pk], (180, True, shop_wide.pk))
+        result = ProductImporter(self.shop).run(read_rows(BytesIO(b'sku,nomi,narx,chegirma_narx\nS-1,Stul,200,150\n'), 'csv'))
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(self.prices()[self.chair.pk], (150, True, None))
+        # Kampaniya qo'lda berilgan chegirmani qayta yozmaydi va tugaganda o'chirmaydi
+        self.run_at()
+        self.run_at(days=2)
+        self.assertEqual(self.prices()[self.chair.pk], (150, True, None))
+
+    def test_apply_and_expire(self):
+        shop_wide = self.campaign(10, shop=self.shop)
+        category = self.campaign(20, days=(-1, 3), category=self.category)
+        big = self.campaign(50, days=(2, 4), shop=self.shop)
+
+        self.assertEqual(self.run_at(), {'campaigns': 2, 'applied': 3, 'expired': 0})
+        prices = self.prices()
+        # Ikkala kampaniyaga tushgan mahsulotda kattasi
+        self.assertEqual(prices[self.product.pk], (800, True, category.pk))
+        self.assertEqual(prices[self.tv.pk], (4000, True, category.pk))
+        self.assertEqual(prices[self.chair.pk], (180, True, shop_wide.pk))
+        # Idempotent
+        self.assertEqual(self.run_at(), {'campaigns': 2, 'applied': 0, 'expired': 0})
+        hits = self.client.get('/api/v1/search/?q=stul&chegirma_bormi=true').data['results']
+        self.assertEqual(len(hits), 1)
+
+        # 10% tugadi, 50% boshlandi: mahsulotlar chegirmasiz oraliqdan o'tmaydi
+        self.assertEqual(self.run_at(days=2.5), {'campaigns': 2, 'applied': 3, 'expired': 0})
+        self.assertEqual({campaign for _, _, campaign in self.prices().values()}, {big.pk})
+        self.assertEqual(self.run_at(days=5), {'campaigns': 0, 'applied': 0, 'expired': 3})
+        self.assertFalse(Product.objects.filter(chegirma_bormi=True).exists())
+        hits = self.client.get('/api/v1/search/?q=stul&chegirma_bormi=true').data['results']
+        self.assertEqual(hits, [])
+
+    def test_manual_discount_is_kept(self):
+        Product.objects.filter(pk=self.tv.pk).update(chegirma_narx=100, chegirma_bormi=True)
+        campaign = self.campaign(10, shop=self.shop)
+        self.assertEqual(self.run_at()['applied'], 2)
+        self.assertEqual(self.prices()[self.tv.pk], (100, True, None))
+
+        # Qo'lda o'zgartirilgan chegirma kampaniyadan ajraladi
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.patch(f'/api/v1/products/{self.chair.pk}/', {'chegirma_narx': '150'}, format='json')
+        self.assertEqual(self.prices()[self.chair.pk], (150, True, None))
+        self.assertEqual(self.run_at(days=3)['expired'], 1)
+        self.assertEqual(self.prices()[self.chair.pk], (150, True, None))
+        self.assertEqual(self.prices()[self.product.pk], (None, False, None))
+
+        campaign.tugash_vaqti = self.now + timezone.timedelta(days=5)
+        campaign.save()
+        self.run_at()
+        campaign.delete()
+        self.assertEqual(Product.objects.filter(chegirma_bormi=True).count(), 2)
+        self.assertFalse(Product.objects.filter(pk=self.product.pk, chegirma_bormi=True).exists())
+
+    def test_command(self):
+        self.campaign(10, product=self.product)
+        out = StringIO()
+        call_command('run_discount_campaigns', '--batch-size', '1', stdout=out)
+        self.assertIn("chegirma qo'yildi: 1", out.getvalue())
+        out = StringIO()
+        call_command('run_discount_campaigns', '--now', (self.now + timezone.timedelta(days=2)).isoformat(), stdout=out)
+        self.assertIn("olib tashlandi: 1", out.getvalue())
+
+
+class PriceHistoryTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def history(self, product=None):
+        return list(
+            PriceHistory.objects.filter(product=product or self.product)
+            .order_by('vaqt', 'pk').values_list('narx', 'chegirma_narx')
+        )
+
+    def min_price(self, product=None):
+        return Product.objects.values_list('min_price_90d', flat=True).get(pk=(product or self.product).pk)
+
+    def test_records_only_price_changes(self):
+        self.assertEqual(self.history(), [(1000, None)])
+        self.client.patch(f'/api/v1/products/{self.product.pk}/', {'nomi': 'Telefon X'}, format='json')
+        self.client.patch(f'/api/v1/products/{self.product.pk}/', {'narx': '1200'}, format='json')
+        self.client.post('/api/v1/products/bulk-update/', {'items': [
+            {'id': self.product.pk, 'chegirma_narx': '900'},
+        ]}, format='json')
+        rule = {'shop': self.shop.pk, 'discount_percent': '50'}
+        self.client.post('/api/v1/products/bulk-update/', {'rule': rule}, format='json')
+        self.client.post('/api/v1/products/bulk-update/', {'rule': rule}, format='json')
+        self.client.post('/api/v1/products/bulk-update/', {'rule': {**rule, 'discount_percent': None}}, format='json')
+        self.assertEqual(self.history(), [(1000, None), (1200, None), (1200, 900), (1200, 600), (1200, None)])
+        self.assertEqual(self.min_price(), 600)
+        data = self.client.get(f'/api/v1/products/{self.product.pk}/').data
+        self.assertEqual(data['min_price_90d'], '600.00')
+
+    def test_import_records_changed_rows(self):
+        url = f'/api/v1/shops/{self.shop.pk}/import-products/'
+        for content in ('sku,nomi,narx\nB-1,Stul,100\n', 'sku,nomi,narx\nB-1,Stul yangi,100\n', 'sku,nomi,narx\nB-1,Stul yangi,90\n'):
+            self.client.post(url, {'file': SimpleUploadedFile('fayl.csv', content.encode())}, format='multipart')
+        chair = Product.objects.get(sku='B-1')
+        self.assertEqual(self.history(chair), [(100, None), (90, None)])
+        self.assertEqual(self.min_price(chair), 90)
+
+    def test_endpoint_and_downsampling(self):
+        now = timezone.now()
+        day = timezone.timedelta(days=1)
+        PriceHistory.objects.filter(product=self.product).update(vaqt=now - 100 * day)
+        PriceHistory.objects.bulk_create([
+            PriceHistory(product=self.product, narx=narx, chegirma_narx=chegirma, vaqt=now - days * day + hours * day / 24)
+            for days, hours, narx, chegirma in (
+                (10, 1, 1100, None), (10, 5, 1100, 950), (3, 0, 1050, None),
+            )
+        ])
+        url = f'/api/v1/products/{self.product.pk}/price-history/'
+        data = self.client.get(url).data
+        self.assertEqual([point['chegirma_narx'] for point in data['points']], [None, '950.00', None])
+        self.assertEqual(data['start_price']['narx'], '1000.00')
+        self.assertEqual(data['min_price'], '950.00')
+
+        data = self.client.get(url, {'resolution': 'day', 'from': (now - 20 * day).isoformat()}).data
+        self.assertEqual(
+            [(point['min_price'], point['max_price'], point['changes']) for point in data['points']],
+            [('950.00', '1100.00', 2), ('1050.00', '1050.00', 1)],
+        )
+        # 30 kun oldingi narx
+        data = self.client.get(url, {'from': (now - 30 * day).isoformat(), 'to': (now - 20 * day).isoformat()}).data
+        self.assertEqual((data['start_price']['narx'], data['points']), ('1000.00', []))
+
+        self.assertEqual(self.client.get(url, {'resolution': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': now.isoformat(), 'to': (now - day).isoformat()}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/products/999999/price-history/').status_code, 404)
+
+    def test_refresh_min_prices(self):
+        day = timezone.timedelta(days=1)
+        PriceHistory.objects.filter(product=self.product).update(vaqt=timezone.now() - 200 * day)
+        self.client.patch(f'/api/v1/products/{self.product.pk}/', {'narx': '700'}, format='json')
+        self.client.patch(f'/api/v1/products/{self.product.pk}/', {'narx': '800'}, format='json')
+        self.assertEqual(self.min_price(), 700)
+        # 700 oynadan chiqib ketadi: eng past narx -- oyna boshida amalda bo'lgan 800
+        PriceHistory.objects.filter(product=self.product, narx=700).update(vaqt=timezone.now() - 91 * day)
+        PriceHistory.objects.filter(product=self.product, narx=800).update(vaqt=timezone.now() - 90.5 * day)
+        out = StringIO()
+        call_command('refresh_min_prices', stdout=out)
+        self.assertIn('1 ta', out.getvalue())
+        self.assertEqual(self.min_price(), 800)
+        Product.objects.filter(pk=self.product.pk).update(min_price_90d=None)
+        call_command('refresh_min_prices', '--all', stdout=StringIO())
+        self.assertEqual(self.min_price(), 800)
+
+    def test_benchmark_command_cleans_up(self):
+        before = PriceHistory.objects.count()
+        out = StringIO()
+        call_command('benchmark_price_history', '--changes', '300', '--queries', '2', stdout=out)
+        self.assertIn("300 o'zgarish", out.getvalue())
+        self.assertEqual(PriceHistory.objects.count(), before)
+
+
+class CategoryTreeTests(CatalogTestMixin, TestCase):
+    url = '/api/v1/categories/tree/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.phones = SubCategory.objects.create(category=cls.category, nomi='Telefonlar')
+        SubCategory.objects.create(category=cls.category, nomi='Aksessuarlar')
+        Category.objects.create(nomi='Bo\'sh')
+        Product.objects.filter(pk=cls.product.pk).update(subcategory=cls.phones)
+
+    def setUp(self):
+        tree.TREE.clear()
+        self.client = APIClient()
+
+    def get(self, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, **headers)
+        return response, len(ctx.captured_queries)
+
+    def test_snapshot_served_without_queries(self):
+        response, queries = self.get()
+        self.assertEqual(queries, 4)
+        data = json.loads(response.content)
+        self.assertEqual([category['nomi'] for category in data], ["Bo'sh", 'Elektronika'])
+        electronics = data[1]
+        self.assertEqual((electronics['subcategories_count'], electronics['products_count']), (2, 1))
+        self.assertEqual(
+            [(sub['nomi'], sub['products_count']) for sub in electronics['subcategories']],
+            [('Aksessuarlar', 0), ('Telefonlar', 1)],
+        )
+
+        again, queries = self.get()
+        self.assertEqual((again.content, queries), (response.content, 0))
+        not_modified, queries = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual((not_modified.status_code, queries), (304, 0))
+
+    def test_rebuilt_after_change(self):
+        first, _ = self.get()
+        Product.objects.create(shop=self.shop, category=self.category, subcategory=self.phones, nomi='X', tavsif='', narx=1)
+        response, queries = self.get()
+        self.assertEqual(queries, 4)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(json.loads(response.content)[1]['products_count'], 2)
+
+        self.phones.delete()
+        data = json.loads(self.get()[0].content)
+        self.assertEqual(data[1]['subcategories_count'], 1)
+
+    def test_version_shared_through_cache(self):
+        self.get()
+        # Boshqa worker versiyani oshirgandek: shu jarayonda hech narsa o'zgarmagan
+        tree.TREE.bump()
+        self.assertEqual(self.get()[1], 4)
+
+
+class HomeTests(CatalogTestMixin, TestCase):
+    url = '/api/v1/home/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.discounted = Product.objects.create(
+            shop=cls.shop, category=cls.category, nomi='Chegirma', tavsif='-', narx=100,
+            chegirma_narx=80, chegirma_bormi=True,
+        )
+        cls.rated = Product.objects.create(shop=cls.shop, category=cls.category, nomi='Reyting', tavsif='-', narx=10)
+        for n, yulduz in enumerate((5, 5, 4), start=3):
+            ProductReview.objects.create(product=cls.rated, user=make_user(n), tavsif='-', yulduz=yulduz)
+        # Kam sharhli 5 yulduz "top" ga kirmaydi
+        ProductReview.objects.create(product=cls.product, user=cls.other, tavsif='-', yulduz=5)
+        Advertisement.objects.create(product=cls.product, tavsif='Reklama')
+        ProductLike.objects.create(product=cls.rated, user=cls.other)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, query=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url + query)
+        return response, len(ctx.captured_queries)
+
+    def test_sections(self):
+        response, _ = self.get('?newest=2')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(list(data), ['ads', 'discounted', 'categories', 'newest', 'top_rated'])
+        self.assertEqual([ad['tavsif'] for ad in data['ads']], ['Reklama'])
+        self.assertEqual([product['id'] for product in data['discounted']], [self.discounted.pk])
+        self.assertEqual([category['nomi'] for category in data['categories']], ['Elektronika'])
+        self.assertEqual([product['id'] for product in data['newest']], [self.rated.pk, self.discounted.pk])
+        self.assertEqual([product['id'] for product in data['top_rated']], [self.rated.pk])
+        self.assertIsNone(data['top_rated'][0]['is_liked'])
+
+    def test_limits(self):
+        data = self.get('?ads=0&categories=0&top_rated=0&newest=1')[0].json()
+        self.assertEqual(list(data), ['discounted', 'newest'])
+        self.assertEqual(len(data['newest']), 1)
+        for query in ('?newest=x', f'?newest={home.MAX_LIMIT + 1}', '?ads=-1'):
+            self.assertEqual(self.get(query)[0].status_code, 400)
+
+    def test_sections_cached_separately(self):
+        first, _ = self.get()
+        again, queries = self.get()
+        self.assertEqual((again.json(), queries), (first.json(), 0))
+        # Boshqa son -- faqat shu bo'lim quriladi
+        self.assertGreater(self.get('?newest=3')[1], 0)
+        with self.settings(HOME_SECTION_TTL={'newest': 0}):
+            self.get('?newest=4')
+            self.assertGreater(self.get('?newest=4')[1], 0)
+
+    def test_viewer_state_not_cached(self):
+        self.client.force_authenticate(self.other)
+        data = self.get()[0].json()
+        self.assertTrue(data['top_rated'][0]['is_liked'])
+        self.assertEqual([p['my_rating'] for p in data['newest'] if p['id'] == self.product.pk], [5])
+
+        self.client.force_authenticate(self.user)
+        # Bo'limlar keshdan, foydalanuvchi holati -- ikkita so'rov
+        response, queries = self.get()
+        self.assertEqual(queries, 2)
+        self.assertFalse(response.json()['top_rated'][0]['is_liked'])
+        self.client.force_authenticate(None)
+        self.assertIsNone(self.get()[0].json()['top_rated'][0]['is_liked'])
+
+    @override_settings(DEBUG=False)
+    def test_server_timing(self):
+        self.assertNotIn('Server-Timing', self.get()[0])
+        staff = make_user(9)
+        User.objects.filter(pk=staff.pk).update(is_staff=True)
+        staff.is_staff = True
+        self.client.force_authenticate(staff)
+        timing = self.get('?ads=0')[0]['Server-Timing']
+        self.assertEqual(
+            [part.split(';')[0] for part in timing.split(', ')], ['discounted', 'categories', 'newest', 'top_rated'],
+        )
+        self.assertIn('desc="hit"', timing)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class AsyncEndpointTests(CatalogTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        SubCategory.objects.create(category=cls.category, nomi='Telefonlar')
+        for i in range(4):
+            Product.objects.create(shop=cls.shop, category=cls.category, nomi=f'Mahsulot {i}', tavsif='-', narx=i)
+        ProductReview.objects.create(product=cls.product, user=cls.user, tavsif='Zo\'r', yulduz=5)
+        ProductLike.objects.create(product=cls.product, user=cls.other)
+        Advertisement.objects.create(product=cls.product, tavsif='Aksiya')
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = async_to_sync(self.async_client.get)(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content), len(ctx.captured_queries)
+
+    def test_product_list_matches_sync(self):
+        data, queries = self.get('/api/v1/async/products/?page_size=3&count=true')
+        expected = self.client.get('/api/v1/products/?cursor=&page_size=3').json()
+        self.assertEqual(data['results'], expected['results'])
+        self.assertEqual(data['count'], 5)
+        # sahifa + COUNT
+        self.assertEqual(queries, 2)
+        rest, _ = self.get(data['next'].replace('http://testserver', ''))
+        self.assertEqual(len(rest['results']), 2)
+        self.assertIsNone(rest['next'])
+
+    def test_product_detail(self):
+        data, queries = self.get(f'/api/v1/async/products/{self.product.pk}/')
+        expected = self.client.get(f'/api/v1/products/{self.product.pk}/').json()
+        self.assertEqual({key: data[key] for key in expected}, expected)
+        self.assertEqual([ad['tavsif'] for ad in data['ads']], ['Aksiya'])
+        # mahsulot, sharhlar, likelar, reklamalar (+ tranzaksiya tekshiruvi so'rovsiz)
+        self.assertEqual(queries, 4)
+
+    def test_nested_lists_and_tree(self):
+        data, _ = self.get(f'/api/v1/async/shops/{self.shop.pk}/products/?has_discount=false')
+        self.assertEqual(len(data['results']), 5)
+        data, _ = self.get(f'/api/v1/async/products/{self.product.pk}/reviews/')
+        self.assertEqual(data['results'][0]['user_info']['ism'], 'Ism1')
+        tree.TREE.clear()
+        data, queries = self.get('/api/v1/async/categories/tree/')
+        self.assertEqual(data[0]['subcategories'][0]['nomi'], 'Telefonlar')
+        # Snapshot qurilishi: kategoriyalar, subkategoriyalar, ikki xil mahsulotlar soni
+        self.assertEqual(queries, 4)
+        self.assertEqual(self.get('/api/v1/async/categories/tree/'), (data, 0))
+
+    def test_errors(self):
+        response = async_to_sync(self.async_client.get)('/api/v1/async/products/999999/')
+        self.assertEqual(response.status_code, 404)
+        response = async_to_sync(self.async_client.get)('/api/v1/async/products/?cursor=xyz')
+        self.assertEqual(response.status_code, 404)
+        response = async_to_sync(self.async_client.post)('/api/v1/async/products/')
+        self.assertEqual(response.status_code, 405)
+
+    def test_viewer_fields_authenticated(self):
+        data, _ = self.get(f'/api/v1/async/products/{self.product.pk}/')
+        self.assertIsNone(data['is_liked'])
+        async_to_sync(self.async_client.aforce_login)(self.other)
+        data, _ = self.get(f'/api/v1/async/products/{self.product.pk}/')
+        self.assertIs(data['is_liked'], True)
+        data, _ = self.get('/api/v1/async/products/?page_size=10')
+        self.assertEqual([row['id'] for row in data['results'] if row['is_liked']], [self.product.pk])
+
+    def test_throttled(self):
+        throttling.STORE.clear()
+        with throttle_settings(anon='2/min'):
+            for _ in range(2):
+                self.get('/api/v1/async/categories/tree/')
+            response = async_to_sync(self.async_client.get)('/api/v1/async/categories/tree/')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+
+
+def make_image(name='rasm.png', size=(1200, 900), color='red', fmt='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{fmt.lower()}')
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None, IMAGE_VARIANTS_BACKGROUND=False)
+class ImageVariantsTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def media_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, files in os.walk(self.media_root) for name in files
+        )
+
+    def upload(self, product, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            product.rasm = image
+            product.save()
+        product.refresh_from_db()
+        return product
+
+    def test_variants_and_dedup(self):
+        product = self.upload(self.product, make_image())
+        data = product.rasm_variants
+        self.assertEqual(product.rasm.name, f"products/{data['hash']}.png")
+        self.assertEqual((data['width'], data['height']), (1200, 900))
+        self.assertEqual((data['variants']['thumb']['width'], data['variants']['thumb']['height']), (200, 200))
+        self.assertEqual((data['variants']['medium']['width'], data['variants']['medium']['height']), (800, 600))
+        with Image.open(os.path.join(self.media_root, data['variants']['medium']['webp'])) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (800, 600)))
+        files = self.media_files()
+        self.assertEqual(len(files), 5)
+
+        other = Product.objects.create(shop=self.shop, nomi='Boshqa', tavsif='-', narx=1)
+        other = self.upload(other, make_image(name='nusxa.png'))
+        self.assertEqual(other.rasm.name, product.rasm.name)
+        self.assertEqual(other.rasm_variants['variants'], data['variants'])
+        self.assertEqual(self.media_files(), files)
+
+    def test_api_images(self):
+        self.upload(self.product, make_image())
+        response = APIClient().get(f'/api/v1/products/{self.product.pk}/')
+        result = response.data['images']
+        self.assertEqual(result['original']['width'], 1200)
+        self.assertTrue(result['thumb']['webp'].startswith('http://testserver/media/variants/'))
+        self.assertTrue(result['medium']['jpeg'].endswith('/medium.jpeg'))
+        self.assertIsNone(APIClient().get(f'/api/v1/shops/{self.shop.pk}/').data['images'])
+
+    def test_backfill_command(self):
+        product = self.upload(self.product, make_image(size=(300, 100)))
+        Product.objects.filter(pk=product.pk).update(rasm_variants=None)
+        broken = Product.objects.create(shop=self.shop, nomi='Buzuq', tavsif='-', narx=1)
+        with self.assertLogs('core.images', 'WARNING'):
+            broken = self.upload(broken, SimpleUploadedFile('buzuq.png', b'rasm emas'))
+        self.assertIsNone(broken.rasm_variants)
+
+        out = StringIO()
+        with self.assertLogs('core.images', 'WARNING'):
+            call_command('generate_image_variants', '--model=categoriya.product', stdout=out)
+        self.assertIn("1 ta rasm, 1 ta xato", out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(product.rasm_variants['variants']['medium']['width'], 300)
+        self.assertEqual(product.rasm_variants['source'], product.rasm.name)
+
+    def test_clearing_image_clears_variants(self):
+        product = self.upload(self.product, make_image())
+        product.rasm = None
+        product.save()
+        product.refresh_from_db()
+        self.assertIsNone(product.rasm_variants)
+        self.assertIn(Product, images.REGISTRY)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], DATABASE_REPLICA_LAG_CHECK_INTERVAL=60)
+class ReplicaRoutingTests(TestCase):
+    """Replika aliaslari testda yo'q: faqat yo'naltirish qarorlari tekshiriladi"""
+    router = db_routing.ReplicaRouter()
+    product_list = views.ProductViewSet.as_view({'get': 'list', 'post': 'create'})
+
+    def setUp(self):
+        db_routing.record_lag('replica1', 0.0)
+        db_routing.record_lag('replica2', 0.0)
+
+    def in_request(self, method, view, check):
+        """``check(state)`` -- middleware ochgan so'rov holati ichida"""
+        request = RequestFactory().generic(method, '/')
+        middleware = db_routing.ReplicaRoutingMiddleware(
+            lambda request: middleware.process_view(request, view, (), {}) or check(db_routing.current_state())
+        )
+        return middleware(request)
+
+    def test_safe_requests_read_from_one_replica(self):
+        def check(state):
+            self.assertTrue(state.use_replica)
+            self.assertIn(state.replica, ('replica1', 'replica2'))
+            self.assertEqual(self.router.db_for_read(Product), state.replica)
+            self.assertEqual(self.router.db_for_read(User), state.replica)
+            # Boshqa ilovalar (sessiyalar) -- primary
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+            # Read-your-writes
+            self.assertEqual(self.router.db_for_write(Product), 'default')
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+        self.in_request('GET', self.product_list, check)
+
+    def test_primary_for_writes_other_views_and_outside_requests(self):
+        primary = lambda state: self.assertEqual(self.router.db_for_read(Product), 'default')  # noqa: E731
+        self.in_request('POST', self.product_list, primary)
+        self.in_request('GET', serve, primary)
+        primary(None)
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.in_request('GET', self.product_list, primary)
+
+    def test_cache_and_snapshot_fills_read_primary(self):
+        seen = []
+        snapshot = Snapshot('tests.routing', lambda version: seen.append(self.router.db_for_read(Product)))
+
+        def check(state):
+            snapshot.get()
+            self.assertEqual(seen, ['default'])
+            # Snapshot qurilgandan keyin -- yana replika
+            self.assertEqual(self.router.db_for_read(Product), state.replica)
+            db_routing.use_primary()
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+        self.in_request('GET', self.product_list, check)
+
+        # Javob keshi MISS: view primary'dan o'qiydi (test replikalari mavjud emas)
+        cache.clear()
+        view = views.ProductViewSet.as_view({'get': 'list'})
+        middleware = db_routing.ReplicaRoutingMiddleware(
+            lambda request: middleware.process_view(request, view, (), {}) or view(request)
+        )
+        request = RequestFactory().get('/api/v1/products/')
+        with self.settings(RESPONSE_CACHE_ALIAS='default'):
+            response = middleware(request)
+        self.assertEqual((response.status_code, response['X-Cache']), (200, 'MISS'))
+
+    def test_lag_guard(self):
+        db_routing.record_lag('replica1', 30.0)
+        db_routing.record_lag('replica2', None)
+        self.assertEqual(db_routing.choose_replica(), 'default')
+        db_routing.record_lag('replica2', 1.0)
+        self.assertEqual(db_routing.healthy_replicas(), ['replica2'])
+
+    def test_sqlite_copy_lag(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary, replica = os.path.join(directory, 'primary'), os.path.join(directory, 'replica')
+            for path in (primary, replica):
+                open(path, 'w').close()
+            os.utime(replica, (time.time() - 20, time.time() - 20))
+            # Nusxadan keyin primary o'zgargan: lag -- nusxa yoshi
+            self.assertAlmostEqual(db_routing.file_copy_lag(primary, replica), 20, delta=2)
+            os.utime(primary, (time.time() - 30, time.time() - 30))
+            self.assertEqual(db_routing.file_copy_lag(primary, replica), 0)
+            with self.assertRaises(OSError):
+                db_routing.file_copy_lag(primary, os.path.join(directory, 'missing'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_query_counters(self):
+        cache.clear()
+        db_routing.reset_stats()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/v1/categories/')
+        self.assertGreater(len(ctx.captured_queries), 0)
+        self.assertEqual(db_routing.stats(), {'default': len(ctx.captured_queries)})
+        db_routing.reset_stats()
+        self.assertEqual(db_routing.stats(), {'default': 0})
+
+
+def throttle_settings(**rates):
+    return override_settings(
+        THROTTLE_ENABLED=True,
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates},
+    )
+
+
+@throttle_settings(anon='3/min', user='100/min', likes='2/min')
+class ThrottlingTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        throttling.STORE.clear()
+        self.client = APIClient()
+
+    def test_anon_limit_and_headers(self):
+        remaining = []
+        for _ in range(3):
+            response = self.client.get('/api/v1/categories/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-RateLimit-Limit'], '3')
+            remaining.append(response['X-RateLimit-Remaining'])
+        self.assertEqual(remaining, ['2', '1', '0'])
+        response = self.client.get('/api/v1/categories/')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Boshqa IP -- alohida hisoblagich
+        self.assertEqual(self.client.get('/api/v1/categories/', REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_forwarded_for_is_not_trusted(self):
+        statuses = [
+            self.client.get('/api/v1/categories/', HTTP_X_FORWARDED_FOR=f'10.1.0.{n}').status_code
+            for n in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_login_limited_per_phone(self):
+        url = '/api/v1/auth/users/login/'
+        data = {'telefon': self.user.telefon, 'password': 'xato'}
+        with throttle_settings(anon='100/min', login='2/min'):
+            statuses = [
+                self.client.post(url, data, format='json', REMOTE_ADDR=f'10.2.0.{n}').status_code
+                for n in range(3)
+            ]
+            self.assertEqual(statuses, [400, 400, 429])
+            # Boshqa telefon -- alohida hisoblagich
+            other = {'telefon': self.other.telefon, 'password': 'xato'}
+            self.assertEqual(self.client.post(url, other, format='json', REMOTE_ADDR='10.2.0.9').status_code, 400)
+
+    def test_endpoint_scope(self):
+        self.client.force_authenticate(self.user)
+        url = f'/api/v1/products/{self.product.pk}/toggle-like/'
+        self.assertEqual([self.client.post(url).status_code for _ in range(3)], [200, 200, 429])
+        # Endpoint doirasi boshqa endpointlarga ta'sir qilmaydi
+        response = self.client.get('/api/v1/products/')
+        self.assertEqual((response.status_code, response['X-RateLimit-Limit']), (200, '100'))
+
+    def test_sliding_window(self):
+        hit = throttling.STORE.hit
+        for second in range(4):
+            hit('k', 60, now=6000 + second)
+        # Keyingi oynaning o'rtasida oldingi 4 ta yarmi bilan hisoblanadi
+        count, previous, elapsed = hit('k', 60, now=6090)
+        self.assertEqual((count, previous, elapsed), (1, 4, 0.5))
+        self.assertEqual(throttling.window_state(count, previous, elapsed, 3, 60)[:2], (3.0, 0))
+        estimated, wait, _ = throttling.window_state(3, 4, 0.5, 3, 60)
+        # 4 * (1 - 0.5 - t) + 3 <= 3  ->  t = 0.5 oyna
+        self.assertEqual((estimated, wait), (5.0, 30.0))
+        # Ikki oyna tanaffusdan keyin hisoblagich noldan
+        self.assertEqual(hit('k', 60, now=6250)[:2], (1, 0))
+
+    def test_fails_open(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(THROTTLE_STORE_PATH=directory):
+            statuses = {self.client.get('/api/v1/categories/').status_code for _ in range(5)}
+        self.assertEqual(statuses, {200})
+
+
+class MetricsTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.REGISTRY.clear()
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_view_metrics(self):
+        self.client.get('/api/v1/products/')
+        self.client.get('/api/v1/products/')
+        self.client.get(f'/api/v1/products/{self.product.pk}/')
+        lines = self.scrape()
+        labels = 'view="ProductViewSet",action="list"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels},method="GET"}} 2', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},method="GET",le="+Inf"}} 2', lines)
+        self.assertIn(f'http_responses_total{{{labels},method="GET",status="200"}} 2', lines)
+        self.assertIn(f'http_response_cache_total{{{labels},result="miss"}} 1', lines)
+        self.assertIn(f'http_response_cache_total{{{labels},result="hit"}} 1', lines)
+        # Keshdan berilgan javobda SQL yo'q: 0 bucket'ida bittasi
+        self.assertIn(f'http_request_sql_queries_bucket{{{labels},le="0"}} 1', lines)
+        self.assertIn(f'http_request_sql_queries_count{{{labels}}} 2', lines)
+        self.assertIn(
+            'http_request_sql_queries_count{view="ProductViewSet",action="retrieve"} 1', lines,
+        )
+        self.assertTrue(any(line.startswith(f'http_response_size_bytes_sum{{{labels}}}') for line in lines))
+
+    def test_aggregates_worker_files(self):
+        self.client.get('/api/v1/categories/')
+        other = metrics.metrics_dir() / 'metrics-999999.json'
+        other.write_text(json.dumps({
+            'histograms': [],
+            'counters': [['http_responses_total', [
+                ['view', 'CategoryViewSet'], ['action', 'list'], ['method', 'GET'], ['status', '200'],
+            ], 4]],
+        }))
+        self.assertIn(
+            'http_responses_total{view="CategoryViewSet",action="list",method="GET",status="200"} 5',
+            self.scrape(),
+        )
+
+    def test_slow_logs(self):
+        with self.settings(METRICS_SLOW_REQUEST_MS=0, METRICS_SLOW_QUERY_MS=0), \
+                self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get('/api/v1/categories/')
+        output = '\n'.join(logs.output)
+        self.assertIn('Sekin SQL', output)
+        self.assertIn("Sekin so'rov", output)
+        self.assertIn('[CategoryViewSet.list]', output)
+        self.assertIn('FROM "categoriya_category"', output)
+
+    def test_access(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 403)
+        with self.settings(METRICS_ALLOWED_IPS=None):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+
+class ProfilingTests(CatalogTestMixin, TestCase):
+    def setUp(self):
+        self.staff = make_user(3)
+        self.staff.is_staff = True
+        self.staff.save()
+        self.client = APIClient()
+        self.url = f'/api/v1/shops/{self.shop.pk}/products/'
+
+    def test_json_report(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(self.url + '?_profile=json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Profiled-Status'], '200')
+        report = response.json()
+        self.assertEqual(report['request']['path'], self.url + '?_profile=json')
+        self.assertEqual(report['sql']['count'], len(report['sql']['queries']))
+        self.assertGreater(report['sql']['count'], 0)
+        query = report['sql']['queries'][0]
+        self.assertTrue(query['stack'][0].startswith(('categoriya/', 'core/')))
+        self.assertEqual(query['params'][-1], self.shop.pk)
+        self.assertTrue(report['explain'] and report['explain'][0]['plan'])
+        self.assertTrue(any('views.py' in row['function'] for row in report['profile']))
+
+    def test_wrapper_only_during_profiled_request(self):
+        self.client.get(self.url)
+        self.assertNotIn(profiling._capture_query, connection.execute_wrappers)
+        self.client.force_authenticate(self.staff)
+        self.client.get(self.url + '?_profile=json')
+        self.assertNotIn(profiling._capture_query, connection.execute_wrappers)
+
+    def test_async_report(self):
+        async_to_sync(self.async_client.aforce_login)(self.staff)
+        response = async_to_sync(self.async_client.get)(f'/api/v1/async/products/{self.product.pk}/?_profile=json')
+        report = json.loads(response.content)
+        # mahsulot, sharhlar, likelar, reklamalar (+ sessiya va foydalanuvchi)
+        self.assertGreaterEqual(report['sql']['count'], 4)
+        self.assertNotIn(profiling._capture_query, connection.execute_wrappers)
+
+    def test_header_and_html(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(self.url, HTTP_X_PROFILE='html')
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertIn(b'<h2>EXPLAIN', response.content)
+
+    def test_ignored_for_non_staff(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url + '?_profile=json')
+        self.assertNotIn('X-Profiled-Status', response)
+        self.assertIn('results', response.json())
+
+    def test_duplicates(self):
+        queries = [
+            {'alias': 'default', 'sql': 'SELECT a WHERE id = %s', 'params': [n % 2], 'time_ms': 1.0,
+             'stack': ['categoriya/serializers.py:10 get_x']}
+            for n in range(3)
+        ] + [{'alias': 'default', 'sql': 'SELECT b', 'params': [], 'time_ms': 1.0, 'stack': []}]
+        self.assertEqual(profiling.duplicates(queries), [{
+            'alias': 'default', 'sql': 'SELECT a WHERE id = %s', 'count': 3, 'identical': 1,
+            'time_ms': 3.0, 'call_sites': ['categoriya/serializers.py:10 get_x'],
+        }])
+
+    def test_disabled(self):
+        with self.settings(PROFILING_ENABLED=False), self.assertRaises(MiddlewareNotUsed):
+            profiling.ProfilingMiddleware(lambda request: None)
+
+
+class BenchmarkToolsTests(TestCase):
+    def test_generate_and_benchmark(self):
+        call_command(
+            'generate_catalog', '--users=5', '--shops=3', '--products=40', '--categories=2',
+            '--subcategories=2', '--ads=4', '--batch-size=16', '--search-index', stdout=StringIO(),
+        )
+        self.assertEqual(Product.objects.count(), 40)
+        self.assertEqual(
+            sum(Product.objects.values_list('reviews_count', flat=True)), ProductReview.objects.count(),
+        )
+        out = StringIO()
+        call_command('rebuild_product_stats', '--check', stdout=out)
+
+        report_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(report_dir.cleanup)
+        report_path = os.path.join(report_dir.name, 'report.json')
+        call_command('benchmark_endpoints', '--iterations=2', '--warmup=0', f'--output={report_path}', stdout=StringIO())
+        with open(report_path) as fh:
+            results = json.load(fh)['results']
+        self.assertEqual(results['product-list']['status'], [200])
+        self.assertEqual(results['product-like']['status'], [201])
+        self.assertEqual(results['product-unlike']['status'], [204])
+        self.assertIsNotNone(results['product-list']['p95_ms'])
+        # Yozuvchi so'rovlar rollback qilinadi
+        self.assertFalse(User.objects.filter(username__startswith='benchmark-').exists())
+
+        out = StringIO()
+        call_command('benchmark_nearby', '--min-shops=1', '--queries=3', '--radius=300', stdout=out)
+        self.assertIn("bir xil", out.getvalue())
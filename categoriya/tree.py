@@ -0,0 +1,70 @@
+"""
+Kategoriyalar daraxti snapshot'i (``/api/v1/categories/tree/``).
+
+Kategoriya va subkategoriyalar kam o'zgaradi, lekin ilova har ochilganda
+o'qiladi. Daraxt (subkategoriyalar va mahsulotlar soni bilan) to'rtta so'rov
+bilan quriladi, JSON baytlarga bir marta serializatsiya qilinadi va worker
+xotirasida saqlanadi: keshdagi versiya o'zgarmaguncha javob DB'ga tegmaydi.
+
+Versiyani kategoriya, subkategoriya va mahsulot saqlanishi/o'chirilishi
+(``signals``) hamda signal chaqirmaydigan bulk yozuvlar (import,
+``generate_catalog``) oshiradi.
+"""
+import hashlib
+from dataclasses import dataclass
+
+from django.db.models import Count
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+
+from core.async_db import attach_prefetched
+from core.snapshot import Snapshot
+from .models import Category, Product, SubCategory
+from .serializers import CategoryTreeSerializer
+
+
+@dataclass(frozen=True)
+class CategoryTree:
+    version: int
+    data: tuple
+    content: bytes
+    etag: str
+
+
+def build_tree(version):
+    categories = list(Category.objects.order_by('nomi', 'pk'))
+    subcategories = list(SubCategory.objects.order_by('nomi', 'pk'))
+    # Ikkita alohida GROUP BY: har biri FK indeksini covering skan qiladi
+    # ((category, subcategory) bo'yicha bitta GROUP BY vaqtinchalik B-tree talab qiladi)
+    category_counts = dict(Product.objects.order_by().values_list('category_id').annotate(count=Count('pk')))
+    subcategory_counts = dict(Product.objects.order_by().values_list('subcategory_id').annotate(count=Count('pk')))
+
+    children = {}
+    for subcategory in subcategories:
+        subcategory.products_count = subcategory_counts.get(subcategory.pk, 0)
+        children.setdefault(subcategory.category_id, []).append(subcategory)
+    for category in categories:
+        category.products_count = category_counts.get(category.pk, 0)
+        category.subcategories_count = len(children.get(category.pk, []))
+        attach_prefetched(category, 'subcategories', children.get(category.pk, []))
+
+    data = tuple(CategoryTreeSerializer(categories, many=True).data)
+    content = JSONRenderer().render(data)
+    return CategoryTree(
+        version=version, data=data, content=content,
+        etag=f'"{hashlib.sha1(content).hexdigest()[:32]}"',
+    )
+
+
+TREE = Snapshot('categoriya.tree', build_tree)
+
+
+def tree_response(request, tree):
+    """Tayyor baytlardan javob; ``If-None-Match`` mos kelsa 304"""
+    http_request = getattr(request, '_request', request)
+    response = get_conditional_response(http_request, etag=tree.etag)
+    if response is None:
+        response = HttpResponse(tree.content, content_type='application/json')
+    response['ETag'] = tree.etag
+    return response
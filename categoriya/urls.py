@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     CategoryViewSet, SubCategoryViewSet, ShopViewSet,
     ProductViewSet, ProductReviewViewSet, ProductLikeViewSet,
-    AdvertisementViewSet
+    AdvertisementViewSet, SearchViewSet, HomeViewSet
 )
 
 router = DefaultRouter()
@@ -14,7 +15,19 @@ router.register(r'products', ProductViewSet, basename='product')
 router.register(r'reviews', ProductReviewViewSet, basename='review')
 router.register(r'likes', ProductLikeViewSet, basename='like')
 router.register(r'advertisements', AdvertisementViewSet, basename='advertisement')
+router.register(r'search', SearchViewSet, basename='search')
+router.register(r'home', HomeViewSet, basename='home')
+
+# Async (ASGI) o'qish endpointlari
+async_urlpatterns = [
+    path('products/', async_views.product_list, name='async-product-list'),
+    path('products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('products/<int:pk>/reviews/', async_views.product_reviews, name='async-product-reviews'),
+    path('shops/<int:pk>/products/', async_views.shop_products, name='async-shop-products'),
+    path('categories/tree/', async_views.category_tree, name='async-category-tree'),
+]
 
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
 ]
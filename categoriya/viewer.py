@@ -0,0 +1,79 @@
+"""
+Joriy foydalanuvchiga bog'liq mahsulot maydonlari: ``is_liked`` va ``my_rating``.
+
+Sahifadagi barcha mahsulotlar uchun ikkita so'rov -- ``ProductLike`` va
+``ProductReview`` ga bittadan ``product_id IN (...)``. Natija so'rov (request)
+obyektida saqlanadi: ETag hisoblashda o'qilgan holat serializatsiyada qayta
+so'ralmaydi. Anonim foydalanuvchi uchun maydonlar ``null`` (javob keshi faqat
+anonim javoblarni saqlaydi, shuning uchun keshga foydalanuvchi holati tushmaydi).
+Umumiy keshga yoziladigan natija serializer kontekstida ``shared=True`` bilan
+quriladi: maydonlar ``null``, foydalanuvchi holati keyin ``overlay`` bilan qo'shiladi.
+"""
+from .models import ProductLike, ProductReview
+
+
+def _user(request):
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def viewer_state(request, product_ids):
+    """``{product_id: (is_liked, my_rating)}``; anonim bo'lsa None"""
+    user = _user(request)
+    if user is None:
+        return None
+    # Detail ETag'i URL'dagi pk (satr) bilan chaqiradi
+    product_ids = [int(pk) for pk in product_ids]
+    http_request = getattr(request, '_request', request)
+    cache = http_request.__dict__.setdefault('_viewer_state', {})
+    missing = [pk for pk in product_ids if pk not in cache]
+    if missing:
+        liked = set(
+            ProductLike.objects.filter(user=user, product_id__in=missing).values_list('product_id', flat=True)
+        )
+        ratings = {}
+        # Bir nechta sharh bo'lsa eng oxirgisining bahosi
+        reviews = (
+            ProductReview.objects.filter(user=user, product_id__in=missing)
+            .order_by('yaratilgan_vaqt', 'pk').values_list('product_id', 'yulduz')
+        )
+        for product_id, yulduz in reviews:
+            ratings[product_id] = yulduz
+        for pk in missing:
+            cache[pk] = (pk in liked, ratings.get(pk))
+    return {pk: cache[pk] for pk in product_ids}
+
+
+def _context_state(context, product_ids):
+    if context.get('shared'):
+        return None
+    return viewer_state(context.get('request'), product_ids)
+
+
+def is_liked_map(context, product_ids):
+    state = _context_state(context, product_ids)
+    return {} if state is None else {pk: liked for pk, (liked, _) in state.items()}
+
+
+def my_rating_map(context, product_ids):
+    state = _context_state(context, product_ids)
+    return {} if state is None else {pk: rating for pk, (_, rating) in state.items()}
+
+
+def overlay(request, items):
+    """
+    ``shared`` kontekstda serializatsiya qilingan mahsulot lug'atlariga joriy
+    foydalanuvchi holatini qo'yadi (yangi lug'atlar; anonim bo'lsa o'zgarishsiz).
+    """
+    state = viewer_state(request, {item['id'] for item in items})
+    if state is None:
+        return items
+    return [{**item, 'is_liked': state[item['id']][0], 'my_rating': state[item['id']][1]} for item in items]
+
+
+def etag_part(request, product_ids):
+    """Shartli GET uchun: foydalanuvchi like/baho qo'ysa ETag ham o'zgaradi"""
+    state = viewer_state(request, product_ids)
+    if state is None:
+        return None
+    return (request.user.pk, sorted((pk, value) for pk, value in state.items() if value != (False, None)))
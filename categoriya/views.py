@@ -1,23 +1,87 @@
+import math
+
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from core.conditional import ConditionalGetMixin
+from core.eager_loading import EagerLoadingMixin, plan_queryset
+from core.pagination import DistancePagination, NestedListMixin
+from core.response_cache import ResponseCacheMixin
 from .models import (
     Category, SubCategory, Shop, Product, 
-    Advertisement, ProductReview, ProductLike
+    Advertisement, ProductReview, ProductLike, SearchDocument
 )
+from . import geo, home, likes, price_history, pricing, search, tree
+from . import export as catalog_export
+from .importer import ImportFileError, detect_format, import_products
 from .serializers import (
     CategorySerializer, SubCategorySerializer, ShopSerializer,
     ProductSerializer, ProductDetailSerializer, AdvertisementSerializer,
-    ProductReviewSerializer, ProductLikeSerializer
+    ProductReviewSerializer, ProductLikeSerializer,
+    NearbyShopSerializer, NearbyProductSerializer, BulkPriceUpdateSerializer,
+    PriceHistoryQuerySerializer, PricePointSerializer, PricePeriodSerializer
 )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+NEARBY_PARAMETERS = [
+    openapi.Parameter('lat', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True),
+    openapi.Parameter('lng', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True),
+    openapi.Parameter('radius', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                      description=f"Radius, km (standart {geo.DEFAULT_RADIUS_KM}, ko'pi bilan {geo.MAX_RADIUS_KM})"),
+    openapi.Parameter('k', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                      description="Eng yaqin k ta natija (radius bu holatda maksimal chegara)"),
+]
+
+
+def _number_param(params, name, default=None, minimum=None, maximum=None, cast=float):
+    value = params.get(name)
+    if value in (None, ''):
+        if default is None:
+            raise ValidationError({name: "Majburiy parametr"})
+        return default
+    try:
+        value = cast(value)
+    except ValueError:
+        raise ValidationError({name: "Son bo'lishi kerak"})
+    # float('nan') har qanday taqqoslashda False -- oraliq tekshiruvidan o'tib ketadi
+    if not math.isfinite(value):
+        raise ValidationError({name: "Chekli son bo'lishi kerak"})
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValidationError({name: f"{minimum} va {maximum} oralig'ida bo'lishi kerak"})
+    return value
+
+
+def nearby_params(request):
+    """``(lat, lng, radius_km, k)``; ``k`` berilmasa ``None``"""
+    params = request.query_params
+    lat = _number_param(params, 'lat', minimum=-90, maximum=90)
+    lng = _number_param(params, 'lng', minimum=-180, maximum=180)
+    k = _number_param(params, 'k', default=0, minimum=1, maximum=1000, cast=int) or None
+    default_radius = geo.MAX_RADIUS_KM if k else geo.DEFAULT_RADIUS_KM
+    radius = _number_param(params, 'radius', default=default_radius, minimum=0.01, maximum=geo.MAX_RADIUS_KM)
+    return lat, lng, radius, k
+
+
+def nearby_queryset(queryset, request, prefix=''):
+    lat, lng, radius, k = nearby_params(request)
+    if k:
+        return geo.nearest(queryset, lat, lng, k, max_radius_km=radius, prefix=prefix)
+    return geo.within(queryset, lat, lng, radius, prefix=prefix)
+
+
+class CategoryViewSet(ResponseCacheMixin, ConditionalGetMixin, NestedListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Kategoriya CRUD operations
     
@@ -34,6 +98,28 @@ class CategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['nomi', 'tavsif']
     ordering_fields = ['nomi']
     ordering = ['nomi']
+    cache_action_serializers = {
+        'subcategories': SubCategorySerializer,
+        'products': ProductSerializer,
+    }
+    throttle_scopes = {'subcategories': 'lists'}
+
+    def is_response_cacheable(self, request):
+        # Daraxt o'zining jarayon ichidagi snapshot'idan beriladi
+        return self.action != 'tree' and super().is_response_cacheable(request)
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description=(
+            "Butun kategoriyalar daraxti bitta so'rovda: subkategoriyalar, subkategoriya va "
+            "mahsulotlar soni bilan. Worker xotirasidagi snapshot'dan (DB so'rovisiz), "
+            "`If-None-Match` bilan 304."
+        ),
+    )
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """Kategoriyalar daraxtini qaytaradi"""
+        return tree.tree_response(request, tree.TREE.get())
     
     @swagger_auto_schema(
         method='get',
@@ -43,7 +129,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def subcategories(self, request, pk=None):
         """Kategoriyaning barcha subkategoriyalarini qaytaradi"""
         category = self.get_object()
-        subcategories = category.subcategories.all()
+        subcategories = self.eager_load(category.subcategories.all(), SubCategorySerializer)
         serializer = SubCategorySerializer(subcategories, many=True)
         return Response(serializer.data)
     
@@ -55,21 +141,20 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def products(self, request, pk=None):
         """Kategoriyaga tegishli barcha mahsulotlarni qaytaradi"""
         category = self.get_object()
-        products = category.products.all()
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        return self.nested_list_response(category.products.all(), ProductSerializer)
 
 
-class SubCategoryViewSet(viewsets.ModelViewSet):
+class SubCategoryViewSet(ResponseCacheMixin, ConditionalGetMixin, NestedListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     SubKategoriya CRUD operations
     """
-    queryset = SubCategory.objects.all()
+    queryset = SubCategory.objects.order_by('-id')
     serializer_class = SubCategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['category']
     search_fields = ['nomi', 'tavsif']
+    cache_action_serializers = {'products': ProductSerializer}
     
     @swagger_auto_schema(
         method='get',
@@ -79,12 +164,10 @@ class SubCategoryViewSet(viewsets.ModelViewSet):
     def products(self, request, pk=None):
         """Subkategoriyaga tegishli barcha mahsulotlarni qaytaradi"""
         subcategory = self.get_object()
-        products = subcategory.products.all()
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        return self.nested_list_response(subcategory.products.all(), ProductSerializer)
 
 
-class ShopViewSet(viewsets.ModelViewSet):
+class ShopViewSet(ResponseCacheMixin, ConditionalGetMixin, NestedListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Do'kon CRUD operations
     
@@ -102,6 +185,7 @@ class ShopViewSet(viewsets.ModelViewSet):
     search_fields = ['kompaniya_nomi', 'brend_nomi', 'bizness_manzili']
     ordering_fields = ['yaratilgan_vaqt', 'kompaniya_nomi']
     ordering = ['-yaratilgan_vaqt']
+    cache_action_serializers = {'products': ProductSerializer, 'nearby': NearbyShopSerializer}
     
     @swagger_auto_schema(
         method='get',
@@ -118,11 +202,53 @@ class ShopViewSet(viewsets.ModelViewSet):
         if has_discount is not None:
             products = products.filter(chegirma_bormi=has_discount.lower() == 'true')
         
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        return self.nested_list_response(products, ProductSerializer)
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Nuqtaga yaqin do'konlar (masofa bo'yicha saralangan)",
+        manual_parameters=NEARBY_PARAMETERS,
+    )
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Berilgan nuqtaga yaqin do'konlarni qaytaradi"""
+        shops = nearby_queryset(Shop.objects.all(), request)
+        return self.nested_list_response(shops, NearbyShopSerializer, DistancePagination)
 
+    @swagger_auto_schema(
+        method='post',
+        operation_description=(
+            "Mahsulotlarni CSV yoki JSONL fayldan ommaviy import qilish. Ustunlar: sku, nomi, "
+            "tavsif, narx, chegirma_narx, chegirma_bormi, category, subcategory (ID yoki nomi). "
+            "SKU bo'yicha mavjud mahsulot yangilanadi. Xato qatorlar hisobotda qaytadi."
+        ),
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter('format', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=['csv', 'jsonl']),
+            openapi.Parameter('dry_run', openapi.IN_FORM, type=openapi.TYPE_BOOLEAN,
+                              description="Faqat tekshirish, hech narsa yozilmaydi"),
+        ],
+    )
+    @action(detail=True, methods=['post'], url_path='import-products',
+            permission_classes=[IsAuthenticated], parser_classes=[MultiPartParser])
+    def import_products(self, request, pk=None):
+        """Do'kon mahsulotlarini fayldan import qiladi"""
+        shop = self.get_object()
+        if shop.foydalanuvchi_id != request.user.pk and not request.user.is_staff:
+            raise PermissionDenied("Faqat do'kon egasi mahsulot import qila oladi")
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': "Fayl yuborilmagan"})
+        dry_run = request.data.get('dry_run', '').lower() in ('1', 'true')
+        try:
+            format = detect_format(upload.name, request.data.get('format'))
+            result = import_products(shop, upload, format, dry_run=dry_run)
+        except ImportFileError as exc:
+            raise ValidationError({'file': str(exc)})
+        return Response(result.as_dict())
 
-class ProductViewSet(viewsets.ModelViewSet):
+
+class ProductViewSet(ResponseCacheMixin, ConditionalGetMixin, NestedListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Mahsulot CRUD operations
     
@@ -132,13 +258,19 @@ class ProductViewSet(viewsets.ModelViewSet):
     update: Mahsulot ma'lumotini yangilash
     destroy: Mahsulotni o'chirish
     """
-    queryset = Product.objects.select_related('shop', 'category', 'subcategory').all()
+    queryset = Product.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['shop', 'category', 'subcategory', 'chegirma_bormi']
     search_fields = ['nomi', 'tavsif']
     ordering_fields = ['yaratilgan_vaqt', 'narx', 'nomi']
     ordering = ['-yaratilgan_vaqt']
+    cache_action_serializers = {
+        'reviews': ProductReviewSerializer,
+        'nearby_discounted': NearbyProductSerializer,
+    }
+    # core.throttling endpoint doiralari
+    throttle_scopes = {'like': 'likes', 'unlike': 'likes', 'toggle_like': 'likes', 'export': 'lists'}
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -152,10 +284,130 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def discounted(self, request):
         """Chegirmadagi mahsulotlarni qaytaradi"""
-        products = self.queryset.filter(chegirma_bormi=True)
-        serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+        products = Product.objects.filter(chegirma_bormi=True)
+        return self.nested_list_response(products, ProductSerializer)
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Yaqin atrofdagi chegirmalar (do'kongacha masofa bo'yicha)",
+        manual_parameters=NEARBY_PARAMETERS,
+    )
+    @action(detail=False, methods=['get'], url_path='nearby-discounted')
+    def nearby_discounted(self, request):
+        """Nuqtaga yaqin do'konlardagi chegirmali mahsulotlarni qaytaradi"""
+        products = nearby_queryset(Product.objects.filter(chegirma_bormi=True), request, prefix='shop__')
+        return self.nested_list_response(products, NearbyProductSerializer, DistancePagination)
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description=(
+            "Butun (filtrlangan) katalog bitta oqimda: NDJSON yoki CSV. "
+            "`Accept-Encoding: gzip` bo'lsa siqilgan holda. Keyingi inkremental "
+            "eksport uchun `updated_since` = javobdagi `X-Export-Watermark`."
+        ),
+        manual_parameters=[
+            openapi.Parameter('format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(catalog_export.FORMATS)),
+            openapi.Parameter('updated_since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="ISO 8601 sana/vaqt: shundan keyin o'zgarganlar"),
+        ],
+    )
+    @action(detail=False, methods=['get'], renderer_classes=[catalog_export.NDJSONRenderer, catalog_export.CSVRenderer])
+    def export(self, request, format=None):
+        """Katalogni NDJSON/CSV oqim sifatida qaytaradi"""
+        watermark = catalog_export.watermark()
+        filterset = catalog_export.ProductExportFilter(request.query_params, queryset=Product.objects.all())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        output = request.accepted_renderer.format
+        compress = catalog_export.accepts_gzip(request)
+        chunks = catalog_export.stream(
+            filterset.qs, output, compress=compress,
+            media_url=request.build_absolute_uri(settings.MEDIA_URL),
+        )
+        if isinstance(request._request, ASGIRequest):
+            chunks = catalog_export.aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=catalog_export.CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="products.{output}"'
+        response['X-Export-Watermark'] = watermark
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
     
+    @swagger_auto_schema(
+        method='get',
+        operation_description=(
+            "Mahsulot narxi tarixi. `resolution=raw` -- har bir o'zgarish (ko'pi bilan "
+            f"{price_history.MAX_RAW_POINTS} ta), `hour`/`day`/`week`/`month` -- har bir davr "
+            "uchun amaldagi narxning min/max'i. `start_price` -- `from` paytida amalda bo'lgan narx."
+        ),
+        query_serializer=PriceHistoryQuerySerializer,
+    )
+    @action(detail=True, methods=['get'], url_path='price-history')
+    def price_history(self, request, pk=None):
+        """Narx tarixini (ixtiyoriy davr bo'yicha siqilgan) qaytaradi"""
+        product_pk = self._product_pk()
+        if not Product.objects.filter(pk=product_pk).exists():
+            raise NotFound()
+        query = PriceHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        start, end, resolution = (query.validated_data[key] for key in ('start', 'end', 'resolution'))
+
+        rows = price_history.points(product_pk, start, end, resolution)
+        start_price = price_history.price_at(product_pk, start)
+        if resolution == 'raw':
+            if len(rows) > price_history.MAX_RAW_POINTS:
+                raise ValidationError({'resolution': "Oraliqda o'zgarishlar juda ko'p: resolution=day kabi davr bering"})
+            prices = [price_history.effective_price(row['narx'], row['chegirma_narx']) for row in rows]
+            points = PricePointSerializer(rows, many=True).data
+        else:
+            prices = [row['min_price'] for row in rows]
+            points = PricePeriodSerializer(rows, many=True).data
+        if start_price:
+            prices.append(price_history.effective_price(start_price['narx'], start_price['chegirma_narx']))
+        return Response({
+            'product': product_pk,
+            'from': start,
+            'to': end,
+            'resolution': resolution,
+            'start_price': start_price and PricePointSerializer(start_price).data,
+            'min_price': format(min(prices), '.2f') if prices else None,
+            'points': points,
+        })
+
+    @swagger_auto_schema(
+        method='post',
+        operation_description=(
+            "Ko'p mahsulot narxini bitta so'rovda o'zgartirish: `items` ro'yxati "
+            f"(ko'pi bilan {pricing.MAX_ITEMS} ta) yoki `rule` -- do'kon (ixtiyoriy "
+            "kategoriya/subkategoriya) mahsulotlariga foizli chegirma. Faqat do'kon egasi. "
+            "Bitta xato bo'lsa hech narsa o'zgarmaydi."
+        ),
+        request_body=BulkPriceUpdateSerializer,
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-update', permission_classes=[IsAuthenticated])
+    def bulk_update(self, request):
+        """Narx/chegirmalarni ommaviy o'zgartiradi"""
+        serializer = BulkPriceUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if 'items' in serializer.validated_data:
+            try:
+                result = pricing.apply_item_changes(request.user, serializer.validated_data['items'])
+            except pricing.PriceChangeError as exc:
+                raise ValidationError({'items': {str(pk): errors for pk, errors in exc.errors.items()}})
+            return Response(result)
+
+        rule = serializer.validated_data['rule']
+        if not pricing.can_manage(request.user, rule['shop'].foydalanuvchi_id):
+            raise PermissionDenied("Faqat do'kon egasi narxni o'zgartira oladi")
+        products = Product.objects.filter(shop=rule['shop'])
+        for field in ('category', 'subcategory'):
+            if rule.get(field):
+                products = products.filter(**{field: rule[field]})
+        updated = pricing.apply_discount(products, rule['discount_percent'], discount_campaign=None)
+        matched = products.count()
+        return Response({'matched': matched, 'updated': updated, 'unchanged': matched - updated})
+
     @swagger_auto_schema(
         method='post',
         operation_description="Mahsulotni like qilish",
@@ -167,11 +419,10 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
         """Mahsulotni like qilish"""
-        product = self.get_object()
-        like, created = ProductLike.objects.get_or_create(
-            product=product,
-            user=request.user
-        )
+        try:
+            created = likes.like(self._product_pk(), request.user.pk)
+        except Product.DoesNotExist:
+            raise NotFound()
         if created:
             return Response({'status': 'like qo\'shildi'}, status=status.HTTP_201_CREATED)
         return Response({'status': 'allaqachon like qilgansiz'}, status=status.HTTP_400_BAD_REQUEST)
@@ -183,14 +434,31 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['delete'], permission_classes=[IsAuthenticated])
     def unlike(self, request, pk=None):
         """Mahsulotdan like ni olib tashlash"""
-        product = self.get_object()
-        try:
-            like = ProductLike.objects.get(product=product, user=request.user)
-            like.delete()
+        if likes.unlike(self._product_pk(), request.user.pk):
             return Response({'status': 'like olib tashlandi'}, status=status.HTTP_204_NO_CONTENT)
-        except ProductLike.DoesNotExist:
-            return Response({'status': 'like topilmadi'}, status=status.HTTP_404_NOT_FOUND)
-    
+        return Response({'status': 'like topilmadi'}, status=status.HTTP_404_NOT_FOUND)
+
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Like holatini almashtirish: yangi holat va likelar soni qaytadi",
+        responses={200: openapi.Response('{"liked": true, "likes_count": 12}')},
+    )
+    @action(detail=True, methods=['post'], url_path='toggle-like', permission_classes=[IsAuthenticated])
+    def toggle_like(self, request, pk=None):
+        """Like qo'yadi yoki olib tashlaydi"""
+        try:
+            liked, count = likes.toggle(self._product_pk(), request.user.pk)
+        except Product.DoesNotExist:
+            raise NotFound()
+        return Response({'liked': liked, 'likes_count': count})
+
+    def _product_pk(self):
+        # Mahsulot o'qilmaydi: like yo'li bitta SQL so'rov bilan ishlaydi
+        try:
+            return int(self.kwargs['pk'])
+        except ValueError:
+            raise NotFound()
+
     @swagger_auto_schema(
         method='get',
         operation_description="Mahsulotning barcha sharhlarini ko'rish"
@@ -199,49 +467,158 @@ class ProductViewSet(viewsets.ModelViewSet):
     def reviews(self, request, pk=None):
         """Mahsulotning barcha sharhlarini qaytaradi"""
         product = self.get_object()
-        reviews = product.reviews.all().order_by('-yaratilgan_vaqt')
-        serializer = ProductReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        return self.nested_list_response(product.reviews.all(), ProductReviewSerializer)
 
 
-class ProductReviewViewSet(viewsets.ModelViewSet):
+class ProductReviewViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Mahsulot sharhlari CRUD operations
     """
-    queryset = ProductReview.objects.select_related('product', 'user').all()
+    queryset = ProductReview.objects.all()
     serializer_class = ProductReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['product', 'user', 'yulduz']
     ordering_fields = ['yaratilgan_vaqt', 'yulduz']
     ordering = ['-yaratilgan_vaqt']
+    throttle_scopes = {'create': 'reviews'}
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class ProductLikeViewSet(viewsets.ModelViewSet):
+class ProductLikeViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Mahsulot likelari CRUD operations
     """
-    queryset = ProductLike.objects.select_related('product', 'user').all()
+    queryset = ProductLike.objects.all()
     serializer_class = ProductLikeSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['product', 'user']
+    ordering_fields = ['yaratilgan_vaqt']
+    ordering = ['-id']
+    throttle_scopes = {'create': 'likes'}
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class AdvertisementViewSet(viewsets.ModelViewSet):
+class AdvertisementViewSet(ResponseCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     Reklama CRUD operations
     """
-    queryset = Advertisement.objects.select_related('product').all()
+    queryset = Advertisement.objects.order_by('-id')
     serializer_class = AdvertisementSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['product']
     search_fields = ['tavsif']
 
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Mahsulot, do'kon va kategoriyalar bo'yicha reytingli qidiruv.
+
+    Kirill/lotin yozuvi va tutuq belgisi variantlari bir xil deb qaraladi
+    ("телефон" == "telefon", "oʻzbek" == "o'zbek").
+    """
+    permission_classes = [AllowAny]
+    page_size = 20
+    max_page_size = 100
+    search_models = {
+        SearchDocument.KIND_PRODUCT: (Product, ProductSerializer),
+        SearchDocument.KIND_SHOP: (Shop, ShopSerializer),
+        SearchDocument.KIND_CATEGORY: (Category, CategorySerializer),
+    }
+
+    def _int_param(self, name, default):
+        try:
+            return int(self.request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: "Butun son bo'lishi kerak"})
+
+    @swagger_auto_schema(
+        operation_description="Mahsulot, do'kon va kategoriyalar bo'yicha qidiruv",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('type', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="product,shop,category (vergul bilan)"),
+            openapi.Parameter('category', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('shop', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('chegirma_bormi', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+        ]
+    )
+    def list(self, request):
+        params = request.query_params
+        query = params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': "Qidiruv so'zi kiritilmagan"})
+
+        kinds = [kind for kind in params.get('type', '').split(',') if kind in self.search_models]
+        filters = {}
+        if 'category' in params:
+            filters['category_id'] = self._int_param('category', None)
+        if 'shop' in params:
+            filters['shop_id'] = self._int_param('shop', None)
+        if 'chegirma_bormi' in params:
+            filters['chegirma_bormi'] = params['chegirma_bormi'].lower() in ('true', '1')
+        if filters:
+            # Filtrlar faqat mahsulotlarga tegishli
+            kinds = [SearchDocument.KIND_PRODUCT]
+
+        page = max(1, self._int_param('page', 1))
+        page_size = max(1, min(self._int_param('page_size', self.page_size), self.max_page_size))
+        hits = search.search(
+            query, kinds=kinds or None, filters=filters,
+            limit=page_size + 1, offset=(page - 1) * page_size,
+        )
+        has_next = len(hits) > page_size
+        hits = hits[:page_size]
+
+        context = {'request': request, 'view': self}
+        data = {}
+        for kind, (model, serializer_class) in self.search_models.items():
+            ids = [object_id for hit_kind, object_id, _ in hits if hit_kind == kind]
+            if ids:
+                objects = plan_queryset(model.objects.filter(pk__in=ids), serializer_class)
+                for item in serializer_class(objects, many=True, context=context).data:
+                    data[(kind, item['id'])] = item
+
+        results = [
+            {'type': kind, 'score': round(score, 4), 'object': data[(kind, object_id)]}
+            for kind, object_id, score in hits if (kind, object_id) in data
+        ]
+        next_link = None
+        if has_next:
+            next_link = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+        return Response({'next': next_link, 'results': results})
+
+
+class HomeViewSet(viewsets.ViewSet):
+    """
+    Bosh sahifa: reklamalar, chegirmalar, kategoriyalar, yangi va eng yuqori
+    baholangan mahsulotlar bitta javobda (bo'limlar parallel quriladi va
+    alohida keshlanadi).
+    """
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Bosh sahifa bo'limlari. `?<bo'lim>=n` -- bo'limdagi elementlar soni "
+            f"(0 -- bo'limsiz, ko'pi bilan {home.MAX_LIMIT}). DEBUG yoki staff uchun "
+            "`Server-Timing` sarlavhasida har bir bo'limning vaqti (ms) va kesh holati."
+        ),
+        manual_parameters=[
+            openapi.Parameter(section.name, openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description=f"Standart {section.default_limit}")
+            for section in home.SECTIONS
+        ],
+    )
+    def list(self, request):
+        data, timings = home.home(request, home.section_limits(request.query_params))
+        response = Response(data)
+        if settings.DEBUG or request.user.is_staff:
+            response['Server-Timing'] = home.server_timing(timings)
+        return response
@@ -0,0 +1,128 @@
+"""
+API'ning asosiy (kanonik) GET so'rovlari katalogi.
+
+``explain_queries`` va benchmark buyruqlari shu ro'yxatdan foydalanadi, shuning
+uchun yangi endpoint yoki filtr qo'shilganda uni shu yerga ham qo'shish kerak.
+Detail URL'lar uchun ID'lar mavjud ma'lumotlardan olinadi: eng ko'p
+mahsulotli do'kon, eng ko'p sharhli mahsulot va hokazo -- sekin holatlar aynan
+shularda ko'rinadi.
+"""
+from dataclasses import dataclass
+
+from django.db.models import Count
+
+
+@dataclass(frozen=True)
+class CatalogRequest:
+    name: str
+    url: str
+    auth: bool = False
+    # EXPLAIN tahlilida kutilgan (ruxsat etilgan) muammo prefikslari
+    allow: tuple = ()
+    method: str = 'get'
+    data: dict = None
+
+
+def _busiest(model, related, fallback_order='-pk'):
+    """``related`` bo'yicha eng ko'p bog'langan obyekt ID'si"""
+    pk = (
+        model.objects.annotate(n=Count(related)).order_by('-n', fallback_order)
+        .values_list('pk', flat=True).first()
+    )
+    return pk
+
+
+def canonical_requests():
+    from categoriya.models import Category, Product, Shop, SubCategory
+    from user.models import User
+
+    shop = _busiest(Shop, 'products')
+    category = _busiest(Category, 'products')
+    subcategory = _busiest(SubCategory, 'products')
+    product = _busiest(Product, 'reviews')
+    user = _busiest(User, 'shops')
+
+    requests = [
+        CatalogRequest('product-list', '/api/v1/products/'),
+        CatalogRequest('product-list-nocount', '/api/v1/products/?count=false'),
+        CatalogRequest('product-list-cursor', '/api/v1/products/?cursor='),
+        CatalogRequest('product-list-price', '/api/v1/products/?ordering=narx'),
+        CatalogRequest('product-list-discounted', '/api/v1/products/?chegirma_bormi=true'),
+        CatalogRequest('product-discounted', '/api/v1/products/discounted/'),
+        CatalogRequest('shop-list', '/api/v1/shops/'),
+        CatalogRequest('category-list', '/api/v1/categories/'),
+        CatalogRequest('subcategory-list', '/api/v1/subcategories/'),
+        CatalogRequest('review-list', '/api/v1/reviews/'),
+        CatalogRequest('like-list', '/api/v1/likes/'),
+        CatalogRequest('advertisement-list', '/api/v1/advertisements/'),
+        # Reyting bo'yicha saralash faqat mos kelgan hujjatlar ustida bajariladi
+        CatalogRequest('search', '/api/v1/search/?q=telefon', allow=('temp sort',)),
+        CatalogRequest('user-list', '/api/v1/auth/users/', auth=True),
+        CatalogRequest('user-me', '/api/v1/auth/users/me/', auth=True),
+    ]
+    point = Shop.objects.exclude(geo_cell=None).values_list('latitude', 'longitude').order_by('pk').first()
+    if point:
+        lat, lng = point
+        requests += [
+            # Masofa bo'yicha saralash faqat radius ichidagi nomzodlar ustida
+            CatalogRequest('shop-nearby', f'/api/v1/shops/nearby/?lat={lat}&lng={lng}&radius=10', allow=('temp sort',)),
+            CatalogRequest('shop-nearby-knn', f'/api/v1/shops/nearby/?lat={lat}&lng={lng}&k=10', allow=('temp sort',)),
+            CatalogRequest(
+                'product-nearby-discounted', f'/api/v1/products/nearby-discounted/?lat={lat}&lng={lng}&radius=10',
+                allow=('temp sort',),
+            ),
+        ]
+    if shop:
+        requests += [
+            CatalogRequest('product-list-shop', f'/api/v1/products/?shop={shop}'),
+            CatalogRequest('shop-detail', f'/api/v1/shops/{shop}/'),
+            CatalogRequest('shop-products', f'/api/v1/shops/{shop}/products/'),
+            CatalogRequest('shop-products-discounted', f'/api/v1/shops/{shop}/products/?has_discount=true'),
+        ]
+    if category:
+        requests += [
+            CatalogRequest('product-list-category', f'/api/v1/products/?category={category}'),
+            CatalogRequest('product-list-category-price', f'/api/v1/products/?category={category}&ordering=narx'),
+            CatalogRequest('category-detail', f'/api/v1/categories/{category}/'),
+            CatalogRequest('category-subcategories', f'/api/v1/categories/{category}/subcategories/'),
+            CatalogRequest('category-products', f'/api/v1/categories/{category}/products/'),
+        ]
+    if subcategory:
+        requests += [
+            CatalogRequest('subcategory-products', f'/api/v1/subcategories/{subcategory}/products/'),
+        ]
+    if product:
+        requests += [
+            CatalogRequest('product-detail', f'/api/v1/products/{product}/'),
+            CatalogRequest('product-reviews', f'/api/v1/products/{product}/reviews/'),
+            CatalogRequest('review-list-product', f'/api/v1/reviews/?product={product}'),
+            CatalogRequest('like-list-product', f'/api/v1/likes/?product={product}'),
+        ]
+    if user:
+        requests += [
+            CatalogRequest('user-detail', f'/api/v1/auth/users/{user}/', auth=True),
+            CatalogRequest('user-shops', f'/api/v1/auth/users/{user}/shops/', auth=True),
+        ]
+    return requests
+
+
+def write_requests():
+    """
+    Yozuvchi endpointlar. Benchmark ularni ro'yxat tartibida (like -> unlike)
+    bitta tranzaksiya ichida bajarib, keyin orqaga qaytaradi (rollback),
+    shuning uchun ma'lumotlar o'zgarmaydi. ``data`` ga so'rov yuboruvchi
+    foydalanuvchi ID'si (``user``) benchmark tomonidan qo'shiladi.
+    """
+    from categoriya.models import Product
+
+    product = Product.objects.order_by('-likes_count', 'pk').values_list('pk', flat=True).first()
+    if not product:
+        return []
+    return [
+        CatalogRequest('product-like', f'/api/v1/products/{product}/like/', auth=True, method='post'),
+        CatalogRequest('product-unlike', f'/api/v1/products/{product}/unlike/', auth=True, method='delete'),
+        CatalogRequest(
+            'review-create', '/api/v1/reviews/', auth=True, method='post',
+            data={'product': product, 'tavsif': 'Benchmark', 'yulduz': 5},
+        ),
+    ]
@@ -0,0 +1,136 @@
+"""
+Async view'lar uchun yordamchilar (Django async ORM ustida).
+
+* ``alist`` -- querysetni ``aiterator`` bilan o'qiydi (prefetch ham ishlaydi).
+* ``gather_lists`` -- bir-biriga bog'liq bo'lmagan querysetlarni bir vaqtda
+  o'qiydi. Django'ning async ORM metodlari so'rovning yagona DB oqimida
+  navbat bilan bajariladi, shuning uchun haqiqiy parallellik uchun har bir
+  queryset alohida oqimda (o'z ulanishi bilan) o'qiladi. Ulanish tranzaksiya
+  ichida bo'lsa (masalan testlar) boshqa ulanish commit qilinmagan
+  ma'lumotni ko'rmaydi -- bu holatda oddiy ``aiterator`` ishlatiladi.
+* ``render`` -- serializatsiya va JSON rendering event loop'ni bloklamasligi
+  uchun oqimda bajariladi.
+"""
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections, connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .profiling import capture_queries
+
+
+CHUNK_SIZE = 500
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset.aiterator(chunk_size=CHUNK_SIZE)]
+
+
+def _list_in_worker(queryset):
+    try:
+        with capture_queries():
+            return list(queryset)
+    finally:
+        # Oqim ulanishi so'rov oxiridagi kabi CONN_MAX_AGE bo'yicha yopiladi
+        close_old_connections()
+
+
+@sync_to_async
+def _in_transaction(alias):
+    return connections[alias].in_atomic_block
+
+
+async def gather_lists(*querysets):
+    """Querysetlar natijalari (ro'yxatlar), berilgan tartibda"""
+    parallel = (
+        getattr(settings, 'ASYNC_PARALLEL_QUERIES', True)
+        and len(querysets) > 1
+        and not await _in_transaction(querysets[0].db)
+    )
+    if not parallel:
+        return await asyncio.gather(*(alist(queryset) for queryset in querysets))
+    worker = sync_to_async(_list_in_worker, thread_sensitive=False)
+    return await asyncio.gather(*(worker(queryset) for queryset in querysets))
+
+
+def attach_prefetched(instance, name, objects):
+    """
+    Alohida o'qilgan bog'langan obyektlarni ``prefetch_related`` natijasi kabi
+    biriktiradi: ``instance.<name>.all()`` yangi so'rov yubormaydi.
+    """
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    instance.__dict__.setdefault('_prefetched_objects_cache', {})[name] = queryset
+
+
+async def render(serializer_class, instance, many=False, context=None, wrap=None):
+    """
+    Serializer natijasini JSON javobga aylantiradi. ``wrap`` --
+    ``{'next': ..., 'results': ...}`` kabi tashqi obyekt (``results`` kaliti
+    serializer natijasi bilan to'ldiriladi).
+    """
+    def build():
+        data = serializer_class(instance, many=many, context=context).data
+        if wrap is not None:
+            data = {**wrap, 'results': data}
+        return JSONRenderer().render(data)
+    content = await sync_to_async(build)()
+    return HttpResponse(content, content_type='application/json')
+
+
+def error_response(status, detail, headers=None):
+    response = HttpResponse(JSONRenderer().render({'detail': detail}), status=status, content_type='application/json')
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def initial_request(request, view):
+    """
+    DRF ``APIView.initial`` dagi kabi: ``DEFAULT_AUTHENTICATION_CLASSES`` bilan
+    foydalanuvchi aniqlanadi va ``DEFAULT_THROTTLE_CLASSES`` tekshiriladi.
+    Token/sessiya va cheklov ombori sinxron -- oqimda chaqiriladi.
+    """
+    request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    request.user
+    waits = [
+        throttle.wait() for throttle in (cls() for cls in api_settings.DEFAULT_THROTTLE_CLASSES)
+        if not throttle.allow_request(request, view)
+    ]
+    if waits:
+        waits = [wait for wait in waits if wait is not None]
+        raise Throttled(max(waits, default=None))
+    return request
+
+
+def async_api_view(view):
+    """
+    Async view uchun: so'rov DRF ``Request`` ga o'raladi (``query_params``,
+    ``build_absolute_uri``, autentifikatsiya va cheklovlar sinxron API bilan
+    bir xil), faqat GET/HEAD qabul qilinadi, topilmagan obyekt va DRF
+    xatolari JSON javobga aylanadi.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return error_response(405, f'"{request.method}" metodi ruxsat etilmagan.')
+        try:
+            request = await sync_to_async(initial_request)(request, view)
+            return await view(request, *args, **kwargs)
+        except ObjectDoesNotExist:
+            return error_response(404, "Topilmadi.")
+        except Throttled as exc:
+            headers = {'Retry-After': str(exc.wait)} if exc.wait is not None else None
+            return error_response(exc.status_code, exc.detail, headers)
+        except APIException as exc:
+            return error_response(exc.status_code, exc.detail)
+    return wrapper
@@ -0,0 +1,84 @@
+"""
+Benchmark buyruqlari uchun umumiy yordamchilar: percentil hisoblash,
+natijalarni JSON ga yozish va ikki natijani solishtirish.
+"""
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.db import connection
+
+
+def percentile(values, p):
+    """``p`` (0..100) percentil, chiziqli interpolatsiya bilan"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies_ms):
+    """Kechikishlar ro'yxatidan p50/p95/p99 va o'rtacha qiymat"""
+    return {
+        'n': len(latencies_ms),
+        'mean_ms': round(statistics.fmean(latencies_ms), 3) if latencies_ms else None,
+        'p50_ms': round(percentile(latencies_ms, 50), 3) if latencies_ms else None,
+        'p95_ms': round(percentile(latencies_ms, 95), 3) if latencies_ms else None,
+        'p99_ms': round(percentile(latencies_ms, 99), 3) if latencies_ms else None,
+        'max_ms': round(max(latencies_ms), 3) if latencies_ms else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'debug': settings.DEBUG,
+    }
+
+
+def write_report(path, report):
+    with open(path, 'w') as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def load_report(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare_results(old, new, metrics):
+    """
+    Ikki ``{nom: {metrika: qiymat}}`` lug'atini solishtiradi va
+    ``[(nom, metrika, eski, yangi, o'zgarish_foizi), ...]`` qaytaradi.
+    """
+    rows = []
+    for name in sorted(set(old) | set(new)):
+        for metric in metrics:
+            before = old.get(name, {}).get(metric)
+            after = new.get(name, {}).get(metric)
+            change = None
+            if isinstance(before, (int, float)) and isinstance(after, (int, float)) and before:
+                change = (after - before) / before * 100
+            rows.append((name, metric, before, after, change))
+    return rows
@@ -0,0 +1,200 @@
+"""
+``yangilangan_vaqt`` asosida shartli GET (ETag / Last-Modified).
+
+Serializatsiyadan oldin arzon validator so'rovi bajariladi:
+
+* detail -- faqat obyektning ``yangilangan_vaqt`` i (bitta ustun, PK bo'yicha);
+* ro'yxat -- sahifa odatdagidek sahifalanadi, lekin faqat ``pk`` va vaqt
+  ustunlari o'qiladi. ETag sahifadagi ``(pk, yangilangan_vaqt)`` juftliklari va
+  pagination ma'lumotidan (count/next/previous) hisoblanadi.
+
+``If-None-Match`` / ``If-Modified-Since`` mos kelsa 304 qaytadi: eager-loading
+ham, serializer ham ishlamaydi. Aks holda sahifa obyektlari PK bo'yicha to'liq
+(eager-load bilan) o'qiladi.
+
+Javobda joriy foydalanuvchiga bog'liq maydonlar bo'lsa serializer
+``viewer_etag(request, pks)`` classmethod'ini e'lon qiladi: uning natijasi
+ETag ga qo'shiladi (masalan ``is_liked`` o'zgarsa 304 qaytmaydi).
+
+Serializer ``source='shop.kompaniya_nomi'`` yoki nested serializer orqali
+forward FK bo'yicha bog'langan obyektlarni ham ko'rsatadi. O'sha obyektlarda
+``yangilangan_vaqt`` bo'lsa ularning vaqti ham validator so'roviga JOIN bilan
+qo'shiladi: kategoriya yoki do'kon nomi o'zgarsa mahsulot ETag'i ham o'zgaradi.
+Vaqt maydoni yo'q modellar (masalan ``User``) o'zgarganda ko'rsatuvchi qatorlar
+signal orqali ``touch`` qilinadi (``categoriya.signals``).
+
+Ro'yxatlar faqat ETag oladi: sahifadagi qator o'chirilsa sahifaning eng
+katta vaqti kamayishi mumkin, shuning uchun Last-Modified ro'yxat uchun
+ishonchli validator emas.
+"""
+import hashlib
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from core.eager_loading import get_queryset_plan
+
+
+def make_etag(request, *parts):
+    # Bir URL turli formatlarda (json / browsable API) qaytishi mumkin
+    media_type = getattr(request, 'accepted_media_type', '')
+    digest = hashlib.sha1(repr((media_type, parts)).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def not_modified(request, etag, last_modified=None):
+    """Shart bajarilsa 304 javobini, aks holda None qaytaradi"""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def has_field(model, name):
+    return any(field.name == name for field in model._meta.concrete_fields)
+
+
+@lru_cache(maxsize=None)
+def related_validators(serializer_class, field):
+    """
+    Serializer forward FK orqali ko'rsatadigan va ``field`` maydoni bor
+    obyektlar uchun ``shop__yangilangan_vaqt`` kabi yo'llar.
+    """
+    model = serializer_class.Meta.model
+    paths = []
+    for path in sorted(get_queryset_plan(model, serializer_class)['select']):
+        related = model
+        for bit in path.split('__'):
+            related = related._meta.get_field(bit).related_model
+        if has_field(related, field):
+            paths.append(f'{path}__{field}')
+    return tuple(paths)
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _prefixes(path):
+    """``a__b__c`` -> ``a``, ``a__b``, ``a__b__c``"""
+    bits = path.split('__')
+    return ['__'.join(bits[:index]) for index in range(1, len(bits) + 1)]
+
+
+def _follow(obj, path):
+    for bit in path.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, bit)
+    return obj
+
+
+class ConditionalGetMixin:
+    """
+    ``list``, ``retrieve`` va ``nested_list_response`` uchun ETag/Last-Modified.
+    ``EagerLoadingMixin`` va ``NestedListMixin`` dan oldin qo'shiladi.
+    """
+    last_modified_field = 'yangilangan_vaqt'
+
+    def get_validation_queryset(self):
+        # get_queryset() filtrlari bilan, lekin eager-loading va annotatsiyalarsiz
+        self.eager_loading = False
+        try:
+            return self.get_queryset()
+        finally:
+            self.eager_loading = True
+
+    def supports_conditional(self, model):
+        return has_field(model, self.last_modified_field)
+
+    def viewer_etag(self, serializer_class, pks):
+        hook = getattr(serializer_class, 'viewer_etag', None)
+        return hook(self.request, pks) if hook is not None else None
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        serializer_class = self.get_serializer_class()
+        try:
+            values = (
+                self.get_validation_queryset()
+                .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                .values_list(self.last_modified_field, *related_validators(serializer_class, self.last_modified_field))
+                .first()
+            )
+        except (ValueError, TypeError, DjangoValidationError):
+            # URL'dagi qiymat maydon turiga mos emas (masalan /products/abc/)
+            values = None
+        if values is None:
+            # Topilmadi (404) -- odatiy yo'l bilan
+            return super().retrieve(request, *args, **kwargs)
+        last_modified = max(value for value in values if value is not None)
+        etag = make_etag(
+            request, self.kwargs[lookup_url_kwarg], [_isoformat(value) for value in values],
+            self.viewer_etag(serializer_class, [self.kwargs[lookup_url_kwarg]]),
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_validation_queryset())
+        return self.conditional_list_response(
+            queryset, self.get_serializer_class(), self.paginator,
+        )
+
+    def nested_list_response(self, queryset, serializer_class, pagination_class=None):
+        # Annotatsiyali queryset (masalan masofa) PK bo'yicha qayta o'qilganda
+        # annotatsiyasini yo'qotadi -- odatiy yo'l bilan
+        if (pagination_class is not None or queryset.query.annotations
+                or not self.supports_conditional(queryset.model)):
+            return super().nested_list_response(queryset, serializer_class, pagination_class)
+        return self.conditional_list_response(queryset, serializer_class, self.nested_pagination_class())
+
+    def conditional_list_response(self, queryset, serializer_class, paginator):
+        field = self.last_modified_field
+        fields = [field]
+        cursor_field = getattr(paginator, 'ordering_field', None) or 'yaratilgan_vaqt'
+        if has_field(queryset.model, cursor_field):
+            # Keyset kursori shu maydondan tuziladi
+            fields.append(cursor_field)
+        # FK ustunlari ham o'qiladi: related manager (category.products) har bir
+        # qatorga ota obyektni biriktiradi va aks holda *_id uchun alohida so'rov ketadi
+        fields += [field.name for field in queryset.model._meta.concrete_fields if field.is_relation]
+        # Bog'langan obyektlar vaqti shu so'rovda JOIN bilan o'qiladi (COUNT ga ta'sir qilmaydi)
+        related = related_validators(serializer_class, field)
+        paths = [field, *related]
+        selects = [path.rpartition('__')[0] for path in related]
+        fields += {prefix for path in selects for prefix in _prefixes(path)}
+        light = queryset.select_related(*selects).only(*fields, *related)
+        if paginator is not None:
+            rows = paginator.paginate_queryset(light, self.request, view=self)
+            meta = paginator.get_paginated_response([]).data
+            meta = {key: value for key, value in meta.items() if key != 'results'}
+        else:
+            rows, meta = list(light), None
+        ids = [row.pk for row in rows]
+        etag = make_etag(
+            self.request, meta,
+            [(row.pk, *(_isoformat(_follow(row, path)) for path in paths)) for row in rows],
+            self.viewer_etag(serializer_class, ids),
+        )
+        response = not_modified(self.request, etag)
+        if response is not None:
+            return response
+
+        objects = self.eager_load(queryset.model._default_manager.filter(pk__in=ids).order_by(), serializer_class)
+        by_pk = {obj.pk: obj for obj in objects}
+        page = [by_pk[pk] for pk in ids if pk in by_pk]
+        data = serializer_class(page, many=True, context=self.get_serializer_context()).data
+        response = paginator.get_paginated_response(data) if paginator is not None else Response(data)
+        response['ETag'] = etag
+        return response
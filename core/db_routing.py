@@ -0,0 +1,290 @@
+"""
+O'qish replikalariga yo'naltirish (``DATABASE_ROUTERS``).
+
+``ReplicaRoutingMiddleware`` har bir so'rov uchun holat (contextvar) ochadi.
+View ``DATABASE_REPLICA_APPS`` ilovalaridan (categoriya, user) bo'lsa va
+metod xavfsiz (GET/HEAD/OPTIONS) bo'lsa, shu ilovalar modellarini o'qish
+``DATABASE_REPLICAS`` dan biriga ketadi -- so'rov davomida bitta replikaga
+(view chaqirilishidan oldin tanlanadi). Qolgan hamma narsa -- primary (``default``):
+
+* yozuvlar va so'rovda birinchi yozuvdan keyingi barcha o'qishlar
+  (read-your-writes);
+* boshqa ilovalar modellari (sessiyalar, kontent turlari) va so'rovdan
+  tashqaridagi kod (buyruqlar, signal ishlovchilari fon oqimlarida);
+* umumiy keshga yoki snapshot'ga yoziladigan natijalar (javob keshi MISS,
+  ``home`` bo'limlari, ``core.snapshot``): kechikkan replikadan o'qilgan eski
+  ma'lumot yangi generatsiya/versiya ostida saqlanib, keyingi o'zgarishgacha
+  barcha klientlarga berilardi (``use_primary`` / ``primary_reads``);
+* kechikishi ``DATABASE_REPLICA_MAX_LAG`` soniyadan oshgan yoki javob
+  bermayotgan replikalar (lag guard). Kechikish har alias uchun
+  ``DATABASE_REPLICA_LAG_CHECK_INTERVAL`` soniyada bir marta o'lchanadi:
+  PostgreSQL -- ``pg_last_xact_replay_timestamp()``, SQLite fayl nusxasi --
+  primary fayli nusxadan keyin o'zgargan bo'lsa nusxa yoshi.
+
+Har bir alias'ga ketgan SQL soni so'rov oxirida ``DATABASE_STATS_CACHE_ALIAS``
+keshiga qo'shiladi (``stats()``, ``db_replicas`` buyrug'i).
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+KEY_PREFIX = 'db'
+
+
+@dataclass
+class RoutingState:
+    use_replica: bool = False
+    wrote: bool = False
+    replica: str = None
+    queries: dict = field(default_factory=dict)
+    # Bo'limlar/querysetlar parallel oqimlarda o'qilganda (home, gather_lists)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def current_state():
+    return _state.get()
+
+
+def use_primary():
+    """So'rovning qolgan o'qishlari primary'dan"""
+    state = _state.get()
+    if state is not None:
+        state.use_replica = False
+
+
+@contextmanager
+def primary_reads():
+    """Blok ichidagi o'qishlar primary'dan, keyin avvalgi holat"""
+    state = _state.get()
+    if state is None or not state.use_replica:
+        yield
+        return
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        state.use_replica = True
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def replica_apps():
+    return set(getattr(settings, 'DATABASE_REPLICA_APPS', ()))
+
+
+# Replika kechikishi: {alias: (o'lchangan vaqt, soniya yoki None)}
+_lag = {}
+_lag_lock = threading.Lock()
+
+PG_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def _sqlite_path(connection):
+    # Test bazasi (va uning mirror'lari) xotirada
+    name = str(connection.settings_dict['NAME'])
+    if name == ':memory:' or name.startswith('file:'):
+        return None
+    return name
+
+
+def file_copy_lag(primary, replica):
+    """
+    SQLite fayl nusxasi kechikishi: primary nusxadan keyin o'zgargan bo'lsa
+    nusxa yoshi, aks holda 0. Fayl yo'q bo'lsa OSError (replika ishlatilmaydi).
+    """
+    copied = os.path.getmtime(replica)
+    if os.path.getmtime(primary) <= copied:
+        return 0.0
+    return max(0.0, time.time() - copied)
+
+
+def measure_lag(alias):
+    """Replika primary'dan necha soniya orqada (o'lchab bo'lmasa 0)"""
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(PG_LAG_SQL)
+            return float(cursor.fetchone()[0])
+    if connection.vendor == 'sqlite':
+        replica = _sqlite_path(connection)
+        primary = _sqlite_path(connections[PRIMARY])
+        if replica is None or primary is None:
+            return 0.0
+        return file_copy_lag(primary, replica)
+    return 0.0
+
+
+def record_lag(alias, seconds):
+    """O'lchangan kechikishni saqlaydi (None -- replika ishlamayapti)"""
+    with _lag_lock:
+        _lag[alias] = (time.monotonic(), seconds)
+
+
+def replica_lag(alias):
+    interval = getattr(settings, 'DATABASE_REPLICA_LAG_CHECK_INTERVAL', 1.0)
+    checked = _lag.get(alias)
+    if checked is not None and time.monotonic() - checked[0] < interval:
+        return checked[1]
+    try:
+        seconds = measure_lag(alias)
+    except (DatabaseError, OSError):
+        seconds = None
+    record_lag(alias, seconds)
+    return seconds
+
+
+def healthy_replicas():
+    max_lag = getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 5.0)
+    return [
+        alias for alias in replica_aliases()
+        if (lag := replica_lag(alias)) is not None and lag <= max_lag
+    ]
+
+
+def choose_replica():
+    """Sog'lom replikalardan tasodifiy bittasi (yo'q bo'lsa primary)"""
+    replicas = healthy_replicas()
+    return random.choice(replicas) if replicas else PRIMARY
+
+
+class ReplicaRouter:
+    """
+    Alias har doim aniq qaytariladi: None bo'lsa Django obyekt o'qilgan
+    bazani (``instance._state.db``) oladi va replikadan o'qilgan obyekt
+    replikaga yozilib qolardi.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return PRIMARY
+        if model._meta.app_label not in replica_apps():
+            return PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replikalar primary'ning nusxasi: obyektlar bitta bazadan deb qaraladi
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def _count_query(execute, sql, params, many, context):
+    state = _state.get()
+    if state is not None:
+        alias = context['connection'].alias
+        with state.lock:
+            state.queries[alias] = state.queries.get(alias, 0) + 1
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def get_cache():
+    return caches[getattr(settings, 'DATABASE_STATS_CACHE_ALIAS', 'default')]
+
+
+def _stats_key(alias):
+    return f'{KEY_PREFIX}:queries:{alias}'
+
+
+def aliases():
+    return [PRIMARY, *replica_aliases()]
+
+
+def flush_stats(queries):
+    cache = get_cache()
+    for alias, count in queries.items():
+        key = _stats_key(alias)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.set(key, count, timeout=None)
+
+
+def stats():
+    """``{alias: SQL soni}`` (so'rovlar ichidagi)"""
+    values = get_cache().get_many([_stats_key(alias) for alias in aliases()])
+    return {alias: values.get(_stats_key(alias), 0) for alias in aliases()}
+
+
+def reset_stats():
+    get_cache().delete_many([_stats_key(alias) for alias in aliases()])
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _state.reset(token)
+            flush_stats(state.queries)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _state.reset(token)
+            flush_stats(state.queries)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if (
+            state is not None
+            and replica_aliases()
+            and request.method in SAFE_METHODS
+            and view_func.__module__.split('.')[0] in replica_apps()
+        ):
+            state.use_replica = True
+            state.replica = choose_replica()
@@ -0,0 +1,252 @@
+"""
+Serializer maydonlariga qarab querysetni avtomatik optimallashtirish.
+
+``plan_queryset(queryset, SerializerClass)`` serializer e'lon qilgan maydonlarni
+ko'rib chiqadi va kerakli ``select_related`` / ``prefetch_related`` /
+``annotate`` larni qo'shadi:
+
+* ``source='shop.kompaniya_nomi'`` kabi nuqtali manbalar -- forward FK uchun
+  ``select_related('shop')``, teskari bog'lanishlar uchun ``prefetch_related``;
+* ichki (nested) serializerlar -- bitta obyekt bo'lsa ``select_related``,
+  ``many=True`` bo'lsa ichki queryseti ham rejalashtirilgan ``Prefetch``;
+* ``AggregateField(Count(...))`` -- ``annotate`` orqali bitta so'rovda. Teskari
+  bog'lanish ustidagi agregatlar JOIN + GROUP BY emas, korrelyatsiyalangan
+  subquery sifatida qo'shiladi: aks holda asosiy so'rov indeks bo'yicha
+  tartiblay olmaydi va paginator COUNT(*) butun JOIN ni hisoblaydi.
+* ``PageBatchField(resolver)`` -- querysetga qo'shib bo'lmaydigan qiymatlar
+  (masalan joriy foydalanuvchiga bog'liq): butun sahifa uchun bitta chaqiruv.
+
+Shu sababli yangi maydon qo'shilganda har bir qator uchun yangi so'rov paydo
+bo'lmaydi.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Aggregate, QuerySet, Count, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+
+class AggregateField(serializers.ReadOnlyField):
+    """
+    Queryset annotatsiyasidan o'qiladigan agregat maydon.
+
+    ``products_count = AggregateField(Count('products'))`` -- planner querysetga
+    ``annotate(products_count=Count('products'))`` qo'shadi. Annotatsiyasiz
+    obyekt (masalan ``create`` javobi) uchun qiymat alohida so'rov bilan
+    hisoblanadi.
+    """
+
+    def __init__(self, expression, **kwargs):
+        self.expression = expression
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if self.field_name in instance.__dict__:
+            return instance.__dict__[self.field_name]
+        value = (
+            type(instance)._default_manager
+            .filter(pk=instance.pk)
+            .aggregate(value=self.expression)['value']
+        )
+        instance.__dict__[self.field_name] = value
+        return value
+
+
+class PageBatchField(serializers.Field):
+    """
+    Qiymati sahifadagi barcha obyektlar uchun birga topiladigan maydon.
+
+    ``resolver(context, pks) -> {pk: qiymat}`` serializatsiya davomida bir marta
+    (``many=True`` bo'lsa butun ro'yxat uchun) chaqiriladi; lug'atda yo'q
+    obyektlar uchun qiymat None.
+    """
+
+    def __init__(self, resolver, **kwargs):
+        self.resolver = resolver
+        kwargs['read_only'] = True
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def page(self, instance):
+        root = self.root
+        objects = root.instance if isinstance(root, serializers.ListSerializer) else None
+        if isinstance(objects, QuerySet):
+            objects = objects._result_cache
+        if isinstance(objects, (list, tuple)) and any(obj is instance for obj in objects):
+            return objects
+        return [instance]
+
+    def to_representation(self, instance):
+        values = self.root.__dict__.setdefault('_page_batch', {}).setdefault(self.field_name, {})
+        if instance.pk not in values:
+            pks = [obj.pk for obj in self.page(instance)]
+            found = self.resolver(self.context, pks)
+            values.update({pk: found.get(pk) for pk in pks})
+        return values[instance.pk]
+
+
+def _relation(model, name):
+    """``name`` model bog'lanishi bo'lsa ``(field, many)`` qaytaradi"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None, False
+    if not field.is_relation:
+        return None, False
+    many = field.many_to_many or field.one_to_many
+    return field, many
+
+
+def aggregate_as_subquery(model, expression):
+    """
+    ``Count('products')`` kabi bitta teskari FK ustidagi agregatni korrelyatsiyalangan
+    subquery ga aylantiradi. Boshqa ifodalar o'zgarishsiz qaytadi.
+    """
+    if not isinstance(expression, Aggregate) or expression.filter is not None:
+        return expression
+    sources = [source for source in expression.get_source_expressions() if source is not None]
+    if len(sources) != 1 or not hasattr(sources[0], 'name'):
+        return expression
+    relation_name, _, column = sources[0].name.partition('__')
+    relation, many = _relation(model, relation_name)
+    if relation is None or not relation.one_to_many:
+        return expression
+    fk_name = relation.field.name
+    inner = (
+        relation.related_model._default_manager
+        .filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(value=type(expression)(column or 'pk', distinct=expression.distinct))
+        .values('value')
+    )
+    output_field = expression.output_field if not isinstance(expression, Count) else IntegerField()
+    subquery = Subquery(inner, output_field=output_field)
+    if isinstance(expression, Count):
+        return Coalesce(subquery, Value(0))
+    return subquery
+
+
+def _walk(model, serializer, prefix, plan):
+    """Serializer maydonlarini aylanib chiqib ``plan`` ni to'ldiradi"""
+    for field in serializer.fields.values():
+        if getattr(field, 'write_only', False):
+            continue
+
+        if isinstance(field, AggregateField):
+            plan['models'].update(_aggregate_models(model, field.expression))
+            if not prefix:
+                plan['annotate'][field.field_name] = aggregate_as_subquery(model, field.expression)
+            continue
+
+        if field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                _walk(model, field, prefix, plan)
+            continue
+
+        nested = field
+        if isinstance(field, serializers.ListSerializer):
+            nested = field.child
+        is_serializer = isinstance(nested, serializers.BaseSerializer)
+
+        current_model = model
+        path = prefix
+        bits = field.source.split('.')
+        for index, bit in enumerate(bits):
+            relation, many = _relation(current_model, bit)
+            if relation is None:
+                break
+            is_last = index == len(bits) - 1
+            # PrimaryKeyRelatedField faqat *_id ni o'qiydi -- so'rov kerak emas
+            if is_last and not is_serializer and not many:
+                break
+            related_model = relation.related_model
+            plan['models'].add(related_model)
+            path = f'{path}__{bit}' if path else bit
+            if many:
+                inner = related_model._default_manager.all()
+                if is_last and is_serializer:
+                    inner = plan_queryset(inner, nested)
+                    plan['models'].update(get_queryset_plan(related_model, nested)['models'])
+                plan['prefetch'][path] = inner
+                break
+            plan['select'].add(path)
+            current_model = related_model
+            if is_last and is_serializer:
+                _walk(current_model, nested, path, plan)
+
+
+def _aggregate_models(model, expression):
+    """Agregat ifodasi o'qiydigan bog'langan modellar"""
+    models = set()
+    for source in expression.flatten():
+        name = getattr(source, 'name', None)
+        current = model
+        for bit in (name or '').split('__'):
+            relation, _ = _relation(current, bit)
+            if relation is None:
+                break
+            current = relation.related_model
+            models.add(current)
+    return models
+
+
+def get_queryset_plan(model, serializer):
+    plan = {'select': set(), 'prefetch': {}, 'annotate': {}, 'models': {model}}
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    _walk(model, serializer, '', plan)
+    return plan
+
+
+@lru_cache(maxsize=None)
+def serializer_models(serializer_class):
+    """
+    Serializer ma'lumot o'qiydigan barcha modellar: asosiy model, nested va
+    nuqtali manbalar hamda agregatlar orqali bog'langanlari. Javob keshi shu
+    modellardan biri o'zgarganda bekor qilinadi.
+    """
+    model = serializer_class.Meta.model
+    return frozenset(get_queryset_plan(model, serializer_class)['models'])
+
+
+def plan_queryset(queryset, serializer):
+    """Serializer uchun kerakli eager-loading larni querysetga qo'llaydi"""
+    plan = get_queryset_plan(queryset.model, serializer)
+    if plan['select']:
+        # Ichma-ich yo'llar (a__b) a ni ham qamrab oladi
+        paths = sorted(
+            path for path in plan['select']
+            if not any(other.startswith(f'{path}__') for other in plan['select'])
+        )
+        queryset = queryset.select_related(*paths)
+    prefetches = [Prefetch(path, queryset=inner) for path, inner in plan['prefetch'].items()]
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    if plan['annotate']:
+        queryset = queryset.annotate(**plan['annotate'])
+    return queryset
+
+
+class EagerLoadingMixin:
+    """
+    ViewSet uchun mixin: ``get_queryset`` natijasini joriy action serializeri
+    bo'yicha rejalashtiradi. ``@action`` larda boshqa serializer ishlatilsa
+    ``self.eager_load(queryset, SerializerClass)`` chaqiriladi.
+    ``eager_loading = False`` bo'lsa ``get_queryset`` filtrlangan, lekin
+    rejalashtirilmagan querysetni qaytaradi (masalan validator so'rovlari uchun).
+    """
+    eager_loading = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.eager_loading:
+            return queryset
+        return self.eager_load(queryset, self.get_serializer_class())
+
+    def eager_load(self, queryset, serializer_class):
+        return plan_queryset(queryset, serializer_class)
@@ -0,0 +1,277 @@
+"""
+Yuklangan rasmlar uchun variantlar (thumbnail va medium, WebP + JPEG).
+
+* Yuklangan fayl saqlanishidan oldin (``pre_save``) uning SHA-256 xeshi
+  hisoblanadi va fayl ``<upload_to>/<xesh>.<kengaytma>`` nomi bilan saqlanadi.
+  Shu nomdagi fayl allaqachon bo'lsa qayta yozilmaydi -- bir xil rasmlar bitta
+  faylga ishora qiladi.
+* Variantlar so'rovdan tashqarida (commit'dan keyin fon oqimida) yaratiladi va
+  ``variants/<xesh>/<variant>.<format>`` ga yoziladi. Fayllar mavjud bo'lsa
+  qayta kodlanmaydi, shuning uchun bir xil rasm uchun variantlar bir marta
+  yaratiladi.
+* Variantlar haqidagi ma'lumot (yo'llar va o'lchamlar) modelning
+  ``<maydon>_variants`` JSON ustunida saqlanadi -- serializer qo'shimcha so'rov
+  va fayl tizimiga murojaatsiz ``images`` obyektini qaytaradi.
+
+Variantlar yozilgach ``variants_updated`` signali (``sender=Model, pk=...``)
+yuboriladi: rasmni boshqa obyektlar javobida ko'rsatadigan ilovalar o'sha
+obyektlarni eskirtirishi uchun.
+
+Yangi model ``register(Model, 'rasm')`` bilan ulanadi. Eski (variantlarsiz)
+rasmlar uchun ``generate_image_variants`` buyrug'i.
+"""
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.functions import Now
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from . import response_cache
+
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'variants'
+# nom -> (maksimal o'lcham, kvadratga kesish)
+VARIANTS = {
+    'thumb': ((200, 200), True),
+    'medium': ((800, 800), False),
+}
+# kengaytma -> (Pillow formati, saqlash parametrlari)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# EXIF orientatsiyasi 5-8 -- rasm 90 gradusga buriladi (kenglik va balandlik almashadi)
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+# {Model: ['rasm', ...]}
+REGISTRY = {}
+
+variants_updated = Signal()
+
+_executor = None
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def register(model, *field_names):
+    """Model rasm maydonlari uchun dedup va variant yaratishni ulaydi"""
+    REGISTRY.setdefault(model, []).extend(field_names)
+    uid = f'images_{model._meta.label_lower}'
+    pre_save.connect(deduplicate_uploads, sender=model, dispatch_uid=f'{uid}_pre_save')
+    post_save.connect(schedule_variants, sender=model, dispatch_uid=f'{uid}_post_save')
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def deduplicate_uploads(sender, instance, raw=False, **kwargs):
+    """Yangi yuklangan faylga xeshdan nom beradi; bunday fayl bo'lsa uni qayta ishlatadi"""
+    if raw:
+        return
+    for field_name in REGISTRY[sender]:
+        file = getattr(instance, field_name)
+        if not file or file._committed:
+            continue
+        extension = os.path.splitext(file.name)[1].lower()
+        filename = f'{content_hash(file)}{extension}'
+        existing = file.field.generate_filename(instance, filename)
+        if file.storage.exists(existing):
+            file.name = existing
+            file._committed = True
+        else:
+            # FileField.pre_save upload_to prefiksini qo'shib saqlaydi
+            file.name = filename
+
+
+def schedule_variants(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for field_name in REGISTRY[sender]:
+        file = getattr(instance, field_name)
+        data = getattr(instance, variants_field(field_name))
+        if not file:
+            if data:
+                update_variants(sender, instance.pk, field_name, '', None)
+            continue
+        if data and data.get('source') == file.name:
+            continue
+        args = (sender, instance.pk, field_name)
+        transaction.on_commit(lambda args=args: submit(generate_for, *args))
+
+
+def submit(function, *args):
+    """``IMAGE_VARIANTS_BACKGROUND`` yoqilgan bo'lsa fon oqimida bajaradi"""
+    global _executor
+    if not getattr(settings, 'IMAGE_VARIANTS_BACKGROUND', True):
+        return function(*args)
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANTS_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor.submit(_run_in_thread, function, *args)
+
+
+def _run_in_thread(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception("Rasm variantlarini yaratib bo'lmadi: %r", args)
+    finally:
+        # Oqim o'z DB ulanishini ochgan -- yopilmasa ochiq qoladi
+        connections.close_all()
+
+
+def generate_for(model, pk, field_name, force=False):
+    """
+    Obyekt rasmi uchun variantlarni yaratadi va saqlaydi. Fayl shu orada
+    almashtirilgan bo'lsa natija yozilmaydi. Saqlangan bo'lsa True.
+    """
+    name = model._default_manager.filter(pk=pk).values_list(field_name, flat=True).first()
+    if not name:
+        return False
+    storage = model._meta.get_field(field_name).storage
+    data = build_variants(storage, name, force=force)
+    if data is None:
+        return False
+    return update_variants(model, pk, field_name, name, data)
+
+
+def update_variants(model, pk, field_name, name, data):
+    values = {variants_field(field_name): data}
+    if any(field.name == 'yangilangan_vaqt' for field in model._meta.concrete_fields):
+        # ETag (core.conditional) ham yangilanadi
+        values['yangilangan_vaqt'] = Now()
+    updated = model._default_manager.filter(pk=pk, **{field_name: name}).update(**values)
+    if updated:
+        response_cache.bump(model)
+        variants_updated.send(sender=model, pk=pk)
+    return bool(updated)
+
+
+def _oriented_size(image):
+    width, height = image.size
+    if image.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def _resize(image, size, crop):
+    if crop:
+        return ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail(size, Image.Resampling.LANCZOS)
+    return resized
+
+
+def _encode(image, pil_format, options):
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # Shaffof fon oq rangga
+            rgba = image.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(storage, name, force=False):
+    """
+    ``name`` fayli uchun variantlarni yaratadi (mavjudlari qayta kodlanmaydi).
+    Fayl rasm bo'lmasa yoki o'qilmasa None.
+    """
+    try:
+        with storage.open(name) as fh:
+            content = fh.read()
+        digest = hashlib.sha256(content).hexdigest()
+        base = f'{VARIANTS_DIR}/{digest[:2]}/{digest}'
+        with Image.open(BytesIO(content)) as original:
+            width, height = _oriented_size(original)
+            decoded = None
+            variants = {}
+            for variant, (size, crop) in VARIANTS.items():
+                paths = {extension: f'{base}/{variant}.{extension}' for extension in FORMATS}
+                if not force and all(storage.exists(path) for path in paths.values()):
+                    # Bir xil rasm oldin yuklangan: faqat o'lcham sarlavhadan o'qiladi
+                    with storage.open(paths['jpeg']) as fh, Image.open(fh) as existing:
+                        variant_size = existing.size
+                else:
+                    if decoded is None:
+                        decoded = ImageOps.exif_transpose(original)
+                        decoded.load()
+                    resized = _resize(decoded, size, crop)
+                    variant_size = resized.size
+                    for extension, (pil_format, options) in FORMATS.items():
+                        if storage.exists(paths[extension]):
+                            storage.delete(paths[extension])
+                        storage.save(paths[extension], ContentFile(_encode(resized, pil_format, options)))
+                variants[variant] = {'width': variant_size[0], 'height': variant_size[1], **paths}
+    except (OSError, Image.DecompressionBombError) as exc:
+        logger.warning("%s: rasm variantlari yaratilmadi (%s)", name, exc)
+        return None
+    return {'source': name, 'hash': digest, 'width': width, 'height': height, 'variants': variants}
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    ``images = ImageVariantsField('rasm')`` -- asl rasm va variantlar URL'lari
+    hamda o'lchamlari. Variantlar hali tayyor bo'lmasa faqat ``original``.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def url(self, storage, name):
+        url = storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def to_representation(self, instance):
+        file = getattr(instance, self.image_field)
+        if not file:
+            return None
+        data = getattr(instance, variants_field(self.image_field)) or {}
+        if data.get('source') != file.name:
+            data = {}
+        images = {
+            'original': {
+                'url': self.url(file.storage, file.name),
+                'width': data.get('width'),
+                'height': data.get('height'),
+            },
+        }
+        for variant, entry in data.get('variants', {}).items():
+            images[variant] = {
+                'width': entry['width'],
+                'height': entry['height'],
+                **{extension: self.url(file.storage, entry[extension]) for extension in FORMATS},
+            }
+        return images
@@ -0,0 +1,362 @@
+"""
+Prometheus formatidagi metrikalar (``/metrics``): har bir view va action
+uchun so'rov kechikishi, SQL soni va vaqti, javob hajmi (histogrammalar),
+status kodlari va javob keshi hit/miss (hisoblagichlar).
+
+``MetricsMiddleware`` so'rov holatini (contextvar) ochadi, SQL esa
+``connection_created`` orqali o'rnatilgan execute wrapper bilan o'lchanadi
+(oqimlarga ``contextvars.copy_context`` bilan o'tgan so'rovlar ham). Label'lar
+-- viewset klassi va action nomi (``ProductViewSet``/``list``), URL emas:
+ularning soni cheklangan.
+
+Har bir jarayon qiymatlarni o'z xotirasida yig'adi va
+``METRICS_FLUSH_INTERVAL`` soniyada bir marta ``METRICS_DIR/metrics-<pid>.json``
+ga yozadi (vaqtinchalik fayl + ``os.replace``, o'quvchi yarim faylni
+ko'rmaydi). ``/metrics`` katalogdagi barcha fayllarni qo'shib chiqaradi:
+boshqa worker'lar qiymati ko'pi bilan shu interval eskiradi. To'xtagan
+jarayonlar fayllari qoladi (hisoblagichlar kamaymaydi); katalog deploy
+paytida tozalanadi.
+
+Sekin so'rovlar (``METRICS_SLOW_REQUEST_MS``, eng sekin SQL'lari bilan) va
+sekin SQL (``METRICS_SLOW_QUERY_MS``) ``core.metrics`` logger'iga yoziladi.
+"""
+import atexit
+import bisect
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+# Sekin so'rov logiga shuncha eng sekin SQL qo'shiladi
+SLOWEST_QUERIES = 3
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ("So'rov kechikishi", LATENCY_BUCKETS),
+    'http_request_sql_queries': ("So'rovdagi SQL soni", QUERY_BUCKETS),
+    'http_request_sql_duration_seconds': ("So'rovdagi SQL vaqti", LATENCY_BUCKETS),
+    'http_response_size_bytes': ('Javob hajmi', SIZE_BUCKETS),
+}
+COUNTERS = {
+    'http_responses_total': "Javoblar (status bo'yicha)",
+    'http_response_cache_total': 'Javob keshi (X-Cache) hit/miss',
+    'http_slow_requests_total': 'METRICS_SLOW_REQUEST_MS dan sekin so\'rovlar',
+    'sql_slow_queries_total': 'METRICS_SLOW_QUERY_MS dan sekin SQL',
+}
+
+UNMATCHED = 'unmatched'
+# Boshqa metodlar 'other' label'i bilan (label'lar soni cheklangan)
+KNOWN_METHODS = {'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+@dataclass
+class RequestState:
+    view: str = UNMATCHED
+    action: str = ''
+    queries: int = 0
+    sql_time: float = 0.0
+    slowest: list = field(default_factory=list)
+    # SQL parallel oqimlarda ham bajarilishi mumkin (home, async_db)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_query(self, sql, elapsed):
+        with self.lock:
+            self.queries += 1
+            self.sql_time += elapsed
+            entry = (elapsed, sql)
+            if len(self.slowest) < SLOWEST_QUERIES:
+                heapq.heappush(self.slowest, entry)
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+
+_state = ContextVar('metrics_state', default=None)
+
+
+def current_state():
+    return _state.get()
+
+
+def metrics_dir():
+    return Path(getattr(settings, 'METRICS_DIR', settings.BASE_DIR / '.metrics'))
+
+
+def _threshold(name):
+    value = getattr(settings, name, None)
+    return None if value is None else value / 1000
+
+
+class Registry:
+    """
+    Jarayon ichidagi qiymatlar: histogramma -- ``[bucket'lar..., sum, count]``
+    (bucket'lar kumulyativ emas), hisoblagich -- son. Kalit ``(nom, label'lar)``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.histograms = {}
+        self.counters = {}
+        self.flushed = 0.0
+
+    def _check_fork(self):
+        # Fork qilingan worker ota jarayon qiymatlarini ikkinchi marta sanamasin
+        if self.pid != os.getpid():
+            self.reset()
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        # Birinchi ``value <= chegara`` bucket'i (hech biri bo'lmasa +Inf)
+        index = bisect.bisect_left(buckets, value)
+        with self.lock:
+            self._check_fork()
+            values = self.histograms.get((name, labels))
+            if values is None:
+                values = self.histograms[(name, labels)] = [0] * (len(buckets) + 3)
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self._check_fork()
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + amount
+
+    def dump(self):
+        with self.lock:
+            self._check_fork()
+            return {
+                'histograms': [[name, labels, values[:]] for (name, labels), values in self.histograms.items()],
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+            }
+
+    def flush(self, force=False):
+        """Jarayon faylini yangilaydi (``METRICS_FLUSH_INTERVAL`` da bir marta)"""
+        now = time.monotonic()
+        if not force and now - self.flushed < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0):
+            return
+        self.flushed = now
+        directory = metrics_dir()
+        path = directory / f'metrics-{os.getpid()}.json'
+        temporary = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(json.dumps(self.dump()))
+            os.replace(temporary, path)
+        except OSError:
+            logger.exception("Metrikalar yozilmadi: %s", path)
+
+    def clear(self):
+        """Jarayon qiymatlari va katalogdagi fayllarni o'chiradi (testlar uchun)"""
+        with self.lock:
+            self.reset()
+        for path in metrics_dir().glob('metrics-*.json'):
+            path.unlink(missing_ok=True)
+
+
+REGISTRY = Registry()
+atexit.register(lambda: REGISTRY.flush(force=True))
+
+
+def collect():
+    """Barcha jarayon fayllari yig'indisi: ``(histograms, counters)``"""
+    REGISTRY.flush(force=True)
+    histograms, counters = {}, {}
+    for path in sorted(metrics_dir().glob('metrics-*.json')):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, labels, values in data['histograms']:
+            if name not in HISTOGRAMS or len(values) != len(HISTOGRAMS[name][1]) + 3:
+                # Bucket'lari boshqa versiyadagi jarayon fayli
+                continue
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(values))
+            for index, value in enumerate(values):
+                total[index] += value
+        for name, labels, value in data['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Prometheus text exposition formati (0.0.4)"""
+    histograms, counters = collect()
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], values):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(values[-2])}')
+            lines.append(f'{name}_count{_labels(labels)} {values[-1]}')
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _time_query(execute, sql, params, many, context):
+    state = _state.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        state.add_query(sql, elapsed)
+        threshold = _threshold('METRICS_SLOW_QUERY_MS')
+        if threshold is not None and elapsed >= threshold:
+            REGISTRY.inc('sql_slow_queries_total', (('view', state.view), ('action', state.action)))
+            logger.warning(
+                "Sekin SQL (%.1f ms) %s.%s: %s", elapsed * 1000, state.view, state.action, sql,
+            )
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def view_labels(view_func, method):
+    """``(view, action)``: viewset klassi va action (oddiy view uchun funksiya nomi)"""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', type(view_func).__name__), ''
+    actions = getattr(view_func, 'actions', None) or {}
+    return cls.__name__, actions.get(method.lower(), '')
+
+
+def _response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+def record(request, response, state, elapsed):
+    labels = (('view', state.view), ('action', state.action))
+    method = request.method if request.method in KNOWN_METHODS else 'other'
+    REGISTRY.observe('http_request_duration_seconds', (*labels, ('method', method)), elapsed)
+    REGISTRY.observe('http_request_sql_queries', labels, state.queries)
+    REGISTRY.observe('http_request_sql_duration_seconds', labels, state.sql_time)
+    size = _response_size(response)
+    if size is not None:
+        REGISTRY.observe('http_response_size_bytes', labels, size)
+    REGISTRY.inc('http_responses_total', (*labels, ('method', method), ('status', str(response.status_code))))
+    cache_status = response.get('X-Cache')
+    if cache_status in ('HIT', 'MISS'):
+        REGISTRY.inc('http_response_cache_total', (*labels, ('result', cache_status.lower())))
+
+    threshold = _threshold('METRICS_SLOW_REQUEST_MS')
+    if threshold is not None and elapsed >= threshold:
+        REGISTRY.inc('http_slow_requests_total', labels)
+        slowest = ''.join(
+            f'\n  {query_time * 1000:.1f} ms: {sql}' for query_time, sql in sorted(state.slowest, reverse=True)
+        )
+        logger.warning(
+            "Sekin so'rov (%.1f ms, %d SQL, %.1f ms SQL) %s %s [%s.%s]%s",
+            elapsed * 1000, state.queries, state.sql_time * 1000, request.method,
+            request.get_full_path(), state.view, state.action, slowest,
+        )
+    REGISTRY.flush()
+
+
+class MetricsMiddleware:
+    """``MIDDLEWARE`` boshida: kechikish boshqa middleware'larni ham o'z ichiga oladi"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+        state = RequestState()
+        token = _state.set(state)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        record(request, response, state, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return await self.get_response(request)
+        state = RequestState()
+        token = _state.set(state)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        record(request, response, state, time.perf_counter() - started)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is not None:
+            state.view, state.action = view_labels(view_func, request.method)
+
+
+def metrics_view(request):
+    """
+    ``GET /metrics``: ``METRICS_ALLOWED_IPS`` dagi manzillar (None -- hamma)
+    va staff foydalanuvchilar (sessiya) uchun.
+    """
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', None)
+    user = getattr(request, 'user', None)
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed and not (user and user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
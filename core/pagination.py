@@ -0,0 +1,228 @@
+"""
+API pagination klasslari.
+
+* ``KeysetPagination`` -- ``(yaratilgan_vaqt, id)`` bo'yicha kursorli
+  pagination. OFFSET ishlatmaydi va COUNT(*) qilmaydi, shuning uchun 5000-sahifa
+  ham 1-sahifa kabi arzon. Ichki ro'yxat action'lari shu klassdan foydalanadi.
+* ``DistancePagination`` -- masofa bo'yicha saralangan ``nearby`` ro'yxatlari.
+* ``CatalogPagination`` -- standart PageNumberPagination, lekin:
+  ``?count=false`` bo'lsa COUNT(*) umuman bajarilmaydi, aks holda jami soni
+  ``PAGINATION_COUNT_CACHE_TIMEOUT`` soniya keshlanadi; ``?cursor=`` berilsa
+  keyset rejimiga o'tadi (faqat modelda ``yaratilgan_vaqt`` bo'lsa va
+  ``?ordering=`` keyset tartibiga zid bo'lmasa, aks holda 400).
+"""
+import base64
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """``(ordering_field, id)`` juftligi bo'yicha kursorli pagination"""
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_field = 'yaratilgan_vaqt'
+    invalid_cursor_message = "Noto'g'ri kursor"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.ordering_field)
+        raw = f'{value.isoformat()}|{obj.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            value, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(value), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def page_queryset(self, queryset, request):
+        """Kursordan keyingi ``page_size + 1`` qator (bittasi keyingi sahifa borligi uchun)"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        field = self.ordering_field
+        queryset = queryset.order_by(f'-{field}', '-pk')
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+            )
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """``paginate_queryset`` ning async ORM varianti"""
+        queryset = self.page_queryset(queryset, request)
+        return self.set_page([row async for row in queryset])
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """Jami sonni SQL bo'yicha qisqa muddat keshlaydigan Paginator"""
+
+    @cached_property
+    def count(self):
+        timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 0)
+        query = getattr(self.object_list, 'query', None)
+        if not timeout or query is None:
+            return super().count
+        try:
+            sql, params = query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'pagination-count:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, timeout)
+        return count
+
+
+class CatalogPagination(PageNumberPagination):
+    """PageNumberPagination + ``?count=false`` va ``?cursor=`` rejimlari"""
+    django_paginator_class = CachedCountPaginator
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    keyset_class = KeysetPagination
+
+    def check_keyset(self, queryset, request):
+        """Keyset tartibi bu ro'yxatga mos kelmasa 400"""
+        field = self.keyset_class.ordering_field
+        cursor = self.keyset_class.cursor_query_param
+        try:
+            queryset.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            raise ValidationError({cursor: "Bu ro'yxatda kursorli pagination yo'q, ?page= ishlating"})
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM)
+        if ordering and ordering != f'-{field}':
+            raise ValidationError({
+                api_settings.ORDERING_PARAM: f"?{cursor}= faqat -{field} tartibi bilan ishlaydi",
+            })
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        self.countless = False
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.check_keyset(queryset, request)
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        if request.query_params.get(self.count_query_param, '').lower() in ('0', 'false'):
+            return self._paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def _paginate_without_count(self, queryset, request):
+        self.countless = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = max(1, int(request.query_params.get(self.page_query_param, 1)))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.rows = rows[:page_size]
+        if not self.rows and self.page_number > 1:
+            raise NotFound(self.invalid_page_message)
+        return self.rows
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if not self.countless:
+            return super().get_paginated_response(data)
+        url = self.request.build_absolute_uri()
+        next_link = previous_link = None
+        if self.has_next:
+            next_link = replace_query_param(url, self.page_query_param, self.page_number + 1)
+        if self.page_number == 2:
+            previous_link = remove_query_param(url, self.page_query_param)
+        elif self.page_number > 2:
+            previous_link = replace_query_param(url, self.page_query_param, self.page_number - 1)
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', next_link),
+            ('previous', previous_link),
+            ('results', data),
+        ]))
+
+
+class DistancePagination(PageNumberPagination):
+    """Masofa bo'yicha saralangan ro'yxatlar (keyset bu tartibga mos emas)"""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class NestedListMixin:
+    """
+    Bog'langan obyektlar ro'yxatini qaytaruvchi ``@action`` lar uchun:
+    querysetni serializer bo'yicha eager-load qiladi va keyset pagination
+    (yoki berilgan ``pagination_class``) bilan sahifalaydi.
+    """
+    nested_pagination_class = KeysetPagination
+
+    def nested_list_response(self, queryset, serializer_class, pagination_class=None):
+        queryset = self.eager_load(queryset, serializer_class)
+        paginator = (pagination_class or self.nested_pagination_class)()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
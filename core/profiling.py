@@ -0,0 +1,349 @@
+"""
+Staff uchun so'rov profileri: ``?_profile=json`` (yoki ``html``) yoki
+``X-Profile: json`` sarlavhasi bilan so'rov cProfile ostida bajariladi va
+odatiy javob o'rniga hisobot qaytadi:
+
+* har bir SQL -- vaqti, alias, chaqirilgan joy (loyiha kodidagi birinchi
+  kadrlar) va parametrlari;
+* takrorlar -- bir xil SQL shabloni bir necha marta (N+1), chaqirilgan
+  joylari bilan;
+* eng sekin ``PROFILING_EXPLAIN_TOP`` ta SELECT uchun EXPLAIN
+  (``core.query_plans``);
+* eng ko'p vaqt olgan funksiyalar (cumulative).
+
+Faqat ``is_staff`` foydalanuvchilar uchun (API autentifikatsiya klasslari
+bilan tekshiriladi); boshqalarda parametr e'tiborsiz qoldiriladi. Odatiy
+so'rovlar narxi -- query string'da substring tekshiruvi: SQL wrapper faqat
+profil qilinayotgan so'rov davomida ``connection.execute_wrapper`` bilan
+qo'yiladi. So'rov SQL'ni boshqa oqimda bajarsa (``home`` bo'limlari,
+``async_db.gather_lists``) o'sha oqim kodi ``capture_queries()`` bilan o'raladi.
+``PROFILING_ENABLED = False`` bo'lsa middleware zanjirga umuman kirmaydi.
+
+Async view'larda cProfile ishlatilmaydi (event loop'dagi boshqa
+so'rovlarni ham o'lchardi) -- faqat SQL qismi; async ORM so'rovlari
+asgiref oqimida bajarilgani uchun chaqirilgan joy bo'sh bo'lishi mumkin.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections
+from django.http import HttpResponse, JsonResponse
+from django.template import Context, Template
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .query_plans import EXPLAINERS
+
+
+PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+FORMATS = ('json', 'html')
+# Chaqirilgan joy qidirilganda o'tkazib yuboriladigan modullar (SQL wrapper'lar, middleware)
+SKIP_FILES = ('profiling.py', 'metrics.py', 'db_routing.py', 'throttling.py', 'manage.py')
+STACK_DEPTH = 3
+MAX_PARAM_LENGTH = 200
+
+
+@dataclass
+class Capture:
+    queries: list = field(default_factory=list)
+    # SQL parallel oqimlarda ham bajarilishi mumkin (home, async_db)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+_state = ContextVar('profiling_capture', default=None)
+
+
+def _project_frame(filename):
+    return (
+        filename.startswith(str(settings.BASE_DIR))
+        and 'site-packages' not in filename
+        and not filename.endswith(SKIP_FILES)
+    )
+
+
+def call_site():
+    """Loyiha kodidagi eng ichki ``STACK_DEPTH`` ta kadr (``fayl:qator funksiya``)"""
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < STACK_DEPTH:
+        filename = frame.f_code.co_filename
+        if _project_frame(filename):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            frames.append(f'{path}:{frame.f_lineno} {frame.f_code.co_name}')
+        frame = frame.f_back
+    return frames
+
+
+def _param(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + '...'
+
+
+def _capture_query(execute, sql, params, many, context):
+    capture = _state.get()
+    if capture is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        query = {
+            'alias': context['connection'].alias,
+            'sql': sql,
+            # executemany: parametrlar o'rniga qatorlar soni
+            'params': [_param(value) for value in params or ()] if not many else None,
+            'rows': len(params) if many else None,
+            'time_ms': round(elapsed * 1000, 3),
+            'stack': call_site(),
+        }
+        with capture.lock:
+            query['index'] = len(capture.queries)
+            capture.queries.append(query)
+
+
+@contextmanager
+def capture_queries():
+    """
+    Profil qilinayotgan so'rov ichida joriy oqimning barcha ulanishlariga SQL
+    wrapper'ini qo'yadi; boshqa so'rovlarda hech narsa qilmaydi.
+    """
+    if _state.get() is None:
+        yield
+        return
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_capture_query))
+        yield
+
+
+def requested_format(request):
+    """``'json'``/``'html'`` yoki None (profil so'ralmagan)"""
+    value = request.META.get(HEADER)
+    if value is None:
+        # request.GET parse qilinmasin: oddiy so'rovlarda faqat substring tekshiruvi
+        if PARAM not in request.META.get('QUERY_STRING', ''):
+            return None
+        value = request.GET.get(PARAM)
+        if value is None:
+            return None
+    value = value.lower()
+    return value if value in FORMATS else 'json'
+
+
+def is_staff(request):
+    """API autentifikatsiyasi (Bearer, sessiya, Basic) bo'yicha staff foydalanuvchi"""
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        user = Request(request, authenticators=authenticators).user
+    except APIException:
+        return False
+    return bool(user and user.is_active and user.is_staff)
+
+
+def duplicates(queries):
+    """Bir necha marta bajarilgan SQL shablonlari (ko'p takrorlangani birinchi)"""
+    groups = {}
+    for query in queries:
+        groups.setdefault((query['alias'], query['sql']), []).append(query)
+    result = []
+    for (alias, sql), group in groups.items():
+        if len(group) < 2:
+            continue
+        result.append({
+            'alias': alias,
+            'sql': sql,
+            'count': len(group),
+            # Parametrlari ham bir xil -- bir natija qayta o'qilgan
+            'identical': len(group) - len({repr(query['params']) for query in group}),
+            'time_ms': round(sum(query['time_ms'] for query in group), 3),
+            'call_sites': sorted({query['stack'][0] if query['stack'] else '?' for query in group}),
+        })
+    return sorted(result, key=lambda item: (-item['count'], -item['time_ms']))
+
+
+def explain_slowest(queries, limit):
+    """Eng sekin SELECT shablonlari uchun EXPLAIN rejasi va muammolari"""
+    plans = []
+    seen = set()
+    for query in sorted(queries, key=lambda query: -query['time_ms']):
+        if len(plans) >= limit:
+            break
+        key = (query['alias'], query['sql'])
+        if key in seen or query['params'] is None or not query['sql'].lstrip().upper().startswith('SELECT'):
+            continue
+        seen.add(key)
+        connection = connections[query['alias']]
+        explain = EXPLAINERS.get(connection.vendor)
+        if explain is None:
+            continue
+        try:
+            with connection.cursor() as cursor:
+                plan, issues = explain(cursor, query['sql'], query['params'])
+        except DatabaseError as exc:
+            plan, issues = [], [f'EXPLAIN bajarilmadi: {exc}']
+        plans.append({
+            'index': query['index'], 'sql': query['sql'], 'time_ms': query['time_ms'],
+            'plan': plan, 'issues': issues,
+        })
+    return plans
+
+
+def _function_name(key):
+    filename, line, name = key
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f'{filename}:{line}({name})'
+
+
+def top_functions(profiler, limit):
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: -item[1][3])[:limit]
+    return [
+        {
+            'function': _function_name(key),
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for key, (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def build_report(request, response, capture, elapsed, profiler=None):
+    queries = capture.queries
+    return {
+        'request': {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'time_ms': round(elapsed * 1000, 3),
+        },
+        'sql': {
+            'count': len(queries),
+            'time_ms': round(sum(query['time_ms'] for query in queries), 3),
+            'duplicates': duplicates(queries),
+            'queries': queries,
+        },
+        'explain': explain_slowest(queries, getattr(settings, 'PROFILING_EXPLAIN_TOP', 3)),
+        'profile': (
+            top_functions(profiler, getattr(settings, 'PROFILING_TOP_FUNCTIONS', 40))
+            if profiler is not None else None
+        ),
+    }
+
+
+HTML_TEMPLATE = Template("""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Profil: {{ r.request.method }} {{ r.request.path }}</title>
+<style>
+body { font: 13px/1.4 monospace; margin: 1.5em; }
+table { border-collapse: collapse; margin-bottom: 2em; }
+td, th { border: 1px solid #ccc; padding: 2px 6px; text-align: left; vertical-align: top; }
+pre { margin: 0; white-space: pre-wrap; }
+.warn { color: #b00; }
+</style></head><body>
+<h1>{{ r.request.method }} {{ r.request.path }}</h1>
+<p>Status {{ r.request.status }}, {{ r.request.time_ms }} ms; SQL: {{ r.sql.count }} ta, {{ r.sql.time_ms }} ms</p>
+<h2>Takrorlangan SQL</h2>
+<table><tr><th>soni</th><th>bir xil</th><th>ms</th><th>joy</th><th>SQL</th></tr>
+{% for d in r.sql.duplicates %}<tr class="warn"><td>{{ d.count }}</td><td>{{ d.identical }}</td><td>{{ d.time_ms }}</td>
+<td>{{ d.call_sites|join:"<br>" }}</td><td><pre>{{ d.sql }}</pre></td></tr>
+{% empty %}<tr><td colspan="5">yo'q</td></tr>{% endfor %}</table>
+<h2>EXPLAIN (eng sekinlari)</h2>
+{% for e in r.explain %}<p>#{{ e.index }}, {{ e.time_ms }} ms{% for issue in e.issues %} <span class="warn">{{ issue }}</span>{% endfor %}</p>
+<pre>{{ e.sql }}</pre><pre>{{ e.plan|join:"\n" }}</pre>{% endfor %}
+<h2>SQL</h2>
+<table><tr><th>#</th><th>alias</th><th>ms</th><th>joy</th><th>SQL</th><th>parametrlar</th></tr>
+{% for q in r.sql.queries %}<tr><td>{{ q.index }}</td><td>{{ q.alias }}</td><td>{{ q.time_ms }}</td>
+<td>{{ q.stack|join:"<br>" }}</td><td><pre>{{ q.sql }}</pre></td><td>{{ q.params|default_if_none:q.rows }}</td></tr>{% endfor %}</table>
+{% if r.profile %}<h2>Funksiyalar (cumulative)</h2>
+<table><tr><th>chaqiruv</th><th>o'zi ms</th><th>jami ms</th><th>funksiya</th></tr>
+{% for f in r.profile %}<tr><td>{{ f.calls }}</td><td>{{ f.own_ms }}</td><td>{{ f.cumulative_ms }}</td><td>{{ f.function }}</td></tr>{% endfor %}
+</table>{% endif %}
+</body></html>""")
+
+
+def render_report(report, fmt):
+    if fmt == 'html':
+        response = HttpResponse(HTML_TEMPLATE.render(Context({'r': report})))
+    else:
+        response = JsonResponse(report, encoder=DjangoJSONEncoder, json_dumps_params={'ensure_ascii': False})
+    response['Cache-Control'] = 'no-store'
+    response['X-Profiled-Status'] = str(report['request']['status'])
+    return response
+
+
+class ProfilingMiddleware:
+    """``MIDDLEWARE`` oxirida (sessiya va autentifikatsiyadan keyin)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        fmt = requested_format(request)
+        if fmt is None or not is_staff(request):
+            return self.get_response(request)
+        capture = Capture()
+        token = _state.set(capture)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            with capture_queries():
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+        finally:
+            _state.reset(token)
+        elapsed = time.perf_counter() - started
+        return render_report(build_report(request, response, capture, elapsed, profiler), fmt)
+
+    async def __acall__(self, request):
+        fmt = requested_format(request)
+        if fmt is None:
+            return await self.get_response(request)
+        if not await sync_to_async(is_staff)(request):
+            return await self.get_response(request)
+        capture = Capture()
+        token = _state.set(capture)
+        # Async ORM so'rovlari so'rovning sinxron oqimida bajariladi: wrapper o'sha oqimga
+        wrappers = ExitStack()
+        started = time.perf_counter()
+        try:
+            await sync_to_async(wrappers.enter_context)(capture_queries())
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(wrappers.close)()
+        finally:
+            _state.reset(token)
+        elapsed = time.perf_counter() - started
+        report = await sync_to_async(build_report)(request, response, capture, elapsed)
+        return render_report(report, fmt)
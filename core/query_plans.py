@@ -0,0 +1,74 @@
+"""
+SQL so'rov rejalari (EXPLAIN) va ulardagi muammolar: to'liq skan (full scan)
+va vaqtinchalik saralash (temp sort). ``explain_queries`` buyrug'i va
+``core.profiling`` ishlatadi.
+
+``EXPLAINERS[vendor](cursor, sql, params=None)`` -> ``(reja qatorlari, muammolar)``.
+"""
+import re
+
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+# Vaqtinchalik (derived) jadvallar: ularni skanlash -- asl jadval skani emas
+SQLITE_DERIVED = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\w+)')
+UNFILTERED_COUNT = re.compile(r'^SELECT COUNT\(\*\) AS "__count" FROM "\w+"$')
+
+
+def is_bounded_walk(sql):
+    """
+    WHERE siz, LIMIT li so'rov jadvalni tartib bo'yicha faqat LIMIT qatorgacha
+    o'qiydi -- bu sahifali ro'yxat, to'liq skan emas. Filtrsiz COUNT(*) esa
+    pagination tomonidan keshlanadi yoki ``?count=false`` bilan o'tkaziladi.
+    """
+    if UNFILTERED_COUNT.match(sql):
+        return True
+    upper = sql.upper()
+    return ' LIMIT ' in upper and ' WHERE ' not in upper
+
+
+def explain_sqlite(cursor, sql, params=None):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    plan = [row[-1] for row in cursor.fetchall()]
+    derived = {match.group(1) for match in map(SQLITE_DERIVED.match, plan) if match}
+    issues = []
+    for line in plan:
+        match = SQLITE_FULL_SCAN.match(line.strip())
+        if match and match.group(1) not in derived and not is_bounded_walk(sql):
+            issues.append(f'full scan: {match.group(1)}')
+        elif 'USE TEMP B-TREE' in line:
+            issues.append(f"temp sort: {line.strip()}")
+    return plan, issues
+
+
+def explain_postgresql(cursor, sql, params=None):
+    cursor.execute(f'EXPLAIN {sql}', params)
+    plan = [row[0] for row in cursor.fetchall()]
+    issues = []
+    for line in plan:
+        text = line.strip().lstrip('-> ').strip()
+        if text.startswith('Seq Scan on') and not is_bounded_walk(sql):
+            issues.append(f"full scan: {text.split()[3]}")
+        elif text.startswith('Sort ') or text.startswith('Sort  '):
+            issues.append(f'temp sort: {text}')
+    return plan, issues
+
+
+def explain_mysql(cursor, sql, params=None):
+    cursor.execute(f'EXPLAIN {sql}', params)
+    columns = [col[0] for col in cursor.description]
+    plan, issues = [], []
+    for row in cursor.fetchall():
+        info = dict(zip(columns, row))
+        plan.append(str(info))
+        if info.get('type') == 'ALL' and not is_bounded_walk(sql):
+            issues.append(f"full scan: {info.get('table')}")
+        if 'filesort' in (info.get('Extra') or ''):
+            issues.append(f"temp sort: {info.get('table')}")
+    return plan, issues
+
+
+EXPLAINERS = {
+    'sqlite': explain_sqlite,
+    'postgresql': explain_postgresql,
+    'mysql': explain_mysql,
+}
@@ -0,0 +1,241 @@
+"""
+Anonim GET so'rovlar uchun versiyalangan javob keshi.
+
+Kesh kaliti: viewset + action + URL kwargs + normallashtirilgan query string
+(parametrlar saralangan) + javob bog'liq bo'lgan har bir modelning *avlod*
+(generation) raqami. Model o'zgarganda (``post_save``/``post_delete``) faqat
+shu modelning avlodi oshiriladi -- unga bog'liq barcha kalitlar o'z-o'zidan
+eskiradi, bog'liq bo'lmagan javoblar esa keshda qoladi. Eski yozuvlar
+o'chirilmaydi, TIMEOUT tugagach yoki backend tomonidan chiqarib yuboriladi.
+
+Action qaysi modellarga bog'liqligi serializerdan aniqlanadi
+(``serializer_models``): masalan ``CategorySerializer`` -> Category,
+SubCategory. Shuning uchun like bosilishi kategoriyalar keshiga tegmaydi.
+
+Signal chaqirmaydigan yozuvlardan (``queryset.update()``, ``bulk_create``,
+``_raw_delete``) keyin ``bump(...)`` yoki ``bump_all()`` ni qo'lda chaqirish
+kerak.
+
+Backend ``RESPONSE_CACHE_ALIAS`` sozlamasidagi Django kesh aliasi:
+``LocMemCache`` faqat bitta jarayon uchun to'g'ri ishlaydi (avlodlar boshqa
+worker'larga ko'rinmaydi), bir nechta worker bo'lsa umumiy backend (Redis,
+Memcached) kerak.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import db_routing
+from .eager_loading import serializer_models
+
+
+KEY_PREFIX = 'rc'
+ALL_MODELS = '*'
+
+# ResponseCacheMixin ishlatuvchi viewsetlar (statistika uchun)
+CACHED_VIEWSETS = []
+
+
+def get_cache():
+    alias = getattr(settings, 'RESPONSE_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def model_label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def _generation_key(label):
+    return f'{KEY_PREFIX}:gen:{label}'
+
+
+def _stats_key(name, kind):
+    return f'{KEY_PREFIX}:stats:{name}:{kind}'
+
+
+def _incr(cache, key, initial=0):
+    # add() mavjud qiymatni o'zgartirmaydi, shuning uchun poyga xavfsiz
+    cache.add(key, initial, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # add va incr orasida kalit chiqarib yuborilgan
+        cache.set(key, initial + 1, timeout=None)
+        return initial + 1
+
+
+def _initial_generation():
+    # Kalit yo'qolsa ham avlod eski qiymatlar bilan to'qnashmasligi uchun vaqtdan
+    return time.time_ns() // 1000
+
+
+def generations(labels):
+    """``{label: avlod}``; hali yo'q avlodlar yaratiladi"""
+    cache = get_cache()
+    keys = {_generation_key(label): label for label in labels}
+    found = cache.get_many(list(keys))
+    for key in keys.keys() - found.keys():
+        cache.add(key, _initial_generation(), timeout=None)
+        found[key] = cache.get(key)
+    return {label: found[key] for key, label in keys.items()}
+
+
+def _bump(cache, labels):
+    for label in labels:
+        _incr(cache, _generation_key(label), _initial_generation())
+
+
+def bump(*models):
+    """
+    Berilgan modellarga bog'liq barcha kesh yozuvlarini eskirtiradi.
+
+    Tranzaksiya ichida avlod commit'dan keyin yana bir marta oshiriladi:
+    aks holda commit'gacha eski ma'lumotni o'qigan parallel so'rov uni yangi
+    avlod kaliti bilan keshga yozib qo'yishi mumkin.
+    """
+    cache = get_cache()
+    if cache is None:
+        return
+    labels = [model_label(model) for model in models]
+    _bump(cache, labels)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(cache, labels))
+
+
+def bump_all():
+    bump(ALL_MODELS)
+
+
+def record(name, hit):
+    cache = get_cache()
+    if cache is not None:
+        _incr(cache, _stats_key(name, 'hit' if hit else 'miss'))
+
+
+def stat_names():
+    names = []
+    for viewset in CACHED_VIEWSETS:
+        actions = ['list', 'retrieve'] + [
+            extra.__name__ for extra in viewset.get_extra_actions() if 'get' in extra.mapping
+        ]
+        names.extend(f'{viewset.__name__}.{action}' for action in actions)
+    return names
+
+
+def stats():
+    """``{nom: {'hit': n, 'miss': m, 'ratio': ...}}``"""
+    cache = get_cache()
+    names = stat_names()
+    if cache is None:
+        return {}
+    values = cache.get_many([_stats_key(name, kind) for name in names for kind in ('hit', 'miss')])
+    result = {}
+    for name in names:
+        hit = values.get(_stats_key(name, 'hit'), 0)
+        miss = values.get(_stats_key(name, 'miss'), 0)
+        if hit or miss:
+            result[name] = {'hit': hit, 'miss': miss, 'ratio': round(hit / (hit + miss), 3)}
+    return result
+
+
+def reset_stats():
+    cache = get_cache()
+    if cache is not None:
+        cache.delete_many([_stats_key(name, kind) for name in stat_names() for kind in ('hit', 'miss')])
+
+
+class ResponseCacheMixin:
+    """
+    ViewSet uchun mixin: anonim foydalanuvchilarning GET so'rovlari JSON javobini
+    keshlaydi. Javobda ``X-Cache: HIT`` yoki ``MISS`` sarlavhasi bo'ladi.
+
+    Action boshqa serializer bilan javob qaytarsa (masalan
+    ``/categories/{id}/products/``), u ``cache_action_serializers`` da ko'rsatiladi.
+    """
+    cache_action_serializers = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        CACHED_VIEWSETS.append(cls)
+
+    def get_cache_models(self):
+        models = set(serializer_models(self.get_serializer_class()))
+        extra = self.cache_action_serializers.get(self.action)
+        if extra is not None:
+            models |= serializer_models(extra)
+        return {model_label(model) for model in models} | {ALL_MODELS}
+
+    def get_cache_key(self, request):
+        labels = sorted(self.get_cache_models())
+        versions = generations(labels)
+        query = urlencode(sorted(
+            (key, value) for key, values in request.query_params.lists() for value in values
+        ))
+        parts = [
+            type(self).__name__, self.action,
+            urlencode(sorted(self.kwargs.items())), query,
+            # Javobdagi to'liq URL'lar (next/previous) host va sxemaga bog'liq
+            request.scheme, request.get_host(),
+            ','.join(f'{label}={versions[label]}' for label in labels),
+        ]
+        digest = hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()
+        return f'{KEY_PREFIX}:resp:{digest}'
+
+    def is_response_cacheable(self, request):
+        return (
+            get_cache() is not None
+            and request.method == 'GET'
+            and not request.user.is_authenticated
+            and isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer)
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = None
+        if not self.is_response_cacheable(request):
+            return
+        self.response_cache_name = f'{type(self).__name__}.{self.action}'
+        self.response_cache_key = self.get_cache_key(request)
+        cached = get_cache().get(self.response_cache_key)
+        record(self.response_cache_name, hit=cached is not None)
+        if cached is None:
+            # Javob yangi generatsiya kaliti bilan saqlanadi -- kechikkan replikadan
+            # o'qilgan eski ma'lumot keyingi o'zgarishgacha keshda qolmasin
+            db_routing.use_primary()
+        if cached is not None:
+            response = HttpResponse(cached['content'], status=cached['status'])
+            for header, value in cached['headers']:
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            if response.has_header('ETag'):
+                # Shartli so'rov keshdagi validator bilan tekshiriladi (304)
+                response = get_conditional_response(
+                    request._request, etag=response['ETag'],
+                    last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+                    response=response,
+                )
+            # dispatch() handlerni initial() dan keyin oladi: action o'rniga
+            # keshdagi javob qaytariladi
+            self.get = lambda *args, **kwargs: response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'response_cache_key', None)
+        if key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            get_cache().set(key, {
+                'status': response.status_code,
+                'content': response.content,
+                'headers': list(response.items()),
+            }, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+            response['X-Cache'] = 'MISS'
+        return response
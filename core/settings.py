@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,13 +50,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db_routing.ReplicaRoutingMiddleware',
+    'core.throttling.RateLimitHeadersMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -81,12 +86,64 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Ma'lumotlar bazasi muhit o'zgaruvchilaridan:
+#   DB_ENGINE       -- sqlite3 (standart) yoki postgresql
+#   DB_NAME         -- sqlite3: fayl yo'li; postgresql: baza nomi
+#   DB_HOST, DB_PORT, DB_USER, DB_PASSWORD -- postgresql uchun
+#   DB_REPLICAS     -- o'qish replikalari, vergul bilan: sqlite3 uchun fayl
+#                      nusxalari, postgresql uchun host[:port] (core.db_routing)
+#   DB_CONN_MAX_AGE -- doimiy ulanish umri, soniya ("none" -- cheksiz, 0 -- har so'rovda yangi)
+#   DB_POOL_SIZE    -- postgresql: psycopg ulanishlar puli hajmi (0 -- pulsiz,
+#                      DB_CONN_MAX_AGE ishlatiladi; psycopg[pool] kerak)
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '60')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '0'))
+
+
+def _database(name=None, host=None):
+    config = {
+        'ENGINE': f'django.db.backends.{DB_ENGINE}',
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE),
+        # Doimiy ulanish uzilgan bo'lsa so'rov boshida qayta ochiladi
+        'CONN_HEALTH_CHECKS': True,
     }
-}
+    if DB_ENGINE == 'sqlite3':
+        config['NAME'] = name or os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3')
+        return config
+    host, _, port = (host or os.environ.get('DB_HOST', 'localhost')).partition(':')
+    config.update({
+        'NAME': os.environ.get('DB_NAME', 'categoriya'),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': host,
+        'PORT': port or os.environ.get('DB_PORT', ''),
+    })
+    if DB_POOL_SIZE:
+        # Pul bilan CONN_MAX_AGE ishlatilmaydi (Django talabi)
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS'] = {'pool': {'min_size': 1, 'max_size': DB_POOL_SIZE}}
+    return config
+
+
+DATABASES = {'default': _database()}
+DATABASE_REPLICAS = []
+for _number, _replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    _alias = f'replica{_number}'
+    _replica = _replica.strip()
+    DATABASES[_alias] = _database(name=_replica) if DB_ENGINE == 'sqlite3' else _database(host=_replica)
+    # Testlarda replika primary test bazasining o'zi
+    DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['core.db_routing.ReplicaRouter']
+# Shu ilovalar view'larining GET so'rovlari va shu ilovalar modellari replikadan o'qiladi
+DATABASE_REPLICA_APPS = ['categoriya', 'user']
+# Kechikishi shundan (soniya) katta replika ishlatilmaydi; kechikish shuncha
+# soniyada bir marta o'lchanadi
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', '5'))
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = 1.0
+# Alias bo'yicha SQL hisoblagichlari keshi. Bir nechta worker bo'lsa 'shared' ga o'zgartiring.
+DATABASE_STATS_CACHE_ALIAS = 'default'
 
 
 # Password validation
@@ -142,7 +199,7 @@ STATIC_ROOT = BASE_DIR / "static"
 
 # Django REST Framework
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CatalogPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -150,15 +207,120 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
+    # Bearer token (user.tokens) -- asosiy usul; Basic har so'rovda parol xeshini
+    # hisoblaydi va faqat moslik uchun qoldirilgan
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'user.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # Klient IP'si: X-Forwarded-For oxiridan shuncha proksi (0 -- sarlavha
+    # e'tiborga olinmaydi, REMOTE_ADDR). Sarlavhani klient o'zi yozishi mumkin:
+    # haqiqiy proksi soni berilmasa uni almashtirib cheklovdan qochiladi
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
+    # core.throttling: anonim (IP), foydalanuvchi va endpoint doiralari
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.AnonThrottle',
+        'core.throttling.UserThrottle',
+        'core.throttling.EndpointThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '120/min',
+        'user': '600/min',
+        # Viewset throttle_scopes dagi endpoint doiralari
+        'likes': '30/min',
+        'reviews': '5/min',
+        'register': '5/hour',
+        'login': '10/min',
+        'lists': '30/min',
+    },
+}
+
+# Metrikalar (core.metrics, GET /metrics): har bir worker o'z qiymatlarini
+# METRICS_DIR/metrics-<pid>.json ga METRICS_FLUSH_INTERVAL soniyada bir marta
+# yozadi; /metrics hammasini qo'shadi. Katalog barcha worker'lar uchun bitta
+# (deploy paytida tozalanadi). Sekin so'rov/SQL chegaralari (ms, None -- o'chiq)
+# 'core.metrics' logger'iga yoziladi.
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get('METRICS_DIR', BASE_DIR / '.metrics')
+METRICS_FLUSH_INTERVAL = 5.0
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_QUERY_MS = 100
+
+# Staff uchun profiler (core.profiling): ?_profile=json|html yoki X-Profile
+# sarlavhasi. False -- middleware zanjirdan chiqariladi.
+PROFILING_ENABLED = True
+PROFILING_EXPLAIN_TOP = 3
+PROFILING_TOP_FUNCTIONS = 40
+
+# So'rovlarni cheklash hisoblagichlari (core.throttling): bir hostdagi barcha
+# worker'lar uchun umumiy SQLite fayl (tmpfs'da bo'lgani ma'qul).
+THROTTLE_ENABLED = True
+THROTTLE_STORE_PATH = os.environ.get('THROTTLE_STORE_PATH', BASE_DIR / 'throttle.sqlite3')
+# Testlarda cheklash o'chiriladi va hisoblagichlar vaqtinchalik faylda
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Tokenlar (user.tokens): amal qilish muddatlari (soniya) va tekshirilgan
+# foydalanuvchilarning jarayon ichidagi keshi
+AUTH_ACCESS_TOKEN_TTL = 15 * 60
+AUTH_REFRESH_TOKEN_TTL = 14 * 24 * 3600
+AUTH_USER_CACHE_TTL = 30
+AUTH_USER_CACHE_MAX_ENTRIES = 10000
+
+# Pagination: jami sonni (COUNT(*)) necha soniya keshlash. 0 -- keshlamaslik.
+# Klient ?count=false bilan COUNT ni butunlay o'tkazib yuborishi mumkin.
+PAGINATION_COUNT_CACHE_TIMEOUT = 0
+
+# Keshlar. "default" -- jarayon ichidagi xotira (bitta worker, ishlab chiqish),
+# "shared" -- bir nechta worker/server uchun umumiy kesh (redis-py kerak).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'categoriya-default',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
 }
 
+# Anonim GET javoblari keshi (core.response_cache). Bir nechta worker bo'lsa
+# 'shared' ga o'zgartiring; None -- keshlash o'chirilgan.
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Jarayon ichidagi snapshot'lar (core.snapshot, masalan kategoriyalar daraxti)
+# versiyasi saqlanadigan kesh. Bir nechta worker bo'lsa 'shared' ga o'zgartiring.
+SNAPSHOT_CACHE_ALIAS = 'default'
+
+# Bosh sahifa (categoriya.home): bo'limlar keshi muddati (soniya, RESPONSE_CACHE_ALIAS
+# keshida; berilmagan bo'limlar uchun home.DEFAULT_TTL) va bo'limlarni parallel
+# quradigan oqimlar soni.
+HOME_SECTION_TTL = {}
+HOME_WORKERS = 5
+
+# Rasm variantlari (core.images): False -- commit'dan keyin shu so'rov ichida
+# yaratish (testlar, fon oqimlari istalmagan muhit).
+IMAGE_VARIANTS_BACKGROUND = True
+IMAGE_VARIANTS_WORKERS = 2
+
+# Async endpointlar (core.async_db): mustaqil querysetlarni alohida oqim va
+# ulanishlarda parallel o'qish. False -- so'rov oqimida navbat bilan.
+ASYNC_PARALLEL_QUERIES = True
+
+# Like hisoblagichlari buferi (categoriya.likes): likes_count shuncha soniya
+# yoki shuncha o'zgarishdan keyin yoziladi. 0 -- har bir like darhol yoziladi.
+LIKE_BUFFER_MAX_DELAY = 1.0
+LIKE_BUFFER_MAX_PENDING = 500
+
+# Qidiruv backendi. None -- SQLite'da FTS5, boshqa DB'larda oddiy LIKE backend.
+SEARCH_BACKEND = None
+
 # Swagger settings
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
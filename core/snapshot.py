@@ -0,0 +1,88 @@
+"""
+Jarayon ichidagi o'zgarmas snapshot'lar: kichik, kam o'zgaradigan va tez-tez
+o'qiladigan ma'lumot (masalan kategoriyalar daraxti) uchun.
+
+Snapshot bir marta quriladi va worker xotirasida saqlanadi; o'qish -- faqat
+versiyani tekshirish (kesh ``get``), DB so'rovi yo'q. Ma'lumot o'zgarganda
+(signal yoki bulk yozuv) ``bump()`` versiyani oshiradi, keyingi ``get()``
+snapshot'ni qayta quradi ("lazy"). Versiya ``SNAPSHOT_CACHE_ALIAS`` keshida:
+bir nechta worker bo'lsa umumiy backend ('shared') kerak, aks holda boshqa
+jarayonlar o'zgarishni ko'rmaydi.
+
+Quruvchi funksiya versiya o'qilgandan keyin chaqiriladi: qurish paytida
+versiya oshsa snapshot eski versiya bilan saqlanadi va keyingi ``get()``
+uni yana quradi. Qurish har doim primary bazadan o'qiydi (``core.db_routing``).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from . import db_routing
+
+
+KEY_PREFIX = 'snapshot'
+
+
+def get_cache():
+    return caches[getattr(settings, 'SNAPSHOT_CACHE_ALIAS', 'default')]
+
+
+class Snapshot:
+    """``build(version)`` -- o'zgarmas qiymat quruvchi funksiya"""
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self.key = f'{KEY_PREFIX}:{name}:version'
+        self.lock = threading.Lock()
+        self.current = None
+        self.builds = 0
+
+    def version(self):
+        cache = get_cache()
+        version = cache.get(self.key)
+        if version is None:
+            # Kalit yo'qolsa ham yangi versiya eskisi bilan to'qnashmasin
+            cache.add(self.key, time.time_ns() // 1000, timeout=None)
+            version = cache.get(self.key)
+        return version
+
+    def get(self):
+        version = self.version()
+        current = self.current
+        if current is not None and current.version == version:
+            return current
+        with self.lock:
+            # Boshqa oqim allaqachon qurgan bo'lishi mumkin
+            current = self.current
+            if current is None or current.version != version:
+                # Replika kechiksa eski ma'lumot yangi versiya bilan qolardi
+                with db_routing.primary_reads():
+                    current = self.build(version)
+                self.current = current
+                self.builds += 1
+        return current
+
+    def _bump(self):
+        cache = get_cache()
+        cache.add(self.key, time.time_ns() // 1000, timeout=None)
+        try:
+            cache.incr(self.key)
+        except ValueError:
+            cache.set(self.key, time.time_ns() // 1000, timeout=None)
+
+    def bump(self):
+        """
+        Versiyani oshiradi. Tranzaksiya ichida commit'dan keyin yana bir marta:
+        commit'gacha eski ma'lumotdan qurilgan snapshot yangi versiya bilan qolmasin.
+        """
+        self._bump()
+        if connection.in_atomic_block:
+            transaction.on_commit(self._bump)
+
+    def clear(self):
+        """Jarayondagi nusxani tashlaydi (testlar uchun)"""
+        self.current = None
@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Testlar uchun: so'rovlarni cheklash o'chiriladi (yoqadigan testlar
+    ``override_settings(THROTTLE_ENABLED=True)`` ishlatadi), hisoblagichlar va
+    metrika fayllari vaqtinchalik katalogda -- ishlab turgan server yoki
+    oldingi ishga tushirishlar fayllariga tegmaydi. Sekin so'rov/SQL logi
+    o'chiq (parol xeshlash kabi sekin yo'llar chiqishni to'ldirmasin).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        settings.THROTTLE_STORE_PATH = os.path.join(self.temp_dir.name, 'throttle.sqlite3')
+        settings.THROTTLE_ENABLED = False
+        settings.METRICS_DIR = os.path.join(self.temp_dir.name, 'metrics')
+        settings.METRICS_SLOW_REQUEST_MS = settings.METRICS_SLOW_QUERY_MS = None
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self.temp_dir.cleanup()
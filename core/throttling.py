@@ -0,0 +1,246 @@
+"""
+So'rovlarni cheklash (DRF throttling): sliding window, bir hostdagi barcha
+worker jarayonlari uchun umumiy hisoblagichlar bilan.
+
+Doiralar (``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``, masalan ``'60/min'``):
+
+* ``anon`` -- anonim so'rovlar, IP bo'yicha;
+* ``user`` -- autentifikatsiyalangan so'rovlar, foydalanuvchi bo'yicha;
+* endpoint doiralari -- viewset ``throttle_scopes = {action: doira}``
+  (masalan ``like``, ``create``), foydalanuvchi yoki IP bo'yicha.
+  ``throttle_fields = {action: [maydon, ...]}`` bo'lsa so'rov tanasidagi shu
+  maydon qiymati bo'yicha ham (masalan login -- ``telefon``): bitta hisobga
+  turli IP'lardan parol tanlash ham cheklanadi.
+
+IP ``REST_FRAMEWORK['NUM_PROXIES']`` bo'yicha olinadi (0 -- ``REMOTE_ADDR``):
+``X-Forwarded-For`` ni klient o'zi yozadi va proksi soni to'g'ri berilmasa
+har so'rovda uni almashtirib cheklovdan qochish mumkin.
+
+Algoritm -- sliding window counter: joriy va oldingi oyna hisoblagichlari,
+oldingisi oynaning o'tgan qismiga mos kamayadi
+(``oldingi * (1 - o'tgan_ulush) + joriy``). Rad etilgan so'rovlar ham
+sanaladi: to'xtamay urayotgan klient cheklovda qoladi.
+
+Hisoblagichlar ``THROTTLE_STORE_PATH`` dagi SQLite faylida (WAL,
+``synchronous=OFF``): har bir tekshiruv -- bitta ``INSERT ... ON CONFLICT DO
+UPDATE ... RETURNING`` (atomar, jarayonlar orasida ham). Jarayon ichidagi
+LocMem kesh worker'lar orasida bo'linmaydi, Redis esa bitta host uchun
+tarmoq so'rovini qo'shadi. Fayl tmpfs'da (``/dev/shm``) bo'lsa diskka
+yozilmaydi. Ombor band yoki ishlamasa so'rov o'tkaziladi (fail open).
+
+Javobda ``X-RateLimit-Limit``/``-Remaining``/``-Reset`` (eng qattiq
+cheklov bo'yicha, ``RateLimitHeadersMiddleware``), 429 da ``Retry-After``.
+"""
+import math
+import random
+import sqlite3
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+BUSY_TIMEOUT = 0.05
+# Eskirgan kalitlar taxminan shuncha tekshiruvda bir marta o'chiriladi
+PURGE_EVERY = 1000
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS throttle (
+        key TEXT PRIMARY KEY,
+        window INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        previous INTEGER NOT NULL,
+        expires REAL NOT NULL
+    ) WITHOUT ROWID
+"""
+HIT_SQL = """
+    INSERT INTO throttle (key, window, count, previous, expires) VALUES (?, ?, 1, 0, ?)
+    ON CONFLICT (key) DO UPDATE SET
+        previous = CASE
+            WHEN excluded.window = window THEN previous
+            WHEN excluded.window = window + 1 THEN count
+            ELSE 0
+        END,
+        count = CASE WHEN excluded.window = window THEN count + 1 ELSE 1 END,
+        window = excluded.window,
+        expires = excluded.expires
+    RETURNING count, previous
+"""
+
+
+def parse_rate(rate):
+    """``'60/min'`` -> ``(60, 60)``: so'rovlar soni va oyna (soniya)"""
+    number, period = rate.split('/')
+    return int(number), DURATIONS[period[0]]
+
+
+class SlidingWindowStore:
+    """Oqim boshiga bitta SQLite ulanishi (autocommit)"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def path(self):
+        return str(getattr(settings, 'THROTTLE_STORE_PATH', settings.BASE_DIR / 'throttle.sqlite3'))
+
+    def connection(self):
+        path = self.path()
+        if getattr(self.local, 'path', None) != path:
+            connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Hisoblagichlar vaqtinchalik: fsync kerak emas
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(SCHEMA)
+            self.local.connection, self.local.path = connection, path
+        return self.local.connection
+
+    def hit(self, key, duration, now=None):
+        """
+        Kalitga bitta so'rov qo'shadi: ``(joriy, oldingi, o'tgan_ulush)``;
+        ombor ishlamasa None.
+        """
+        now = time.time() if now is None else now
+        window, offset = divmod(now, duration)
+        try:
+            connection = self.connection()
+            count, previous = connection.execute(HIT_SQL, (key, int(window), now + 2 * duration)).fetchone()
+            if random.randrange(PURGE_EVERY) == 0:
+                connection.execute('DELETE FROM throttle WHERE expires < ?', (now,))
+        except sqlite3.Error:
+            return None
+        return count, previous, offset / duration
+
+    def clear(self):
+        self.connection().execute('DELETE FROM throttle')
+
+
+STORE = SlidingWindowStore()
+
+
+def window_state(count, previous, elapsed, limit, duration):
+    """``(baholangan so'rovlar soni, kutish soniyasi, oyna tugashigacha soniya)``"""
+    estimated = previous * (1 - elapsed) + count
+    reset = (1 - elapsed) * duration
+    if estimated <= limit:
+        return estimated, 0, reset
+    if count > limit:
+        # Keyingi oynada joriy hisoblagich "oldingi" bo'ladi va kamaya boshlaydi
+        wait = reset + (1 - limit / count) * duration
+    else:
+        wait = max(0, 1 - elapsed - (limit - count) / previous) * duration
+    return estimated, wait, reset
+
+
+def _record(request, limit, remaining, reset):
+    # Javob sarlavhalari uchun eng qattiq (qolgani eng kam) cheklov
+    http_request = getattr(request, '_request', request)
+    current = getattr(http_request, 'rate_limit', None)
+    if current is None or remaining < current[1]:
+        http_request.rate_limit = (limit, remaining, reset)
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    scope = None
+
+    def get_scope(self, view):
+        return self.scope
+
+    def applies(self, request):
+        return True
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def get_ident_keys(self, request, view):
+        return [self.get_ident_key(request)]
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if not getattr(settings, 'THROTTLE_ENABLED', True) or not self.applies(request):
+            return True
+        scope = self.get_scope(view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if not rate:
+            return True
+        limit, duration = parse_rate(rate)
+        waits = []
+        for key in self.get_ident_keys(request, view):
+            hit = STORE.hit(f'{scope}:{key}', duration)
+            if hit is None:
+                continue
+            estimated, wait, reset = window_state(*hit, limit, duration)
+            _record(request, limit, max(0, limit - math.ceil(estimated)), reset)
+            if estimated > limit:
+                waits.append(wait)
+        if not waits:
+            return True
+        self.wait_seconds = max(waits)
+        return False
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AnonThrottle(SlidingWindowThrottle):
+    scope = 'anon'
+
+    def applies(self, request):
+        return not (request.user and request.user.is_authenticated)
+
+
+class UserThrottle(SlidingWindowThrottle):
+    scope = 'user'
+
+    def applies(self, request):
+        return bool(request.user and request.user.is_authenticated)
+
+
+class EndpointThrottle(SlidingWindowThrottle):
+    """Viewset ``throttle_scopes`` dagi action doirasi"""
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scopes', {}).get(getattr(view, 'action', None))
+
+    def get_ident_keys(self, request, view):
+        keys = super().get_ident_keys(request, view)
+        fields = getattr(view, 'throttle_fields', {}).get(getattr(view, 'action', None), ())
+        for name in fields:
+            value = request.data.get(name) if hasattr(request.data, 'get') else None
+            if isinstance(value, str) and value.strip():
+                keys.append(f'{name}:{value.strip().lower()}')
+        return keys
+
+
+def _add_headers(request, response):
+    rate_limit = getattr(request, 'rate_limit', None)
+    if rate_limit is not None:
+        limit, remaining, reset = rate_limit
+        response['X-RateLimit-Limit'] = str(limit)
+        response['X-RateLimit-Remaining'] = str(remaining)
+        response['X-RateLimit-Reset'] = str(math.ceil(reset))
+    return response
+
+
+class RateLimitHeadersMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return _add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return _add_headers(request, await self.get_response(request))
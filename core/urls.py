@@ -22,6 +22,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from core.metrics import metrics_view
+
 # Swagger/OpenAPI sozlamalari
 schema_view = get_schema_view(
     openapi.Info(
@@ -70,6 +72,9 @@ urlpatterns = [
     
     # DRF browsable API login
     path('api-auth/', include('rest_framework.urls')),
+
+    # Prometheus metrikalari (core.metrics)
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Media files uchun URL
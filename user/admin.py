@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import User
+from .models import RevokedToken, User
 
 
 @admin.register(User)
@@ -30,3 +30,21 @@ class UserAdmin(BaseUserAdmin):
     
     readonly_fields = ['yaratilgan_vaqt', 'last_login']
 
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    """Bekor qilingan tokenlar (faqat ko'rish: yozuvlarni logout va refresh boshqaradi)"""
+    list_display = ['jti', 'user', 'rotated', 'revoked_at', 'expires_at']
+    list_filter = ['rotated']
+    search_fields = ['jti', 'user__telefon']
+    raw_id_fields = ['user']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,30 @@
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import tokens
+
+
+class TokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Bearer <access token>`` (``user.tokens``). Parol xeshi
+    hisoblanmaydi; ``request.auth`` -- token payload'i.
+    """
+    keyword = tokens.TOKEN_TYPE
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed("Token noto'g'ri formatda")
+        try:
+            payload = tokens.decode(header[1].decode('latin-1'), tokens.ACCESS)
+        except tokens.TokenError as exc:
+            raise AuthenticationFailed(str(exc))
+        user = tokens.USERS.get(payload['u'])
+        if user is None:
+            raise AuthenticationFailed("Foydalanuvchi topilmadi yoki faol emas")
+        return user, payload
+
+    def authenticate_header(self, request):
+        return f'{self.keyword} realm="api"'
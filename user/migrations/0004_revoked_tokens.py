@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(blank=True, max_length=32, null=True, unique=True, verbose_name='Token ID')),
+                ('revoked_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Bekor qilingan vaqt')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Amal qilish muddati')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revoked_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bekor qilingan token',
+                'verbose_name_plural': 'Bekor qilingan tokenlar',
+            },
+        ),
+    ]
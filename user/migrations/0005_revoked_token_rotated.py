@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revokedtoken',
+            name='rotated',
+            field=models.BooleanField(default=False, verbose_name='Refresh rotation'),
+        ),
+        migrations.AddIndex(
+            model_name='revokedtoken',
+            index=models.Index(fields=['rotated', 'revoked_at'], name='revoked_token_recent_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -14,6 +15,8 @@ class User(AbstractUser):
     ism = models.CharField(_("Ism"), max_length=255)
     familiya = models.CharField(_("Familiya"), max_length=255)
     rasm = models.ImageField(_("Rasm"), upload_to="users/", null=True, blank=True)
+    # Rasm variantlari (core.images), fonda to'ldiriladi
+    rasm_variants = models.JSONField(null=True, blank=True, editable=False)
     telefon = models.CharField(_("Telefon raqam"), max_length=20, unique=True)
     email = models.EmailField(_("Email"), unique=True)
 
@@ -28,3 +31,31 @@ class User(AbstractUser):
     class Meta:
         verbose_name = _("Foydalanuvchi")
         verbose_name_plural = _("Foydalanuvchilar")
+        indexes = [
+            models.Index(fields=['-yaratilgan_vaqt'], name='user_recent_idx'),
+        ]
+
+
+class RevokedToken(models.Model):
+    """
+    Bekor qilingan tokenlar ro'yxati (``user.tokens``). ``jti`` bo'sh bo'lsa
+    foydalanuvchining ``revoked_at`` gacha berilgan barcha tokenlari bekor.
+    ``rotated`` -- refresh rotation'da ishlatilgan refresh token: faqat
+    ``/refresh/`` da tekshiriladi, access tokenlar snapshot'iga kirmaydi.
+    Qator token muddati (``expires_at``) tugagach kerak emas va o'chiriladi.
+    """
+    jti = models.CharField(_("Token ID"), max_length=32, unique=True, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='revoked_tokens')
+    rotated = models.BooleanField(_("Refresh rotation"), default=False)
+    revoked_at = models.DateTimeField(_("Bekor qilingan vaqt"), default=timezone.now)
+    expires_at = models.DateTimeField(_("Amal qilish muddati"), db_index=True)
+
+    class Meta:
+        verbose_name = _("Bekor qilingan token")
+        verbose_name_plural = _("Bekor qilingan tokenlar")
+        indexes = [
+            models.Index(fields=['rotated', 'revoked_at'], name='revoked_token_recent_idx'),
+        ]
+
+    def __str__(self):
+        return self.jti or f"{self.user_id}: barcha tokenlar"
@@ -1,15 +1,46 @@
+from django.contrib.auth import authenticate
 from rest_framework import serializers
+
+from core.images import ImageVariantsField
+from . import tokens
 from .models import User
 
 
 class UserSerializer(serializers.ModelSerializer):
     """User model uchun serializer"""
+    images = ImageVariantsField('rasm')
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'telefon', 'email', 'ism', 'familiya', 'rasm', 'yaratilgan_vaqt']
+        fields = ['id', 'username', 'telefon', 'email', 'ism', 'familiya', 'rasm', 'images', 'yaratilgan_vaqt']
         read_only_fields = ['id', 'yaratilgan_vaqt', 'username']
 
 
+class UserInfoSerializer(serializers.ModelSerializer):
+    """Boshqa obyektlar ichida ko'rsatiladigan qisqa user ma'lumoti"""
+    class Meta:
+        model = User
+        fields = ['id', 'ism', 'familiya']
+
+
+class ShopOwnerSerializer(UserInfoSerializer):
+    """Do'kon egasi haqida qisqa ma'lumot"""
+    class Meta(UserInfoSerializer.Meta):
+        fields = UserInfoSerializer.Meta.fields + ['telefon']
+
+
+class ReviewAuthorSerializer(UserInfoSerializer):
+    """Sharh muallifi haqida qisqa ma'lumot"""
+    rasm = serializers.SerializerMethodField()
+    images = ImageVariantsField('rasm')
+
+    class Meta(UserInfoSerializer.Meta):
+        fields = UserInfoSerializer.Meta.fields + ['rasm', 'images']
+
+    def get_rasm(self, obj):
+        return obj.rasm.url if obj.rasm else None
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     """Yangi user yaratish uchun serializer"""
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -31,3 +62,40 @@ class UserCreateSerializer(serializers.ModelSerializer):
             user.rasm = validated_data['rasm']
             user.save()
         return user
+
+
+class LoginSerializer(serializers.Serializer):
+    """Telefon va parol bilan token olish (parol faqat shu yerda tekshiriladi)"""
+    telefon = serializers.CharField()
+    password = serializers.CharField(write_only=True, style={'input_type': 'password'})
+
+    def validate(self, attrs):
+        user = authenticate(self.context.get('request'), username=attrs['telefon'], password=attrs['password'])
+        if user is None:
+            raise serializers.ValidationError("Telefon yoki parol noto'g'ri")
+        attrs['user'] = user
+        return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """``refresh`` -- tekshirilgan token payload'iga aylantiriladi"""
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            return tokens.decode(value, tokens.REFRESH)
+        except tokens.TokenError as exc:
+            raise serializers.ValidationError(str(exc))
+
+
+class LogoutSerializer(RefreshTokenSerializer):
+    all = serializers.BooleanField(default=False, help_text="Barcha qurilmalardagi tokenlarni bekor qilish")
+
+
+class TokenPairSerializer(serializers.Serializer):
+    """Login/refresh javobi (hujjatlar uchun)"""
+    token_type = serializers.CharField()
+    access = serializers.CharField()
+    access_expires_in = serializers.IntegerField(help_text="Soniya")
+    refresh = serializers.CharField()
+    refresh_expires_in = serializers.IntegerField(help_text="Soniya")
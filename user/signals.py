@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import images, response_cache
+from . import tokens
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    tokens.USERS.evict(instance.pk)
+    # Har bir login'da faqat last_login yoziladi -- javoblarda u ko'rinmaydi
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    response_cache.bump(User)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    tokens.USERS.evict(instance.pk)
+    response_cache.bump(User)
+
+
+images.register(User, 'rasm')
@@ -1,3 +1,135 @@
+from datetime import timedelta
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from categoriya.models import Shop
+from . import tokens
+from .models import RevokedToken, User
+
+
+class UserShopsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='998901112233', telefon='998901112233', email='a@test.uz',
+            ism='Ali', familiya='Valiyev', password='parol12345',
+        )
+        for i in range(3):
+            Shop.objects.create(
+                foydalanuvchi=self.user, kompaniya_nomi=f'Do\'kon {i}', brend_nomi='B',
+                direktor_ismi='D', telefon_raqam_email='-', bizness_manzili='-',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_shops_action_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/v1/auth/users/{self.user.id}/shops/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['foydalanuvchi_info']['ism'], 'Ali')
+        # get_object + do'konlar (egasi va mahsulotlar soni bilan)
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+
+class TokenAuthTests(TestCase):
+    login_url = '/api/v1/auth/users/login/'
+    me_url = '/api/v1/auth/users/me/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='998901112233', telefon='998901112233', email='a@test.uz',
+            ism='Ali', familiya='Valiyev', password='parol12345',
+        )
+
+    def setUp(self):
+        tokens.USERS.clear()
+        tokens.REVOKED.clear()
+        self.client = APIClient()
+
+    def login(self, password='parol12345'):
+        return self.client.post(self.login_url, {'telefon': self.user.telefon, 'password': password}, format='json')
+
+    def me(self, access):
+        return self.client.get(self.me_url, HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_login_and_cached_verification(self):
+        self.assertEqual(self.login('xato').status_code, 400)
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['token_type'], 'Bearer')
+        access = response.data['access']
+
+        response = self.me(access)
+        self.assertEqual((response.status_code, response.data['id']), (200, self.user.pk))
+        # Keyingi so'rovlar: foydalanuvchi ham, bekor qilinganlar ro'yxati ham xotiradan
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.me(access).status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_invalid_tokens(self):
+        refresh = self.login().data['refresh']
+        for token in ('abc', refresh, self.login().data['access'][:-2] + 'xx'):
+            response = self.me(token)
+            self.assertEqual(response.status_code, 401)
+            self.assertTrue(response['WWW-Authenticate'].startswith('Bearer'))
+        with self.settings(AUTH_ACCESS_TOKEN_TTL=0):
+            self.assertEqual(self.me(self.login().data['access']).status_code, 401)
+
+    def test_refresh_rotation(self):
+        pair = self.login().data
+        response = self.client.post('/api/v1/auth/users/refresh/', {'refresh': pair['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.me(response.data['access']).status_code, 200)
+        # Eski refresh qayta ishlatilmaydi, eski access muddati tugaguncha ishlaydi
+        again = self.client.post('/api/v1/auth/users/refresh/', {'refresh': pair['refresh']}, format='json')
+        self.assertEqual(again.status_code, 400)
+        self.assertEqual(self.me(pair['access']).status_code, 200)
+
+    def test_rotation_does_not_reload_revocations(self):
+        pair = self.login().data
+        self.assertEqual(self.me(pair['access']).status_code, 200)
+        version = tokens.REVOKED.version()
+        response = self.client.post('/api/v1/auth/users/refresh/', {'refresh': pair['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tokens.REVOKED.version(), version)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.me(response.data['access']).status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_old_revocations_leave_snapshot(self):
+        pair = self.login().data
+        self.client.post('/api/v1/auth/users/logout/', {'refresh': pair['refresh']}, format='json')
+        self.assertEqual(len(tokens.REVOKED.get().sessions), 1)
+        # Access token muddatidan eski bekor qilishlar snapshot'ga kirmaydi,
+        # lekin sessiyaning refresh tokeni baribir rad etiladi (bazadan)
+        RevokedToken.objects.update(revoked_at=timezone.now() - timedelta(hours=1))
+        tokens.REVOKED.bump()
+        self.assertEqual(len(tokens.REVOKED.get().sessions), 0)
+        response = self.client.post('/api/v1/auth/users/refresh/', {'refresh': pair['refresh']}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_logout(self):
+        first, second = self.login().data, self.login().data
+        # Eskirgan access token sarlavhada bo'lsa ham logout ishlaydi
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer eskirgan')
+        response = self.client.post('/api/v1/auth/users/logout/', {'refresh': first['refresh']}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.client.credentials()
+        self.assertEqual(self.me(first['access']).status_code, 401)
+        self.assertEqual(self.me(second['access']).status_code, 200)
+
+        self.client.post('/api/v1/auth/users/logout/', {'refresh': second['refresh'], 'all': True}, format='json')
+        self.assertEqual(self.me(second['access']).status_code, 401)
+        self.assertEqual(self.me(self.login().data['access']).status_code, 200)
 
-# Create your tests here.
+    def test_deactivated_user(self):
+        access = self.login().data['access']
+        self.assertEqual(self.me(access).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me(access).status_code, 401)
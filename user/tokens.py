@@ -0,0 +1,218 @@
+"""
+Imzolangan access/refresh tokenlar: Basic auth'dagi har so'rovlik PBKDF2
+o'rniga parol faqat login'da tekshiriladi.
+
+Token -- ``django.core.signing`` (SECRET_KEY bilan HMAC-SHA256) imzolagan
+``{'u': user_id, 'k': tur, 'j': token_id, 's': sessiya, 'i': berilgan, 'e': tugash}``.
+Sessiya -- bitta login: refresh yangilanganda (rotation) ham o'zgarmaydi,
+logout uni butunlay bekor qiladi.
+Tekshirish -- bitta HMAC va ikkita xotira o'qishi:
+
+* ``USERS`` -- tekshirilgan foydalanuvchilar jarayon ichida
+  ``AUTH_USER_CACHE_TTL`` soniya saqlanadi (``User`` qatori har so'rovda
+  o'qilmaydi). Foydalanuvchi saqlansa shu jarayonda darhol, boshqalarida
+  TTL tugagach yangilanadi.
+* ``REVOKED`` -- bekor qilingan sessiyalar va "barcha sessiyalar" snapshot'i
+  (``core.snapshot``): ``revoke_session``/``revoke_all`` versiyani oshiradi va
+  barcha worker'lar keyingi so'rovda ro'yxatni qayta o'qiydi. Snapshot'ga
+  faqat oxirgi ``AUTH_ACCESS_TOKEN_TTL`` ichidagi bekor qilishlar kiradi:
+  undan oldin berilgan access tokenlar baribir muddati o'tgan.
+
+Refresh token faqat ``/refresh/`` da ishlatiladi, shuning uchun u bazadan
+tekshiriladi (``decode(token, REFRESH)`` -- bitta so'rov, primary). Refresh
+rotation ishlatilgan tokenni ``rotated`` qator sifatida yozadi va snapshot'ni
+oshirmaydi: har bir rotation barcha worker'larni ro'yxatni qayta o'qishga
+majburlamaydi.
+"""
+import copy
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils import timezone
+
+from core.snapshot import Snapshot
+from .models import RevokedToken, User
+
+
+SALT = 'user.tokens'
+ACCESS = 'access'
+REFRESH = 'refresh'
+TOKEN_TYPE = 'Bearer'
+
+
+class TokenError(Exception):
+    pass
+
+
+def lifetime(kind):
+    if kind == ACCESS:
+        return getattr(settings, 'AUTH_ACCESS_TOKEN_TTL', 15 * 60)
+    return getattr(settings, 'AUTH_REFRESH_TOKEN_TTL', 14 * 24 * 3600)
+
+
+def issue(user_id, kind, session, now=None):
+    now = time.time() if now is None else now
+    payload = {
+        'u': user_id, 'k': kind, 'j': uuid.uuid4().hex, 's': session,
+        'i': round(now, 3), 'e': int(now + lifetime(kind)),
+    }
+    return signing.dumps(payload, salt=SALT)
+
+
+def issue_pair(user_id, session=None):
+    """Access va refresh tokenlar; ``session`` berilmasa yangi sessiya (login)"""
+    session = session or uuid.uuid4().hex
+    return {
+        'token_type': TOKEN_TYPE,
+        'access': issue(user_id, ACCESS, session),
+        'access_expires_in': lifetime(ACCESS),
+        'refresh': issue(user_id, REFRESH, session),
+        'refresh_expires_in': lifetime(REFRESH),
+    }
+
+
+def decode(token, kind):
+    """Tekshirilgan payload; yaroqsiz, muddati o'tgan yoki bekor qilingan bo'lsa ``TokenError``"""
+    try:
+        payload = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise TokenError("Token yaroqsiz")
+    if not isinstance(payload, dict) or payload.get('k') != kind:
+        raise TokenError("Token turi noto'g'ri")
+    if payload['e'] <= time.time():
+        raise TokenError("Token muddati tugagan")
+    if is_revoked(payload) or (kind == REFRESH and is_refresh_revoked(payload)):
+        raise TokenError("Token bekor qilingan")
+    return payload
+
+
+@dataclass(frozen=True)
+class Revocations:
+    version: int
+    # Bekor qilingan sessiyalar
+    sessions: frozenset
+    # {user_id: shu vaqtgacha (timestamp) berilgan tokenlar bekor}
+    users: dict
+
+
+def build_revocations(version):
+    sessions = set()
+    users = {}
+    # Replika kechikishi bekor qilishni yashirmasin: har doim primary'dan
+    since = timezone.now() - timedelta(seconds=lifetime(ACCESS))
+    rows = (
+        RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(rotated=False, revoked_at__gt=since)
+        .values_list('jti', 'user_id', 'revoked_at')
+    )
+    for jti, user_id, revoked_at in rows:
+        if jti:
+            sessions.add(jti)
+        else:
+            users[user_id] = max(users.get(user_id, 0), revoked_at.timestamp())
+    return Revocations(version=version, sessions=frozenset(sessions), users=users)
+
+
+REVOKED = Snapshot('user.revoked_tokens', build_revocations)
+
+
+def is_revoked(payload):
+    revocations = REVOKED.get()
+    return (
+        payload['s'] in revocations.sessions
+        or payload['i'] <= revocations.users.get(payload['u'], 0)
+    )
+
+
+def is_refresh_revoked(payload):
+    """Refresh token ishlatilganmi, sessiyasi yoki barcha sessiyalar bekor qilinganmi (bazadan)"""
+    return RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(
+        Q(jti__in=[payload['j'], payload['s']])
+        | Q(jti__isnull=True, user_id=payload['u'], revoked_at__gte=_to_datetime(payload['i']))
+    ).exists()
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def _purge_expired():
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+
+
+def revoke(payload):
+    """
+    Refresh tokenni (``decode`` natijasi) ishlatilgan deb yozadi: rotation.
+    False -- token allaqachon ishlatilgan (parallel so'rov ulgurgan).
+    """
+    _purge_expired()
+    _, created = RevokedToken.objects.get_or_create(
+        jti=payload['j'],
+        defaults={'user_id': payload['u'], 'rotated': True, 'expires_at': _to_datetime(payload['e'])},
+    )
+    return created
+
+
+def revoke_session(payload):
+    """Token sessiyasidagi barcha tokenlarni bekor qiladi: logout"""
+    _purge_expired()
+    # Sessiyaning hozirgacha berilgan eng uzoq tokeni ham shu vaqtgacha tugaydi
+    RevokedToken.objects.get_or_create(jti=payload['s'], defaults={
+        'user_id': payload['u'], 'expires_at': _to_datetime(time.time() + lifetime(REFRESH)),
+    })
+    REVOKED.bump()
+
+
+def revoke_all(user_id):
+    """Foydalanuvchiga hozirgacha berilgan barcha tokenlarni bekor qiladi"""
+    _purge_expired()
+    RevokedToken.objects.create(user_id=user_id, expires_at=_to_datetime(time.time() + lifetime(REFRESH)))
+    REVOKED.bump()
+
+
+class UserCache:
+    """Jarayon ichidagi ``{user_id: (tugash, user)}``; har so'rovga nusxa beriladi"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, user_id):
+        """Faol foydalanuvchi (yo'q bo'lsa None)"""
+        entry = self.entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            # So'rov obyektni o'zgartirsa boshqa so'rovlarga o'tmasin
+            return copy.copy(entry[1])
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is not None:
+            self.put(user)
+        return user
+
+    def put(self, user):
+        ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', 30)
+        max_entries = getattr(settings, 'AUTH_USER_CACHE_MAX_ENTRIES', 10000)
+        with self.lock:
+            if len(self.entries) >= max_entries:
+                now = time.monotonic()
+                self.entries = {pk: entry for pk, entry in self.entries.items() if entry[0] > now}
+                while len(self.entries) >= max_entries:
+                    # Eng eski yozuv (lug'at qo'shilish tartibida)
+                    self.entries.pop(next(iter(self.entries)))
+            self.entries[user.pk] = (time.monotonic() + ttl, copy.copy(user))
+
+    def evict(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+USERS = UserCache()
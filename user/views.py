@@ -2,15 +2,23 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from django.contrib.auth.signals import user_logged_in
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from core.eager_loading import EagerLoadingMixin
+from core.pagination import NestedListMixin
+from . import tokens
 from .models import User
-from .serializers import UserSerializer, UserCreateSerializer
+from .serializers import (
+    UserSerializer, UserCreateSerializer, LoginSerializer, RefreshTokenSerializer,
+    LogoutSerializer, TokenPairSerializer
+)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(NestedListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     User CRUD operations
     
@@ -27,6 +35,10 @@ class UserViewSet(viewsets.ModelViewSet):
     search_fields = ['ism', 'familiya', 'telefon', 'email']
     ordering_fields = ['yaratilgan_vaqt', 'ism']
     ordering = ['-yaratilgan_vaqt']
+    # core.throttling endpoint doiralari
+    throttle_scopes = {'create': 'register', 'login': 'login'}
+    # Login IP bilan birga telefon bo'yicha ham cheklanadi
+    throttle_fields = {'login': ['telefon']}
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -34,9 +46,62 @@ class UserViewSet(viewsets.ModelViewSet):
         return UserSerializer
     
     def get_permissions(self):
-        if self.action == 'create':
+        if self.action in ('create', 'login', 'refresh', 'logout'):
             return [AllowAny()]
         return [IsAuthenticated()]
+
+    # Token endpointlari Authorization sarlavhasini o'qimaydi: eskirgan
+    # access token login/refresh'ga xalaqit bermasin
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Telefon va parol bilan access/refresh token olish",
+        request_body=LoginSerializer,
+        responses={200: TokenPairSerializer()}
+    )
+    @action(detail=False, methods=['post'], authentication_classes=[])
+    def login(self, request):
+        """Imzolangan access va refresh tokenlarni qaytaradi"""
+        serializer = LoginSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        user_logged_in.send(sender=user.__class__, request=request, user=user)
+        return Response(tokens.issue_pair(user.pk))
+
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Refresh token bilan yangi juftlik olish (eski refresh bekor qilinadi)",
+        request_body=RefreshTokenSerializer,
+        responses={200: TokenPairSerializer()}
+    )
+    @action(detail=False, methods=['post'], authentication_classes=[])
+    def refresh(self, request):
+        """Yangi access va refresh token (rotation)"""
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = serializer.validated_data['refresh']
+        if tokens.USERS.get(payload['u']) is None:
+            raise AuthenticationFailed("Foydalanuvchi topilmadi yoki faol emas")
+        if not tokens.revoke(payload):
+            raise ValidationError({'refresh': "Token bekor qilingan"})
+        return Response(tokens.issue_pair(payload['u'], session=payload['s']))
+
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Sessiya tokenlarini (all=true -- barcha sessiyalarni) bekor qilish",
+        request_body=LogoutSerializer,
+        responses={204: 'Tokenlar bekor qilindi'}
+    )
+    @action(detail=False, methods=['post'], authentication_classes=[])
+    def logout(self, request):
+        """Refresh token sessiyasini bekor qiladi"""
+        serializer = LogoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = serializer.validated_data['refresh']
+        if serializer.validated_data['all']:
+            tokens.revoke_all(payload['u'])
+        else:
+            tokens.revoke_session(payload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
     @swagger_auto_schema(
         method='get',
@@ -58,6 +123,4 @@ class UserViewSet(viewsets.ModelViewSet):
         """Foydalanuvchining barcha do'konlarini qaytaradi"""
         user = self.get_object()
         from categoriya.serializers import ShopSerializer
-        shops = user.shops.all()
-        serializer = ShopSerializer(shops, many=True)
-        return Response(serializer.data)
+        return self.nested_list_response(user.shops.all(), ShopSerializer)